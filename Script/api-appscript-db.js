@@ -1,6 +1,9 @@
 // API and Database handling for Google Apps Script
 // This file handles API calls and database operations
 
+// Column of the updated_at stamp that insert and update write
+const UPDATED_AT_COLUMN = 9;
+
 function doPost(request) {
   // Handle POST requests to the web app
   try {
@@ -55,6 +58,7 @@ function handleInsert(params) {
     const newRow = lastRow + 1;
     
     sheet.getRange(newRow, 1, 1, data.length).setValues([data]);
+    notifyWebhook('insert', sheet, newRow, readRow(sheet, newRow));
     
     return createResponse('success', 'Data inserted successfully');
     
@@ -90,7 +94,8 @@ function handleUpdate(params) {
     if (params.data8) sheet.getRange(rowIndex, 8).setValue(params.data8);
     
     // Update timestamp
-    sheet.getRange(rowIndex, 9).setValue(new Date().toISOString());
+    sheet.getRange(rowIndex, UPDATED_AT_COLUMN).setValue(new Date().toISOString());
+    notifyWebhook('update', sheet, rowIndex, readRow(sheet, rowIndex));
     
     return createResponse('success', 'Data updated successfully');
     
@@ -147,8 +152,10 @@ function handleDelete(params) {
       throw new Error('Invalid row index: ' + params.rowIndex);
     }
     
-    // Delete the row
+    // Delete the row, telling the webhook which one it was
+    const deleted = readRow(sheet, rowIndex);
     sheet.deleteRow(rowIndex);
+    notifyWebhook('delete', sheet, rowIndex, deleted);
     
     return createResponse('success', 'Data deleted successfully');
     
@@ -158,6 +165,98 @@ function handleDelete(params) {
   }
 }
 
+function readRow(sheet, rowIndex) {
+  // Row as an object of header to value, the shape the webhook receiver expects.
+  // Display values are what the CSV export holds, so a date typed as 2024-02-01
+  // stays 2024-02-01 whatever the spreadsheet's time zone.
+  const lastColumn = sheet.getLastColumn();
+  const headers = sheet.getRange(1, 1, 1, lastColumn).getDisplayValues()[0];
+  const range = sheet.getRange(rowIndex, 1, 1, lastColumn);
+  const displayed = range.getDisplayValues()[0];
+  const values = range.getValues()[0];
+  const row = {};
+  headers.forEach((header, index) => {
+    if (header) {
+      const value = values[index];
+      // Only the updated_at stamp this script writes is an instant
+      const stamp = index + 1 === UPDATED_AT_COLUMN && value instanceof Date;
+      row[header] = stamp ? value.toISOString() : displayed[index];
+    }
+  });
+  return row;
+}
+
+function notifyWebhook(action, sheet, rowIndex, row) {
+  // POST a signed row-change event to the sync daemon (sync_daemon.py --webhook-port).
+  // Set WEBHOOK_URL (e.g. https://host:8090/webhook/main) and WEBHOOK_SECRET in script properties.
+  const properties = PropertiesService.getScriptProperties();
+  const url = properties.getProperty('WEBHOOK_URL');
+  const secret = properties.getProperty('WEBHOOK_SECRET');
+  if (!url || !secret) {
+    return;
+  }
+  
+  const body = JSON.stringify({
+    event_id: Utilities.getUuid(),
+    action: action,
+    spreadsheet_id: sheet.getParent().getId(),
+    sheet_name: sheet.getName(),
+    row_index: rowIndex,
+    row: row || {}
+  });
+  const timestamp = Math.floor(Date.now() / 1000).toString();
+  const signature = Utilities.computeHmacSha256Signature(timestamp + '.' + body, secret, Utilities.Charset.UTF_8)
+    .map(byte => ('0' + (byte & 0xff).toString(16)).slice(-2))
+    .join('');
+  
+  try {
+    const response = UrlFetchApp.fetch(url, {
+      method: 'post',
+      contentType: 'application/json',
+      payload: body,
+      headers: {
+        'X-Webhook-Timestamp': timestamp,
+        'X-Webhook-Signature': 'sha256=' + signature
+      },
+      muteHttpExceptions: true
+    });
+    if (response.getResponseCode() !== 200) {
+      console.error('Webhook ' + action + ' failed:', response.getContentText());
+    }
+  } catch (error) {
+    // The daemon's polling (if enabled) still picks the change up
+    console.error('Webhook ' + action + ' failed:', error);
+  }
+}
+
+function onSheetEdit(e) {
+  // Installable edit trigger: manual edits reach the webhook too (see installWebhookTrigger)
+  const sheet = e.range.getSheet();
+  const firstRow = e.range.getRow();
+  const lastRow = e.range.getLastRow();
+  if (lastRow < 2) {
+    return;
+  }
+  if (lastRow - firstRow >= 20) {
+    // Pastes and sorts: cheaper to have the whole sheet read once
+    notifyWebhook('resync', sheet, null, null);
+    return;
+  }
+  for (let rowIndex = Math.max(2, firstRow); rowIndex <= lastRow; rowIndex++) {
+    notifyWebhook('update', sheet, rowIndex, readRow(sheet, rowIndex));
+  }
+}
+
+function installWebhookTrigger() {
+  // Simple onEdit triggers can't call UrlFetchApp, so install onSheetEdit once
+  const spreadsheet = SpreadsheetApp.getActiveSpreadsheet();
+  ScriptApp.getProjectTriggers()
+    .filter(trigger => trigger.getHandlerFunction() === 'onSheetEdit')
+    .forEach(trigger => ScriptApp.deleteTrigger(trigger));
+  ScriptApp.newTrigger('onSheetEdit').forSpreadsheet(spreadsheet).onEdit().create();
+  console.log('Webhook edit trigger installed');
+}
+
 function createResponse(status, message, data = null) {
   // Create standardized response object
   const response = {
@@ -0,0 +1,431 @@
+"""Generate missing articles and meta descriptions with a chat completion API
+
+Replaces the row-by-row loops of Script/generateARTIKEL.js and
+Script/generateMETA.js, which sleep a second or more between rows:
+
+* the rows come from the ingested dataset; the sheet's own column decides
+  which cells are still empty, since ingestion fills meta descriptions in,
+* prompts go out from a thread pool through an adaptive limiter that backs
+  off when the API answers 429 and creeps back up while it doesn't,
+* every response is cached by a hash of its prompt, so a rerun (or a row
+  whose prompt didn't change) costs nothing,
+* results are written back to the sheet in `values:batchUpdate` requests of
+  up to WRITE_BATCH rows, contiguous rows as one range, together with the
+  sheet's `updated_at`-style column when it has one.
+
+Rows that fail are left empty and picked up again by the next run. Any
+OpenAI-compatible `/chat/completions` endpoint works; `ai_api_base` in the
+settings or COMPLETION_API_BASE point it elsewhere; google_check.py runs the
+whole flow against a local stand-in.
+Writing to the sheet uses the Google OAuth credentials of the Search Console
+settings (see indexing), whose refresh token must also carry the
+spreadsheets scope.
+
+Usage:
+    python ai_generate.py --blog main --task article --dry-run     # rows that would be generated, a blog of workspace.db
+    python ai_generate.py --blog main --task meta --concurrency 8
+    python ai_generate.py --task article --limit 50 --config app_config.json --dataset blog.blogds
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import requests
+
+from content_render import plain_text
+from indexing import OAUTH_TOKEN_URL, get_access_token
+from resilience import AdaptiveLimiter, TransientError, get_breaker, retry_call
+from sheets_api import CHANGE_COLUMNS, SHEETS_API_BASE, column_letter, quote_tab, row_ranges
+
+COMPLETION_API_BASE = os.environ.get("COMPLETION_API_BASE", "https://api.openai.com/v1")
+DEFAULT_MODEL = "gpt-3.5-turbo"
+AI_CACHE = os.path.join(".cache", "ai_generate.sqlite")
+DEFAULT_CONCURRENCY = 4
+WRITE_BATCH = 50
+META_MAX_LENGTH = 160
+PROMPT_TEXT_LENGTH = 1500
+
+COMPLETION_BREAKER = get_breaker("completion-api", failure_threshold=5, reset_timeout=60)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    prompt_hash TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TEXT NOT NULL
+)
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+def article_prompt(post):
+    """createArticlePrompt of generateARTIKEL.js"""
+    keyword = post.get('keyword') or post.get('title')
+    prompt = f'Write a comprehensive article about "{keyword}"'
+    if post.get('title'):
+        prompt += f' with the title "{post["title"]}"'
+    focus = post.get('description') or post.get('tags')
+    if focus:
+        prompt += f'. Focus on: {focus}'
+    return prompt + """
+
+Please write a well-structured article with:
+- Introduction that hooks the reader
+- 3-5 main sections with subheadings
+- Practical examples and tips
+- Conclusion that summarizes key points
+- Use SEO-friendly language
+- Make it engaging and informative
+- Target word count: 800-1200 words
+
+Format the article with proper HTML tags for headings and paragraphs."""
+
+
+def meta_prompt(post):
+    """A meta description request built from the post's title, keyword and text"""
+    prompt = f'Write an SEO meta description for the article "{post.get("title")}"'
+    if post.get('keyword'):
+        prompt += f' targeting the keyword "{post["keyword"]}"'
+    text = plain_text(post.get('content_html') or post.get('content') or '')[:PROMPT_TEXT_LENGTH]
+    if text:
+        prompt += f'.\n\nArticle:\n{text}'
+    return prompt + f"""
+
+Requirements:
+- 120-{META_MAX_LENGTH} characters
+- Include the main keyword naturally
+- Encourage the reader to click
+- Reply with the description only, without quotes"""
+
+
+def _clean_article(text):
+    """Drop the ```html fence models like to wrap HTML in"""
+    return re.sub(r'^```[a-zA-Z]*\s*|\s*```$', '', text.strip()).strip()
+
+
+def _clean_meta(text):
+    text = re.sub(r'\s+', ' ', text).strip().strip('"\'').strip()
+    if len(text) > META_MAX_LENGTH:
+        text = text[:META_MAX_LENGTH - 3].rsplit(' ', 1)[0].rstrip(',.;:') + '...'
+    return text
+
+
+TASKS = {
+    "article": {
+        "column": "content",
+        "system": "You are a professional content writer who creates high-quality, SEO-optimized articles.",
+        "prompt": article_prompt,
+        "clean": _clean_article,
+        "max_tokens": 2000,
+        "temperature": 0.7
+    },
+    "meta": {
+        "column": "meta_description",
+        "system": "You are an SEO specialist who writes concise, compelling meta descriptions.",
+        "prompt": meta_prompt,
+        "clean": _clean_meta,
+        "max_tokens": 120,
+        "temperature": 0.7
+    }
+}
+
+
+def completion_payload(task, post, model=DEFAULT_MODEL):
+    """Chat completion request body for one row"""
+    spec = TASKS[task]
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": spec["system"]},
+            {"role": "user", "content": spec["prompt"](post)}
+        ],
+        "max_tokens": spec["max_tokens"],
+        "temperature": spec["temperature"]
+    }
+
+
+def prompt_hash(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """Completion responses keyed by the hash of the request that produced them"""
+
+    def __init__(self, path=AI_CACHE):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        db = self._connect()
+        try:
+            db.execute(SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def get_many(self, keys):
+        """{prompt hash: response} of the cached ones among `keys`"""
+        found = {}
+        keys = list(keys)
+        db = self._connect()
+        try:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                found.update(db.execute(
+                    f"SELECT prompt_hash, response FROM responses WHERE prompt_hash IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall())
+        finally:
+            db.close()
+        return found
+
+    def put(self, key, model, response):
+        db = self._connect()
+        try:
+            with db:
+                db.execute("INSERT OR REPLACE INTO responses (prompt_hash, model, response, created_at) "
+                           "VALUES (?, ?, ?, ?)", (key, model, response, _now()))
+        finally:
+            db.close()
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('Retry-After'))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+def complete(http, payload, api_key, limiter, api_base=COMPLETION_API_BASE, timeout=120):
+    """Text of one chat completion, retried through the limiter on throttling and server errors"""
+    def attempt():
+        limiter.acquire()
+        throttled, retry_after = False, None
+        try:
+            try:
+                response = http.post(f"{api_base.rstrip('/')}/chat/completions", json=payload,
+                                     headers={"Authorization": f"Bearer {api_key}"}, timeout=timeout)
+            except requests.RequestException as e:
+                raise TransientError(str(e))
+            if response.status_code == 429:
+                throttled, retry_after = True, _retry_after(response)
+                raise TransientError("HTTP 429: rate limited")
+            if response.status_code >= 500:
+                raise TransientError(f"HTTP {response.status_code}")
+            if response.status_code != 200:
+                try:
+                    message = response.json()["error"]["message"]
+                except (ValueError, KeyError, TypeError):
+                    message = response.text[:200]
+                raise RuntimeError(f"HTTP {response.status_code}: {message}")
+            try:
+                return response.json()["choices"][0]["message"]["content"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                raise RuntimeError("No content generated from API")
+        finally:
+            limiter.release(throttled, retry_after)
+    return COMPLETION_BREAKER.call(retry_call, attempt, attempts=6)
+
+
+def sheets_request(method, url, access_token, timeout=30, **kwargs):
+    response = requests.request(method, url, headers={"Authorization": f"Bearer {access_token}"},
+                                timeout=timeout, **kwargs)
+    if response.status_code != 200:
+        raise RuntimeError(f"Sheets API: HTTP {response.status_code} {response.text[:200]}")
+    return response.json()
+
+
+def read_sheet_columns(spreadsheet_id, tab, column, access_token, sheets_base=SHEETS_API_BASE):
+    """Header plus the id, title and `column` cells of a tab, in one header read and one batchGet"""
+    base = f"{sheets_base.rstrip('/')}/spreadsheets/{spreadsheet_id}"
+    header_range = f"{quote_tab(tab)}!1:1"
+    values = sheets_request("GET", f"{base}/values/{quote(header_range, safe='')}", access_token).get('values')
+    headers = [h.strip().lower() for h in (values[0] if values else [])]
+    if column not in headers:
+        raise ValueError(f"The sheet has no '{column}' column")
+    if 'title' not in headers:
+        raise ValueError("The sheet has no 'title' column")
+
+    wanted = [name for name in dict.fromkeys(('id', 'title', column)) if name in headers]
+    ranges = []
+    for name in wanted:
+        letter = column_letter(headers.index(name) + 1)
+        ranges.append(f"{quote_tab(tab)}!{letter}2:{letter}")
+    data = sheets_request("GET", f"{base}/values:batchGet", access_token,
+                           params={"ranges": ranges, "majorDimension": "COLUMNS"})
+    columns = {}
+    for name, value_range in zip(wanted, data.get('valueRanges', [])):
+        cells = value_range.get('values') or [[]]
+        columns[name] = cells[0]
+    return headers, columns
+
+
+def pending_rows(posts, headers, columns, column):
+    """(sheet row, post) of the posts whose `column` cell is empty in the sheet, in sheet order
+
+    Rows are matched by id the way blog_data.rows_to_posts assigns it (the id
+    cell, or the data row number when there is none) together with the title,
+    as a blank id cell can repeat another row's id.
+    """
+    ids = columns.get('id', [])
+    titles = columns.get('title', [])
+    targets = columns.get(column, [])
+    empty = {}
+    for index in range(max(len(ids), len(titles))):
+        title = titles[index] if index < len(titles) else ''
+        target = targets[index] if index < len(targets) else ''
+        if not title.strip() or target.strip():
+            continue
+        row_id = (ids[index].strip() if index < len(ids) else '') or str(index + 1)
+        empty.setdefault((row_id, title.strip()), index + 2)
+    rows = [(empty[(str(post.get('id')), post.get('title'))], post) for post in posts
+            if (str(post.get('id')), post.get('title')) in empty]
+    return sorted(rows, key=lambda item: item[0])
+
+
+def write_cells(spreadsheet_id, tab, updates, access_token, sheets_base=SHEETS_API_BASE):
+    """Write {column letter: {sheet row: value}} in one values:batchUpdate; returns the cells written"""
+    data = []
+    for letter, cells in updates.items():
+        for first, last in row_ranges(sorted(cells)):
+            data.append({"range": f"{quote_tab(tab)}!{letter}{first}:{letter}{last}", "majorDimension": "ROWS",
+                         "values": [[cells[row]] for row in range(first, last + 1)]})
+    if not data:
+        return 0
+    sheets_request("POST", f"{sheets_base.rstrip('/')}/spreadsheets/{spreadsheet_id}/values:batchUpdate",
+                    access_token, json={"valueInputOption": "RAW", "data": data})
+    return sum(len(cells) for cells in updates.values())
+
+
+def generate_posts(posts, config, task="article", cache_path=AI_CACHE, concurrency=None, limit=None, dry_run=False,
+                   progress=None, api_base=None, token_url=OAUTH_TOKEN_URL, sheets_base=SHEETS_API_BASE):
+    """Generate the task's column for every row where it is empty and write it back; returns a summary"""
+    if task not in TASKS:
+        raise ValueError(f"Unknown task '{task}', expected one of: {', '.join(TASKS)}")
+    if not (config.get('spreadsheet_id') and config.get('sheet_name')):
+        raise ValueError("Spreadsheet ID and sheet name are required to write results back")
+    column = TASKS[task]["column"]
+    model = config.get('ai_model') or DEFAULT_MODEL
+    api_base = api_base or config.get('ai_api_base') or COMPLETION_API_BASE
+    concurrency = max(1, concurrency or int(config.get('ai_concurrency') or DEFAULT_CONCURRENCY))
+    spreadsheet_id, tab = config['spreadsheet_id'], config['sheet_name']
+
+    access_token = get_access_token(config, token_url)
+    headers, columns = read_sheet_columns(spreadsheet_id, tab, column, access_token, sheets_base)
+    rows = pending_rows(posts, headers, columns, column)[:limit]
+    cache = ResponseCache(cache_path)
+    jobs = []
+    for row, post in rows:
+        payload = completion_payload(task, post, model)
+        jobs.append((row, post, payload, prompt_hash(payload)))
+    cached = cache.get_many(key for _, _, _, key in jobs)
+
+    summary = {"task": task, "pending": len(jobs), "cached": sum(1 for job in jobs if job[3] in cached),
+               "generated": 0, "failed": 0, "written": 0, "throttled": 0}
+    if dry_run:
+        summary["would_generate"] = [f"row {row}: {post.get('title')}" for row, post, _, _ in jobs]
+        return summary
+    if not jobs:
+        return summary
+    if len(cached) < len(jobs) and not config.get('ai_api_key'):
+        raise ValueError("An AI API key is required to generate uncached rows")
+
+    target_letter = column_letter(headers.index(column) + 1)
+    change_letter = next((column_letter(headers.index(name) + 1) for name in CHANGE_COLUMNS if name in headers), None)
+    clean = TASKS[task]["clean"]
+    buffered = {}
+    errors = set()
+
+    def flush():
+        if not buffered:
+            return
+        updates = {target_letter: dict(buffered)}
+        if change_letter:
+            stamp = _now()
+            updates[change_letter] = {row: stamp for row in buffered}
+        write_cells(spreadsheet_id, tab, updates, access_token, sheets_base)
+        summary["written"] += len(buffered)
+        buffered.clear()
+
+    def done(row, text):
+        text = clean(text)
+        if not text:
+            summary["failed"] += 1
+            errors.add("Empty response")
+            return
+        buffered[row] = text
+        if len(buffered) >= WRITE_BATCH:
+            flush()
+
+    for row, _, _, key in jobs:
+        if key in cached:
+            done(row, cached[key])
+
+    uncached = [job for job in jobs if job[3] not in cached]
+    if uncached:
+        limiter = AdaptiveLimiter(concurrency)
+        http = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=concurrency)
+        http.mount("https://", adapter)
+        http.mount("http://", adapter)
+
+        def generate(payload, key):
+            text = complete(http, payload, config['ai_api_key'], limiter, api_base)
+            cache.put(key, model, text)
+            return text
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = {pool.submit(generate, payload, key): row for row, _, payload, key in uncached}
+            for count, future in enumerate(as_completed(futures), start=1):
+                try:
+                    done(futures[future], future.result())
+                    summary["generated"] += 1
+                except Exception as e:
+                    summary["failed"] += 1
+                    errors.add(str(e))
+                if progress:
+                    progress(count, len(futures), f"Generated {count}/{len(futures)} rows")
+        summary["throttled"] = limiter.throttled_count
+    flush()
+    if errors:
+        summary["errors"] = sorted(errors)[:5]
+    return summary
+
+
+def main(argv=None):
+    from dataset_store import PostDataset
+    from workspace import add_blog_arguments, resolve_blog
+
+    parser = argparse.ArgumentParser(description="Generate missing articles or meta descriptions and write them to the sheet")
+    parser.add_argument('--task', choices=sorted(TASKS), default="article")
+    add_blog_arguments(parser)
+    parser.add_argument('--cache', default=AI_CACHE, help="Response cache")
+    parser.add_argument('--concurrency', type=int, help=f"Most requests in flight (default {DEFAULT_CONCURRENCY})")
+    parser.add_argument('--limit', type=int, help="Generate at most this many rows")
+    parser.add_argument('--dry-run', action='store_true', help="Only list the rows that would be generated")
+    args = parser.parse_args(argv)
+
+    try:
+        _, config, dataset_file = resolve_blog(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    with PostDataset(dataset_file) as dataset:
+        summary = generate_posts(dataset, config, args.task, args.cache, args.concurrency, args.limit, args.dry_run)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,464 @@
+"""Self-hosted page assets: purged vendor CSS, inlined critical CSS, precompressed files
+
+The page templates loaded Bootstrap, its JS bundle and Font Awesome from
+jsDelivr and cdnjs: render-blocking requests to two more origins for a few
+hundred KB of CSS, most of it unused by a card layout. Instead:
+
+* the vendor files are downloaded once into ASSET_CACHE_DIR, or read from a
+  local copy (`vendor_dir`, files under their CDN names) for offline builds,
+* rules naming a class or id the templates never mention are purged; the
+  template sources are searched as text, so markup built by JavaScript counts
+  as used (PurgeCSS's rule), and element selectors always stay, since post
+  content can hold any allowed element,
+* rules the navigation bar and hero need (everything up to FOLD_MARKER) are
+  inlined as critical CSS; the rest goes into one fingerprinted stylesheet
+  loaded without blocking render, with the webfonts it uses self-hosted,
+* the Bootstrap JS bundle is only included when a template uses a data-bs-*
+  component, self-hosted and deferred,
+* text files get .gz and, with the brotli module installed, .br variants.
+
+When the vendor files can't be fetched the pages keep the CDN links.
+
+Usage:
+    python asset_pipeline.py --out dist/site/assets                  # assets of the static pages
+    python asset_pipeline.py --template blog-template.html --out public/assets
+    python asset_pipeline.py --vendor-dir vendor --out dist/site/assets
+"""
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import logging
+import os
+import posixpath
+import re
+import sys
+import time
+import zipfile
+from urllib.parse import urljoin, urlsplit
+
+import requests
+
+logger = logging.getLogger("asset_pipeline")
+
+VENDOR_STYLES = (
+    "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css",
+    "https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css",
+)
+VENDOR_SCRIPT = "https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"
+CDN_STYLES = "\n".join(f'<link href="{url}" rel="stylesheet">' for url in VENDOR_STYLES)
+CDN_SCRIPT = f'<script src="{VENDOR_SCRIPT}"></script>'
+
+ASSET_CACHE_DIR = os.path.join(".cache", "assets")
+ASSET_BASE = "/assets/"
+ASSET_CACHE_CONTROL = "public, max-age=31536000, immutable"
+FOLD_MARKER = '<div class="container mt-5">'
+CONTENT_TYPES = {
+    "css": "text/css; charset=utf-8",
+    "js": "application/javascript; charset=utf-8",
+    "svg": "image/svg+xml",
+    "woff2": "font/woff2",
+    "woff": "font/woff",
+    "ttf": "font/ttf",
+}
+COMPRESSIBLE_TYPES = ("text/", "application/javascript", "image/svg+xml")
+FETCH_RETRY_INTERVAL = 300
+GROUPING_RULES = ("@media", "@supports", "@document", "@layer")
+
+_COMMENT = re.compile(r'/\*.*?\*/', re.S)
+_NOTICE = re.compile(r'/\*!.*?\*/', re.S)
+_TOKEN = re.compile(r'[A-Za-z0-9_-]+')
+_ATTRIBUTE = re.compile(r'\[[^\]]*\]')
+_PSEUDO = re.compile(r'::?[\w-]+(\((?:[^()]|\([^()]*\))*\))?')
+_NAMES = re.compile(r'[.#](-?[_a-zA-Z][\w-]*)')
+_CUSTOM_PROPERTY = re.compile(r'--[\w-]+\s*:[^;}]*')
+_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+# Builds by their inputs; a failed fetch is retried after FETCH_RETRY_INTERVAL
+_built = {}
+_failed = {}
+
+
+def fingerprint(name, content):
+    """`name` with a hash of `content` before its extension: app.css -> app.<hash>.css"""
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    stem, dot, ext = name.rpartition('.')
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:10]}{dot}{ext}"
+
+
+def content_type(name):
+    return CONTENT_TYPES.get(name.rpartition('.')[2], "application/octet-stream")
+
+
+def template_sources(*names):
+    """Text of template source files beside this module, the markup the CSS is purged against"""
+    texts = []
+    for name in names:
+        with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), name), 'r', encoding='utf-8') as f:
+            texts.append(f.read())
+    return "\n".join(texts)
+
+
+def vendor_file(url, cache_dir=ASSET_CACHE_DIR, vendor_dir=None, timeout=10):
+    """Bytes of a vendor file: a local copy in vendor_dir, the download cache, or a download"""
+    filename = posixpath.basename(urlsplit(url).path)
+    if vendor_dir:
+        with open(os.path.join(vendor_dir, filename), 'rb') as f:
+            return f.read()
+    path = os.path.join(cache_dir, "vendor", f"{hashlib.sha256(url.encode('utf-8')).hexdigest()[:16]}-{filename}")
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    response = requests.get(url, timeout=timeout)
+    if response.status_code != 200:
+        raise RuntimeError(f"Download of {url} failed: HTTP {response.status_code}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(response.content)
+    os.replace(tmp, path)
+    return response.content
+
+
+def _skip_string(text, i):
+    """Index just past the quoted string starting at i"""
+    quote = text[i]
+    i += 1
+    while i < len(text) and text[i] != quote:
+        i += 2 if text[i] == '\\' else 1
+    return i + 1
+
+
+def _scan(text, i, stops):
+    """Index of the next character in `stops` outside quoted strings, or len(text)"""
+    while i < len(text):
+        if text[i] in '"\'':
+            i = _skip_string(text, i)
+        elif text[i] in stops:
+            return i
+        else:
+            i += 1
+    return len(text)
+
+
+def _parse_block(text, i):
+    nodes = []
+    while True:
+        j = _scan(text, i, '{;}')
+        if j >= len(text) or text[j] == '}':
+            return nodes, j + 1
+        prelude = text[i:j].strip()
+        if text[j] == ';':
+            # Statement at-rules (@charset, @import) and stray semicolons
+            if prelude:
+                nodes.append((prelude, None))
+            i = j + 1
+        elif prelude.startswith('@') and re.split(r'[\s(]', prelude, maxsplit=1)[0].lower() in GROUPING_RULES:
+            children, i = _parse_block(text, j + 1)
+            nodes.append((prelude, children))
+        else:
+            # Declarations, or the nested blocks of @keyframes, kept as text
+            depth, end = 1, j + 1
+            while depth and end < len(text):
+                end = _scan(text, end, '{}')
+                if end < len(text):
+                    depth += 1 if text[end] == '{' else -1
+                    end += 1
+            nodes.append((prelude, text[j + 1:end - 1].strip()))
+            i = end
+
+
+def parse_css(text):
+    """[(prelude, body)] of a stylesheet: body is the declaration text, a list of
+    nested rules for grouping at-rules (@media, @supports) or None for statements"""
+    return _parse_block(_COMMENT.sub('', text), 0)[0]
+
+
+def serialize(nodes):
+    """Minified CSS text of parsed rules"""
+    return ''.join(f"{prelude};" if body is None else
+                   f"{prelude}{{{serialize(body) if isinstance(body, list) else body}}}"
+                   for prelude, body in nodes)
+
+
+def split_commas(prelude):
+    """Items of a comma-separated list (selectors, font sources), splitting outside parentheses"""
+    items, depth, start = [], 0, 0
+    for i, ch in enumerate(prelude):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch == ',' and depth == 0:
+            items.append(prelude[start:i].strip())
+            start = i + 1
+    items.append(prelude[start:].strip())
+    return items
+
+
+def used_tokens(markup):
+    """Every word of the markup that could be a class name, id or element"""
+    return set(_TOKEN.findall(markup))
+
+
+def selector_used(selector, tokens):
+    """False when the selector names a class or id missing from `tokens`; pseudo-classes and attributes don't count"""
+    bare = _PSEUDO.sub('', _ATTRIBUTE.sub('', selector))
+    return all(name in tokens for name in _NAMES.findall(bare))
+
+
+def above_fold(markup):
+    """Markup of each page from <body> up to the main content container"""
+    return re.findall(r'<body[^>]*>((?:(?!<body).)*?)' + re.escape(FOLD_MARKER), markup, re.S)
+
+
+def _woff2_only(body):
+    """@font-face src without the older formats every browser that reads woff2 skips"""
+    match = re.search(r'src:([^;]+)', body)
+    if not match:
+        return body
+    sources = [source for source in split_commas(match.group(1)) if 'woff2' in source]
+    return body if not sources else body[:match.start(1)] + ','.join(sources) + body[match.end(1):]
+
+
+def _references(nodes):
+    """Declaration text of the style rules, without custom properties, to look up fonts and keyframes in"""
+    texts = []
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            texts.append(_references(body))
+        elif body and not prelude.startswith('@'):
+            texts.append(_CUSTOM_PROPERTY.sub('', body))
+    return ' '.join(texts)
+
+
+def _drop_unreferenced(nodes, references):
+    kept = []
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            children = _drop_unreferenced(body, references)
+            if children:
+                kept.append((prelude, children))
+            continue
+        keyword = prelude.split(None, 1)[0].lower()
+        if keyword == '@font-face':
+            family = re.search(r'font-family:\s*([^;]+)', body)
+            if not family or family.group(1).strip().strip('"\'') not in references:
+                continue
+            body = _woff2_only(body)
+        elif keyword.endswith('keyframes'):
+            if not re.search(r'(?<![\w-])' + re.escape(prelude.split()[-1]) + r'(?![\w-])', references):
+                continue
+        kept.append((prelude, body))
+    return kept
+
+
+def purge(nodes, tokens):
+    """Rules with the selectors that can match the markup, plus the @font-face and @keyframes they use"""
+    def keep(nodes):
+        kept = []
+        for prelude, body in nodes:
+            if isinstance(body, list):
+                children = keep(body)
+                if children:
+                    kept.append((prelude, children))
+            elif body is None:
+                continue
+            elif prelude.startswith('@'):
+                kept.append((prelude, body))
+            else:
+                selectors = [selector for selector in split_commas(prelude) if selector_used(selector, tokens)]
+                if selectors:
+                    kept.append((','.join(selectors), body))
+        return kept
+
+    kept = keep(nodes)
+    return _drop_unreferenced(kept, _references(kept))
+
+
+def split_critical(nodes, tokens):
+    """(critical, deferred) rules: a rule is critical when one of its selectors can match `tokens`"""
+    critical, deferred = [], []
+    for prelude, body in nodes:
+        if isinstance(body, list):
+            inner_critical, inner_deferred = split_critical(body, tokens)
+            if inner_critical:
+                critical.append((prelude, inner_critical))
+            if inner_deferred:
+                deferred.append((prelude, inner_deferred))
+        elif prelude.startswith('@') or body is None:
+            deferred.append((prelude, body))
+        elif any(selector_used(selector, tokens) for selector in split_commas(prelude)):
+            critical.append((prelude, body))
+        else:
+            deferred.append((prelude, body))
+    return critical, deferred
+
+
+def self_host(css, css_url, files, fetch, base_url=ASSET_BASE):
+    """Rewrite the url()s of a stylesheet to fingerprinted copies under base_url, added to `files`"""
+    def replace(match):
+        reference = match.group(2).strip()
+        if reference.startswith(('data:', '#')):
+            return match.group(0)
+        absolute = urljoin(css_url, reference)
+        data = fetch(absolute)
+        name = fingerprint(posixpath.basename(urlsplit(absolute).path), data)
+        files[name] = (data, content_type(name))
+        return f"url({base_url}{name})"
+    return _URL.sub(replace, css)
+
+
+def variant_name(name, encoding):
+    """File name of a precompressed variant: site.<hash>.css.gz, site.<hash>.css.br"""
+    return f"{name}.{'gz' if encoding == 'gzip' else encoding}"
+
+
+def _load_brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def precompress(files):
+    """{name: {"br": bytes, "gzip": bytes}} for the compressible files; .br needs the brotli module"""
+    brotli = _load_brotli()
+    encoded = {}
+    for name, (data, type_) in files.items():
+        if not type_.startswith(COMPRESSIBLE_TYPES):
+            continue
+        encoded[name] = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+        if brotli:
+            encoded[name]["br"] = brotli.compress(data, quality=11)
+    return encoded
+
+
+def cdn_assets(markup, theme_css=''):
+    """The third-party links the templates always had, for when the vendor files can't be fetched"""
+    styles = CDN_STYLES + (f"\n<style>{theme_css}</style>" if theme_css else '')
+    return {"styles": styles, "scripts": CDN_SCRIPT if 'data-bs-' in markup else '', "files": {}, "encoded": {},
+            "critical_bytes": 0, "deferred_bytes": 0}
+
+
+def _build(markup, theme_css, cache_dir, vendor_dir, base_url):
+    fetch = lambda url: vendor_file(url, cache_dir, vendor_dir)
+    tokens = used_tokens(markup)
+    fold_tokens = used_tokens('\n'.join(above_fold(markup)))
+    files = {}
+    critical, deferred, notices = [], [], []
+    for url in VENDOR_STYLES:
+        text = fetch(url).decode('utf-8')
+        notices += _NOTICE.findall(text)
+        fast, rest = split_critical(purge(parse_css(text), tokens), fold_tokens)
+        critical.append(self_host(serialize(fast), url, files, fetch, base_url))
+        deferred.append(self_host(serialize(rest), url, files, fetch, base_url))
+    # The page's own rules come last so they still override the vendor's
+    fast, rest = split_critical(parse_css(theme_css), fold_tokens)
+    critical.append(serialize(fast))
+    deferred.append(serialize(rest))
+
+    critical_css = ''.join(critical)
+    deferred_css = '\n'.join(notices) + '\n' + ''.join(deferred)
+    css_name = fingerprint("site.css", deferred_css)
+    files[css_name] = (deferred_css.encode('utf-8'), content_type(css_name))
+    href = base_url + css_name
+    styles = (f"<style>{critical_css}</style>\n"
+              f"<link rel=\"stylesheet\" href=\"{href}\" media=\"print\" onload=\"this.media='all'\">\n"
+              f"<noscript><link rel=\"stylesheet\" href=\"{href}\"></noscript>")
+
+    scripts = ''
+    if 'data-bs-' in markup:
+        bundle = fetch(VENDOR_SCRIPT)
+        script_name = fingerprint(posixpath.basename(urlsplit(VENDOR_SCRIPT).path), bundle)
+        files[script_name] = (bundle, content_type(script_name))
+        scripts = f'<script src="{base_url}{script_name}" defer></script>'
+    return {"styles": styles, "scripts": scripts, "files": files, "encoded": precompress(files),
+            "critical_bytes": len(critical_css.encode('utf-8')), "deferred_bytes": len(deferred_css.encode('utf-8'))}
+
+
+def build_page_assets(markup, theme_css='', cache_dir=ASSET_CACHE_DIR, vendor_dir=None, base_url=ASSET_BASE):
+    """Assets of pages built from `markup` (the template sources, as text)
+
+    Returns {"styles": HTML for <head>, "scripts": HTML for the end of <body>,
+    "files": {name: (bytes, Content-Type)}, "encoded": {name: {"br", "gzip"}},
+    "critical_bytes", "deferred_bytes"}. `theme_css` is the pages' own
+    stylesheet, split into critical and deferred rules but never purged.
+    Without the vendor files it returns cdn_assets().
+    """
+    key = hashlib.sha256('\0'.join((markup, theme_css, cache_dir, vendor_dir or '', base_url)).encode('utf-8')).hexdigest()
+    if key not in _built:
+        if time.monotonic() - _failed.get(key, -FETCH_RETRY_INTERVAL) < FETCH_RETRY_INTERVAL:
+            return cdn_assets(markup, theme_css)
+        try:
+            _built[key] = _build(markup, theme_css, cache_dir, vendor_dir, base_url)
+        except (OSError, RuntimeError, UnicodeDecodeError, requests.RequestException) as e:
+            logger.warning("vendor assets unavailable, pages keep the CDN links: %s", e)
+            _failed[key] = time.monotonic()
+            return cdn_assets(markup, theme_css)
+    return _built[key]
+
+
+def apply_assets(html, assets):
+    """Swap the CDN <link>/<script> tags of a page for the built styles and scripts"""
+    links = [re.compile(r'<link[^>]*href="' + re.escape(url) + r'"[^>]*>\n?') for url in VENDOR_STYLES]
+    first = min((match.start() for match in (link.search(html) for link in links) if match), default=None)
+    if first is None:
+        return html
+    html = html[:first] + '\0' + html[first:]
+    for link in links:
+        html = link.sub('', html)
+    html = html.replace('\0', assets["styles"] + '\n', 1)
+    return re.sub(r'<script[^>]*src="' + re.escape(VENDOR_SCRIPT) + r'"[^>]*></script>',
+                  lambda _: assets["scripts"], html)
+
+
+def write_assets(assets, out_dir):
+    """Write the asset files and their .gz/.br variants into out_dir; returns the file names"""
+    os.makedirs(out_dir, exist_ok=True)
+    written = []
+    for name, (data, _) in assets["files"].items():
+        outputs = [(name, data)] + [(variant_name(name, encoding), variant)
+                                    for encoding, variant in assets["encoded"].get(name, {}).items()]
+        for output, content in outputs:
+            with open(os.path.join(out_dir, output), 'wb') as f:
+                f.write(content)
+            written.append(output)
+    return written
+
+
+def assets_zip(assets, folder="assets"):
+    """The asset files and their variants as a zip, for templates downloaded on their own"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, (data, _) in assets["files"].items():
+            archive.writestr(f"{folder}/{name}", data)
+            for encoding, variant in assets["encoded"].get(name, {}).items():
+                archive.writestr(f"{folder}/{variant_name(name, encoding)}", variant)
+    return buffer.getvalue()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the purged, self-hosted and precompressed page assets")
+    parser.add_argument('--template', action='append',
+                        help="Template source to purge against (repeatable; default: the static site templates)")
+    parser.add_argument('--out', default=os.path.join("dist", "site", "assets"), help="Directory for the files")
+    parser.add_argument('--vendor-dir', help="Local copies of the vendor files, under their CDN file names")
+    parser.add_argument('--cache', default=ASSET_CACHE_DIR, help="Download cache")
+    args = parser.parse_args(argv)
+
+    markup = template_sources(*(args.template or ("site_render.py", "content_render.py")))
+    assets = build_page_assets(markup, cache_dir=args.cache, vendor_dir=args.vendor_dir)
+    if not assets["files"]:
+        print("Vendor files unavailable; the pages keep the CDN links", file=sys.stderr)
+        return 1
+    written = write_assets(assets, args.out)
+    print(json.dumps({"critical_bytes": assets["critical_bytes"], "deferred_bytes": assets["deferred_bytes"],
+                      "files": written}, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,475 @@
+"""Self-hosted blog server: the Worker's routes served from Python on asyncio
+
+Usage:
+    python blog_api_server.py --blog main             # a blog of the app's workspace.db on :8080
+    python blog_api_server.py --config app_config.json   # a legacy single-blog config
+    python blog_api_server.py --workers 4 --port 80   # one process per core (SO_REUSEPORT)
+    python blog_api_server.py --no-refresh            # dataset kept fresh by sync_daemon.py
+
+Routes match the generated Cloudflare Worker: /, /api/posts, /api/categories,
+/api/tags, /api/stats, /post/<slug>, /api/post/<slug>, /api/list/<path>.json
+and /health, plus the listing pages the static build emits (/page/N/,
+/category/..., /tag/..., /archive/YYYY/MM/).
+
+Every response body is prepared when the dataset changes, not per request:
+API bodies are the same JSON the KV snapshot holds, HTML pages are rendered
+on first use and kept in an LRU of PAGE_CACHE_SIZE pages, and gzip variants and ETags are computed once. The
+pages' stylesheet, fonts and scripts (asset_pipeline.py) are served from
+/assets/ with their precompressed .br and .gzip bodies.
+
+The supervisor process polls Google and rewrites the mmap dataset file;
+worker processes only watch that file and swap in a new site when it changes.
+"""
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from collections import OrderedDict
+from datetime import datetime
+from email.utils import formatdate
+from urllib.parse import unquote
+
+from asset_pipeline import ASSET_BASE, ASSET_CACHE_CONTROL, build_page_assets, template_sources
+from blog_data import build_dataset, fetch_sheet_csv_if_changed, parse_posts_csv
+from dataset_store import PostDataset, prepare_posts, write_dataset
+from feeds import FEED_CACHE_CONTROL, content_type, feed_bodies
+from kv_publish import build_kv_entries
+from listing_shards import LISTING_KEY_PREFIX
+from site_render import compile_templates, listing_url, render_listing, render_post
+from static_build import plan_build
+from workspace import add_blog_arguments, resolve_blog
+
+logger = logging.getLogger("blog_api_server")
+
+DEFAULT_PORT = 8080
+REFRESH_INTERVAL = 60
+RELOAD_CHECK_INTERVAL = 2
+KEEPALIVE_TIMEOUT = 15
+MAX_HEADER_BYTES = 16 * 1024
+GZIP_MIN_BYTES = 1024
+PAGE_CACHE_SIZE = 2048
+
+CORS_HEADERS = (
+    b"Access-Control-Allow-Origin: *\r\n"
+    b"Access-Control-Allow-Methods: GET, POST, PUT, DELETE, OPTIONS\r\n"
+    b"Access-Control-Allow-Headers: Content-Type, Authorization\r\n"
+)
+REASONS = {200: b"OK", 204: b"No Content", 304: b"Not Modified", 400: b"Bad Request", 404: b"Not Found",
+           405: b"Method Not Allowed", 431: b"Request Header Fields Too Large", 503: b"Service Unavailable"}
+JSON_TYPE = "application/json"
+HTML_TYPE = "text/html; charset=utf-8"
+TEXT_TYPE = "text/plain; charset=utf-8"
+
+
+class Resource:
+    """A response body with its validators and a lazily built gzip variant
+
+    `encoded` holds precompressed variants ({"gzip": ..., "br": ...}); a body
+    that doesn't compress (fonts) is created with compress=False.
+    """
+
+    def __init__(self, body, content_type, status=200, cache_control="public, max-age=60", encoded=None,
+                 compress=True):
+        self.body = body if isinstance(body, bytes) else body.encode('utf-8')
+        self.status = status
+        self.content_type = content_type.encode('ascii')
+        self.cache_control = cache_control.encode('ascii')
+        self.etag = b'"' + hashlib.sha1(self.body).hexdigest()[:20].encode('ascii') + b'"'
+        self.compress = compress
+        self._gzip = (encoded or {}).get("gzip")
+        self.brotli = (encoded or {}).get("br")
+
+    def gzipped(self):
+        if self._gzip is None:
+            self._gzip = gzip.compress(self.body, compresslevel=6, mtime=0)
+        return self._gzip
+
+
+def _json_resource(data, status=200):
+    return Resource(json.dumps(data, ensure_ascii=False, separators=(',', ':')), JSON_TYPE, status)
+
+
+NOT_FOUND = Resource("Not Found", TEXT_TYPE, 404, "no-store")
+POST_NOT_FOUND = Resource("Post not found", TEXT_TYPE, 404, "no-store")
+API_POST_NOT_FOUND = _json_resource({"success": False, "message": "Post not found"}, 404)
+UNAVAILABLE = _json_resource({"success": False, "error": "Blog data is temporarily unavailable"}, 503)
+
+
+class BlogSite:
+    """Everything the server answers from, built from one dataset version"""
+
+    def __init__(self, dataset, config):
+        self.config = config
+        self.spreadsheet_id = config.get('spreadsheet_id', '')
+        posts = list(dataset)
+        data = build_dataset(posts)
+        posts_per_page = int(config.get('posts_per_page') or 6)
+        entries = build_kv_entries(data, self.spreadsheet_id, config.get('sheet_name', ''), posts_per_page,
+                                   config.get('blog_title', 'Blog'))
+        self.version = json.loads(entries.pop("meta"))["version"]
+        self.post_count = len(posts)
+
+        # API bodies are exactly what the KV snapshot serves
+        self.api = {'/' + key: Resource(value, JSON_TYPE) for key, value in entries.items()}
+        if config.get('site_url'):
+            for name, body in feed_bodies(posts, config).items():
+                self.api['/' + name] = Resource(body, content_type(name), cache_control=FEED_CACHE_CONTROL)
+        self.posts = data["by_slug"]
+        assets = build_page_assets(template_sources("site_render.py", "content_render.py"))
+        self.templates = compile_templates(config, assets)
+        for name, (body, type_) in assets["files"].items():
+            encoded = assets["encoded"].get(name)
+            self.api[ASSET_BASE + name] = Resource(body, type_, cache_control=ASSET_CACHE_CONTROL, encoded=encoded,
+                                                   compress=encoded is not None)
+
+        _, listing_tasks = plan_build(dataset, config.get('blog_title', 'Blog'), posts_per_page)
+        self.listings = {}
+        for task in listing_tasks:
+            for heading, base, page, total_pages, rows in task:
+                self.listings[listing_url(base, page)] = (heading, base, page, total_pages,
+                                                          [posts[row] for row in rows])
+        self.pages = OrderedDict()
+
+    def _page(self, path):
+        """Rendered HTML for a post or listing path, or None
+
+        Pages are cached by post slug or listing URL, so /post/<slug> and
+        /post/<slug>/ share one entry and unknown paths never take one.
+        """
+        if path.startswith('/post/'):
+            slug, _, rest = path[len('/post/'):].partition('/')
+            slug = unquote(slug)
+            if rest or slug not in self.posts:
+                return None
+            key = f"/post/{slug}/"
+        else:
+            key = path if path.endswith('/') else path + '/'
+            if key not in self.listings:
+                return None
+
+        resource = self.pages.get(key)
+        if resource is not None:
+            self.pages.move_to_end(key)
+            return resource
+
+        if path.startswith('/post/'):
+            html = render_post(self.templates, self.posts[slug])
+        else:
+            heading, base, page, total_pages, posts = self.listings[key]
+            html = render_listing(self.templates, heading, posts, base, page, total_pages)
+
+        resource = self.pages[key] = Resource(html, HTML_TYPE)
+        if len(self.pages) > PAGE_CACHE_SIZE:
+            self.pages.popitem(last=False)
+        return resource
+
+    def health(self):
+        return _json_resource({
+            "status": "healthy",
+            "timestamp": datetime.now().isoformat(),
+            "spreadsheetId": self.spreadsheet_id,
+            "version": self.version,
+            "posts": self.post_count
+        })
+
+    def resolve(self, path):
+        if path == '/health':
+            return self.health()
+        resource = self.api.get(path)
+        if resource is not None:
+            return resource
+        if path.startswith('/api/post/'):
+            return API_POST_NOT_FOUND
+        if path.startswith('/' + LISTING_KEY_PREFIX):
+            # Shards are also addressed by the file names the static build writes
+            return self.api.get(path[:-len('.json')] if path.endswith('.json') else path) or NOT_FOUND
+        if path.startswith('/post/'):
+            return self._page(path) or POST_NOT_FOUND
+        return self._page(path) or NOT_FOUND
+
+
+class _DateHeader:
+    """Date header bytes, formatted at most once per second"""
+
+    def __init__(self):
+        self.second = None
+        self.value = b""
+
+    def get(self):
+        now = int(time.time())
+        if now != self.second:
+            self.second = now
+            self.value = b"Date: " + formatdate(now, usegmt=True).encode('ascii') + b"\r\n"
+        return self.value
+
+
+_date = _DateHeader()
+
+
+class HTTPProtocol(asyncio.Protocol):
+    """Minimal HTTP/1.1 for GET/HEAD: keep-alive, pipelining, gzip and conditional requests"""
+
+    def __init__(self, server):
+        self.server = server
+        self.transport = None
+        self.buffer = b""
+        self.idle = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self._arm_idle_timer()
+
+    def connection_lost(self, exc):
+        if self.idle:
+            self.idle.cancel()
+
+    def _arm_idle_timer(self):
+        if self.idle:
+            self.idle.cancel()
+        self.idle = asyncio.get_running_loop().call_later(KEEPALIVE_TIMEOUT, self.transport.close)
+
+    def data_received(self, data):
+        self.buffer += data
+        while self.transport and not self.transport.is_closing():
+            end = self.buffer.find(b"\r\n\r\n")
+            if end == -1:
+                if len(self.buffer) > MAX_HEADER_BYTES:
+                    self._send_simple(431)
+                return
+            head = self.buffer[:end]
+            rest = self.buffer[end + 4:]
+
+            lines = head.split(b"\r\n")
+            try:
+                method, target, version = lines[0].split(b" ", 2)
+            except ValueError:
+                self._send_simple(400)
+                return
+            headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(b":")
+                headers[name.strip().lower()] = value.strip()
+
+            # Bodies are not used by any route; skip them to stay in sync
+            length = int(headers.get(b"content-length", b"0") or 0)
+            if len(rest) < length:
+                return
+            self.buffer = rest[length:]
+
+            keep_alive = headers.get(b"connection", b"").lower() != b"close" if version == b"HTTP/1.1" \
+                else headers.get(b"connection", b"").lower() == b"keep-alive"
+            self._respond(method, target, headers, keep_alive)
+            if not keep_alive:
+                self.transport.close()
+                return
+            self._arm_idle_timer()
+
+    def _send_simple(self, status):
+        self.transport.write(b"HTTP/1.1 %d %s\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+                             % (status, REASONS[status]))
+        self.transport.close()
+
+    def _respond(self, method, target, headers, keep_alive):
+        if method == b"OPTIONS":
+            self._write(204, [CORS_HEADERS], b"", keep_alive)
+            return
+        if method not in (b"GET", b"HEAD"):
+            self._write(405, [CORS_HEADERS, b"Allow: GET, HEAD, OPTIONS\r\n"], b"", keep_alive)
+            return
+
+        path = target.split(b"?", 1)[0].decode('utf-8', 'replace')
+        site = self.server.site
+        resource = site.resolve(path) if site is not None else UNAVAILABLE
+
+        extra = [CORS_HEADERS, b"Content-Type: ", resource.content_type, b"\r\n",
+                 b"Cache-Control: ", resource.cache_control, b"\r\n",
+                 b"ETag: ", resource.etag, b"\r\nVary: Accept-Encoding\r\n"]
+        if resource.status == 200 and headers.get(b"if-none-match") == resource.etag:
+            self._write(304, extra, b"", keep_alive)
+            return
+
+        body = resource.body
+        accept_encoding = headers.get(b"accept-encoding", b"")
+        if resource.brotli is not None and b"br" in accept_encoding:
+            body = resource.brotli
+            extra.append(b"Content-Encoding: br\r\n")
+        elif resource.compress and len(body) >= GZIP_MIN_BYTES and b"gzip" in accept_encoding:
+            body = resource.gzipped()
+            extra.append(b"Content-Encoding: gzip\r\n")
+        self._write(resource.status, extra, b"" if method == b"HEAD" else body, keep_alive, len(body))
+
+    def _write(self, status, extra, body, keep_alive, length=None):
+        self.transport.write(b"".join([
+            b"HTTP/1.1 %d %s\r\n" % (status, REASONS.get(status, b"OK")),
+            _date.get(),
+            *extra,
+            b"Content-Length: %d\r\n" % (len(body) if length is None else length),
+            b"Connection: keep-alive\r\n\r\n" if keep_alive else b"Connection: close\r\n\r\n",
+            body
+        ]))
+
+
+class BlogServer:
+    """Holds the current BlogSite and swaps it when the dataset file changes"""
+
+    def __init__(self, dataset_file, config):
+        self.dataset_file = dataset_file
+        self.config = config
+        self.site = None
+        self.mtime = None
+
+    def reload_if_changed(self):
+        try:
+            mtime = os.stat(self.dataset_file).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self.mtime:
+            return False
+        with PostDataset(self.dataset_file) as dataset:
+            site = BlogSite(dataset, self.config)
+        self.site = site
+        self.mtime = mtime
+        logger.info("[%d] serving dataset version %s (%d posts)", os.getpid(), site.version, site.post_count)
+        return True
+
+    async def watch(self, stop):
+        while not stop.is_set():
+            try:
+                # Building the site is CPU work; a thread keeps the old site serving meanwhile
+                await asyncio.to_thread(self.reload_if_changed)
+            except Exception as e:
+                logger.warning("[%d] reload failed: %s", os.getpid(), e)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=RELOAD_CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def serve(host, port, dataset_file, config, reuse_port=False, refresh=None):
+    """Serve until SIGINT/SIGTERM; `refresh` is an optional coroutine factory run alongside"""
+    server = BlogServer(dataset_file, config)
+    server.reload_if_changed()
+
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    listener = await loop.create_server(lambda: HTTPProtocol(server), host, port,
+                                        reuse_port=reuse_port or None, backlog=1024)
+    logger.info("[%d] listening on http://%s:%d", os.getpid(), host, port)
+    tasks = [asyncio.create_task(server.watch(stop))]
+    if refresh:
+        tasks.append(asyncio.create_task(refresh(stop)))
+    await stop.wait()
+    listener.close()
+    await listener.wait_closed()
+    for task in tasks:
+        task.cancel()
+
+
+def refresh_dataset(spreadsheet_id, sheet_name, dataset_file, validators=None):
+    """One conditional fetch; rewrites the dataset file when the sheet changed"""
+    csv_text, validators = fetch_sheet_csv_if_changed(spreadsheet_id, sheet_name, validators)
+    if csv_text is not None:
+        write_dataset(dataset_file, prepare_posts(parse_posts_csv(csv_text), dataset_file))
+    return validators
+
+
+def _refresher(spreadsheet_id, sheet_name, dataset_file, interval):
+    async def run(stop):
+        validators = {}
+        while not stop.is_set():
+            try:
+                validators = await asyncio.to_thread(refresh_dataset, spreadsheet_id, sheet_name,
+                                                     dataset_file, validators)
+            except Exception as e:
+                logger.warning("refresh failed: %s", e)
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=interval)
+            except asyncio.TimeoutError:
+                pass
+    return run
+
+
+def _worker_main(host, port, dataset_file, config, verbose):
+    logging.basicConfig(level=logging.DEBUG if verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(serve(host, port, dataset_file, config, reuse_port=True))
+
+
+def run_supervisor(host, port, dataset_file, config, workers, refresh_interval=None, verbose=False):
+    """Start `workers` server processes on one port and keep the dataset fresh from here"""
+    ctx = multiprocessing.get_context("spawn")
+    processes = [ctx.Process(target=_worker_main, args=(host, port, dataset_file, config, verbose), daemon=True)
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+
+    stop = {"set": False}
+
+    def _stop(*_):
+        stop["set"] = True
+    signal.signal(signal.SIGINT, _stop)
+    signal.signal(signal.SIGTERM, _stop)
+
+    validators = {}
+    next_refresh = 0
+    while not stop["set"] and all(process.is_alive() for process in processes):
+        if refresh_interval and time.monotonic() >= next_refresh:
+            try:
+                validators = refresh_dataset(config.get('spreadsheet_id'), config.get('sheet_name'),
+                                             dataset_file, validators)
+            except Exception as e:
+                logger.warning("refresh failed: %s", e)
+            next_refresh = time.monotonic() + refresh_interval
+        time.sleep(0.5)
+
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the blog API and pages from Python")
+    add_blog_arguments(parser)
+    parser.add_argument('--host', default="0.0.0.0")
+    parser.add_argument('--port', type=int, default=int(os.environ.get("PORT", DEFAULT_PORT)))
+    parser.add_argument('--workers', type=int, default=1, help="Server processes sharing the port")
+    parser.add_argument('--refresh-interval', type=int, default=REFRESH_INTERVAL, help="Seconds between sheet polls")
+    parser.add_argument('--no-refresh', action='store_true', help="Don't poll Google; another process updates the dataset")
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    try:
+        _, config, dataset_file = resolve_blog(args)
+    except ValueError as e:
+        parser.error(str(e))
+    refresh_interval = None if args.no_refresh else args.refresh_interval
+
+    if args.workers > 1:
+        run_supervisor(args.host, args.port, dataset_file, config, args.workers, refresh_interval, args.verbose)
+        return 0
+
+    refresh = None
+    if refresh_interval:
+        refresh = _refresher(config.get('spreadsheet_id'), config.get('sheet_name'), dataset_file, refresh_interval)
+    asyncio.run(serve(args.host, args.port, dataset_file, config, refresh=refresh))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,237 @@
+"""Google Sheets ingestion and blog dataset building shared by the app and CLI tools"""
+import csv
+import hashlib
+import io
+import os
+import re
+from datetime import datetime
+
+import requests
+
+from resilience import CircuitOpenError, TransientError, get_breaker, load_last_good, retry_call, save_last_good
+
+# Public export host; overridable so tools can run against a local stand-in
+GOOGLE_SHEETS_BASE = os.environ.get("GOOGLE_SHEETS_BASE", "https://docs.google.com/spreadsheets")
+
+
+def get_csv_urls(spreadsheet_id, sheet_name=None):
+    """Candidate public CSV export URLs for a spreadsheet, most specific first"""
+    urls = [
+        f"{GOOGLE_SHEETS_BASE}/d/{spreadsheet_id}/export?format=csv&gid=0",
+        f"{GOOGLE_SHEETS_BASE}/d/{spreadsheet_id}/export?format=csv",
+    ]
+    if sheet_name:
+        urls.append(f"{GOOGLE_SHEETS_BASE}/d/{spreadsheet_id}/gviz/tq?tqx=out:csv&sheet={sheet_name}")
+    urls.append(f"{GOOGLE_SHEETS_BASE}/d/{spreadsheet_id}/gviz/tq?tqx=out:csv")
+    return urls
+
+
+# One breaker for the export host: when Google is down or rate-limiting us every
+# sheet is affected, so there is no point in probing it per spreadsheet
+SHEETS_BREAKER = get_breaker("google-sheets", failure_threshold=3, reset_timeout=60)
+FETCH_ATTEMPTS = 3
+
+
+def _download_csv(http, urls, timeout, headers_for=None):
+    """First usable CSV response among urls
+
+    Raises TransientError when any URL failed in a way worth retrying (network,
+    timeout, 429, 5xx) and RuntimeError when the sheet is simply not readable.
+    """
+    errors = []
+    transient = False
+    for url in urls:
+        try:
+            response = http.get(url, headers=headers_for(url) if headers_for else {}, timeout=timeout)
+        except requests.RequestException as e:
+            errors.append(f"{url}: {e}")
+            transient = True
+            continue
+        if response.status_code == 304:
+            return url, response
+        if response.status_code == 200 and not response.text.startswith('<!DOCTYPE'):
+            response.encoding = response.encoding or 'utf-8'
+            return url, response
+        errors.append(f"{url}: HTTP {response.status_code}")
+        transient = transient or response.status_code == 429 or response.status_code >= 500
+    message = "Could not download spreadsheet CSV - make sure it is public. " + "; ".join(errors)
+    raise (TransientError if transient else RuntimeError)(message)
+
+
+def _guarded(download):
+    """Run a download through the Google breaker with retries inside it"""
+    return SHEETS_BREAKER.call(retry_call, download, attempts=FETCH_ATTEMPTS)
+
+
+def fetch_sheet_csv_with_status(spreadsheet_id, sheet_name=None, timeout=15, session=None):
+    """Download the sheet CSV, falling back to the last good copy when Google is failing
+
+    Returns (csv_text, stale_since): stale_since is None for a fresh download and
+    the save time of the last good copy when that was served instead.
+    """
+    http = session or requests
+    urls = get_csv_urls(spreadsheet_id, sheet_name)
+    key = f"csv:{spreadsheet_id}:{sheet_name or ''}"
+    try:
+        _, response = _guarded(lambda: _download_csv(http, urls, timeout))
+    except (TransientError, CircuitOpenError):
+        text, saved_at = load_last_good(key)
+        if text is None:
+            raise
+        return text, saved_at
+    save_last_good(key, response.text)
+    return response.text, None
+
+
+def fetch_sheet_csv(spreadsheet_id, sheet_name=None, timeout=15, session=None):
+    """Download the sheet as CSV text using the first export URL that works"""
+    return fetch_sheet_csv_with_status(spreadsheet_id, sheet_name, timeout, session)[0]
+
+
+def fetch_sheet_csv_if_changed(spreadsheet_id, sheet_name=None, validators=None, timeout=15, session=None):
+    """Conditionally download the sheet CSV
+
+    Returns (csv_text, validators); csv_text is None when the sheet did not change.
+    The export endpoint does not always honour ETag/Last-Modified, so the body
+    hash is compared as well.
+    """
+    http = session or requests
+    validators = dict(validators or {})
+    urls = get_csv_urls(spreadsheet_id, sheet_name)
+    if validators.get('url') in urls:
+        urls.remove(validators['url'])
+        urls.insert(0, validators['url'])
+
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+
+    url, response = _guarded(lambda: _download_csv(
+        http, urls, timeout, lambda candidate: headers if candidate == validators.get('url') else {}))
+    if response.status_code == 304:
+        return None, validators
+
+    text = response.text
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    changed = digest != validators.get('sha256')
+    validators = {
+        "url": url,
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+        "sha256": digest
+    }
+    return (text if changed else None), validators
+
+
+def slugify(text):
+    """Build a URL slug the same way the generated Worker does"""
+    slug = re.sub(r'[^a-z0-9\s-]', '', (text or '').lower())
+    return re.sub(r'\s+', '-', slug).strip()
+
+
+_UNSAFE_SLUG = re.compile(r'[/\\"\'<>`\x00-\x1f\x7f]|\.\.')
+
+
+def is_safe_slug(slug):
+    """True when a slug can be used as one URL path segment and one file name as-is"""
+    return bool(slug) and slug != '.' and not _UNSAFE_SLUG.search(slug)
+
+
+def parse_posts_csv(csv_text):
+    """Parse CSV text into post dicts with lower-cased headers, id and slug filled in"""
+    return rows_to_posts(csv.reader(io.StringIO(csv_text.lstrip('\ufeff'))))
+
+
+def rows_to_posts(rows):
+    """Turn a header row followed by value rows into post dicts"""
+    rows = iter(rows)
+    try:
+        headers = [h.strip().lower() for h in next(rows)]
+    except StopIteration:
+        return []
+
+    posts = []
+    for row_number, values in enumerate(rows, start=1):
+        if not any(v.strip() for v in values):
+            continue
+        post = {}
+        for index, header in enumerate(headers):
+            if header:
+                post[header] = values[index].strip() if index < len(values) else ''
+        if not post.get('id'):
+            post['id'] = str(row_number)
+        if post.get('slug') and not is_safe_slug(post['slug']):
+            post['slug'] = slugify(post['slug'])
+        if not post.get('slug') and post.get('title'):
+            post['slug'] = slugify(post['title'])
+        posts.append(post)
+    return posts
+
+
+def split_tags(tags):
+    """Split a comma-separated tag cell into clean tags"""
+    return [tag.strip() for tag in (tags or '').split(',') if tag.strip()]
+
+
+def is_published(post):
+    """Posts without a status are treated as published, like the Worker does"""
+    return post.get('status') == 'published' or not post.get('status')
+
+
+def build_dataset(posts):
+    """Build the post dataset and the listing indexes served by the blog API"""
+    categories = {}
+    tags = {}
+    by_slug = {}
+    for post in posts:
+        category = post.get('category') or 'Uncategorized'
+        categories[category] = categories.get(category, 0) + 1
+        for tag in split_tags(post.get('tags')):
+            tags[tag] = tags.get(tag, 0) + 1
+        if post.get('slug'):
+            by_slug.setdefault(post['slug'], post)
+
+    published = [post for post in posts if is_published(post)]
+
+    return {
+        "generated_at": datetime.now().isoformat(),
+        "posts": posts,
+        "published": published,
+        "by_slug": by_slug,
+        "categories": categories,
+        "tags": tags,
+        "stats": {
+            "totalPosts": len(posts),
+            "totalCategories": len(categories),
+            "totalTags": len(tags),
+            "publishedPosts": len(published)
+        }
+    }
+
+
+def load_dataset(spreadsheet_id, sheet_name=None, timeout=15):
+    """Fetch the sheet and build its dataset in one step"""
+    return build_dataset(parse_posts_csv(fetch_sheet_csv(spreadsheet_id, sheet_name, timeout=timeout)))
+
+
+def post_key(post):
+    """Stable identity of a row across fetches"""
+    return post.get('slug') or f"id:{post.get('id', '')}"
+
+
+def diff_posts(old_posts, new_posts):
+    """Row delta between two fetches: added, updated and removed posts"""
+    old_by_key = {post_key(post): post for post in old_posts or []}
+    new_by_key = {post_key(post): post for post in new_posts or []}
+
+    added = [post for key, post in new_by_key.items() if key not in old_by_key]
+    updated = [post for key, post in new_by_key.items() if key in old_by_key and old_by_key[key] != post]
+    removed = [post for key, post in old_by_key.items() if key not in new_by_key]
+    return {"added": added, "updated": updated, "removed": removed}
+
+
+def delta_is_empty(delta):
+    """True when a delta carries no row changes"""
+    return not (delta["added"] or delta["updated"] or delta["removed"])
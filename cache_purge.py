@@ -0,0 +1,136 @@
+"""Targeted Cloudflare cache purge: only the URLs a row change affects
+
+Comparing the posts before and after a change gives exactly what went stale:
+
+* the post itself, under its old and new slug: /post/<slug>, /post/<slug>/
+  and /api/post/<slug>,
+* every listing page (home, category, tag and monthly archive, with their
+  /page/N/ pages) whose posts or whose cards changed, and its JSON shard, so a
+  post moving between pages or categories purges both sides,
+* /api/posts and the home page on any change, /api/categories, /api/tags and
+  /api/stats when their counts moved,
+* the sitemap(s) and feeds.
+
+The URLs go to the purge-by-URL endpoint PURGE_BATCH at a time, the
+per-request limit of every plan, with cf_request's backoff on 429 and 5xx.
+Past MAX_TARGETED_URLS (a bulk import, a re-sort) a single purge_everything
+is cheaper than the batches. purge_check.py exercises all of it against a
+local stand-in of the endpoint.
+
+Usage:
+    python cache_purge.py --zone ZONE_ID --token API_TOKEN --site-url https://blog.example.com --old old.blogds --new new.blogds
+    python cache_purge.py ... --dry-run          # only print the URLs
+"""
+import argparse
+import json
+import sys
+from urllib.parse import quote
+
+from blog_data import build_dataset, delta_is_empty, diff_posts, post_key
+from cloudflare_api import CF_API_BASE, cf_request
+from listing_shards import listing_groups, paginate, post_columns, shard_key
+from site_render import listing_url
+
+PURGE_BATCH = 30
+MAX_TARGETED_URLS = 3000
+PURGE_RETRIES = 5
+DEFAULT_FEEDS = ("sitemap.xml", "rss.xml", "atom.xml")
+
+
+def post_paths(post):
+    """Paths that serve one post"""
+    slug = quote(str(post.get('slug') or post.get('id') or ''), safe='')
+    return [f"/post/{slug}", f"/post/{slug}/", f"/api/post/{slug}"]
+
+
+def listing_pages(posts, posts_per_page):
+    """{listing page path: post keys on it}, paged the way static_build.plan_build pages them"""
+    groups = listing_groups(*post_columns(posts))
+    return {listing_url(base, page): tuple(post_key(posts[row]) for row in rows)
+            for _, base, page, _, rows in paginate(groups, posts_per_page)}
+
+
+def affected_paths(old_posts, new_posts, posts_per_page=6, feeds=DEFAULT_FEEDS):
+    """Sorted paths whose responses differ between the two versions of the posts"""
+    delta = diff_posts(old_posts, new_posts)
+    if delta_is_empty(delta):
+        return []
+    old_by_key = {post_key(post): post for post in old_posts}
+    new_by_key = {post_key(post): post for post in new_posts}
+    changed = {post_key(post) for post in delta["added"] + delta["updated"] + delta["removed"]}
+
+    paths = {"/", "/api/posts"}
+    for key in changed:
+        for post in (old_by_key.get(key), new_by_key.get(key)):
+            if post:
+                paths.update(post_paths(post))
+
+    old_pages = listing_pages(old_posts, posts_per_page)
+    new_pages = listing_pages(new_posts, posts_per_page)
+    for path in old_pages.keys() | new_pages.keys():
+        keys = new_pages.get(path)
+        if keys != old_pages.get(path) or changed.intersection(keys or ()):
+            paths.update((path, f"/{shard_key(path)}.json"))
+
+    old_data, new_data = build_dataset(old_posts), build_dataset(new_posts)
+    for name in ("categories", "tags", "stats"):
+        if old_data[name] != new_data[name]:
+            paths.add(f"/api/{name}")
+    paths.update(f"/{name}" for name in feeds)
+    return sorted(paths)
+
+
+def purge_urls(zone_id, api_token, urls, api_base=CF_API_BASE, batch_size=PURGE_BATCH):
+    """Purge URLs in purge-by-URL batches; returns the number of requests"""
+    requests_made = 0
+    for start in range(0, len(urls), batch_size):
+        cf_request('POST', f"/zones/{zone_id}/purge_cache", api_token, api_base=api_base,
+                   retries=PURGE_RETRIES, json={"files": urls[start:start + batch_size]})
+        requests_made += 1
+    return requests_made
+
+
+def purge_everything(zone_id, api_token, api_base=CF_API_BASE):
+    cf_request('POST', f"/zones/{zone_id}/purge_cache", api_token, api_base=api_base,
+               retries=PURGE_RETRIES, json={"purge_everything": True})
+
+
+def purge_changes(zone_id, api_token, site_url, old_posts, new_posts, posts_per_page=6, feeds=DEFAULT_FEEDS,
+                  api_base=CF_API_BASE):
+    """Purge what changed between two versions of the posts; returns a summary"""
+    paths = affected_paths(old_posts, new_posts, posts_per_page, feeds)
+    if not paths:
+        return {"purged_urls": 0, "requests": 0}
+    if len(paths) > MAX_TARGETED_URLS:
+        purge_everything(zone_id, api_token, api_base)
+        return {"purged_urls": "everything", "requests": 1}
+    site_url = site_url.rstrip('/')
+    urls = [site_url + path for path in paths]
+    return {"purged_urls": len(urls), "requests": purge_urls(zone_id, api_token, urls, api_base)}
+
+
+def main(argv=None):
+    from dataset_store import PostDataset
+
+    parser = argparse.ArgumentParser(description="Purge the cached URLs that differ between two datasets")
+    parser.add_argument('--zone', required=True, help="Cloudflare zone ID")
+    parser.add_argument('--token', required=True, help="API token with Cache Purge permission")
+    parser.add_argument('--site-url', required=True, help="Public address of the blog")
+    parser.add_argument('--old', required=True, help="Dataset file before the change")
+    parser.add_argument('--new', required=True, help="Dataset file after the change")
+    parser.add_argument('--posts-per-page', type=int, default=6)
+    parser.add_argument('--dry-run', action='store_true', help="Only print the URLs")
+    args = parser.parse_args(argv)
+
+    with PostDataset(args.old) as old, PostDataset(args.new) as new:
+        old_posts, new_posts = list(old), list(new)
+    if args.dry_run:
+        print("\n".join(args.site_url.rstrip('/') + path for path in affected_paths(old_posts, new_posts, args.posts_per_page)))
+        return 0
+    summary = purge_changes(args.zone, args.token, args.site_url, old_posts, new_posts, args.posts_per_page)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
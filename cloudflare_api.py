@@ -0,0 +1,71 @@
+"""Thin helpers around the Cloudflare v4 REST API"""
+import json
+import time
+
+import requests
+
+CF_API_BASE = "https://api.cloudflare.com/client/v4"
+WORKER_COMPATIBILITY_DATE = "2024-09-23"
+
+
+class CloudflareError(Exception):
+    """Raised when the Cloudflare API answers with an error"""
+
+    def __init__(self, message, status_code=None, errors=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.errors = errors or []
+
+
+def cf_headers(api_token, content_type='application/json'):
+    """Authorization headers for the Cloudflare API"""
+    headers = {'Authorization': f'Bearer {api_token}'}
+    if content_type:
+        headers['Content-Type'] = content_type
+    return headers
+
+
+def cf_request(method, path, api_token, api_base=CF_API_BASE, retries=3, timeout=60, content_type='application/json', **kwargs):
+    """Call the Cloudflare API and return the parsed JSON envelope
+
+    Rate limits and server errors are retried with exponential backoff.
+    """
+    url = f"{api_base}{path}"
+    headers = cf_headers(api_token, content_type)
+    headers.update(kwargs.pop('headers', {}))
+
+    for attempt in range(retries):
+        response = requests.request(method, url, headers=headers, timeout=timeout, **kwargs)
+        if response.status_code in (429, 500, 502, 503, 504) and attempt < retries - 1:
+            retry_after = response.headers.get('Retry-After')
+            time.sleep(float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt)
+            continue
+        break
+
+    try:
+        data = response.json()
+    except ValueError:
+        data = {"success": False, "errors": [{"message": response.text[:200]}]}
+
+    if response.status_code >= 400 or not data.get('success', True):
+        errors = data.get('errors') or []
+        message = '; '.join(e.get('message', 'Unknown error') for e in errors) or f"HTTP {response.status_code}"
+        raise CloudflareError(f"{method} {path} failed: {message}", response.status_code, errors)
+    return data
+
+
+def upload_worker_modules(account_id, api_token, worker_name, modules, bindings=None,
+                          compatibility_date=WORKER_COMPATIBILITY_DATE, api_base=CF_API_BASE):
+    """Upload an ES-module Worker and its bindings in one request
+
+    `modules` maps module names to (source, part Content-Type), main module
+    first; text modules (text/plain, a str) and data modules
+    (application/octet-stream, bytes) are importable by name from the others.
+    """
+    metadata = {"main_module": next(iter(modules)), "bindings": bindings or [],
+                "compatibility_date": compatibility_date}
+    files = [('metadata', (None, json.dumps(metadata), 'application/json'))]
+    files += [(name, (name, source, content_type)) for name, (source, content_type) in modules.items()]
+    # requests sets the multipart boundary itself, so no Content-Type here
+    return cf_request('PUT', f"/accounts/{account_id}/workers/scripts/{worker_name}", api_token,
+                      api_base=api_base, content_type=None, files=files)
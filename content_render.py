@@ -0,0 +1,415 @@
+"""Markdown rendering of the `content` column into sanitized HTML
+
+Sheet cells hold Markdown (or plain text with line breaks) and may contain a
+small set of HTML tags. Every post is rendered once at ingestion into
+
+* `content_html`: sanitized HTML; anything outside the allowlist is dropped,
+* `toc`: the headings as [{"level", "id", "text"}],
+* `reading_time`: whole minutes at READING_WPM,
+* `excerpt` / `meta_description`: filled from the text when the cells are empty.
+
+Results are memoized by a hash of the cell text in a SQLite cache, so an
+ingest only renders the posts whose content changed.
+"""
+import hashlib
+import html
+import json
+import math
+import os
+import re
+import sqlite3
+import time
+from html.parser import HTMLParser
+
+from blog_data import slugify
+
+# Bump when the rendered output changes, so cached results are not reused
+RENDER_VERSION = "1"
+CONTENT_CACHE_PATH = os.path.join(".cache", "content.sqlite")
+CACHE_MAX_AGE = 30 * 86400
+READING_WPM = 200
+EXCERPT_LENGTH = 150
+META_DESCRIPTION_LENGTH = 160
+
+ALLOWED_TAGS = {
+    "a": {"href", "title"},
+    "abbr": {"title"},
+    "b": set(), "blockquote": set(), "br": set(), "code": set(), "del": set(), "em": set(),
+    "h1": {"id"}, "h2": {"id"}, "h3": {"id"}, "h4": {"id"}, "h5": {"id"}, "h6": {"id"},
+    "hr": set(), "i": set(),
+    "img": {"src", "alt", "title", "width", "height"},
+    "li": set(), "ol": {"start"}, "p": set(), "pre": set(), "s": set(), "small": set(), "strong": set(),
+    "sub": set(), "sup": set(), "table": set(), "tbody": set(), "td": {"colspan", "rowspan"},
+    "th": {"colspan", "rowspan"}, "thead": set(), "tr": set(), "u": set(), "ul": set()
+}
+VOID_TAGS = {"br", "hr", "img"}
+# Dropped together with everything inside them
+DROP_CONTENT_TAGS = {"script", "style", "iframe", "object", "embed", "template", "noscript", "textarea", "select"}
+URL_SCHEMES = {"http", "https", "mailto"}
+URL_ATTRIBUTES = {"href", "src"}
+# Tags that separate words in the plain-text version
+BREAK_TAGS = {"blockquote", "br", "h1", "h2", "h3", "h4", "h5", "h6", "hr", "li", "p", "pre", "td", "th", "tr"}
+
+
+def safe_url(url):
+    """The URL when it is relative or uses an allowed scheme, else None"""
+    url = re.sub(r'[\x00-\x20\x7f]', '', url or '')
+    scheme = re.match(r'^([a-zA-Z][a-zA-Z0-9+.-]*):', url)
+    if scheme and scheme.group(1).lower() not in URL_SCHEMES:
+        return None
+    return url
+
+
+class _Sanitizer(HTMLParser):
+    """Re-serializes HTML keeping only allowlisted tags and attributes"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []
+        self.text = []
+        self.open = []
+        self.dropping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BREAK_TAGS:
+            self.text.append(' ')
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping += 1
+            return
+        if self.dropping or tag not in ALLOWED_TAGS:
+            return
+        kept = []
+        for name, value in attrs:
+            if name not in ALLOWED_TAGS[tag] or value is None:
+                continue
+            if name in URL_ATTRIBUTES:
+                value = safe_url(value)
+                if value is None:
+                    continue
+            elif name == "id" and not re.fullmatch(r'[a-z0-9-]+', value):
+                continue
+            elif name in ("width", "height", "colspan", "rowspan", "start") and not value.isdigit():
+                continue
+            kept.append(f' {name}="{html.escape(value, quote=True)}"')
+        self.out.append(f"<{tag}{''.join(kept)}>")
+        if tag not in VOID_TAGS:
+            self.open.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open and self.open[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in BREAK_TAGS:
+            self.text.append(' ')
+        if tag in DROP_CONTENT_TAGS:
+            self.dropping = max(0, self.dropping - 1)
+            return
+        if self.dropping or tag not in self.open:
+            return
+        # Close anything left open inside this element
+        while self.open:
+            inner = self.open.pop()
+            self.out.append(f"</{inner}>")
+            if inner == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.dropping:
+            self.out.append(html.escape(data, quote=False))
+            self.text.append(data)
+
+    def result(self):
+        self.close()
+        while self.open:
+            self.out.append(f"</{self.open.pop()}>")
+        return ''.join(self.out)
+
+
+def sanitize_html(fragment):
+    """Fragment with every tag, attribute and URL outside the allowlist removed"""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(fragment)
+    return sanitizer.result()
+
+
+def plain_text(fragment):
+    """Visible text of an HTML fragment"""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(fragment)
+    sanitizer.result()
+    return re.sub(r'\s+', ' ', ''.join(sanitizer.text)).strip()
+
+
+# Inline Markdown: code spans and raw tags are set aside before escaping the rest
+_INLINE_PROTECT = re.compile(r'(`+)(.+?)\1|<(?:/?[a-zA-Z][a-zA-Z0-9]*(?:\s[^<>]*)?/?|https?://[^\s<>]+|mailto:[^\s<>]+)>')
+_IMAGE = re.compile(r'!\[([^\]]*)\]\(\s*([^\s)]+)(?:\s+&quot;(.*?)&quot;)?\s*\)')
+_LINK = re.compile(r'\[([^\]]+)\]\(\s*([^\s)]+)(?:\s+&quot;(.*?)&quot;)?\s*\)')
+_STRONG = re.compile(r'(\*\*|__)(?=\S)(.+?)(?<=\S)\1')
+_EM = re.compile(r'(?<![\w*])([*_])(?=\S)(.+?)(?<=\S)\1(?![\w*])')
+_STRIKE = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~')
+
+
+def _attr(value):
+    # Markdown text was escaped already; only quotes need escaping for attributes
+    return (value or '').replace('"', '&quot;')
+
+
+def render_inline(text):
+    """Inline Markdown of one block to HTML (not yet sanitized)"""
+    protected = []
+
+    def protect(match):
+        if match.group(1):
+            code = html.escape(match.group(2).strip(), quote=False)
+            protected.append(f"<code>{code}</code>")
+        elif match.group(0)[1:5].lower() in ("http", "mail"):
+            url = match.group(0)[1:-1]
+            protected.append(f'<a href="{html.escape(url)}">{html.escape(url, quote=False)}</a>')
+        else:
+            protected.append(match.group(0))
+        return f"\x00{len(protected) - 1}\x00"
+
+    text = html.escape(_INLINE_PROTECT.sub(protect, text), quote=True)
+    text = _IMAGE.sub(lambda m: f'<img src="{_attr(m.group(2))}" alt="{_attr(m.group(1))}"'
+                                + (f' title="{_attr(m.group(3))}"' if m.group(3) else '') + '>', text)
+    text = _LINK.sub(lambda m: f'<a href="{_attr(m.group(2))}"'
+                               + (f' title="{_attr(m.group(3))}"' if m.group(3) else '') + f'>{m.group(1)}</a>', text)
+    text = _STRONG.sub(r'<strong>\2</strong>', text)
+    text = _EM.sub(r'<em>\2</em>', text)
+    text = _STRIKE.sub(r'<del>\1</del>', text)
+    return re.sub(r'\x00(\d+)\x00', lambda m: protected[int(m.group(1))], text)
+
+
+_HEADING = re.compile(r'^(#{1,6})\s+(.*?)\s*#*\s*$')
+_FENCE = re.compile(r'^(```|~~~)\s*([\w+-]*)\s*$')
+_RULE = re.compile(r'^(?:-\s*){3,}$|^(?:\*\s*){3,}$|^(?:_\s*){3,}$')
+_BULLET = re.compile(r'^\s*[-*+]\s+(.*)$')
+_ORDERED = re.compile(r'^\s*(\d{1,9})[.)]\s+(.*)$')
+_QUOTE = re.compile(r'^\s*>\s?(.*)$')
+_HTML_BLOCK = re.compile(r'^\s*</?(?:p|div|table|thead|tbody|tr|ul|ol|li|dl|blockquote|pre|h[1-6]|hr|figure|section|'
+                         r'article|aside|details|iframe|script|style|object|embed|template)[\s/>]', re.IGNORECASE)
+
+
+def _is_block_start(line):
+    return bool(_HEADING.match(line) or _FENCE.match(line) or _RULE.match(line.strip()) or _BULLET.match(line)
+                or _ORDERED.match(line) or _QUOTE.match(line) or _HTML_BLOCK.match(line))
+
+
+def _render_blocks(lines, headings):
+    out = []
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        stripped = line.strip()
+        if not stripped:
+            i += 1
+            continue
+
+        fence = _FENCE.match(stripped)
+        if fence:
+            end = i + 1
+            while end < len(lines) and lines[end].strip() != fence.group(1):
+                end += 1
+            code = html.escape('\n'.join(lines[i + 1:end]), quote=False)
+            out.append(f"<pre><code>{code}</code></pre>")
+            i = end + 1
+            continue
+
+        heading = _HEADING.match(stripped)
+        if heading:
+            level = len(heading.group(1))
+            inner = render_inline(heading.group(2))
+            text = plain_text(inner)
+            anchor = slugify(text) or f"section-{len(headings) + 1}"
+            used = {entry["id"] for entry in headings}
+            candidate, n = anchor, 2
+            while candidate in used:
+                candidate, n = f"{anchor}-{n}", n + 1
+            headings.append({"level": level, "id": candidate, "text": text})
+            out.append(f'<h{level} id="{candidate}">{inner}</h{level}>')
+            i += 1
+            continue
+
+        if _RULE.match(stripped):
+            out.append("<hr>")
+            i += 1
+            continue
+
+        if _QUOTE.match(line):
+            quoted = []
+            while i < len(lines) and lines[i].strip() and _QUOTE.match(lines[i]):
+                quoted.append(_QUOTE.match(lines[i]).group(1))
+                i += 1
+            out.append(f"<blockquote>{_render_blocks(quoted, headings)}</blockquote>")
+            continue
+
+        for pattern, tag in ((_BULLET, "ul"), (_ORDERED, "ol")):
+            first = pattern.match(line)
+            if not first:
+                continue
+            items = []
+            while i < len(lines) and lines[i].strip():
+                item = pattern.match(lines[i])
+                if item:
+                    items.append([item.groups()[-1]])
+                elif _is_block_start(lines[i]):
+                    break
+                else:
+                    # Lazy continuation of the previous item
+                    items[-1].append(lines[i].strip())
+                i += 1
+            start = ''
+            if tag == "ol" and first.group(1) != "1":
+                start = f' start="{int(first.group(1))}"'
+            body = ''.join(f"<li>{'<br>'.join(render_inline(part) for part in item)}</li>" for item in items)
+            out.append(f"<{tag}{start}>{body}</{tag}>")
+            break
+        else:
+            if _HTML_BLOCK.match(line):
+                # Raw HTML block up to the next blank line; the sanitizer decides what stays
+                block = []
+                while i < len(lines) and lines[i].strip():
+                    block.append(lines[i])
+                    i += 1
+                out.append('\n'.join(block))
+                continue
+
+            # Paragraph: single line breaks are kept, like the sheet shows them
+            paragraph = []
+            while i < len(lines) and lines[i].strip() and (not paragraph or not _is_block_start(lines[i])):
+                paragraph.append(lines[i].strip())
+                i += 1
+            out.append(f"<p>{'<br>'.join(render_inline(part) for part in paragraph)}</p>")
+            continue
+    return '\n'.join(out)
+
+
+def render_markdown(text):
+    """(sanitized HTML, headings) of a Markdown document"""
+    headings = []
+    lines = (text or '').replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    return sanitize_html(_render_blocks(lines, headings)), headings
+
+
+def reading_time(words, wpm=READING_WPM):
+    """Whole minutes to read `words` words, at least 1"""
+    return max(1, math.ceil(words / wpm))
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    """First `length` characters of plain text, cut at a word boundary"""
+    if len(text) <= length:
+        return text
+    cut = text[:length].rsplit(' ', 1)[0].rstrip(' ,.;:-')
+    return f"{cut}..."
+
+
+def render_content(text):
+    """Everything derived from one content cell"""
+    content_html, headings = render_markdown(text)
+    words = plain_text(content_html)
+    return {
+        "content_html": content_html,
+        "toc": headings,
+        "reading_time": reading_time(len(words.split())),
+        "text": words[:META_DESCRIPTION_LENGTH * 2]
+    }
+
+
+def toc_html(toc, min_headings=2):
+    """Table of contents list for a post page, empty for short posts"""
+    if len(toc) < min_headings:
+        return ''
+    top = min(entry["level"] for entry in toc)
+    items = ''.join(
+        f'<li class="toc-level-{entry["level"] - top + 1}"><a href="#{entry["id"]}">{html.escape(entry["text"])}</a></li>'
+        for entry in toc
+    )
+    return f'<nav class="toc mb-4"><h6>Contents</h6><ul class="list-unstyled">{items}</ul></nav>'
+
+
+def content_hash(text):
+    return hashlib.sha256(f"{RENDER_VERSION}\0{text}".encode('utf-8')).hexdigest()
+
+
+class ContentCache:
+    """Rendered content keyed by content hash, shared by every blog and process"""
+
+    def __init__(self, path=CONTENT_CACHE_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        db = self._connect()
+        try:
+            db.execute("CREATE TABLE IF NOT EXISTS rendered (hash TEXT PRIMARY KEY, data TEXT NOT NULL, used_at REAL NOT NULL)")
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def get_many(self, hashes):
+        """{hash: rendered} for the hashes already cached"""
+        found = {}
+        hashes = list(hashes)
+        db = self._connect()
+        try:
+            for start in range(0, len(hashes), 500):
+                chunk = hashes[start:start + 500]
+                rows = db.execute(f"SELECT hash, data FROM rendered WHERE hash IN ({','.join('?' * len(chunk))})", chunk)
+                found.update((key, json.loads(data)) for key, data in rows)
+            with db:
+                db.executemany("UPDATE rendered SET used_at = ? WHERE hash = ?", ((time.time(), key) for key in found))
+        finally:
+            db.close()
+        return found
+
+    def put_many(self, rendered):
+        """Store {hash: rendered} and forget entries nobody used for CACHE_MAX_AGE"""
+        now = time.time()
+        db = self._connect()
+        try:
+            with db:
+                db.executemany("INSERT OR REPLACE INTO rendered (hash, data, used_at) VALUES (?, ?, ?)",
+                               ((key, json.dumps(value, ensure_ascii=False), now) for key, value in rendered.items()))
+                db.execute("DELETE FROM rendered WHERE used_at < ?", (now - CACHE_MAX_AGE,))
+        finally:
+            db.close()
+
+
+def render_posts(posts, cache=None, stats=None):
+    """Posts with content_html, toc, reading_time and empty excerpt/meta_description filled in
+
+    Only contents missing from the cache are rendered. Pass a dict as `stats`
+    to get {"rendered": n, "cached": n} back.
+    """
+    posts = list(posts)
+    if cache is None:
+        cache = ContentCache()
+    hashes = [content_hash(post.get('content') or '') for post in posts]
+    known = cache.get_many(set(hashes))
+
+    fresh = {}
+    for post, key in zip(posts, hashes):
+        if key not in known and key not in fresh:
+            fresh[key] = render_content(post.get('content') or '')
+    if fresh:
+        cache.put_many(fresh)
+    known.update(fresh)
+    if stats is not None:
+        stats.update(rendered=len(fresh), cached=len(set(hashes)) - len(fresh))
+
+    enriched = []
+    for post, key in zip(posts, hashes):
+        rendered = known[key]
+        post = dict(post, content_html=rendered["content_html"], toc=rendered["toc"],
+                    reading_time=rendered["reading_time"])
+        if not post.get('excerpt'):
+            post['excerpt'] = make_excerpt(rendered["text"])
+        if not post.get('meta_description'):
+            post['meta_description'] = make_excerpt(rendered["text"], META_DESCRIPTION_LENGTH)
+        enriched.append(post)
+    return enriched
@@ -0,0 +1,305 @@
+"""Data-quality scan of a blog's sheet, run over the ingested dataset
+
+Replaces analyzeDataQuality, validateDataIntegrity and checkForBlanksAndColor
+of Script/analisdata.js, which walk the sheet cell by cell and color each
+blank cell with its own call. The checks here read the columnar dataset a
+column at a time:
+
+* blank required fields (title, content, date), from the value sizes alone,
+* duplicate slugs and IDs (a duplicate slug hides the later post),
+* malformed dates, i.e. dates row_history.parse_timestamp can't read,
+* featured_image values that aren't http(s) URLs,
+* meta descriptions over META_MAX_LENGTH characters.
+
+The checks are numpy expressions over the mapped bytes (value sizes, leading
+bytes); only values that miss the fast path, like a date with a time,
+are decoded. Dictionary-encoded columns are checked once per distinct value
+and spread over the rows through their codes, so 100k rows take milliseconds.
+
+With write-back the flagged cells are colored in the sheet in a single
+`spreadsheets:batchUpdate`: the checked columns are cleared first, then each
+run of contiguous flagged rows is one repeatCell. Like ai_generate it uses the
+Google OAuth credentials of the Search Console settings.
+
+Usage:
+    python data_quality.py --blog main                 # report on the last ingest of a blog of workspace.db
+    python data_quality.py --blog main --write-back    # and color the flagged cells in its sheet
+    python data_quality.py --dataset blog.blogds --json
+"""
+import argparse
+import json
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+from ai_generate import META_MAX_LENGTH, read_sheet_columns, sheets_request
+from indexing import OAUTH_TOKEN_URL, get_access_token
+from row_history import parse_timestamp
+from sheets_api import SHEETS_API_BASE, row_ranges
+
+REQUIRED_FIELDS = ("title", "content", "date")
+ISSUE_COLOR = {"red": 1.0, "green": 0.8, "blue": 0.8}
+CLEAR_COLOR = {"red": 1.0, "green": 1.0, "blue": 1.0}
+EXAMPLE_ROWS = 5
+
+DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+DATE_DIGITS = [0, 1, 2, 3, 5, 6, 8, 9]
+
+
+class Column:
+    """A dataset column as numpy arrays over the mapped bytes: value offsets, blob and row codes"""
+
+    def __init__(self, dataset, name):
+        offsets, blob, codes = dataset.raw_column(name)
+        self.offsets = np.frombuffer(offsets, dtype=np.uint64).astype(np.int64)
+        self.blob = np.frombuffer(blob, dtype=np.uint8)
+        self.codes = None if codes is None else np.frombuffer(codes, dtype=np.uint32)
+        self.starts = self.offsets[:-1]
+        self.sizes = np.diff(self.offsets)
+
+    def per_row(self, flags):
+        """Spread per-value flags over the rows"""
+        return flags if self.codes is None else flags[self.codes]
+
+    def text(self, index):
+        return self.blob[self.offsets[index]:self.offsets[index + 1]].tobytes().decode('utf-8')
+
+    def leading_bytes(self, width):
+        """(values, width) matrix of the first `width` bytes of every value, zero past its end"""
+        positions = self.starts[:, None] + np.arange(width)
+        if not len(self.blob):
+            return np.zeros(positions.shape, dtype=np.uint8)
+        matrix = self.blob[np.minimum(positions, len(self.blob) - 1)]
+        matrix[np.arange(width) >= self.sizes[:, None]] = 0
+        return matrix
+
+    def contains_below(self, byte):
+        """Values holding a byte below `byte` (whitespace and control characters for 0x21)"""
+        flags = np.zeros(len(self.sizes), dtype=bool)
+        positions = np.flatnonzero(self.blob[:self.offsets[-1]] < byte)
+        flags[np.searchsorted(self.offsets, positions, side='right') - 1] = True
+        return flags
+
+    def texts(self):
+        """Every value decoded, with one decode of the whole blob when it is ASCII"""
+        data = self.blob[:self.offsets[-1]].tobytes()
+        bounds = self.offsets.tolist()
+        if data.isascii():
+            text = data.decode('ascii')
+            return [text[start:end] for start, end in zip(bounds, bounds[1:])]
+        return [data[start:end].decode('utf-8') for start, end in zip(bounds, bounds[1:])]
+
+
+def blank_rows(column):
+    return column.per_row(column.sizes == 0)
+
+
+def duplicate_rows(column):
+    """Rows whose non-blank value also appears on another row"""
+    if column.codes is not None:
+        # Table entries are distinct, so a repeated code is a repeated value
+        counts = np.bincount(column.codes, minlength=len(column.sizes))
+        return (counts[column.codes] > 1) & (column.sizes[column.codes] > 0)
+    texts = column.texts()
+    repeated = {text for text, count in Counter(texts).items() if count > 1 and text}
+    return np.fromiter((text in repeated for text in texts), dtype=bool, count=len(texts))
+
+
+def malformed_date_rows(column):
+    """Rows with a date parse_timestamp can't read; plain YYYY-MM-DD values are checked without decoding"""
+    head = column.leading_bytes(10).astype(np.int64)
+    digits = head[:, DATE_DIGITS] - ord('0')
+    shaped = ((column.sizes == 10) & ((digits >= 0) & (digits <= 9)).all(axis=1)
+              & (head[:, 4] == ord('-')) & (head[:, 7] == ord('-')))
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    last_day = DAYS_IN_MONTH[np.clip(month - 1, 0, 11)] + ((month == 2) & leap)
+    valid = shaped & (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= last_day)
+
+    flags = np.zeros(len(column.sizes), dtype=bool)
+    # Date-times and other shapes go through the parser one value at a time
+    for index in np.flatnonzero((column.sizes > 0) & ~valid).tolist():
+        flags[index] = parse_timestamp(column.text(index)) is None
+    return column.per_row(flags)
+
+
+def bad_url_rows(column):
+    """Rows whose value isn't an http(s) URL with a host and without whitespace"""
+    head = column.leading_bytes(9)
+    lowered = head | 0x20
+    http = (lowered[:, :7] == np.frombuffer(b"http://", dtype=np.uint8)).all(axis=1)
+    https = (lowered[:, :8] == np.frombuffer(b"https://", dtype=np.uint8)).all(axis=1)
+    host_start = np.where(https, 8, 7)
+    host = (column.sizes > host_start) & ~np.isin(head[np.arange(len(head)), host_start], list(b"/?#"))
+    valid = (http | https) & host & ~column.contains_below(0x21)
+    return column.per_row((column.sizes > 0) & ~valid)
+
+
+def over_length_rows(column, limit):
+    """Rows longer than `limit` characters; only values over `limit` bytes are decoded"""
+    flags = np.zeros(len(column.sizes), dtype=bool)
+    for index in np.flatnonzero(column.sizes > limit).tolist():
+        flags[index] = len(column.text(index)) > limit
+    return column.per_row(flags)
+
+
+def checks():
+    """(check, column, label) of every check, in report order"""
+    return ([("blank", field, f"Blank {field}") for field in REQUIRED_FIELDS] + [
+        ("duplicate", "slug", "Duplicate slug"),
+        ("duplicate", "id", "Duplicate ID"),
+        ("date", "date", "Malformed date"),
+        ("url", "featured_image", "Invalid featured image URL"),
+        ("length", "meta_description", f"Meta description over {META_MAX_LENGTH} characters")
+    ])
+
+
+def _flagged(dataset, check, name):
+    column = Column(dataset, name)
+    if check == "blank":
+        flags = blank_rows(column)
+    elif check == "duplicate":
+        flags = duplicate_rows(column)
+    elif check == "date":
+        flags = malformed_date_rows(column)
+    elif check == "url":
+        flags = bad_url_rows(column)
+    else:
+        flags = over_length_rows(column, META_MAX_LENGTH)
+    return np.flatnonzero(flags)
+
+
+def scan_dataset(dataset):
+    """{"rows", "elapsed_ms", "issues": [{"check", "column", "label", "rows"}]} with 0-based dataset rows"""
+    started = time.perf_counter()
+    issues = [{"check": check, "column": column, "label": label, "rows": _flagged(dataset, check, column).tolist()}
+              for check, column, label in checks()]
+    return {"rows": dataset.rows, "elapsed_ms": round((time.perf_counter() - started) * 1000, 1), "issues": issues}
+
+
+def examples(dataset, rows, limit=EXAMPLE_ROWS):
+    """'id: title' of the first flagged rows, for the report"""
+    return [f"{dataset.value(row, 'id')}: {dataset.value(row, 'title') or '(no title)'}" for row in rows[:limit]]
+
+
+def sheet_rows(dataset, columns):
+    """Sheet row number of every dataset row, matched by (id, title) the way ai_generate.pending_rows matches"""
+    ids = columns.get('id', [])
+    titles = columns.get('title', [])
+    by_key = {}
+    for index in range(max(len(ids), len(titles))):
+        row_id = (ids[index].strip() if index < len(ids) else '') or str(index + 1)
+        title = titles[index].strip() if index < len(titles) else ''
+        by_key.setdefault((row_id, title), index + 2)
+    return [by_key.get(key) for key in zip(dataset.column('id'), dataset.column('title'))]
+
+
+def _grid_range(sheet_id, column_index, first, last):
+    return {"sheetId": sheet_id, "startRowIndex": first - 1, "endRowIndex": last,
+            "startColumnIndex": column_index, "endColumnIndex": column_index + 1}
+
+
+def _background(grid_range, color):
+    return {"repeatCell": {"range": grid_range, "cell": {"userEnteredFormat": {"backgroundColor": color}},
+                           "fields": "userEnteredFormat.backgroundColor"}}
+
+
+def format_requests(sheet_id, headers, last_row, flagged):
+    """batchUpdate requests for {sheet column name: sorted sheet rows}: clear the columns, then color the runs"""
+    updates = []
+    for column in flagged:
+        updates.append(_background(_grid_range(sheet_id, headers.index(column), 2, last_row), CLEAR_COLOR))
+    for column, rows in flagged.items():
+        for first, last in row_ranges(rows):
+            updates.append(_background(_grid_range(sheet_id, headers.index(column), first, last), ISSUE_COLOR))
+    return updates
+
+
+def sheet_id(spreadsheet_id, tab, access_token, sheets_base=SHEETS_API_BASE):
+    """Numeric sheetId of a tab, which grid ranges need instead of its name"""
+    data = sheets_request("GET", f"{sheets_base.rstrip('/')}/spreadsheets/{spreadsheet_id}", access_token,
+                          params={"fields": "sheets.properties(sheetId,title)"})
+    for sheet in data.get('sheets', []):
+        if sheet.get('properties', {}).get('title') == tab:
+            return sheet['properties'].get('sheetId', 0)
+    raise ValueError(f"The spreadsheet has no '{tab}' tab")
+
+
+def highlight_issues(dataset, report, config, token_url=OAUTH_TOKEN_URL, sheets_base=SHEETS_API_BASE):
+    """Color the flagged cells in the sheet with one batchUpdate; returns the cells colored"""
+    if not (config.get('spreadsheet_id') and config.get('sheet_name')):
+        raise ValueError("Spreadsheet ID and sheet name are required to write results back")
+    spreadsheet_id, tab = config['spreadsheet_id'], config['sheet_name']
+    access_token = get_access_token(config, token_url)
+    headers, columns = read_sheet_columns(spreadsheet_id, tab, 'title', access_token, sheets_base)
+    rows = sheet_rows(dataset, columns)
+
+    flagged = {}
+    for issue in report["issues"]:
+        # Slugs are derived from the title when the sheet has no slug column
+        column = issue["column"] if issue["column"] in headers else ('title' if issue["column"] == 'slug' else None)
+        if column is None:
+            continue
+        cells = flagged.setdefault(column, set())
+        cells.update(rows[row] for row in issue["rows"] if rows[row])
+    flagged = {column: sorted(cells) for column, cells in flagged.items()}
+
+    last_row = max([2] + [len(values) + 1 for values in columns.values()] + [cells[-1] for cells in flagged.values() if cells])
+    body = {"requests": format_requests(sheet_id(spreadsheet_id, tab, access_token, sheets_base), headers,
+                                        last_row, flagged)}
+    if body["requests"]:
+        sheets_request("POST", f"{sheets_base.rstrip('/')}/spreadsheets/{spreadsheet_id}:batchUpdate",
+                       access_token, json=body)
+    return sum(len(cells) for cells in flagged.values())
+
+
+def check_dataset(dataset, config=None, write_back=False, token_url=OAUTH_TOKEN_URL, sheets_base=SHEETS_API_BASE):
+    """Scan the dataset, add report examples and optionally color the sheet; returns the report"""
+    report = scan_dataset(dataset)
+    for issue in report["issues"]:
+        issue["count"] = len(issue["rows"])
+        issue["examples"] = examples(dataset, issue["rows"])
+    if write_back:
+        report["highlighted"] = highlight_issues(dataset, report, config or {}, token_url, sheets_base)
+    return report
+
+
+def main(argv=None):
+    from dataset_store import PostDataset
+    from workspace import add_blog_arguments, resolve_blog
+
+    parser = argparse.ArgumentParser(description="Check the sheet's posts for blanks, duplicates and malformed values")
+    add_blog_arguments(parser)
+    parser.add_argument('--write-back', action='store_true', help="Color the flagged cells in the sheet")
+    parser.add_argument('--json', action='store_true', help="Print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    # A dataset file on its own needs no blog settings unless cells are colored
+    config, dataset_file = {}, args.dataset
+    if args.write_back or not args.dataset or args.config or args.blog:
+        try:
+            _, config, dataset_file = resolve_blog(args)
+        except ValueError as e:
+            parser.error(str(e))
+
+    with PostDataset(dataset_file) as dataset:
+        report = check_dataset(dataset, config, args.write_back)
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"{report['rows']} rows checked in {report['elapsed_ms']} ms")
+        for issue in report["issues"]:
+            print(f"{issue['label']}: {issue['count']}")
+            for example in issue["examples"]:
+                print(f"    {example}")
+        if "highlighted" in report:
+            print(f"Highlighted {report['highlighted']} cells in the sheet")
+    return 1 if any(issue["count"] for issue in report["issues"]) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
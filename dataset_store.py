@@ -0,0 +1,332 @@
+"""Compact columnar on-disk format for ingested posts, read through mmap
+
+Layout (little-endian, every section 8-byte aligned):
+
+    magic "BLOGDS01" | u64 header length | header JSON | sections...
+
+The header lists the columns and where each section starts. A column is either
+plain (u64 offsets into one UTF-8 blob) or dictionary-encoded (u32 codes into a
+string table with its own offsets and blob), chosen by cardinality. Two indexes
+hold row numbers sorted by slug and by id, so lookups are a binary search
+straight over the mapped bytes.
+
+Opening a file maps it and parses only the header; nothing is decoded until a
+value is read. Several processes opening the same file share the page cache.
+"""
+import json
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left
+
+from blog_data import fetch_sheet_csv, is_published, parse_posts_csv, split_tags
+from content_render import render_posts
+from image_pipeline import attach_images, image_manifest_path, load_image_manifest
+from related_posts import add_related_posts, related_state_path
+from row_history import history_path, stamp_lastmod
+from sheets_api import SHEETS_API_STATE_DIR, fetch_sheet_posts
+
+MAGIC = b"BLOGDS01"
+FORMAT_VERSION = 1
+DATASET_DIR = os.path.join(".cache", "datasets")
+
+
+def dataset_path(spreadsheet_id, sheet_name=None, base_dir=DATASET_DIR):
+    """Default on-disk location of a sheet's dataset"""
+    name = f"{spreadsheet_id}-{sheet_name}" if sheet_name else spreadsheet_id
+    return os.path.join(base_dir, f"{name}.blogds")
+
+
+def _pad(size):
+    return (8 - size % 8) % 8
+
+
+class _SectionWriter:
+    def __init__(self, f, start):
+        self.f = f
+        self.position = start
+
+    def write(self, data):
+        data = bytes(data)
+        offset = self.position
+        self.f.write(data)
+        self.f.write(b"\0" * _pad(len(data)))
+        self.position += len(data) + _pad(len(data))
+        return [offset, len(data)]
+
+
+def _encode_plain(values):
+    offsets = array('Q', [0])
+    blob = bytearray()
+    for value in values:
+        blob += value.encode('utf-8')
+        offsets.append(len(blob))
+    return offsets, blob
+
+
+def write_dataset(path, posts, columns=None):
+    """Write posts to `path` atomically; readers of the old file keep their mapping"""
+    posts = list(posts)
+    if columns is None:
+        columns = []
+        for post in posts:
+            for key in post:
+                if key not in columns:
+                    columns.append(key)
+
+    header = {"version": FORMAT_VERSION, "rows": len(posts), "columns": [], "indexes": {}}
+    sections = []
+
+    for name in columns:
+        raw = [post.get(name, '') for post in posts]
+        kind = "json" if any(not isinstance(v, str) for v in raw) else "str"
+        values = [json.dumps(v, ensure_ascii=False) if kind == "json" else v for v in raw]
+
+        distinct = sorted(set(values))
+        column = {"name": name, "type": kind}
+        if len(distinct) <= max(1, len(values) // 2):
+            codes_by_value = {value: code for code, value in enumerate(distinct)}
+            offsets, blob = _encode_plain(distinct)
+            column["encoding"] = "dict"
+            sections.append((column, "table_offsets", offsets.tobytes()))
+            sections.append((column, "table_blob", blob))
+            sections.append((column, "codes", array('I', (codes_by_value[v] for v in values)).tobytes()))
+        else:
+            offsets, blob = _encode_plain(values)
+            column["encoding"] = "plain"
+            sections.append((column, "offsets", offsets.tobytes()))
+            sections.append((column, "blob", blob))
+        header["columns"].append(column)
+
+    for key in ("slug", "id"):
+        if key in columns:
+            order = sorted(range(len(posts)), key=lambda row: str(posts[row].get(key, '')).encode('utf-8'))
+            sections.append((header["indexes"].setdefault(key, {}), "rows", array('I', order).tobytes()))
+
+    # Section positions depend on the header size, so lay out with a padded header length
+    placeholder = json.dumps(header).encode('utf-8')
+    header_size = len(placeholder) + 64 * (len(sections) + 1) + 64
+    start = len(MAGIC) + 8 + header_size + _pad(header_size)
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.seek(start)
+        writer = _SectionWriter(f, start)
+        for owner, field, data in sections:
+            owner[field] = writer.write(data)
+
+        header_bytes = json.dumps(header).encode('utf-8')
+        if len(header_bytes) > header_size:
+            raise ValueError("dataset header overflow")
+        f.seek(0)
+        f.write(MAGIC)
+        f.write(struct.pack('<Q', header_size))
+        f.write(header_bytes.ljust(header_size, b' '))
+    os.replace(tmp, path)
+    return path
+
+
+class _Column:
+    def __init__(self, spec, view):
+        self.name = spec["name"]
+        self.is_json = spec["type"] == "json"
+        self.is_dict = spec["encoding"] == "dict"
+        if self.is_dict:
+            self.offsets = _slice(view, spec["table_offsets"]).cast('Q')
+            self.blob = _slice(view, spec["table_blob"])
+            self.codes = _slice(view, spec["codes"]).cast('I')
+            self._table = [None] * (len(self.offsets) - 1)
+        else:
+            self.offsets = _slice(view, spec["offsets"]).cast('Q')
+            self.blob = _slice(view, spec["blob"])
+
+    def _decode(self, index):
+        text = str(self.blob[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+        return json.loads(text) if self.is_json else text
+
+    def raw(self, row):
+        """Undecoded bytes of a value, used by the indexes for comparisons"""
+        index = self.codes[row] if self.is_dict else row
+        return bytes(self.blob[self.offsets[index]:self.offsets[index + 1]])
+
+    def get(self, row):
+        if not self.is_dict:
+            return self._decode(row)
+        code = self.codes[row]
+        value = self._table[code]
+        if value is None:
+            value = self._table[code] = self._decode(code)
+        return value
+
+    def distinct(self):
+        """Distinct values; free for dictionary-encoded columns"""
+        if self.is_dict:
+            return [self._decode(code) for code in range(len(self.offsets) - 1)]
+        return list({self._decode(row) for row in range(len(self.offsets) - 1)})
+
+
+def _slice(view, section):
+    offset, length = section
+    return view[offset:offset + length]
+
+
+class _IndexKeys:
+    """Sequence view of an index's keys so bisect can search the mapped bytes"""
+
+    def __init__(self, rows, column):
+        self.rows = rows
+        self.column = column
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, position):
+        return self.column.raw(self.rows[position])
+
+
+class PostDataset:
+    """Read-only, memory-mapped view of a dataset written by write_dataset"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        if self._view[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a blog dataset")
+        (header_size,) = struct.unpack_from('<Q', self._mmap, len(MAGIC))
+        header_start = len(MAGIC) + 8
+        self.header = json.loads(bytes(self._view[header_start:header_start + header_size]))
+
+        self.rows = self.header["rows"]
+        self._columns = {spec["name"]: _Column(spec, self._view) for spec in self.header["columns"]}
+        self.columns = list(self._columns)
+        self._indexes = {
+            key: _slice(self._view, spec["rows"]).cast('I')
+            for key, spec in self.header["indexes"].items()
+        }
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self.row(row)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        # Views must be released before the map can close
+        self._columns = {}
+        self._indexes = {}
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        if getattr(self, '_mmap', None) is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # A caller still holds a slice; the map is freed with it
+                pass
+        self._file.close()
+
+    def value(self, row, column):
+        """One cell, decoded on demand"""
+        col = self._columns.get(column)
+        return col.get(row) if col else ''
+
+    def column(self, name):
+        """Every value of a column, in row order"""
+        col = self._columns.get(name)
+        if col is None:
+            return [''] * self.rows
+        return [col.get(row) for row in range(self.rows)]
+
+    def raw_column(self, name):
+        """(offsets, blob, codes) of a column, undecoded, for column-at-a-time scans
+
+        Value i is blob[offsets[i]:offsets[i + 1]]. Row r holds value codes[r]
+        in a dictionary-encoded column and value r in a plain one (codes None).
+        """
+        col = self._columns.get(name)
+        if col is None:
+            return array('Q', [0, 0]), b'', array('I', bytes(4 * self.rows))
+        return col.offsets, col.blob, (col.codes if col.is_dict else None)
+
+    def distinct(self, name):
+        col = self._columns.get(name)
+        if col is None:
+            return [''] if self.rows else []
+        return col.distinct()
+
+    def row(self, row):
+        """One post as a dict"""
+        return {name: col.get(row) for name, col in self._columns.items()}
+
+    def find(self, key, value):
+        """Row number whose `key` (slug or id) equals value, or None"""
+        rows = self._indexes.get(key)
+        if rows is None:
+            return None
+        keys = _IndexKeys(rows, self._columns[key])
+        target = str(value).encode('utf-8')
+        position = bisect_left(keys, target)
+        if position < len(rows) and keys[position] == target:
+            return rows[position]
+        return None
+
+    def get_by_slug(self, slug):
+        row = self.find("slug", slug)
+        return None if row is None else self.row(row)
+
+    def get_by_id(self, post_id):
+        row = self.find("id", post_id)
+        return None if row is None else self.row(row)
+
+    def stats(self):
+        """Listing counts computed from the columns without materialising posts"""
+        categories = {category or 'Uncategorized' for category in self.distinct("category")}
+        tags = set()
+        for cell in self.distinct("tags"):
+            tags.update(split_tags(cell))
+        published = sum(1 for status in self.column("status") if is_published({"status": status}))
+        return {
+            "totalPosts": self.rows,
+            "totalCategories": len(categories),
+            "totalTags": len(tags),
+            "publishedPosts": published
+        }
+
+
+def open_dataset(path):
+    """Map a dataset file, or return None when it doesn't exist yet"""
+    return PostDataset(path) if os.path.exists(path) else None
+
+
+def prepare_posts(posts, path):
+    """Derived columns every ingest adds to the dataset at `path`: lastmod, rendered content, related posts, images"""
+    posts = stamp_lastmod(posts, history_path(path))
+    posts = attach_images(posts, load_image_manifest(image_manifest_path(path)))
+    return add_related_posts(render_posts(posts), related_state_path(path))
+
+
+def ingest_sheet(spreadsheet_id, sheet_name=None, path=None, api_key=None, state_dir=SHEETS_API_STATE_DIR):
+    """Download the sheet once and store it as a dataset; returns the dataset path
+
+    With a Sheets API key only new and changed rows are downloaded (see sheets_api).
+    Posts get their derived columns on the way in (see prepare_posts).
+    """
+    path = path or dataset_path(spreadsheet_id, sheet_name)
+    if api_key:
+        posts = fetch_sheet_posts(spreadsheet_id, api_key, sheet_name or "Sheet1", state_dir=state_dir)
+    else:
+        posts = parse_posts_csv(fetch_sheet_csv(spreadsheet_id, sheet_name))
+    return write_dataset(path, prepare_posts(posts, path))
@@ -0,0 +1,282 @@
+"""sitemap.xml, RSS and Atom feeds of an ingested dataset
+
+Everything is written in one streaming pass over the posts with XMLGenerator,
+so no document tree is held in memory. Past SITEMAP_MAX_URLS URLs the sitemap
+is split into sitemap-1.xml, sitemap-2.xml, ... and sitemap.xml becomes their
+sitemap index. `lastmod` comes from the row history recorded at ingestion
+(see row_history).
+
+Absolute URLs need the blog's public address, `site_url` in its settings.
+
+Usage:
+    python feeds.py --blog main --out dist/site                  # a blog of the app's workspace.db
+    python feeds.py --blog main --site-url https://blog.example.com --out dist/site
+    python feeds.py --config app_config.json --dataset blog.blogds --out dist/site
+"""
+import argparse
+import heapq
+import io
+import json
+import os
+import sys
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import XMLGenerator
+
+from blog_data import is_published, split_tags
+from row_history import parse_timestamp
+from site_render import category_base, post_url, tag_base
+
+SITEMAP_MAX_URLS = 50000
+FEED_ITEMS = 20
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ATOM_NS = "http://www.w3.org/2005/Atom"
+
+# Served for a day and revalidated in the background for a week
+FEED_CACHE_CONTROL = "public, max-age=86400, stale-while-revalidate=604800"
+
+CONTENT_TYPES = {
+    "sitemap": "application/xml; charset=utf-8",
+    "rss.xml": "application/rss+xml; charset=utf-8",
+    "atom.xml": "application/atom+xml; charset=utf-8"
+}
+
+
+def content_type(name):
+    return CONTENT_TYPES.get(name, CONTENT_TYPES["sitemap"])
+
+
+def _element(xml, name, text, attrs=None):
+    xml.startElement(name, attrs or {})
+    xml.characters(text)
+    xml.endElement(name)
+
+
+def _post_times(post):
+    """(published, lastmod) as UTC datetimes, each falling back to the other"""
+    published = parse_timestamp(post.get('date'))
+    lastmod = parse_timestamp(post.get('lastmod')) or published
+    return published or lastmod, lastmod
+
+
+class _SitemapWriter:
+    """URL sets that roll over to a new numbered file every SITEMAP_MAX_URLS"""
+
+    def __init__(self, opener):
+        self.opener = opener
+        self.files = []
+        self.urls = 0
+        self.xml = None
+        self.out = None
+
+    def add(self, loc, lastmod=None):
+        if self.xml is None or self.urls % SITEMAP_MAX_URLS == 0:
+            self._close()
+            name = f"sitemap-{len(self.files) + 1}.xml"
+            self.out = self.opener(name)
+            self.files.append((name, None))
+            self.xml = XMLGenerator(self.out, encoding='utf-8', short_empty_elements=True)
+            self.xml.startDocument()
+            self.xml.startElement("urlset", {"xmlns": SITEMAP_NS})
+        self.xml.startElement("url", {})
+        _element(self.xml, "loc", loc)
+        if lastmod:
+            _element(self.xml, "lastmod", lastmod.isoformat(timespec='seconds'))
+            name, newest = self.files[-1]
+            self.files[-1] = (name, max(newest, lastmod) if newest else lastmod)
+        self.xml.endElement("url")
+        self.urls += 1
+
+    def _close(self):
+        if self.xml is not None:
+            self.xml.endElement("urlset")
+            self.xml.endDocument()
+            self.out.close()
+            self.xml = None
+
+    def finish(self, site_url, rename):
+        """Close the last file; one file becomes sitemap.xml, several get an index"""
+        self._close()
+        if len(self.files) == 1:
+            rename("sitemap-1.xml", "sitemap.xml")
+            return ["sitemap.xml"]
+        out = self.opener("sitemap.xml")
+        xml = XMLGenerator(out, encoding='utf-8', short_empty_elements=True)
+        xml.startDocument()
+        xml.startElement("sitemapindex", {"xmlns": SITEMAP_NS})
+        for name, newest in self.files:
+            xml.startElement("sitemap", {})
+            _element(xml, "loc", f"{site_url}/{name}")
+            if newest:
+                _element(xml, "lastmod", newest.isoformat(timespec='seconds'))
+            xml.endElement("sitemap")
+        xml.endElement("sitemapindex")
+        xml.endDocument()
+        out.close()
+        return ["sitemap.xml"] + [name for name, _ in self.files]
+
+
+def _write_rss(out, config, site_url, items, now):
+    xml = XMLGenerator(out, encoding='utf-8', short_empty_elements=True)
+    xml.startDocument()
+    xml.startElement("rss", {"version": "2.0", "xmlns:atom": ATOM_NS})
+    xml.startElement("channel", {})
+    _element(xml, "title", config.get('blog_title', 'Blog'))
+    _element(xml, "link", f"{site_url}/")
+    _element(xml, "description", config.get('blog_description', ''))
+    xml.startElement("atom:link", {"href": f"{site_url}/rss.xml", "rel": "self", "type": "application/rss+xml"})
+    xml.endElement("atom:link")
+    _element(xml, "lastBuildDate", format_datetime(now))
+    for post, published, _ in items:
+        link = site_url + post_url(post)
+        xml.startElement("item", {})
+        _element(xml, "title", post.get('title') or '')
+        _element(xml, "link", link)
+        _element(xml, "guid", link, {"isPermaLink": "true"})
+        if published:
+            _element(xml, "pubDate", format_datetime(published))
+        if post.get('category'):
+            _element(xml, "category", post['category'])
+        _element(xml, "description", post.get('excerpt') or '')
+        xml.endElement("item")
+    xml.endElement("channel")
+    xml.endElement("rss")
+    xml.endDocument()
+
+
+def _write_atom(out, config, site_url, items, now):
+    updated = max((lastmod for _, _, lastmod in items if lastmod), default=now)
+    xml = XMLGenerator(out, encoding='utf-8', short_empty_elements=True)
+    xml.startDocument()
+    xml.startElement("feed", {"xmlns": ATOM_NS})
+    _element(xml, "id", f"{site_url}/")
+    _element(xml, "title", config.get('blog_title', 'Blog'))
+    if config.get('blog_description'):
+        _element(xml, "subtitle", config['blog_description'])
+    _element(xml, "updated", updated.isoformat(timespec='seconds'))
+    xml.startElement("link", {"href": f"{site_url}/atom.xml", "rel": "self"})
+    xml.endElement("link")
+    xml.startElement("link", {"href": f"{site_url}/", "rel": "alternate"})
+    xml.endElement("link")
+    for post, published, lastmod in items:
+        link = site_url + post_url(post)
+        xml.startElement("entry", {})
+        _element(xml, "id", link)
+        _element(xml, "title", post.get('title') or '')
+        xml.startElement("link", {"href": link, "rel": "alternate"})
+        xml.endElement("link")
+        _element(xml, "updated", (lastmod or published or now).isoformat(timespec='seconds'))
+        if published:
+            _element(xml, "published", published.isoformat(timespec='seconds'))
+        xml.startElement("author", {})
+        _element(xml, "name", post.get('author') or 'Admin')
+        xml.endElement("author")
+        if post.get('category'):
+            xml.startElement("category", {"term": post['category']})
+            xml.endElement("category")
+        _element(xml, "summary", post.get('excerpt') or '')
+        xml.endElement("entry")
+    xml.endElement("feed")
+    xml.endDocument()
+
+
+def write_feeds(posts, config, opener, rename):
+    """Stream the sitemap(s), rss.xml and atom.xml of `posts`; returns a summary
+
+    `opener(name)` returns a binary file to write `name` to and
+    `rename(old, new)` renames a written file.
+    """
+    site_url = (config.get('site_url') or '').rstrip('/')
+    if not site_url:
+        raise ValueError("site_url is required for sitemaps and feeds")
+    now = datetime.now(timezone.utc)
+
+    sitemap = _SitemapWriter(opener)
+    listings = {}
+    newest = []
+    for order, post in enumerate(posts):
+        if not is_published(post):
+            continue
+        published, lastmod = _post_times(post)
+        sitemap.add(site_url + post_url(post), lastmod)
+        for base in [category_base(post.get('category'))] + [tag_base(tag) for tag in split_tags(post.get('tags'))]:
+            current = listings.get(base)
+            if lastmod and (current is None or lastmod > current):
+                listings[base] = lastmod
+            else:
+                listings.setdefault(base, None)
+        # Keep only the newest FEED_ITEMS posts for the feeds
+        item = ((published or lastmod or now).timestamp(), -order, post, published, lastmod)
+        if len(newest) < FEED_ITEMS:
+            heapq.heappush(newest, item)
+        else:
+            heapq.heappushpop(newest, item)
+
+    home = max((lastmod for lastmod in listings.values() if lastmod), default=None)
+    sitemap.add(f"{site_url}/", home)
+    for base, lastmod in listings.items():
+        sitemap.add(site_url + base, lastmod)
+    files = sitemap.finish(site_url, rename)
+
+    items = [(post, published, lastmod) for _, _, post, published, lastmod in sorted(newest, reverse=True)]
+    for name, writer in (("rss.xml", _write_rss), ("atom.xml", _write_atom)):
+        out = opener(name)
+        writer(out, config, site_url, items, now)
+        out.close()
+        files.append(name)
+    return {"files": files, "urls": sitemap.urls, "feed_items": len(items)}
+
+
+def build_feeds(posts, out_dir, config):
+    """Write the sitemap(s) and feeds into out_dir"""
+    os.makedirs(out_dir, exist_ok=True)
+    return write_feeds(posts, config, lambda name: open(os.path.join(out_dir, name), 'wb'),
+                       lambda old, new: os.replace(os.path.join(out_dir, old), os.path.join(out_dir, new)))
+
+
+def feed_bodies(posts, config):
+    """{file name: XML text} of the sitemap(s) and feeds, for publishing to KV"""
+    bodies = {}
+
+    class _Buffer(io.BytesIO):
+        def __init__(self, name):
+            super().__init__()
+            self.name = name
+
+        def close(self):
+            bodies[self.name] = self.getvalue().decode('utf-8')
+            super().close()
+
+    def rename(old, new):
+        bodies[new] = bodies.pop(old)
+
+    write_feeds(posts, config, _Buffer, rename)
+    return bodies
+
+
+def main(argv=None):
+    from dataset_store import PostDataset
+    from workspace import add_blog_arguments, resolve_blog, site_config
+
+    parser = argparse.ArgumentParser(description="Write sitemap.xml, rss.xml and atom.xml for a dataset")
+    add_blog_arguments(parser)
+    parser.add_argument('--site-url', help="Public address of the blog (default: site_url from the config)")
+    parser.add_argument('--out', default=os.path.join("dist", "site"))
+    args = parser.parse_args(argv)
+
+    try:
+        _, profile, dataset_file = resolve_blog(args)
+    except ValueError as e:
+        parser.error(str(e))
+    config = site_config(profile)
+    if args.site_url:
+        config['site_url'] = args.site_url
+
+    with PostDataset(dataset_file) as dataset:
+        summary = build_feeds(dataset, args.out, config)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
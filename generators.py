@@ -0,0 +1,1335 @@
+"""Generators for the HTML template, the deployment guide and the Cloudflare Worker modules
+
+Kept out of streamlit_app.py so the app, the deploy jobs and loadtest.py can
+build the same Worker without importing Streamlit.
+"""
+import json
+from datetime import datetime
+
+from asset_pipeline import (ASSET_CACHE_CONTROL, apply_assets, build_page_assets, content_type, fingerprint,
+                            precompress, template_sources, variant_name)
+from feeds import FEED_CACHE_CONTROL
+from kv_publish import FEED_KEY_PREFIX, KV_BINDING
+from site_render import COLOR_SCHEMES
+
+WORKER_MAIN_MODULE = "worker.js"
+TEXT_ASSET_TYPES = ("text/", "application/javascript")
+
+# Stylesheet shared by the Worker's pages; asset_pipeline splits it into inlined critical rules and the deferred file
+WORKER_CSS = """body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }
+.navbar { background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); }
+.hero { background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); color: white; padding: 4rem 0; }
+.card { border: none; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); transition: transform 0.3s; }
+.card:hover { transform: translateY(-5px); }
+.btn-primary { background: #2563eb; border-color: #2563eb; }
+.btn-primary:hover { background: #1d4ed8; border-color: #1d4ed8; }
+.loading { text-align: center; padding: 2rem; }
+.post-content { line-height: 1.8; font-size: 1.1rem; }
+"""
+
+# Client script of the Worker's home page: fills the post cards and statistics from the API
+WORKER_HOME_JS = r"""// Update last updated time
+document.getElementById('lastUpdated').textContent = new Date().toLocaleString('id-ID');
+
+// Responsive card image from the image pipeline srcset data
+function pictureHtml(image, alt, sizes) {
+    const sources = image.sources.map(source =>
+        `<source type="${source.type}" srcset="${source.srcset}" sizes="${sizes}">`
+    ).join('')
+    return `<picture>${sources}<img src="${image.src}" width="${image.width}" height="${image.height}" alt="${alt}" class="card-img-top" loading="lazy" decoding="async"></picture>`
+}
+
+function escapeHtml(text) {
+    return String(text || '').replace(/[&<>"']/g, ch => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'})[ch])
+}
+
+// Load the first page of posts: one precomputed listing shard
+async function loadPosts() {
+    try {
+        const response = await fetch('/api/list/index.json')
+        const data = await response.json()
+        
+        if (data.success) {
+            const posts = data.posts || []
+            const postsContainer = document.getElementById('posts')
+            
+            if (posts.length === 0) {
+                postsContainer.innerHTML = '<div class="col-12 text-center"><p>No posts found. Add content to your Google Sheets!</p></div>'
+                return
+            }
+            
+            postsContainer.innerHTML = posts.map(post => `
+                <div class="col-md-6 mb-4">
+                    <div class="card">
+                        ${post.image ? pictureHtml(post.image, escapeHtml(post.title), '(min-width: 768px) 400px, 100vw') : ''}
+                        <div class="card-body">
+                            <h5 class="card-title">${escapeHtml(post.title)}</h5>
+                            <p class="card-text">${escapeHtml(post.excerpt || (post.content || '').substring(0, 150) + '...')}</p>
+                            <div class="d-flex justify-content-between align-items-center">
+                                <small class="text-muted">${escapeHtml(post.category || 'Uncategorized')} • ${escapeHtml(post.date)}</small>
+                                <a href="/post/${encodeURIComponent(post.slug || post.id)}" class="btn btn-primary btn-sm">Read More</a>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            `).join('')
+            if (data.totalPages > 1) {
+                postsContainer.insertAdjacentHTML('beforeend', '<div class="col-12 text-center"><a href="/page/2/" class="btn btn-outline-primary">Older posts</a></div>')
+            }
+        } else {
+            document.getElementById('posts').innerHTML = '<div class="col-12 text-center"><p>Error loading posts</p></div>'
+        }
+    } catch (error) {
+        console.error('Error loading posts:', error)
+        document.getElementById('posts').innerHTML = '<div class="col-12 text-center"><p>Failed to load posts</p></div>'
+    }
+}
+
+// Load statistics
+async function loadStats() {
+    try {
+        const response = await fetch('/api/stats')
+        const data = await response.json()
+        
+        if (data.success) {
+            const stats = data.stats
+            document.getElementById('stats').innerHTML = `
+                <p><i class="fas fa-file-alt me-2"></i>Posts: ${stats.totalPosts}</p>
+                <p><i class="fas fa-folder me-2"></i>Categories: ${stats.totalCategories}</p>
+                <p><i class="fas fa-tags me-2"></i>Tags: ${stats.totalTags}</p>
+            `
+        }
+    } catch (error) {
+        console.error('Error loading stats:', error)
+        document.getElementById('stats').innerHTML = '<p>Error loading statistics</p>'
+    }
+}
+
+// Initialize
+loadPosts()
+loadStats()
+"""
+
+
+def load_html_template():
+    """Text of blog-template.html, or a minimal page when it is missing"""
+    try:
+        with open('blog-template.html', 'r', encoding='utf-8') as f:
+            template = f.read()
+    except FileNotFoundError:
+        # Fallback template if file doesn't exist
+        template = """
+        <!DOCTYPE html>
+        <html lang="id">
+        <head>
+            <meta charset="UTF-8">
+            <meta name="viewport" content="width=device-width, initial-scale=1.0">
+            <title>{{blog_title}}</title>
+            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+        </head>
+        <body>
+            <nav class="navbar navbar-expand-lg navbar-dark bg-primary">
+                <div class="container">
+                    <a class="navbar-brand" href="#">{{blog_title}}</a>
+                </div>
+            </nav>
+            <div class="container mt-4">
+                <h1>{{blog_title}}</h1>
+                <p>{{blog_description}}</p>
+            </div>
+            <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
+        </body>
+        </html>
+        """
+    return template
+
+
+def html_template_assets():
+    """Assets of the generated template's pages, to serve from /assets/ beside it"""
+    return build_page_assets(load_html_template())
+
+
+def generate_html_template(config):
+    """Generate HTML template based on configuration
+
+    The CDN tags are replaced with the critical CSS and the /assets/ links of
+    html_template_assets(), when the vendor files are available.
+    """
+    colors = COLOR_SCHEMES.get(config['color_scheme'], COLOR_SCHEMES['Blue'])
+    
+    template = apply_assets(load_html_template(), html_template_assets())
+
+    # Replace template variables
+    template = template.replace('{{site_title}}', config['blog_title'])
+    template = template.replace('{{site_description}}', config['blog_description'])
+    template = template.replace('{{site_keywords}}', config['blog_keywords'])
+    template = template.replace('{{current_year}}', str(datetime.now().year))
+    
+    # Replace color scheme
+    template = template.replace('--primary-color: #2563eb', f'--primary-color: {colors["primary"]}')
+    template = template.replace('#1d4ed8', colors["secondary"])
+    
+    return template
+
+
+def generate_deployment_guide():
+    """Generate deployment guide"""
+    return """
+    ## 🚀 Deployment Guide
+    
+    ### Prerequisites
+    - Web server (Apache/Nginx)
+    - Domain name
+    - SSL certificate
+    
+    ### Steps
+    1. **Upload Files**
+       - Upload HTML template to your web server
+       - Ensure proper file permissions
+    
+    2. **Configure Environment**
+       - Set up environment variables
+       - Configure Google Sheets API
+       - Set up Cloudflare if using
+    
+    3. **Test Deployment**
+       - Check all links work
+       - Test Google Sheets connection
+       - Verify responsive design
+    
+    4. **Go Live**
+       - Point domain to your server
+       - Enable SSL
+       - Monitor for errors
+    
+    ### Environment Variables
+    ```bash
+    GOOGLE_SHEETS_API_KEY=your_api_key_here
+    SPREADSHEET_ID=your_spreadsheet_id
+    SHEET_NAME=WEBSITE
+    ```
+    
+    ### Troubleshooting
+    - Check API key permissions
+    - Verify spreadsheet sharing settings
+    - Test network connectivity
+    """
+
+
+def worker_assets():
+    """Assets of the Worker's pages (asset_pipeline.build_page_assets) plus the home page script, whose name is under 'js'"""
+    page = build_page_assets(template_sources("generators.py"), theme_css=WORKER_CSS)
+    js_name = fingerprint("home.js", WORKER_HOME_JS)
+    files = dict(page["files"])
+    files[js_name] = (WORKER_HOME_JS.encode('utf-8'), content_type(js_name))
+    encoded = dict(page["encoded"], **precompress({js_name: files[js_name]}))
+    return dict(page, js=js_name, files=files, encoded=encoded)
+
+
+def generate_cloudflare_worker_modules(config):
+    """The Worker as ES modules: {module name: (source, part Content-Type)}, main module first
+
+    The stylesheet and client script are text modules and the fonts and the
+    .gz/.br variants data modules, all with a content hash in their names,
+    served from /assets/ with immutable caching, so the main module only
+    carries the routes, the page templates and their critical CSS.
+    """
+    assets = worker_assets()
+    modules = {WORKER_MAIN_MODULE: (generate_cloudflare_worker_script(config), "application/javascript+module")}
+    for name, (content, type_) in assets["files"].items():
+        if type_.startswith(TEXT_ASSET_TYPES):
+            modules[name] = (content.decode('utf-8'), "text/plain")
+        else:
+            modules[name] = (content, "application/octet-stream")
+        for encoding, variant in assets["encoded"].get(name, {}).items():
+            modules[variant_name(name, encoding)] = (variant, "application/octet-stream")
+    return modules
+
+
+def _asset_table(assets):
+    """Import statements and the ASSETS entries of the main module"""
+    imports, entries = [], []
+    for name, (_, type_) in assets["files"].items():
+        fields = {"body": name}
+        fields.update((encoding, variant_name(name, encoding)) for encoding in assets["encoded"].get(name, {}))
+        values = []
+        for field, module in fields.items():
+            identifier = f"ASSET_{len(imports)}"
+            imports.append(f"import {identifier} from './{module}'")
+            values.append(f"{field}: {identifier}")
+        entries.append(f"    '{name}': {{ type: '{type_}', {', '.join(values)} }}")
+    return "\n".join(imports), ",\n".join(entries)
+
+
+def generate_cloudflare_worker_script(config):
+    """Generate the main module of the Cloudflare Worker (see generate_cloudflare_worker_modules)
+
+    With dataSource 'kv' the Worker serves the snapshot published to Workers KV
+    and never contacts Google at request time; otherwise it reads the sheet directly.
+    """
+    spreadsheet_id = config.get('spreadsheetId', '')
+    sheet_name = config.get('sheetName', 'Sheet1')
+    blog_title = config.get('blogTitle', 'Blog')
+    blog_description = config.get('blogDescription', 'Blog powered by Google Sheets')
+    blog_keywords = config.get('blogKeywords', 'blog, google sheets')
+    posts_per_page = int(config.get('postsPerPage') or 6)
+    assets = worker_assets()
+    asset_imports, asset_entries = _asset_table(assets)
+    
+    if config.get('dataSource') == 'kv':
+        data_layer = generate_worker_kv_data_layer()
+    else:
+        data_layer = generate_worker_sheets_data_layer(config.get('cacheTtl', 60), config.get('fetchTimeout', 8))
+    
+    return f"""// Auto-generated Cloudflare Worker (ES module)
+// Generated on: {datetime.now().isoformat()}
+// Spreadsheet ID: {spreadsheet_id}
+
+{asset_imports}
+
+// Bindings arrive on env; the data layer reads them from module scope
+let {KV_BINDING}
+
+export default {{
+    async fetch(request, env) {{
+        {KV_BINDING} = env.{KV_BINDING}
+        return handleRequest(request)
+    }}
+}}
+
+// Page assets: the names carry a content hash, so browsers may keep them forever
+const ASSETS = {{
+{asset_entries}
+}}
+
+// Inlined critical CSS and the non-blocking stylesheet link, shared by every page
+const PAGE_STYLES = {json.dumps(assets['styles'])}
+const PAGE_SCRIPTS = {json.dumps(assets['scripts'])}
+
+function serveAsset(name, request) {{
+    const asset = ASSETS[name]
+    if (!asset) {{
+        return new Response('Not Found', {{ status: 404 }})
+    }}
+    const headers = {{ 'Content-Type': asset.type, 'Cache-Control': '{ASSET_CACHE_CONTROL}', 'Vary': 'Accept-Encoding' }}
+    const accepted = request.headers.get('Accept-Encoding') || ''
+    for (const encoding of ['br', 'gzip']) {{
+        if (asset[encoding] && accepted.includes(encoding)) {{
+            // Already compressed at build time; the runtime must not encode it again
+            return new Response(asset[encoding], {{
+                headers: {{ ...headers, 'Content-Encoding': encoding }},
+                encodeBody: 'manual'
+            }})
+        }}
+    }}
+    return new Response(asset.body, {{ headers }})
+}}
+
+async function handleRequest(request) {{
+    const url = new URL(request.url)
+    
+    // CORS headers
+    const corsHeaders = {{
+        'Access-Control-Allow-Origin': '*',
+        'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
+        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
+    }}
+    
+    // Handle CORS preflight
+    if (request.method === 'OPTIONS') {{
+        return new Response(null, {{ headers: corsHeaders }})
+    }}
+    
+    try {{
+        let response
+        
+        // Route handling
+        switch (url.pathname) {{
+            case '/':
+                response = await serveBlogHome()
+                break
+            case '/api/posts':
+                response = await getPosts()
+                break
+            case '/api/categories':
+                response = await getCategories()
+                break
+            case '/api/tags':
+                response = await getTags()
+                break
+            case '/api/stats':
+                response = await getStats()
+                break
+            case '/health':
+                response = new Response(JSON.stringify({{ 
+                    status: 'healthy', 
+                    timestamp: new Date().toISOString(),
+                    spreadsheetId: SPREADSHEET_ID 
+                }}), {{
+                    headers: {{ 'Content-Type': 'application/json' }}
+                }})
+                break
+            default:
+                if (url.pathname.startsWith('/assets/')) {{
+                    response = serveAsset(url.pathname.slice('/assets/'.length), request)
+                }} else if (url.pathname.startsWith('/post/')) {{
+                    response = await getPost(url.pathname.split('/')[2])
+                }} else if (FEED_PATH.test(url.pathname)) {{
+                    response = await getFeed(url.pathname.slice(1))
+                }} else if (url.pathname.startsWith('/api/post/')) {{
+                    response = await getPostAPI(url.pathname.split('/')[3])
+                }} else if (url.pathname.startsWith('/api/list/')) {{
+                    response = await getListing(listingKey(url.pathname.slice('/api/list'.length)))
+                }} else if (LISTING_PATH.test(url.pathname)) {{
+                    response = await getListingPage(listingKey(url.pathname))
+                }} else {{
+                    response = new Response('Not Found', {{ status: 404 }})
+                }}
+                break
+        }}
+        
+        // Add CORS headers to response
+        Object.entries(corsHeaders).forEach(([key, value]) => {{
+            response.headers.set(key, value)
+        }})
+        
+        return response
+    }} catch (error) {{
+        console.error('Error handling request:', error)
+        const unavailable = error instanceof DataUnavailableError
+        return new Response(JSON.stringify({{ 
+            success: false, 
+            error: error.message 
+        }}), {{ 
+            status: unavailable ? 503 : 500,
+            headers: {{ 
+                'Content-Type': 'application/json',
+                ...(unavailable ? {{ 'Retry-After': '30' }} : {{}}),
+                ...corsHeaders 
+            }}
+        }})
+    }}
+}}
+
+// Configuration
+const SPREADSHEET_ID = '{spreadsheet_id}'
+const SHEET_NAME = '{sheet_name}'
+const BLOG_CONFIG = {{
+    site_title: '{blog_title}',
+    site_description: '{blog_description}',
+    site_keywords: '{blog_keywords}',
+    current_year: new Date().getFullYear()
+}}
+const POSTS_PER_PAGE = {posts_per_page}
+
+// Sitemaps and feeds precomputed by the Python pipeline (feeds.py)
+const FEED_PATH = /^\\/(sitemap(-\\d+)?\\.xml|rss\\.xml|atom\\.xml)$/
+const FEED_CACHE_CONTROL = '{FEED_CACHE_CONTROL}'
+
+function feedContentType(name) {{
+    if (name === 'rss.xml') return 'application/rss+xml; charset=utf-8'
+    if (name === 'atom.xml') return 'application/atom+xml; charset=utf-8'
+    return 'application/xml; charset=utf-8'
+}}
+
+// Single-flight: concurrent cache misses for the same key share one in-flight
+// promise, so a cold isolate under load loads each dataset only once
+const inflight = new Map()
+
+// Thrown when there is no data to serve at all; answered with 503 instead of 500
+class DataUnavailableError extends Error {{}}
+
+function singleFlight(key, loader) {{
+    let promise = inflight.get(key)
+    if (!promise) {{
+        promise = loader().finally(() => inflight.delete(key))
+        inflight.set(key, promise)
+    }}
+    return promise
+}}
+
+{data_layer}
+
+// Serve blog home page
+async function serveBlogHome() {{
+    const html = `
+    <!DOCTYPE html>
+    <html lang="id">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>${{BLOG_CONFIG.site_title}}</title>
+        <meta name="description" content="${{BLOG_CONFIG.site_description}}">
+        <meta name="keywords" content="${{BLOG_CONFIG.site_keywords}}">
+        ${{PAGE_STYLES}}
+    </head>
+    <body>
+        <nav class="navbar navbar-expand-lg navbar-dark">
+            <div class="container">
+                <a class="navbar-brand" href="/"><i class="fas fa-blog me-2"></i>${{BLOG_CONFIG.site_title}}</a>
+                <div class="navbar-nav ms-auto">
+                    <a class="nav-link" href="/">Home</a>
+                    <a class="nav-link" href="/api/posts">API</a>
+                    <a class="nav-link" href="/health">Health</a>
+                </div>
+            </div>
+        </nav>
+        
+        <div class="hero text-center">
+            <div class="container">
+                <h1 class="display-4">${{BLOG_CONFIG.site_title}}</h1>
+                <p class="lead">${{BLOG_CONFIG.site_description}}</p>
+                <p><small>Powered by Google Sheets & Cloudflare Workers</small></p>
+            </div>
+        </div>
+        
+        <div class="container mt-5">
+            <div class="row">
+                <div class="col-lg-8">
+                    <div id="posts" class="row">
+                        <div class="col-12 loading">
+                            <i class="fas fa-spinner fa-spin fa-2x"></i>
+                            <p>Loading posts...</p>
+                        </div>
+                    </div>
+                </div>
+                <div class="col-lg-4">
+                    <div class="card">
+                        <div class="card-body">
+                            <h5><i class="fas fa-info-circle me-2"></i>About This Blog</h5>
+                            <p>${{BLOG_CONFIG.site_description}}</p>
+                            <p><small><strong>Data Source:</strong> Google Sheets</small></p>
+                            <p><small><strong>Spreadsheet ID:</strong> ${{SPREADSHEET_ID}}</small></p>
+                            <p><small><strong>Last Updated:</strong> <span id="lastUpdated">Loading...</span></small></p>
+                        </div>
+                    </div>
+                    
+                    <div class="card mt-3">
+                        <div class="card-body">
+                            <h5><i class="fas fa-chart-bar me-2"></i>Statistics</h5>
+                            <div id="stats">
+                                <p><i class="fas fa-spinner fa-spin"></i> Loading stats...</p>
+                            </div>
+                        </div>
+                    </div>
+                </div>
+            </div>
+        </div>
+        
+        <footer class="bg-dark text-white mt-5 py-4">
+            <div class="container text-center">
+                <p>&copy; ${{BLOG_CONFIG.current_year}} ${{BLOG_CONFIG.site_title}}. Powered by Cloudflare Workers & Google Sheets.</p>
+                <p><small>Generated by Blog Template System</small></p>
+            </div>
+        </footer>
+        
+        ${{PAGE_SCRIPTS}}
+        <script src="/assets/{assets['js']}" defer></script>
+    </body>
+    </html>
+    `
+    
+    return new Response(html, {{
+        headers: {{ 'Content-Type': 'text/html' }}
+    }})
+}}
+
+// Responsive <picture> from the srcset data produced by the image pipeline
+function pictureHtml(image, alt, sizes, cssClass = 'img-fluid rounded') {{
+    const sources = image.sources.map(source =>
+        `<source type="${{source.type}}" srcset="${{source.srcset}}" sizes="${{sizes}}">`
+    ).join('')
+    return `<picture>${{sources}}<img src="${{image.src}}" width="${{image.width}}" height="${{image.height}}" alt="${{alt}}" class="${{cssClass}}" decoding="async"></picture>`
+}}
+
+function escapeHtml(text) {{
+    return String(text || '').replace(/[&<>"']/g, ch => ({{'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;', "'": '&#39;'}})[ch])
+}}
+
+// Table of contents from the headings content_render found at ingestion
+function tocHtml(toc) {{
+    if (!Array.isArray(toc) || toc.length < 2) return ''
+    const top = Math.min(...toc.map(entry => entry.level))
+    const items = toc.map(entry =>
+        `<li class="toc-level-${{entry.level - top + 1}}"><a href="#${{entry.id}}">${{escapeHtml(entry.text)}}</a></li>`
+    ).join('')
+    return `<nav class="toc mb-4"><h6>Contents</h6><ul class="list-unstyled">${{items}}</ul></nav>`
+}}
+
+// Related posts precomputed at ingestion (related_posts.py)
+function relatedHtml(related) {{
+    if (!Array.isArray(related) || related.length === 0) return ''
+    const items = related.map(item => `<li><a href="/post/${{encodeURIComponent(item.slug)}}">${{escapeHtml(item.title)}}</a></li>`).join('')
+    return `<div class="mt-4 related-posts"><h6>Related posts:</h6><ul>${{items}}</ul></div>`
+}}
+
+// Render a single post page
+function renderPostPage(post) {{
+    const html = `
+    <!DOCTYPE html>
+    <html lang="id">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>${{post.title}} - ${{BLOG_CONFIG.site_title}}</title>
+        <meta name="description" content="${{escapeHtml(post.meta_description || (post.content || '').substring(0, 160))}}">
+        <meta name="keywords" content="${{post.tags}}">
+        ${{PAGE_STYLES}}
+    </head>
+    <body>
+        <nav class="navbar navbar-expand-lg navbar-dark">
+            <div class="container">
+                <a class="navbar-brand" href="/"><i class="fas fa-blog me-2"></i>${{BLOG_CONFIG.site_title}}</a>
+                <div class="navbar-nav ms-auto">
+                    <a class="nav-link" href="/">Home</a>
+                </div>
+            </div>
+        </nav>
+        
+        <div class="hero text-center">
+            <div class="container">
+                <h1 class="display-4">${{post.title}}</h1>
+                <p class="lead">${{post.category || 'Uncategorized'}} • ${{post.date}} • ${{post.author || 'Admin'}}${{post.reading_time ? ` • ${{post.reading_time}} min read` : ''}}</p>
+            </div>
+        </div>
+        
+        <div class="container mt-5">
+            <div class="row">
+                <div class="col-lg-8 mx-auto">
+                    ${{post.image ? `<div class="mb-4">${{pictureHtml(post.image, escapeHtml(post.title), '(min-width: 992px) 856px, 100vw')}}</div>` : ''}}
+                    <div class="post-content">
+                        ${{tocHtml(post.toc)}}
+                        ${{post.content_html || escapeHtml(post.content).replace(/\\n/g, '<br>')}}
+                    </div>
+                    
+                    <div class="mt-4">
+                        <h6>Tags:</h6>
+                        ${{(post.tags || '').split(',').map(tag => `<span class="badge bg-primary me-1">${{tag.trim()}}</span>`).join('')}}
+                    </div>
+                    
+                    ${{relatedHtml(post.related)}}
+                    
+                    <div class="mt-4">
+                        <a href="/" class="btn btn-outline-primary">
+                            <i class="fas fa-arrow-left me-2"></i>Back to Blog
+                        </a>
+                    </div>
+                </div>
+            </div>
+        </div>
+        
+        <footer class="bg-dark text-white mt-5 py-4">
+            <div class="container text-center">
+                <p>&copy; ${{BLOG_CONFIG.current_year}} ${{BLOG_CONFIG.site_title}}. Powered by Cloudflare Workers.</p>
+            </div>
+        </footer>
+        
+        ${{PAGE_SCRIPTS}}
+    </body>
+    </html>
+    `
+    
+    return new Response(html, {{
+        headers: {{ 'Content-Type': 'text/html' }}
+    }})
+}}
+
+// Listing shards (listing_shards.py): each page of the home page, a category, a tag
+// or a month is one precomputed JSON body, so a listing request is one lookup
+const LISTING_PATH = /^\\/(page\\/\\d+|(category|tag)\\/[^/]+(\\/page\\/\\d+)?|archive\\/\\d{{4}}\\/\\d{{2}}(\\/page\\/\\d+)?)\\/?$/
+
+function listingKey(path) {{
+    const rest = path.replace(/^\\/+|\\/+$/g, '').replace(/\\.json$/, '')
+    return 'api/list/' + (rest || 'index')
+}}
+
+function listingUrl(base, page) {{
+    return page === 1 ? base : `${{base}}page/${{page}}/`
+}}
+
+async function getListing(key) {{
+    const body = await loadListing(key)
+    if (body === null) {{
+        return new Response(JSON.stringify({{
+            success: false,
+            message: 'Listing not found'
+        }}), {{
+            status: 404,
+            headers: {{ 'Content-Type': 'application/json' }}
+        }})
+    }}
+    return new Response(body, {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}
+
+async function getListingPage(key) {{
+    const body = await loadListing(key)
+    if (body === null) {{
+        return new Response('Not Found', {{ status: 404 }})
+    }}
+    return renderListingPage(JSON.parse(body))
+}}
+
+function listingPagerHtml(shard) {{
+    if (shard.totalPages <= 1) return ''
+    const prev = shard.page > 1 ? `<a class="btn btn-outline-primary" href="${{listingUrl(shard.base, shard.page - 1)}}" rel="prev">&laquo; Newer</a>` : '<span></span>'
+    const next = shard.page < shard.totalPages ? `<a class="btn btn-outline-primary" href="${{listingUrl(shard.base, shard.page + 1)}}" rel="next">Older &raquo;</a>` : '<span></span>'
+    return `<nav class="d-flex justify-content-between align-items-center mt-4">${{prev}}<small>Page ${{shard.page}} of ${{shard.totalPages}}</small>${{next}}</nav>`
+}}
+
+// Render one page of a listing from its shard
+function renderListingPage(shard) {{
+    const cards = shard.posts.map(post => `
+                <div class="col-md-6 col-lg-4 mb-4">
+                    <div class="card h-100">
+                        ${{post.image ? pictureHtml(post.image, escapeHtml(post.title), '(min-width: 992px) 400px, (min-width: 768px) 50vw, 100vw', 'card-img-top') : ''}}
+                        <div class="card-body">
+                            <h5 class="card-title"><a href="/post/${{encodeURIComponent(post.slug || post.id)}}" class="text-decoration-none">${{escapeHtml(post.title)}}</a></h5>
+                            <p class="card-text">${{escapeHtml(post.excerpt)}}</p>
+                            <small class="text-muted">${{escapeHtml(post.category || 'Uncategorized')}} • ${{escapeHtml(post.date)}}</small>
+                        </div>
+                    </div>
+                </div>`).join('') || '<div class="col-12 text-center"><p>No posts found.</p></div>'
+    const title = shard.kind === 'home' ? BLOG_CONFIG.site_title : `${{escapeHtml(shard.heading)}} - ${{BLOG_CONFIG.site_title}}`
+    const html = `
+    <!DOCTYPE html>
+    <html lang="id">
+    <head>
+        <meta charset="UTF-8">
+        <meta name="viewport" content="width=device-width, initial-scale=1.0">
+        <title>${{title}}${{shard.page > 1 ? ` - Page ${{shard.page}}` : ''}}</title>
+        <meta name="description" content="${{BLOG_CONFIG.site_description}}">
+        ${{PAGE_STYLES}}
+    </head>
+    <body>
+        <nav class="navbar navbar-expand-lg navbar-dark">
+            <div class="container">
+                <a class="navbar-brand" href="/"><i class="fas fa-blog me-2"></i>${{BLOG_CONFIG.site_title}}</a>
+                <div class="navbar-nav ms-auto">
+                    <a class="nav-link" href="/">Home</a>
+                </div>
+            </div>
+        </nav>
+        
+        <div class="hero text-center">
+            <div class="container">
+                <h1 class="display-4">${{escapeHtml(shard.heading)}}</h1>
+                <p class="lead">Page ${{shard.page}} of ${{shard.totalPages}}</p>
+            </div>
+        </div>
+        
+        <div class="container mt-5">
+            <div class="row">${{cards}}
+            </div>
+            ${{listingPagerHtml(shard)}}
+        </div>
+        
+        <footer class="bg-dark text-white mt-5 py-4">
+            <div class="container text-center">
+                <p>&copy; ${{BLOG_CONFIG.current_year}} ${{BLOG_CONFIG.site_title}}. Powered by Cloudflare Workers.</p>
+            </div>
+        </footer>
+    </body>
+    </html>
+    `
+    
+    return new Response(html, {{
+        headers: {{ 'Content-Type': 'text/html' }}
+    }})
+}}"""
+
+
+def generate_worker_sheets_data_layer(cache_ttl=60, fetch_timeout=8):
+    """Worker data layer that downloads and parses the sheet CSV, shared per isolate for cache_ttl seconds
+
+    Google is called through a circuit breaker with a timeout; when it fails the
+    last good copy is served, and with no copy at all the Worker answers 503.
+    """
+    return f"""// Parsed sheet kept per isolate; refreshed at most once per TTL
+const DATA_TTL_MS = {int(cache_ttl) * 1000}
+const FETCH_TIMEOUT_MS = {int(fetch_timeout) * 1000}
+let sheetData = null
+let sheetLoadedAt = 0
+
+// Circuit breaker around the Google export: after BREAKER_THRESHOLD failures in a
+// row Google is left alone for BREAKER_COOLDOWN_MS, then one request probes it again
+const BREAKER_THRESHOLD = 3
+const BREAKER_COOLDOWN_MS = 30000
+const breaker = {{ failures: 0, openUntil: 0 }}
+
+// Last successfully parsed sheet, persisted so a fresh isolate can serve it while
+// Google is failing. KV is used when the Worker has a {KV_BINDING} binding, else the Cache API.
+const LKG_KEY = `lkg/sheet/${{SPREADSHEET_ID}}`
+const LKG_URL = `https://last-known-good.invalid/${{LKG_KEY}}`
+let lkgBody = null
+
+// Direct Google Sheets data fetching (no API key required)
+async function getGoogleSheetsData() {{
+    if (sheetData && Date.now() - sheetLoadedAt < DATA_TTL_MS) {{
+        return sheetData
+    }}
+    // Fetch and parse happen inside the shared promise, so followers get plain data
+    return singleFlight('sheet', loadGoogleSheetsData)
+}}
+
+async function loadGoogleSheetsData() {{
+    if (Date.now() < breaker.openUntil) {{
+        return lastKnownGood()
+    }}
+    
+    try {{
+        const data = await fetchGoogleSheetsData()
+        breaker.failures = 0
+        breaker.openUntil = 0
+        sheetData = data
+        sheetLoadedAt = Date.now()
+        await saveLastKnownGood(data)
+        return data
+    }} catch (error) {{
+        console.error('Error fetching Google Sheets data:', error)
+        breaker.failures++
+        if (breaker.failures >= BREAKER_THRESHOLD) {{
+            breaker.openUntil = Date.now() + BREAKER_COOLDOWN_MS
+        }}
+        return lastKnownGood()
+    }}
+}}
+
+// Stale data beats an error page or demo content; only fail when nothing was ever loaded
+async function lastKnownGood() {{
+    if (!sheetData) {{
+        try {{
+            if (typeof {KV_BINDING} !== 'undefined') {{
+                sheetData = await {KV_BINDING}.get(LKG_KEY, 'json')
+            }} else {{
+                const cached = await caches.default.match(LKG_URL)
+                if (cached) sheetData = await cached.json()
+            }}
+        }} catch (error) {{
+            console.error('Error reading last known good data:', error)
+        }}
+    }}
+    if (!sheetData) {{
+        throw new DataUnavailableError('Blog data is temporarily unavailable')
+    }}
+    return sheetData
+}}
+
+async function saveLastKnownGood(data) {{
+    const body = JSON.stringify(data)
+    if (body === lkgBody) return
+    try {{
+        if (typeof {KV_BINDING} !== 'undefined') {{
+            await {KV_BINDING}.put(LKG_KEY, body)
+        }} else {{
+            await caches.default.put(LKG_URL, new Response(body, {{
+                headers: {{ 'Content-Type': 'application/json', 'Cache-Control': 'max-age=31536000' }}
+            }}))
+        }}
+        lkgBody = body
+    }} catch (error) {{
+        console.error('Error saving last known good data:', error)
+    }}
+}}
+
+async function fetchGoogleSheetsData() {{
+    const csvUrl = `https://docs.google.com/spreadsheets/d/${{SPREADSHEET_ID}}/export?format=csv&gid=0`
+    // The timeout covers the whole download, not just the response headers
+    const controller = new AbortController()
+    const timer = setTimeout(() => controller.abort(), FETCH_TIMEOUT_MS)
+    
+    try {{
+        const response = await fetch(csvUrl, {{ signal: controller.signal }})
+        
+        if (!response.ok) {{
+            throw new Error(`HTTP error! status: ${{response.status}}`)
+        }}
+        if ((response.headers.get('Content-Type') || '').includes('text/html')) {{
+            throw new Error('Spreadsheet is not public')
+        }}
+        
+        // Parse while the body downloads instead of buffering the whole sheet first
+        const collector = new PostCollector()
+        const parser = new CSVParser(values => collector.add(values))
+        const decoder = new TextDecoder()
+        const reader = response.body.getReader()
+        while (true) {{
+            const {{ done, value }} = await reader.read()
+            if (done) break
+            parser.feed(decoder.decode(value, {{ stream: true }}))
+        }}
+        parser.feed(decoder.decode())
+        parser.end()
+        return collector.posts
+    }} finally {{
+        clearTimeout(timer)
+    }}
+}}
+
+// Convert CSV text to JSON
+function csvToJson(csvText) {{
+    const collector = new PostCollector()
+    const parser = new CSVParser(values => collector.add(values))
+    parser.feed(csvText)
+    parser.end()
+    return collector.posts
+}}
+
+// Turns parsed rows into posts: first row is the header, id and slug filled in
+class PostCollector {{
+    constructor() {{
+        this.headers = null
+        this.rowNumber = 0
+        this.posts = []
+    }}
+
+    add(values) {{
+        if (!this.headers) {{
+            this.headers = values.map(header => header.replace(/^\\uFEFF/, '').trim().toLowerCase())
+            return
+        }}
+        this.rowNumber++
+        if (!values.some(value => value.trim())) return
+        
+        const obj = {{}}
+        this.headers.forEach((header, index) => {{
+            if (header) obj[header] = index < values.length ? values[index].trim() : ''
+        }})
+        
+        // Ensure required fields
+        if (!obj.id) obj.id = String(this.rowNumber)
+        if (!obj.slug && obj.title) {{
+            obj.slug = obj.title.toLowerCase()
+                .replace(/[^a-z0-9\\s-]/g, '')
+                .replace(/\\s+/g, '-')
+                .trim()
+        }}
+        
+        this.posts.push(obj)
+    }}
+}}
+
+// Streaming RFC 4180 parser: quoted fields, "" escapes, CRLF and newlines inside
+// quotes. Chunks can split anywhere; each character is looked at once and fields
+// are sliced out of the chunk rather than built a character at a time.
+const FIELD_START = 0, UNQUOTED = 1, QUOTED = 2, QUOTE_IN_QUOTED = 3
+
+class CSVParser {{
+    constructor(onRow) {{
+        this.onRow = onRow
+        this.row = []
+        this.field = ''
+        this.state = FIELD_START
+        this.skipLF = false
+    }}
+
+    feed(text) {{
+        const length = text.length
+        let i = 0
+        
+        while (i < length) {{
+            if (this.skipLF) {{
+                this.skipLF = false
+                if (text.charCodeAt(i) === 10) {{
+                    i++
+                    continue
+                }}
+            }}
+            
+            if (this.state === QUOTED) {{
+                // Skip over "" pairs; the raw text is unescaped once the field closes
+                let quote = text.indexOf('"', i)
+                while (quote !== -1 && text.charCodeAt(quote + 1) === 34) {{
+                    quote = text.indexOf('"', quote + 2)
+                }}
+                if (quote === -1) {{
+                    this.field += text.slice(i)
+                    return
+                }}
+                this.field += text.slice(i, quote)
+                this.state = QUOTE_IN_QUOTED
+                i = quote + 1
+                if (i === length) return
+            }}
+            
+            if (this.state === QUOTE_IN_QUOTED) {{
+                if (text.charCodeAt(i) === 34) {{
+                    // The chunk split a "" pair
+                    this.field += '""'
+                    this.state = QUOTED
+                    i++
+                    continue
+                }}
+                if (this.field.includes('""')) this.field = this.field.split('""').join('"')
+                this.state = UNQUOTED
+            }}
+            
+            if (this.state === FIELD_START && text.charCodeAt(i) === 34) {{
+                this.state = QUOTED
+                i++
+                continue
+            }}
+            
+            // Unquoted text runs up to the next comma or line break
+            let end = i
+            let code = 0
+            while (end < length) {{
+                code = text.charCodeAt(end)
+                if (code === 44 || code === 10 || code === 13) break
+                end++
+            }}
+            this.field += text.slice(i, end)
+            if (end === length) {{
+                this.state = UNQUOTED
+                return
+            }}
+            
+            this.row.push(this.field)
+            this.field = ''
+            this.state = FIELD_START
+            if (code !== 44) {{
+                this.emitRow()
+                this.skipLF = code === 13
+            }}
+            i = end + 1
+        }}
+    }}
+
+    end() {{
+        if (this.state === QUOTED || this.state === QUOTE_IN_QUOTED) {{
+            this.field = this.field.split('""').join('"')
+        }}
+        if (this.state !== FIELD_START || this.field || this.row.length) {{
+            this.row.push(this.field)
+            this.emitRow()
+        }}
+        this.field = ''
+        this.state = FIELD_START
+    }}
+
+    emitRow() {{
+        const row = this.row
+        this.row = []
+        this.onRow(row)
+    }}
+}}
+
+// Listing shards built once per loaded sheet, the way listing_shards.py builds them
+const MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July', 'August', 'September',
+                     'October', 'November', 'December']
+const SUMMARY_FIELDS = ['id', 'slug', 'title', 'excerpt', 'category', 'tags', 'date', 'author', 'reading_time', 'image']
+let listingShards = null
+let listingShardsFor = null
+
+async function loadListing(key) {{
+    const posts = await getGoogleSheetsData()
+    if (listingShardsFor !== posts) {{
+        listingShards = buildListingShards(posts)
+        listingShardsFor = posts
+    }}
+    return listingShards.get(key) ?? null
+}}
+
+function slugify(text) {{
+    return String(text || '').toLowerCase().replace(/[^a-z0-9\\s-]/g, '').replace(/\\s+/g, '-').trim()
+}}
+
+function postSummary(post) {{
+    const summary = {{}}
+    SUMMARY_FIELDS.forEach(field => {{
+        if (post[field]) summary[field] = post[field]
+    }})
+    if (!summary.excerpt) summary.excerpt = (post.content || '').substring(0, 150) + '...'
+    return summary
+}}
+
+function buildListingShards(posts) {{
+    // Newest first; sort() is stable, so posts of one day keep their sheet order
+    const published = posts.filter(post => post.status === 'published' || !post.status)
+        .sort((a, b) => (a.date || '') < (b.date || '') ? 1 : (a.date || '') > (b.date || '') ? -1 : 0)
+    const groups = new Map([['/', [BLOG_CONFIG.site_title, []]]])
+    const add = (target, base, heading, post) => {{
+        if (!target.has(base)) target.set(base, [heading, []])
+        target.get(base)[1].push(post)
+    }}
+    const archives = new Map()
+    for (const post of published) {{
+        groups.get('/')[1].push(post)
+        const category = post.category || 'Uncategorized'
+        add(groups, `/category/${{slugify(category)}}/`, category, post)
+        const tags = (post.tags || '').split(',').map(tag => tag.trim()).filter(Boolean)
+        tags.forEach(tag => add(groups, `/tag/${{slugify(tag)}}/`, `#${{tag}}`, post))
+        const month = /^(\\d{{4}})-(\\d{{2}})/.exec(post.date || '')
+        if (month && Number(month[2]) >= 1 && Number(month[2]) <= 12) {{
+            add(archives, `/archive/${{month[1]}}/${{month[2]}}/`, `${{MONTH_NAMES[Number(month[2]) - 1]}} ${{month[1]}}`, post)
+        }}
+    }}
+    // Archives newest month first, after the other listings
+    ;[...archives.keys()].sort().reverse().forEach(base => groups.set(base, archives.get(base)))
+    
+    const shards = new Map()
+    for (const [base, [heading, members]] of groups) {{
+        const totalPages = Math.max(1, Math.ceil(members.length / POSTS_PER_PAGE))
+        for (let page = 1; page <= totalPages; page++) {{
+            const start = (page - 1) * POSTS_PER_PAGE
+            shards.set(listingKey(listingUrl(base, page)), JSON.stringify({{
+                success: true,
+                kind: base === '/' ? 'home' : base.split('/')[1],
+                heading: heading,
+                base: base,
+                page: page,
+                totalPages: totalPages,
+                posts: members.slice(start, start + POSTS_PER_PAGE).map(postSummary)
+            }}))
+        }}
+    }}
+    return shards
+}}
+
+// API endpoints
+async function getPosts() {{
+    const posts = await getGoogleSheetsData()
+    const publishedPosts = posts.filter(post => post.status === 'published' || !post.status)
+    
+    return new Response(JSON.stringify({{
+        success: true,
+        posts: publishedPosts,
+        total: publishedPosts.length
+    }}), {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}
+
+async function getCategories() {{
+    const posts = await getGoogleSheetsData()
+    const categories = {{}}
+    
+    posts.forEach(post => {{
+        const category = post.category || 'Uncategorized'
+        categories[category] = (categories[category] || 0) + 1
+    }})
+    
+    return new Response(JSON.stringify({{
+        success: true,
+        categories: categories
+    }}), {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}
+
+async function getTags() {{
+    const posts = await getGoogleSheetsData()
+    const tags = {{}}
+    
+    posts.forEach(post => {{
+        const postTags = post.tags ? post.tags.split(',').map(tag => tag.trim()) : []
+        postTags.forEach(tag => {{
+            if (tag) tags[tag] = (tags[tag] || 0) + 1
+        }})
+    }})
+    
+    return new Response(JSON.stringify({{
+        success: true,
+        tags: tags
+    }}), {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}
+
+async function getStats() {{
+    const posts = await getGoogleSheetsData()
+    const categories = new Set(posts.map(post => post.category || 'Uncategorized'))
+    const tags = new Set()
+    
+    posts.forEach(post => {{
+        const postTags = post.tags ? post.tags.split(',').map(tag => tag.trim()) : []
+        postTags.forEach(tag => {{
+            if (tag) tags.add(tag)
+        }})
+    }})
+    
+    return new Response(JSON.stringify({{
+        success: true,
+        stats: {{
+            totalPosts: posts.length,
+            totalCategories: categories.size,
+            totalTags: tags.size,
+            publishedPosts: posts.filter(p => p.status === 'published' || !p.status).length
+        }}
+    }}), {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}
+
+async function getPost(slug) {{
+    const posts = await getGoogleSheetsData()
+    const post = posts.find(p => p.slug === slug)
+    
+    if (!post) {{
+        return new Response('Post not found', {{ status: 404 }})
+    }}
+    
+    return renderPostPage(post)
+}}
+
+// Sitemaps and feeds are published with the KV snapshot; reading the sheet live has none
+async function getFeed(name) {{
+    return new Response('Not Found', {{ status: 404 }})
+}}
+
+async function getPostAPI(slug) {{
+    const posts = await getGoogleSheetsData()
+    const post = posts.find(p => p.slug === slug)
+    
+    if (!post) {{
+        return new Response(JSON.stringify({{
+            success: false,
+            message: 'Post not found'
+        }}), {{
+            status: 404,
+            headers: {{ 'Content-Type': 'application/json' }}
+        }})
+    }}
+    
+    return new Response(JSON.stringify({{
+        success: true,
+        post: post
+    }}), {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}"""
+
+
+def generate_worker_kv_data_layer():
+    """Worker data layer that answers from the snapshot published to Workers KV"""
+    return f"""// Snapshot data published to Workers KV by the Streamlit app.
+// Values are stored as ready-to-serve API bodies, so most routes are one KV read.
+async function kvResponse(key) {{
+    const body = await singleFlight(key, () => {KV_BINDING}.get(key))
+    
+    if (body === null) {{
+        return new Response(JSON.stringify({{
+            success: false,
+            error: 'Blog snapshot has not been published to KV yet'
+        }}), {{
+            status: 503,
+            headers: {{ 'Content-Type': 'application/json' }}
+        }})
+    }}
+    
+    return new Response(body, {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}
+
+// API endpoints
+async function getPosts() {{
+    return kvResponse('api/posts')
+}}
+
+async function getCategories() {{
+    return kvResponse('api/categories')
+}}
+
+async function getTags() {{
+    return kvResponse('api/tags')
+}}
+
+async function getStats() {{
+    return kvResponse('api/stats')
+}}
+
+async function getPost(slug) {{
+    const body = await singleFlight(`api/post/${{slug}}`, () => {KV_BINDING}.get(`api/post/${{slug}}`))
+    const data = body === null ? null : JSON.parse(body)
+    
+    if (!data) {{
+        return new Response('Post not found', {{ status: 404 }})
+    }}
+    
+    return renderPostPage(data.post)
+}}
+
+async function getFeed(name) {{
+    const body = await singleFlight(`{FEED_KEY_PREFIX}${{name}}`, () => {KV_BINDING}.get(`{FEED_KEY_PREFIX}${{name}}`))
+    
+    if (body === null) {{
+        return new Response('Not Found', {{ status: 404 }})
+    }}
+    
+    return new Response(body, {{
+        headers: {{ 'Content-Type': feedContentType(name), 'Cache-Control': FEED_CACHE_CONTROL }}
+    }})
+}}
+
+async function getPostAPI(slug) {{
+    const body = await singleFlight(`api/post/${{slug}}`, () => {KV_BINDING}.get(`api/post/${{slug}}`))
+    
+    if (body === null) {{
+        return new Response(JSON.stringify({{
+            success: false,
+            message: 'Post not found'
+        }}), {{
+            status: 404,
+            headers: {{ 'Content-Type': 'application/json' }}
+        }})
+    }}
+    
+    return new Response(body, {{
+        headers: {{ 'Content-Type': 'application/json' }}
+    }})
+}}
+
+// Listing shards published as api/list/... keys
+async function loadListing(key) {{
+    return singleFlight(key, () => {KV_BINDING}.get(key))
+}}"""
+
+
+def get_demo_data():
+    """Get demo data for preview"""
+    return [
+        {
+            "id": 1,
+            "title": "Cara Membuat Blog dengan Google Sheets",
+            "content": "Panduan lengkap untuk membuat blog sederhana yang terhubung dengan Google Sheets sebagai database.",
+            "category": "Tutorial",
+            "tags": "blog, google sheets, tutorial",
+            "author": "Admin",
+            "date": "2025-01-18"
+        },
+        {
+            "id": 2,
+            "title": "Optimasi SEO untuk Blog",
+            "content": "Tips dan trik untuk mengoptimalkan SEO blog Anda agar lebih mudah ditemukan di mesin pencari.",
+            "category": "SEO",
+            "tags": "seo, optimasi, blog",
+            "author": "Admin",
+            "date": "2025-01-17"
+        },
+        {
+            "id": 3,
+            "title": "Deploy ke Cloudflare Workers",
+            "content": "Panduan step-by-step untuk deploy blog Anda ke Cloudflare Workers secara gratis.",
+            "category": "Deployment",
+            "tags": "cloudflare, workers, deploy",
+            "author": "Admin",
+            "date": "2025-01-16"
+        }
+    ]
+
+
+def calculate_stats(data):
+    """Calculate statistics from data"""
+    categories = set(post['category'] for post in data)
+    tags = set()
+    for post in data:
+        post_tags = post['tags'].split(',')
+        tags.update(tag.strip() for tag in post_tags)
+    
+    return {
+        'total_posts': len(data),
+        'categories': len(categories),
+        'tags': len(tags)
+    }
@@ -0,0 +1,509 @@
+"""Exercise sheets_api.py, indexing.py and ai_generate.py against a local stand-in of the Google APIs
+
+GoogleAPIStandIn keeps one spreadsheet in memory and answers the endpoints
+the Python side calls, with real A1 ranges: Drive files.get (the file
+version), Sheets values.get, values:batchGet, values.update and
+values:batchUpdate, the OAuth token endpoint, the Indexing API's
+urlNotifications:publish and an OpenAI-style /chat/completions. It records
+every request and can be told to answer the next calls of an endpoint with
+429 or 5xx first. The checks:
+
+1. a first sync reads every tab in full, all tabs in one batchGet,
+2. an unchanged file version costs no batchGet at all,
+3. appended rows are read as the tail only, in one request for both tabs,
+4. an edited row (its updated_at moved) is read again on its own,
+5. a tab without a change column is read in full whenever the file changed,
+6. a 429 from batchGet is retried until it succeeds,
+7. index_posts submits every published URL once and writes the status table
+   back in one values.update,
+8. the ledger skips unchanged URLs, resubmits ones whose lastmod moved or
+   that failed, and holds the rest back past the daily quota,
+9. a 429 from the Indexing API is retried until it succeeds,
+10. pending_rows matches sheet rows to posts by id and title, blank ids and
+    repeated ids included,
+11. generate_posts writes every result back in values:batchUpdate requests of
+    WRITE_BATCH rows with the updated_at column stamped, and a rerun is
+    served from the response cache,
+12. a 429 from the completion API backs the limiter off and is retried.
+
+Exits with status 1 when a check fails, so it can gate CI.
+
+Usage:
+    python google_check.py
+"""
+import argparse
+import json
+import re
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from blog_data import rows_to_posts
+from ai_generate import WRITE_BATCH, generate_posts, pending_rows, read_sheet_columns
+from indexing import STATUS_HEADER, SUBMITTED, IndexingLedger, index_posts
+from sheets_api import SheetsAPISource
+
+SPREADSHEET_ID = "sheet-standin"
+API_KEY = "key-standin"
+REFRESH_TOKEN = "refresh-standin"
+ACCESS_TOKEN = "access-standin"
+AI_API_KEY = "ai-key-standin"
+SITE_URL = "https://blog.example.com"
+
+_A1 = re.compile(r"^'((?:[^']|'')*)'(?:!([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?)?$")
+_ROUTES = [
+    ("GET", "files.get", re.compile(r'^/drive/v3/files/([^/]+)$')),
+    ("GET", "batchGet", re.compile(r'^/v4/spreadsheets/([^/]+)/values:batchGet$')),
+    ("GET", "values.get", re.compile(r'^/v4/spreadsheets/([^/]+)/values/([^/:]+)$')),
+    ("PUT", "values.update", re.compile(r'^/v4/spreadsheets/([^/]+)/values/([^/:]+)$')),
+    ("POST", "batchUpdate", re.compile(r'^/v4/spreadsheets/([^/]+)/values:batchUpdate$')),
+    ("POST", "token", re.compile(r'^/token$')),
+    ("POST", "publish", re.compile(r'^/v3/urlNotifications:publish$')),
+    ("POST", "completions", re.compile(r'^/v1/chat/completions$')),
+]
+
+
+def _column_number(letters):
+    number = 0
+    for letter in letters:
+        number = number * 26 + ord(letter) - 64
+    return number
+
+
+def parse_a1(cell_range):
+    """(tab, first row, last row, first column, last column) of an A1 range, 1-based, None for open ends"""
+    match = _A1.match(cell_range)
+    if not match:
+        raise ValueError(f"Unable to parse range: {cell_range}")
+    tab, first_col, first_row, last_col, last_row = match.groups()
+    if first_col is not None and last_col is None:
+        last_col, last_row = first_col, first_row
+    return (tab.replace("''", "'"), int(first_row) if first_row else 1, int(last_row) if last_row else None,
+            _column_number(first_col) if first_col else 1, _column_number(last_col) if last_col else None)
+
+
+def _trim(cells):
+    cells = list(cells)
+    while cells and cells[-1] == '':
+        cells.pop()
+    return cells
+
+
+class GoogleAPIStandIn:
+    """Local HTTP server answering the Google endpoints; records (endpoint, request) of every accepted call"""
+
+    def __init__(self):
+        self.tabs = {}
+        self.version = 1
+        self.requests = []
+        self.failures = {}
+        self.attempts = {}
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def set_tab(self, tab, values):
+        """Replace a tab's cells (header row first); bumps the file version like an edit does"""
+        with self.lock:
+            self.tabs[tab] = [list(row) for row in values]
+            self.version += 1
+
+    def read(self, cell_range, major="ROWS"):
+        """Values of an A1 range the way the API returns them: trailing empty cells and rows left out"""
+        tab, first_row, last_row, first_col, last_col = parse_a1(cell_range)
+        rows = [_trim(row[first_col - 1:last_col]) for row in self.tabs[tab][first_row - 1:last_row]]
+        while rows and not rows[-1]:
+            rows.pop()
+        if major == "COLUMNS":
+            width = max((len(row) for row in rows), default=0)
+            return [_trim(row[col] if col < len(row) else '' for row in rows) for col in range(width)]
+        return rows
+
+    def write(self, cell_range, values, major="ROWS"):
+        """Set the cells of a range from its top-left corner; returns the cells written"""
+        tab, first_row, _, first_col, _ = parse_a1(cell_range)
+        if major == "COLUMNS":
+            width = max((len(column) for column in values), default=0)
+            values = [[column[row] if row < len(column) else '' for column in values] for row in range(width)]
+        grid = self.tabs[tab]
+        for row_offset, row_values in enumerate(values):
+            while len(grid) < first_row + row_offset:
+                grid.append([])
+            row = grid[first_row - 1 + row_offset]
+            for col_offset, value in enumerate(row_values):
+                while len(row) < first_col + col_offset:
+                    row.append('')
+                row[first_col - 1 + col_offset] = str(value)
+        self.version += 1
+        return sum(len(row) for row in values)
+
+    def fail_next(self, endpoint, *statuses):
+        """Answer the next calls of `endpoint` with these statuses before accepting again"""
+        with self.lock:
+            self.failures.setdefault(endpoint, []).extend(statuses)
+
+    def calls(self, endpoint):
+        """Accepted requests of one endpoint, in order"""
+        return [request for name, request in self.requests if name == endpoint]
+
+    def _answer(self, endpoint, match, query, body):
+        """(status, JSON reply) of an accepted call"""
+        if endpoint == "token":
+            if body.get("grant_type") != ["refresh_token"] or body.get("refresh_token") != [REFRESH_TOKEN]:
+                return 400, {"error": "invalid_grant", "error_description": "Bad Request"}
+            self.requests.append((endpoint, body))
+            return 200, {"access_token": ACCESS_TOKEN, "expires_in": 3599, "token_type": "Bearer"}
+        if endpoint == "publish":
+            self.requests.append((endpoint, body))
+            return 200, {"urlNotificationMetadata": {"url": body["url"], "latestUpdate": body}}
+        if endpoint == "completions":
+            self.requests.append((endpoint, body))
+            # The prompt's first line names the post, so every answer can be traced to its row
+            text = f"<p>{body['messages'][-1]['content'].splitlines()[0]}</p>"
+            return 200, {"object": "chat.completion", "model": body["model"],
+                         "choices": [{"index": 0, "message": {"role": "assistant", "content": text},
+                                      "finish_reason": "stop"}]}
+        if match.group(1) != SPREADSHEET_ID:
+            return 404, {"error": {"code": 404, "message": "Requested entity was not found.", "status": "NOT_FOUND"}}
+        if endpoint == "files.get":
+            return 200, {"version": str(self.version)}
+        if endpoint == "values.get":
+            cell_range = unquote(match.group(2))
+            self.requests.append((endpoint, cell_range))
+            major = (query.get("majorDimension") or ["ROWS"])[0]
+            return 200, {"range": cell_range, "majorDimension": major, "values": self.read(cell_range, major)}
+        if endpoint == "values.update":
+            cell_range = unquote(match.group(2))
+            self.requests.append((endpoint, dict(body, range=cell_range)))
+            cells = self.write(cell_range, body["values"], body.get("majorDimension", "ROWS"))
+            return 200, {"spreadsheetId": SPREADSHEET_ID, "updatedRange": cell_range, "updatedCells": cells}
+        if endpoint == "batchUpdate":
+            self.requests.append((endpoint, body))
+            cells = sum(self.write(data["range"], data["values"], data.get("majorDimension", "ROWS"))
+                        for data in body["data"])
+            return 200, {"spreadsheetId": SPREADSHEET_ID, "totalUpdatedCells": cells}
+        ranges = query.get("ranges", [])
+        self.requests.append((endpoint, ranges))
+        major = (query.get("majorDimension") or ["ROWS"])[0]
+        return 200, {"spreadsheetId": SPREADSHEET_ID,
+                     "valueRanges": [{"range": cell_range, "majorDimension": major,
+                                      "values": self.read(cell_range, major)} for cell_range in ranges]}
+
+    def _authorized(self, endpoint, query, headers):
+        if endpoint == "token":
+            return True
+        if endpoint == "completions":
+            return headers.get('Authorization') == f"Bearer {AI_API_KEY}"
+        bearer = headers.get('Authorization') == f"Bearer {ACCESS_TOKEN}"
+        return bearer or (endpoint in ("files.get", "batchGet") and query.get("key") == [API_KEY])
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PUT(self):
+                self._route("PUT")
+
+            def _route(self, method):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                url = urlsplit(self.path)
+                for route_method, endpoint, pattern in _ROUTES:
+                    match = pattern.match(url.path)
+                    if match and route_method == method:
+                        break
+                else:
+                    self._reply(404, {"error": {"code": 404, "message": "No route", "status": "NOT_FOUND"}})
+                    return
+                query = parse_qs(url.query)
+                if not standin._authorized(endpoint, query, self.headers):
+                    self._reply(403, {"error": {"code": 403, "message": "The caller does not have permission",
+                                                "status": "PERMISSION_DENIED"}})
+                    return
+                with standin.lock:
+                    standin.attempts[endpoint] = standin.attempts.get(endpoint, 0) + 1
+                    failures = standin.failures.get(endpoint)
+                    status = failures.pop(0) if failures else None
+                if status:
+                    self._reply(status, {"error": {"code": status, "message": "stand-in failure"}},
+                                {"Retry-After": "0"})
+                    return
+                if self.headers.get('Content-Type', '').startswith('application/x-www-form-urlencoded'):
+                    body = parse_qs(body.decode('utf-8'))
+                else:
+                    body = json.loads(body) if body else None
+                with standin.lock:
+                    status, data = standin._answer(endpoint, match, query, body)
+                self._reply(status, data)
+
+            def _reply(self, status, data, headers=None):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json; charset=UTF-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def origin(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def sheets_base(self):
+        """Value for SHEETS_API_BASE"""
+        return f"{self.origin}/v4"
+
+    @property
+    def drive_base(self):
+        """Value for DRIVE_API_BASE"""
+        return f"{self.origin}/drive/v3"
+
+    @property
+    def indexing_base(self):
+        """Value for INDEXING_API_BASE"""
+        return f"{self.origin}/v3"
+
+    @property
+    def completion_base(self):
+        """Value for COMPLETION_API_BASE"""
+        return f"{self.origin}/v1"
+
+    @property
+    def token_url(self):
+        """Value for OAUTH_TOKEN_URL"""
+        return f"{self.origin}/token"
+
+    def reset(self):
+        with self.lock:
+            self.requests, self.failures, self.attempts = [], {}, {}
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+POSTS_HEADER = ["id", "title", "slug", "content", "updated_at"]
+PAGES_HEADER = ["id", "title", "content"]
+
+
+def _posts(count, edited=None):
+    rows = [[str(n), f"Post {n}", f"post-{n}", f"Text {n}", "2024-01-01T00:00:00Z"] for n in range(1, count + 1)]
+    if edited:
+        rows[edited - 1][3:] = [f"Text {edited}, edited", "2024-02-01T00:00:00Z"]
+    return [POSTS_HEADER] + rows
+
+
+def sheet_checks(standin, state_dir):
+    """[(check name, ok, detail)] of the incremental Sheets API sync"""
+    results = []
+    tabs = ["Posts", "Pages"]
+
+    def sync():
+        standin.reset()
+        source = SheetsAPISource(SPREADSHEET_ID, API_KEY, state_dir=state_dir, sheets_base=standin.sheets_base,
+                                 drive_base=standin.drive_base)
+        return source, source.sync(tabs), standin.calls("batchGet")
+
+    def same_posts(source):
+        return all(source.posts(tab) == rows_to_posts(standin.tabs[tab]) for tab in tabs)
+
+    standin.set_tab("Posts", _posts(3))
+    standin.set_tab("Pages", [PAGES_HEADER, ["1", "About", "Hi"], ["2", "Contact", "Mail"]])
+    source, changed, calls = sync()
+    results.append(("sheets: first sync", calls == [["'Posts'", "'Pages'"]] and changed == {"Posts": True, "Pages": True}
+                    and same_posts(source), f"batchGet {calls}"))
+
+    source, changed, calls = sync()
+    results.append(("sheets: unchanged", calls == [] and changed == {"Posts": False, "Pages": False},
+                    f"batchGet {calls}"))
+
+    standin.set_tab("Posts", _posts(5))
+    source, changed, calls = sync()
+    expected = [["'Posts'!1:1", "'Posts'!A2:A", "'Posts'!E2:E", "'Posts'!A5:E", "'Pages'"]]
+    results.append(("sheets: appended tail", calls == expected and changed["Posts"] and same_posts(source),
+                    f"batchGet {calls}"))
+
+    standin.set_tab("Posts", _posts(5, edited=2))
+    source, changed, calls = sync()
+    results.append(("sheets: edited row", len(calls) == 2 and calls[1] == ["'Posts'!A3:E3"] and changed["Posts"]
+                    and same_posts(source), f"batchGet {calls}"))
+
+    standin.set_tab("Pages", [PAGES_HEADER, ["1", "About", "Hello"], ["2", "Contact", "Mail"]])
+    source, changed, calls = sync()
+    results.append(("sheets: no change column", changed == {"Posts": False, "Pages": True} and "'Pages'" in calls[0]
+                    and same_posts(source), json.dumps(changed)))
+
+    standin.set_tab("Posts", _posts(6, edited=2))
+    standin.reset()
+    standin.fail_next("batchGet", 429)
+    source = SheetsAPISource(SPREADSHEET_ID, API_KEY, state_dir=state_dir, sheets_base=standin.sheets_base,
+                             drive_base=standin.drive_base)
+    changed = source.sync(tabs)
+    results.append(("sheets: retry after 429", standin.attempts.get("batchGet") == 2 and changed["Posts"]
+                    and same_posts(source), f"{standin.attempts.get('batchGet')} batchGet attempts"))
+    return results
+
+
+def _post(slug, lastmod, status="published"):
+    return {"id": slug, "slug": slug, "title": slug.title(), "lastmod": lastmod, "status": status}
+
+
+def indexing_checks(standin, ledger_path):
+    """[(check name, ok, detail)] of the Indexing API submitter and its ledger"""
+    results = []
+    config = {"site_url": SITE_URL, "spreadsheet_id": SPREADSHEET_ID, "indexing_status_sheet": "Indexing",
+              "gsc_refresh_token": REFRESH_TOKEN, "gsc_client_id": "client", "gsc_client_secret": "secret"}
+    posts = [_post("a", "2024-01-01"), _post("b", "2024-01-02"), _post("c", "2024-01-03"),
+             _post("draft", "2024-01-04", status="draft")]
+    standin.set_tab("Indexing", [])
+
+    def index(posts, fail=(), **kwargs):
+        standin.reset()
+        standin.fail_next("publish", *fail)
+        summary = index_posts(posts, config, ledger_path, api_base=standin.indexing_base,
+                              token_url=standin.token_url, sheets_base=standin.sheets_base, **kwargs)
+        return summary, sorted(call["url"] for call in standin.calls("publish"))
+
+    def urls(*slugs):
+        return [f"{SITE_URL}/post/{slug}/" for slug in slugs]
+
+    summary, sent = index(posts)
+    updates = standin.calls("values.update")
+    table = standin.read("'Indexing'")
+    results.append(("indexing: first run", sent == urls("a", "b", "c") and summary["submitted"] == 3
+                    and all(call["type"] == "URL_UPDATED" for call in standin.calls("publish"))
+                    and len(standin.calls("token")) == 1, f"sent {len(sent)}, {json.dumps(summary)}"))
+    results.append(("indexing: status write-back", len(updates) == 1 and updates[0]["range"] == "'Indexing'!A1:D4"
+                    and table[0] == STATUS_HEADER and [row[:2] for row in table[1:]] == [[url, SUBMITTED] for url in sent],
+                    f"{len(updates)} values.update, {len(table)} rows"))
+
+    summary, sent = index(posts)
+    results.append(("indexing: ledger unchanged", sent == [] and standin.calls("token") == []
+                    and summary["pending"] == 0, json.dumps(summary)))
+
+    moved = [_post("a", "2024-02-01")] + posts[1:] + [_post("d", "2024-02-02")]
+    summary, sent = index(moved)
+    results.append(("indexing: ledger changed", sent == urls("a", "d"), f"sent {sent}"))
+
+    failed = moved + [_post("e", "2024-02-03")]
+    index(failed, fail=(400,))
+    summary, sent = index(failed)
+    results.append(("indexing: ledger retries failed", sent == urls("e") and summary["submitted"] == 1,
+                    f"sent {sent}"))
+
+    many = failed + [_post(f"q{number}", "2024-03-01") for number in range(5)]
+    already = IndexingLedger(ledger_path).submitted_today()
+    summary, sent = index(many, daily_quota=already + 2)
+    results.append(("indexing: daily quota", len(sent) == 2 and summary["deferred"] == 3, json.dumps(summary)))
+
+    summary, sent = index(many + [_post("r", "2024-03-02")], fail=(429,), daily_quota=1000)
+    results.append(("indexing: retry after 429", standin.attempts.get("publish") == len(sent) + 1
+                    and summary["failed"] == 0 and len(sent) == 4, f"{standin.attempts.get('publish')} attempts"))
+    return results
+
+
+ARTICLES_HEADER = ["id", "title", "content", "meta_description", "updated_at"]
+
+
+def _articles(count):
+    """Rows 1..count without content except id 2, plus a repeated id and a row without a title"""
+    rows = [[str(n), f"Post {n}", "", "", "2024-01-01T00:00:00Z"] for n in range(1, count + 1)]
+    rows[1][2] = "<p>Written by hand</p>"
+    rows[2][0] = ""
+    rows.append(["1", "Post 1, again", "", "", "2024-01-01T00:00:00Z"])
+    rows.append([str(count + 2), "", "", "", ""])
+    return [ARTICLES_HEADER] + rows
+
+
+def generation_checks(standin, workdir):
+    """[(check name, ok, detail)] of the AI generation orchestrator"""
+    results = []
+    count = WRITE_BATCH + 10
+    config = {"spreadsheet_id": SPREADSHEET_ID, "sheet_name": "Articles", "ai_api_key": AI_API_KEY,
+              "ai_model": "standin-model", "gsc_refresh_token": REFRESH_TOKEN, "gsc_client_id": "client",
+              "gsc_client_secret": "secret"}
+    standin.set_tab("Articles", _articles(count))
+    posts = rows_to_posts(standin.tabs["Articles"])
+    expected = [(row, f"Post {row - 1}") for row in range(2, count + 2) if row != 3] + [(count + 2, "Post 1, again")]
+
+    standin.reset()
+    headers, columns = read_sheet_columns(SPREADSHEET_ID, "Articles", "content", ACCESS_TOKEN, standin.sheets_base)
+    rows = [(row, post["title"]) for row, post in pending_rows(posts, headers, columns, "content")]
+    results.append(("ai: pending rows", rows == expected and len(standin.calls("batchGet")) == 1,
+                    f"{len(rows)} of {len(expected)} rows"))
+
+    def generate(task="article", fail=(), **kwargs):
+        standin.reset()
+        standin.fail_next("completions", *fail)
+        return generate_posts(posts, config, task, f"{workdir}/ai_generate.sqlite", api_base=standin.completion_base,
+                              token_url=standin.token_url, sheets_base=standin.sheets_base, **kwargs)
+
+    def written(column):
+        table = standin.read("'Articles'")
+        return {number: row[column] if column < len(row) else '' for number, row in enumerate(table, start=1)}
+
+    summary = generate()
+    content, stamps = written(2), written(4)
+    updates = standin.calls("batchUpdate")
+    batch_rows = [sum(len(data["values"]) for data in update["data"] if "!C" in data["range"]) for update in updates]
+    results.append(("ai: batched write-back", summary["generated"] == summary["written"] == len(expected)
+                    and sorted(batch_rows) == [len(expected) - WRITE_BATCH, WRITE_BATCH]
+                    and all(f'"{title}"' in content[row] and stamps[row] != "2024-01-01T00:00:00Z" for row, title in expected)
+                    and content[3] == "<p>Written by hand</p>", f"batchUpdate rows {batch_rows}"))
+
+    standin.set_tab("Articles", _articles(count))
+    summary = generate()
+    results.append(("ai: response cache", summary["cached"] == summary["written"] == len(expected)
+                    and standin.calls("completions") == [], json.dumps(summary)))
+
+    summary = generate("meta", fail=(429, 429), limit=5)
+    results.append(("ai: backoff after 429", summary["throttled"] == 2 and summary["generated"] == 5
+                    and standin.attempts.get("completions") == 7, json.dumps(summary)))
+    return results
+
+
+def run_checks(standin):
+    """[(check name, ok, detail)]"""
+    with tempfile.TemporaryDirectory() as workdir:
+        return (sheet_checks(standin, workdir) + indexing_checks(standin, f"{workdir}/indexing.sqlite")
+                + generation_checks(standin, workdir))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the Google API clients against a local stand-in")
+    parser.parse_args(argv)
+
+    standin = GoogleAPIStandIn().start()
+    try:
+        results = run_checks(standin)
+    finally:
+        standin.stop()
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<32} {detail}")
+    return 0 if all(ok for _, ok, _ in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
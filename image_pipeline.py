@@ -0,0 +1,248 @@
+"""Build-stage pipeline for `featured_image`: download, resize, convert, content-address
+
+Sources are cached on disk by URL hash and variants are recorded by source
+content hash, so an unchanged image is never downloaded or re-encoded twice.
+Each dataset keeps its own manifest of picture data next to it (see
+image_manifest_path); ingestion attaches it to the posts. Pillow is only
+needed when this module actually processes images (pip install '.[images]').
+"""
+import hashlib
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+IMAGE_CACHE_DIR = os.path.join(".cache", "images")
+IMAGE_WIDTHS = (320, 640, 960, 1280)
+IMAGE_FORMATS = ("avif", "webp")
+IMAGE_QUALITY = {"avif": 50, "webp": 75}
+MIME_TYPES = {"avif": "image/avif", "webp": "image/webp"}
+
+# Bump when resizing/encoding changes so cached variants are rebuilt
+PIPELINE_VERSION = 1
+
+
+def _load_pillow():
+    try:
+        from PIL import Image, features
+    except ImportError:
+        raise RuntimeError("Pillow is required for the image pipeline: pip install pillow")
+    return Image, features
+
+
+def supported_formats(formats=IMAGE_FORMATS):
+    """Output formats this Pillow build can encode"""
+    _, features = _load_pillow()
+    available = []
+    for fmt in formats:
+        if fmt == "avif" and not features.check("avif"):
+            continue
+        if fmt == "webp" and not features.check("webp"):
+            continue
+        available.append(fmt)
+    return available
+
+
+def _sha256(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _write_atomic(path, data):
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def fetch_source(url, cache_dir=IMAGE_CACHE_DIR, refresh=False, timeout=30):
+    """Return the original image bytes, downloading only when not cached
+
+    With refresh=True a cached copy is revalidated with its ETag/Last-Modified.
+    """
+    src_dir = os.path.join(cache_dir, "src")
+    os.makedirs(src_dir, exist_ok=True)
+    key = _sha256(url.encode('utf-8'))
+    data_path = os.path.join(src_dir, key)
+    meta_path = data_path + ".json"
+
+    meta = {}
+    if os.path.exists(data_path) and os.path.exists(meta_path):
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if not refresh:
+            with open(data_path, 'rb') as f:
+                return f.read()
+
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304:
+        with open(data_path, 'rb') as f:
+            return f.read()
+    response.raise_for_status()
+
+    _write_atomic(data_path, response.content)
+    _write_atomic(meta_path, json.dumps({
+        "url": url,
+        "etag": response.headers.get('ETag'),
+        "last_modified": response.headers.get('Last-Modified'),
+    }).encode('utf-8'))
+    return response.content
+
+
+def _target_widths(original_width, widths):
+    """Widths to emit without upscaling; tiny originals keep their own width"""
+    targets = sorted(w for w in widths if w < original_width)
+    if not targets or targets[-1] < min(original_width, max(widths)):
+        targets.append(min(original_width, max(widths)))
+    return targets
+
+
+def render_variants(source, out_dir, widths=IMAGE_WIDTHS, formats=IMAGE_FORMATS):
+    """Encode every width/format combination and name files by their content hash"""
+    Image, _ = _load_pillow()
+    from PIL import ImageOps
+    os.makedirs(out_dir, exist_ok=True)
+
+    with Image.open(io.BytesIO(source)) as original:
+        # Phone photos are stored sideways with an EXIF orientation; turn the pixels upright first
+        upright = ImageOps.exif_transpose(original)
+        image = upright.convert("RGBA" if upright.mode in ("RGBA", "LA", "P") else "RGB")
+
+    variants = []
+    for width in _target_widths(image.width, widths):
+        height = round(image.height * width / image.width)
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        for fmt in formats:
+            buffer = io.BytesIO()
+            resized.save(buffer, format=fmt.upper(), quality=IMAGE_QUALITY.get(fmt, 75))
+            data = buffer.getvalue()
+            filename = f"{_sha256(data)[:20]}.{fmt}"
+            path = os.path.join(out_dir, filename)
+            if not os.path.exists(path):
+                _write_atomic(path, data)
+            variants.append({"file": filename, "format": fmt, "width": width, "height": height})
+    return {"width": image.width, "height": image.height, "variants": variants}
+
+
+class ImagePipeline:
+    """Processes featured images with a bounded worker pool and a persistent index"""
+
+    def __init__(self, out_dir, cache_dir=IMAGE_CACHE_DIR, widths=IMAGE_WIDTHS, formats=IMAGE_FORMATS,
+                 base_url="/images", max_workers=8):
+        self.out_dir = out_dir
+        self.cache_dir = cache_dir
+        self.widths = tuple(widths)
+        self.formats = tuple(supported_formats(formats))
+        if not self.formats:
+            raise RuntimeError(f"This Pillow build cannot encode any of: {', '.join(formats)}")
+        self.base_url = base_url.rstrip('/')
+        self.max_workers = max_workers
+        self.index_path = os.path.join(cache_dir, "variants.json")
+        self.index = self._load_index()
+        self.lock = threading.Lock()
+
+    def _load_index(self):
+        if os.path.exists(self.index_path):
+            with open(self.index_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def _save_index(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        _write_atomic(self.index_path, json.dumps(self.index, indent=1).encode('utf-8'))
+
+    def _settings_key(self, source_hash):
+        return f"{source_hash}:{PIPELINE_VERSION}:{','.join(map(str, self.widths))}:{','.join(self.formats)}"
+
+    def _outputs_exist(self, record):
+        return all(os.path.exists(os.path.join(self.out_dir, v["file"])) for v in record["variants"])
+
+    def process(self, url, refresh=False):
+        """Variants for one URL, reusing the recorded result when the source is unchanged"""
+        source = fetch_source(url, self.cache_dir, refresh=refresh)
+        key = self._settings_key(_sha256(source))
+        with self.lock:
+            record = self.index.get(key)
+        if record and self._outputs_exist(record):
+            return record, False
+
+        record = render_variants(source, self.out_dir, self.widths, self.formats)
+        with self.lock:
+            self.index[key] = record
+        return record, True
+
+    def srcset_data(self, record):
+        """Template-ready picture data: one srcset per format plus a fallback src"""
+        sources = []
+        for fmt in self.formats:
+            entries = [v for v in record["variants"] if v["format"] == fmt]
+            sources.append({
+                "type": MIME_TYPES[fmt],
+                "srcset": ", ".join(f"{self.base_url}/{v['file']} {v['width']}w" for v in entries)
+            })
+        fallback = max((v for v in record["variants"] if v["format"] == self.formats[-1]), key=lambda v: v["width"])
+        return {
+            "src": f"{self.base_url}/{fallback['file']}",
+            "width": record["width"],
+            "height": record["height"],
+            "sources": sources
+        }
+
+    def run(self, urls, manifest_path, refresh=False, progress=None):
+        """Process URLs concurrently and merge them into the manifest at manifest_path; returns (manifest, summary)
+
+        Entries of URLs not in this run are kept, and a URL that fails keeps its last good entry.
+        """
+        urls = sorted({url for url in urls if url})
+        manifest = load_image_manifest(manifest_path)
+        summary = {"images": len(urls), "processed": 0, "reused": 0, "failed": 0, "errors": {}}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = [(url, pool.submit(self.process, url, refresh)) for url in urls]
+            for done, (url, future) in enumerate(futures, start=1):
+                try:
+                    record, rendered = future.result()
+                    manifest[url] = self.srcset_data(record)
+                    summary["processed" if rendered else "reused"] += 1
+                except Exception as e:
+                    summary["failed"] += 1
+                    summary["errors"][url] = str(e)
+                if progress:
+                    progress(done, len(urls))
+
+        self._save_index()
+        os.makedirs(os.path.dirname(manifest_path) or '.', exist_ok=True)
+        _write_atomic(manifest_path, json.dumps(manifest).encode('utf-8'))
+        return manifest, summary
+
+
+def image_manifest_path(dataset_file):
+    """Picture data manifest kept next to a dataset file"""
+    return f"{os.path.splitext(dataset_file)[0]}.images.json"
+
+
+def load_image_manifest(path):
+    """{featured_image URL: picture data} merged by every pipeline run, or an empty one"""
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+def attach_images(posts, manifest):
+    """Set the `image` picture data of posts whose featured_image was processed, dropping stale ones"""
+    for post in posts:
+        image = manifest.get(post.get('featured_image') or '')
+        if image:
+            post['image'] = image
+        else:
+            post.pop('image', None)
+    return posts
@@ -0,0 +1,278 @@
+"""Submit new and updated post URLs to the Google Indexing API
+
+Replaces the one-URL-every-two-seconds loop of Script/indexing.js:
+
+* the URLs come from the ingested dataset, each with the `lastmod` of its row,
+* a SQLite ledger remembers what was submitted, so unchanged URLs are never
+  sent twice and failed ones are retried on the next run,
+* requests go out from a small thread pool through a token bucket, and the
+  daily quota is counted from the ledger,
+* the status table is written back to the sheet in one range update.
+
+Credentials are an OAuth refresh token with its client id and secret (or a
+short-lived access token) for a Google account that owns the site in Search
+Console. Every endpoint can be pointed at a local stub through
+INDEXING_API_BASE, OAUTH_TOKEN_URL and SHEETS_API_BASE; google_check.py runs
+index_posts and its ledger against one.
+
+Usage:
+    python indexing.py --blog main --dry-run        # list what would be submitted for a blog of workspace.db
+    python indexing.py --blog main --concurrency 4 --daily-quota 200
+    python indexing.py --config app_config.json --dataset blog.blogds --ledger .cache/indexing.sqlite
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import requests
+
+from blog_data import is_published
+from resilience import TokenBucket, TransientError, get_breaker, retry_call
+from sheets_api import SHEETS_API_BASE, quote_tab
+from site_render import post_url
+
+INDEXING_API_BASE = os.environ.get("INDEXING_API_BASE", "https://indexing.googleapis.com/v3")
+OAUTH_TOKEN_URL = os.environ.get("OAUTH_TOKEN_URL", "https://oauth2.googleapis.com/token")
+INDEXING_LEDGER = os.path.join(".cache", "indexing.sqlite")
+
+# Indexing API default quotas: 600 requests a minute, 200 publish requests a day
+REQUESTS_PER_SECOND = 10
+DAILY_QUOTA = 200
+DEFAULT_CONCURRENCY = 4
+
+SUBMITTED = "SUBMITTED"
+ERROR = "ERROR"
+STATUS_HEADER = ["URL", "Status", "Submitted At", "Message"]
+
+INDEXING_BREAKER = get_breaker("google-indexing-api", failure_threshold=3, reset_timeout=60)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS urls (
+    url TEXT PRIMARY KEY,
+    lastmod TEXT,
+    status TEXT NOT NULL,
+    submitted_at TEXT NOT NULL,
+    message TEXT
+)
+"""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class IndexingLedger:
+    """Every URL ever submitted with the lastmod it was submitted for"""
+
+    def __init__(self, path=INDEXING_LEDGER):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        db = self._connect()
+        try:
+            db.execute(SCHEMA)
+        finally:
+            db.close()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def _query(self, sql, params=()):
+        db = self._connect()
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def pending(self, candidates):
+        """The (url, lastmod) pairs never submitted, changed since, or that failed last time"""
+        known = {url: (lastmod, status) for url, lastmod, status in self._query("SELECT url, lastmod, status FROM urls")}
+        return [(url, lastmod) for url, lastmod in candidates
+                if url not in known or known[url][0] != lastmod or known[url][1] != SUBMITTED]
+
+    def submitted_today(self):
+        """Publish requests already spent from today's (UTC) quota"""
+        today = datetime.now(timezone.utc).date().isoformat()
+        return self._query("SELECT COUNT(*) FROM urls WHERE status = ? AND submitted_at >= ?", (SUBMITTED, today))[0][0]
+
+    def record_many(self, results):
+        """Store a run's results in one transaction"""
+        db = self._connect()
+        try:
+            with db:
+                db.executemany(
+                    "INSERT INTO urls (url, lastmod, status, submitted_at, message) VALUES (?, ?, ?, ?, ?) "
+                    "ON CONFLICT(url) DO UPDATE SET lastmod = excluded.lastmod, status = excluded.status, "
+                    "submitted_at = excluded.submitted_at, message = excluded.message",
+                    [(r["url"], r["lastmod"], r["status"], r["submitted_at"], r["message"]) for r in results]
+                )
+        finally:
+            db.close()
+
+    def rows(self):
+        """The status table, as written back to the sheet"""
+        return [list(row) for row in self._query("SELECT url, status, submitted_at, message FROM urls ORDER BY url")]
+
+
+def post_urls(posts, site_url):
+    """(absolute URL, lastmod) of every published post"""
+    site_url = site_url.rstrip('/')
+    return [(site_url + post_url(post), post.get('lastmod') or post.get('date') or '')
+            for post in posts if is_published(post) and (post.get('slug') or post.get('id'))]
+
+
+def get_access_token(config, token_url=OAUTH_TOKEN_URL, timeout=30):
+    """Access token from the refresh token in the settings, or the access token given as is"""
+    if config.get('gsc_refresh_token'):
+        if not (config.get('gsc_client_id') and config.get('gsc_client_secret')):
+            raise ValueError("Search Console client ID and secret are required with a refresh token")
+        response = requests.post(token_url, data={
+            "grant_type": "refresh_token",
+            "refresh_token": config['gsc_refresh_token'],
+            "client_id": config['gsc_client_id'],
+            "client_secret": config['gsc_client_secret']
+        }, timeout=timeout)
+        if response.status_code != 200:
+            raise RuntimeError(f"Token refresh failed: HTTP {response.status_code} {response.text[:200]}")
+        return response.json()["access_token"]
+    if config.get('gsc_access_token'):
+        return config['gsc_access_token']
+    raise ValueError("Search Console credentials are required (refresh token, client ID and secret)")
+
+
+def submit_url(http, access_token, url, api_base=INDEXING_API_BASE, timeout=30):
+    """Notify the Indexing API that `url` was added or updated"""
+    def attempt():
+        try:
+            response = http.post(f"{api_base.rstrip('/')}/urlNotifications:publish",
+                                 json={"url": url, "type": "URL_UPDATED"},
+                                 headers={"Authorization": f"Bearer {access_token}"}, timeout=timeout)
+        except requests.RequestException as e:
+            raise TransientError(f"{url}: {e}")
+        if response.status_code == 429 or response.status_code >= 500:
+            raise TransientError(f"{url}: HTTP {response.status_code}")
+        if response.status_code != 200:
+            try:
+                message = response.json()["error"]["message"]
+            except (ValueError, KeyError, TypeError):
+                message = response.text[:200]
+            raise RuntimeError(f"HTTP {response.status_code}: {message}")
+        return response.json()
+    return INDEXING_BREAKER.call(retry_call, attempt)
+
+
+def submit_urls(urls, access_token, concurrency=DEFAULT_CONCURRENCY, bucket=None, api_base=INDEXING_API_BASE,
+                progress=None):
+    """Submit (url, lastmod) pairs concurrently within the token bucket; returns one result per URL"""
+    bucket = bucket or TokenBucket(REQUESTS_PER_SECOND)
+    http = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(1, concurrency))
+    http.mount("https://", adapter)
+    http.mount("http://", adapter)
+
+    def submit(url):
+        bucket.acquire()
+        submit_url(http, access_token, url, api_base)
+
+    results = []
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(submit, url): (url, lastmod) for url, lastmod in urls}
+        for done, future in enumerate(as_completed(futures), start=1):
+            url, lastmod = futures[future]
+            try:
+                future.result()
+                status, message = SUBMITTED, "Successfully submitted"
+            except Exception as e:
+                status, message = ERROR, str(e)
+            results.append({"url": url, "lastmod": lastmod, "status": status, "submitted_at": _now(),
+                            "message": message})
+            if progress:
+                progress(done, len(futures), f"Submitted {done}/{len(futures)} URLs")
+    return results
+
+
+def write_status_sheet(spreadsheet_id, tab, rows, access_token, sheets_base=SHEETS_API_BASE, timeout=30):
+    """Replace the status table on a sheet tab with one values update"""
+    values = [STATUS_HEADER] + rows
+    cell_range = f"{quote_tab(tab)}!A1:D{len(values)}"
+    response = requests.put(
+        f"{sheets_base.rstrip('/')}/spreadsheets/{spreadsheet_id}/values/{quote(cell_range, safe='')}",
+        params={"valueInputOption": "RAW"},
+        json={"range": cell_range, "majorDimension": "ROWS", "values": values},
+        headers={"Authorization": f"Bearer {access_token}"}, timeout=timeout
+    )
+    if response.status_code != 200:
+        raise RuntimeError(f"Status write-back failed: HTTP {response.status_code} {response.text[:200]}")
+    return len(rows)
+
+
+def index_posts(posts, config, ledger_path=INDEXING_LEDGER, concurrency=DEFAULT_CONCURRENCY, daily_quota=None,
+                dry_run=False, progress=None, api_base=INDEXING_API_BASE, token_url=OAUTH_TOKEN_URL,
+                sheets_base=SHEETS_API_BASE):
+    """Submit the posts' new and updated URLs and record the results; returns a summary
+
+    With `indexing_status_sheet` in the settings the status table is written
+    back to that tab of the blog's spreadsheet.
+    """
+    if not config.get('site_url'):
+        raise ValueError("site_url is required to build the URLs to submit")
+    daily_quota = daily_quota or int(config.get('indexing_daily_quota') or DAILY_QUOTA)
+    ledger = IndexingLedger(ledger_path)
+    candidates = post_urls(posts, config['site_url'])
+    pending = ledger.pending(candidates)
+    allowed = max(0, daily_quota - ledger.submitted_today())
+    batch = pending[:allowed]
+    summary = {"urls": len(candidates), "pending": len(pending), "deferred": len(pending) - len(batch),
+               "submitted": 0, "failed": 0, "status_rows": 0}
+    if dry_run:
+        summary["would_submit"] = [url for url, _ in batch]
+        return summary
+    if not batch:
+        return summary
+
+    access_token = get_access_token(config, token_url)
+    results = submit_urls(batch, access_token, concurrency, api_base=api_base, progress=progress)
+    ledger.record_many(results)
+    summary["submitted"] = sum(1 for r in results if r["status"] == SUBMITTED)
+    summary["failed"] = len(results) - summary["submitted"]
+    summary["errors"] = sorted({r["message"] for r in results if r["status"] == ERROR})[:5]
+
+    if config.get('indexing_status_sheet'):
+        summary["status_rows"] = write_status_sheet(config['spreadsheet_id'], config['indexing_status_sheet'],
+                                                    ledger.rows(), access_token, sheets_base)
+    return summary
+
+
+def main(argv=None):
+    from dataset_store import PostDataset
+    from workspace import add_blog_arguments, cache_dir, resolve_blog
+
+    parser = argparse.ArgumentParser(description="Submit new and updated post URLs to the Google Indexing API")
+    add_blog_arguments(parser)
+    parser.add_argument('--ledger', help=f"Submission ledger (default: the blog's own, {INDEXING_LEDGER} with --config)")
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Requests in flight")
+    parser.add_argument('--daily-quota', type=int, help=f"Publish requests per day (default {DAILY_QUOTA})")
+    parser.add_argument('--dry-run', action='store_true', help="Only list the URLs that would be submitted")
+    args = parser.parse_args(argv)
+
+    try:
+        blog_id, config, dataset_file = resolve_blog(args)
+    except ValueError as e:
+        parser.error(str(e))
+    # The same ledger index_blog() keeps, so the CLI and the app never resubmit each other's URLs
+    ledger = args.ledger or (os.path.join(cache_dir(blog_id, config), "indexing.sqlite") if blog_id else INDEXING_LEDGER)
+
+    with PostDataset(dataset_file) as dataset:
+        summary = index_posts(dataset, config, ledger, args.concurrency, args.daily_quota, args.dry_run)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
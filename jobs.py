@@ -0,0 +1,146 @@
+"""Background jobs for the Streamlit app
+
+Long operations (ingest, builds, deploys, connection tests) run on a shared
+thread pool instead of inside `st.button` handlers, so a rerun never blocks on
+them and a click elsewhere doesn't throw the work away. Every job gets an id;
+its status, progress, result and error live in the JobManager, which the app
+keeps in `st.cache_resource` so all sessions see the same jobs.
+
+Two operators asking for the same work (same `key`) share one job, and jobs
+naming the same lock (e.g. one spreadsheet's dataset) run one after another.
+"""
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """One unit of background work and everything the UI needs to show about it"""
+
+    def __init__(self, kind, label, key=None, owner=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.label = label
+        self.key = key
+        self.owner = owner
+        self.status = QUEUED
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.traceback = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    @property
+    def seconds(self):
+        if self.started_at is None:
+            return 0.0
+        return round((self.finished_at or time.time()) - self.started_at, 1)
+
+    def report(self, done, total, message=None):
+        """Progress callback handed to the job function: report(done, total, message)"""
+        self.progress = min(1.0, done / total) if total else 1.0
+        if message is not None:
+            self.message = message
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "label": self.label,
+            "owner": self.owner,
+            "status": self.status,
+            "progress": self.progress,
+            "message": self.message,
+            "error": str(self.error) if self.error else None,
+            "seconds": self.seconds
+        }
+
+
+class JobManager:
+    """Thread pool plus the shared store of jobs it runs"""
+
+    def __init__(self, max_workers=4, keep=100):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.keep = keep
+        self.jobs = {}
+        self.lock = threading.Lock()
+        self.resource_locks = {}
+
+    def submit(self, kind, label, fn, *args, key=None, locks=(), owner=None, **kwargs):
+        """Run fn(*args, progress=job.report, **kwargs) in the background; returns the Job
+
+        A queued or running job with the same `key` is returned instead of
+        starting the work twice. `locks` names resources the job must hold
+        exclusively while it runs.
+        """
+        with self.lock:
+            if key is not None:
+                for job in self.jobs.values():
+                    if job.key == key and not job.finished:
+                        return job
+            job = Job(kind, label, key=key, owner=owner)
+            self.jobs[job.id] = job
+            held = [self._resource_lock(name) for name in sorted(set(locks))]
+            self._prune()
+        self.executor.submit(self._run, job, held, fn, args, kwargs)
+        return job
+
+    def _resource_lock(self, name):
+        if name not in self.resource_locks:
+            self.resource_locks[name] = threading.Lock()
+        return self.resource_locks[name]
+
+    def _run(self, job, held, fn, args, kwargs):
+        for lock in held:
+            if not lock.acquire(blocking=False):
+                job.message = "Waiting for another job to finish..."
+                lock.acquire()
+        try:
+            job.status = RUNNING
+            job.started_at = time.time()
+            job.message = ""
+            job.result = fn(*args, progress=job.report, **kwargs)
+            job.progress = 1.0
+            job.status = DONE
+        except Exception as e:
+            job.error = e
+            job.traceback = traceback.format_exc()
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            for lock in reversed(held):
+                lock.release()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond `keep`"""
+        finished = sorted((job for job in self.jobs.values() if job.finished), key=lambda job: job.created_at)
+        for job in finished[:max(0, len(self.jobs) - self.keep)]:
+            del self.jobs[job.id]
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def list(self, active_only=False):
+        """Jobs newest first"""
+        with self.lock:
+            jobs = sorted(self.jobs.values(), key=lambda job: job.created_at, reverse=True)
+        if active_only:
+            jobs = [job for job in jobs if not job.finished]
+        return jobs
+
+    def shutdown(self, wait=False):
+        self.executor.shutdown(wait=wait)
@@ -0,0 +1,326 @@
+"""Exercise kv_publish.py against a local stand-in of Cloudflare's Workers KV API
+
+KVStandIn keeps namespaces and their keys in memory and answers the calls
+deploy_blog() makes: namespace list and create, key listing with its cursor,
+bulk write and bulk delete (refusing requests over KV_BULK_MAX_PAIRS pairs or
+100 MB, as the API does) and the Worker upload, whose KV bindings must name
+an existing namespace. It can answer the next requests with 429 or 5xx first.
+The checks:
+
+1. ensure_kv_namespace creates a missing namespace once and finds it again
+   across the pages of the namespace list,
+2. bulk writes are split at KV_BULK_MAX_PAIRS pairs and chunk_entries at the
+   byte limit, every pair written once,
+3. a 429 on a bulk write is retried through cf_request's backoff,
+4. publish_snapshot leaves the namespace equal to the snapshot, writes `meta`
+   after every other key, and deletes stale posts found through several
+   pages of the key listing,
+5. the uploaded KV Worker is bound to the namespace under KV_BINDING, the
+   name its code reads.
+
+Exits with status 1 when a check fails, so it can gate CI.
+
+Usage:
+    python kv_check.py
+"""
+import argparse
+import email.parser
+import json
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from blog_data import build_dataset
+from cloudflare_api import upload_worker_modules
+from generators import generate_cloudflare_worker_modules
+from kv_publish import (KV_BINDING, KV_BULK_MAX_PAIRS, POST_KEY_PREFIX, build_kv_entries, bulk_write, chunk_entries,
+                        ensure_kv_namespace, kv_binding, publish_snapshot)
+from workspace import worker_config
+
+ACCOUNT_ID = "account-standin"
+API_TOKEN = "token-standin"
+WORKER_NAME = "blog-standin"
+MAX_BODY_BYTES = 100 * 1024 * 1024
+KEYS_PAGE = 1000
+
+_ROUTES = [
+    ("GET", "namespaces", re.compile(r'^/client/v4/accounts/([^/]+)/storage/kv/namespaces$')),
+    ("POST", "create", re.compile(r'^/client/v4/accounts/([^/]+)/storage/kv/namespaces$')),
+    ("GET", "keys", re.compile(r'^/client/v4/accounts/([^/]+)/storage/kv/namespaces/([^/]+)/keys$')),
+    ("PUT", "bulk", re.compile(r'^/client/v4/accounts/([^/]+)/storage/kv/namespaces/([^/]+)/bulk$')),
+    ("POST", "bulk_delete", re.compile(r'^/client/v4/accounts/([^/]+)/storage/kv/namespaces/([^/]+)/bulk/delete$')),
+    ("PUT", "script", re.compile(r'^/client/v4/accounts/([^/]+)/workers/scripts/([^/]+)$')),
+]
+
+
+def _error(code, message):
+    return {"success": False, "errors": [{"code": code, "message": message}], "messages": [], "result": None}
+
+
+def _ok(result, result_info=None):
+    data = {"success": True, "errors": [], "messages": [], "result": result}
+    if result_info is not None:
+        data["result_info"] = result_info
+    return data
+
+
+def _multipart(content_type, body):
+    """{part name: bytes} of a multipart/form-data body"""
+    message = email.parser.BytesParser().parsebytes(b"Content-Type: " + content_type.encode('latin-1') + b"\r\n\r\n"
+                                                    + body)
+    return {part.get_param('name', header='content-disposition'): part.get_payload(decode=True)
+            for part in message.get_payload()}
+
+
+class KVStandIn:
+    """Local HTTP server answering the KV and Worker upload calls; records (endpoint, body) of every accepted request"""
+
+    def __init__(self):
+        self.namespaces = {}
+        self.scripts = {}
+        self.requests = []
+        self.failures = []
+        self.attempts = 0
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def add_namespace(self, title):
+        with self.lock:
+            namespace_id = f"ns{len(self.namespaces) + 1:04d}"
+            self.namespaces[namespace_id] = {"title": title, "keys": {}}
+            return namespace_id
+
+    def fail_next(self, *statuses):
+        """Answer the next requests with these statuses before accepting again"""
+        with self.lock:
+            self.failures.extend(statuses)
+
+    def calls(self, endpoint):
+        """Accepted requests of one endpoint, in order"""
+        return [body for name, body in self.requests if name == endpoint]
+
+    def _answer(self, endpoint, match, query, headers, body):
+        """(status, JSON reply) of an accepted call"""
+        if match.group(1) != ACCOUNT_ID:
+            return 403, _error(10000, "Authentication error")
+        if endpoint == "namespaces":
+            page, per_page = int(query.get("page", ["1"])[0]), int(query.get("per_page", ["20"])[0])
+            items = [{"id": namespace_id, "title": namespace["title"]}
+                     for namespace_id, namespace in self.namespaces.items()]
+            shown = items[(page - 1) * per_page:page * per_page]
+            self.requests.append((endpoint, page))
+            return 200, _ok(shown, {"page": page, "per_page": per_page, "count": len(shown), "total_count": len(items),
+                                    "total_pages": max(1, -(-len(items) // per_page))})
+        if endpoint == "create":
+            title = json.loads(body)["title"]
+            if any(namespace["title"] == title for namespace in self.namespaces.values()):
+                return 400, _error(10014, "a namespace with this account ID and title already exists")
+            self.requests.append((endpoint, title))
+            namespace_id = f"ns{len(self.namespaces) + 1:04d}"
+            self.namespaces[namespace_id] = {"title": title, "keys": {}}
+            return 200, _ok({"id": namespace_id, "title": title})
+        if endpoint == "script":
+            parts = _multipart(headers.get('Content-Type', ''), body)
+            metadata = json.loads(parts.pop("metadata"))
+            for binding in metadata.get("bindings", []):
+                if binding.get("type") == "kv_namespace" and binding.get("namespace_id") not in self.namespaces:
+                    return 400, _error(10041, f"KV namespace '{binding.get('namespace_id')}' not found")
+            self.requests.append((endpoint, metadata))
+            self.scripts[match.group(2)] = {"metadata": metadata, "modules": parts}
+            return 200, _ok({"id": match.group(2)})
+
+        namespace = self.namespaces.get(match.group(2))
+        if namespace is None:
+            return 404, _error(10013, "namespace not found")
+        keys = namespace["keys"]
+        if endpoint == "keys":
+            prefix = query.get("prefix", [""])[0]
+            limit = min(KEYS_PAGE, int(query.get("limit", [str(KEYS_PAGE)])[0]))
+            start = int(query.get("cursor", ["0"])[0])
+            names = sorted(name for name in keys if name.startswith(prefix))
+            page = names[start:start + limit]
+            self.requests.append((endpoint, prefix))
+            cursor = str(start + limit) if start + limit < len(names) else ""
+            return 200, _ok([{"name": name} for name in page], {"count": len(page), "cursor": cursor})
+        if len(body) > MAX_BODY_BYTES:
+            return 413, _error(10046, "request body too large")
+        items = json.loads(body)
+        if len(items) > KV_BULK_MAX_PAIRS:
+            return 400, _error(10026, f"bulk requests are limited to {KV_BULK_MAX_PAIRS} pairs")
+        self.requests.append((endpoint, items))
+        if endpoint == "bulk":
+            for item in items:
+                if not isinstance(item.get("value"), str):
+                    return 400, _error(10021, f"value of '{item.get('key')}' is not a string")
+                keys[item["key"]] = item["value"]
+        else:
+            for key in items:
+                keys.pop(key, None)
+        return 200, _ok({"successful_key_count": len(items), "unsuccessful_keys": []})
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PUT(self):
+                self._route("PUT")
+
+            def _route(self, method):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                url = urlsplit(self.path)
+                for route_method, endpoint, pattern in _ROUTES:
+                    match = pattern.match(url.path)
+                    if match and route_method == method:
+                        break
+                else:
+                    self._reply(404, _error(7003, "No route for that URI"))
+                    return
+                if self.headers.get('Authorization') != f"Bearer {API_TOKEN}":
+                    self._reply(403, _error(10000, "Authentication error"))
+                    return
+                with standin.lock:
+                    standin.attempts += 1
+                    status = standin.failures.pop(0) if standin.failures else None
+                if status:
+                    self._reply(status, _error(status, "stand-in failure"), {"Retry-After": "0"})
+                    return
+                with standin.lock:
+                    status, data = standin._answer(endpoint, match, parse_qs(url.query), self.headers, body)
+                self._reply(status, data)
+
+            def _reply(self, status, data, headers=None):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def api_base(self):
+        """Value for kv_publish's api_base"""
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/client/v4"
+
+    def reset(self):
+        with self.lock:
+            self.requests, self.failures, self.attempts = [], [], 0
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+def _dataset(count):
+    posts = [{"id": str(n), "slug": f"post-{n}", "title": f"Post {n}", "content": "...", "category": f"Cat {n % 3}",
+              "tags": f"t{n % 5}", "date": f"2024-{n % 12 + 1:02d}-01", "status": "published"}
+             for n in range(1, count + 1)]
+    return build_dataset(posts)
+
+
+def run_checks(standin):
+    """[(check name, ok, detail)]"""
+    results = []
+    api_base = standin.api_base
+
+    for number in range(150):
+        standin.add_namespace(f"other-{number}")
+    title = f"{WORKER_NAME}-content"
+    namespace_id = ensure_kv_namespace(ACCOUNT_ID, API_TOKEN, title, api_base=api_base)
+    results.append(("namespace: created", standin.calls("create") == [title] and standin.calls("namespaces") == [1, 2]
+                    and standin.namespaces.get(namespace_id, {}).get("title") == title, namespace_id))
+    standin.reset()
+    again = ensure_kv_namespace(ACCOUNT_ID, API_TOKEN, title, api_base=api_base)
+    results.append(("namespace: reused", again == namespace_id and standin.calls("create") == [],
+                    f"{len(standin.calls('namespaces'))} list pages"))
+
+    standin.reset()
+    scratch = standin.add_namespace("scratch")
+    entries = {f"k/{number}": str(number) for number in range(2 * KV_BULK_MAX_PAIRS + 5)}
+    made = bulk_write(ACCOUNT_ID, API_TOKEN, scratch, entries, api_base=api_base)
+    sizes = [len(items) for items in standin.calls("bulk")]
+    results.append(("bulk: pair limit", made == 3 and sizes == [KV_BULK_MAX_PAIRS, KV_BULK_MAX_PAIRS, 5]
+                    and standin.namespaces[scratch]["keys"] == entries, f"{made} requests of {sizes}"))
+
+    sized = {f"b/{number}": "x" * 1000 for number in range(25)}
+    batches = list(chunk_entries(sized, max_bytes=10 * 1004))
+    results.append(("bulk: byte limit", [len(batch) for batch in batches] == [10, 10, 5]
+                    and [item["key"] for batch in batches for item in batch] == list(sized),
+                    f"{[len(batch) for batch in batches]} pairs per batch"))
+
+    standin.reset()
+    standin.fail_next(429)
+    bulk_write(ACCOUNT_ID, API_TOKEN, scratch, {"retried": "1"}, api_base=api_base)
+    results.append(("bulk: retry after 429", standin.attempts == 2 and len(standin.calls("bulk")) == 1
+                    and standin.namespaces[scratch]["keys"].get("retried") == "1", f"{standin.attempts} attempts"))
+
+    standin.reset()
+    first = _dataset(1500)
+    publish_snapshot(first, ACCOUNT_ID, API_TOKEN, namespace_id, api_base=api_base, blog_title="Stand-in")
+    written = standin.calls("bulk")
+    stored = standin.namespaces[namespace_id]["keys"]
+    results.append(("snapshot: meta last", written[-1] == [{"key": "meta", "value": stored.get("meta")}]
+                    and all(item["key"] != "meta" for items in written[:-1] for item in items)
+                    and stored == build_kv_entries(first, blog_title="Stand-in") | {"meta": stored.get("meta")},
+                    f"{len(stored)} keys in {len(written)} requests"))
+
+    standin.reset()
+    second = _dataset(1200)
+    summary = publish_snapshot(second, ACCOUNT_ID, API_TOKEN, namespace_id, api_base=api_base, blog_title="Stand-in")
+    deleted = [key for keys in standin.calls("bulk_delete") for key in keys]
+    gone = {POST_KEY_PREFIX + f"post-{n}" for n in range(1201, 1501)}
+    expected = build_kv_entries(second, blog_title="Stand-in")
+    results.append(("snapshot: stale keys", gone <= set(deleted) and set(stored) == set(expected)
+                    and standin.calls("keys").count(POST_KEY_PREFIX) == 2,
+                    f"{len(deleted)} deleted, {summary['keys_written']} written"))
+
+    standin.reset()
+    modules = generate_cloudflare_worker_modules(dict(worker_config({"blog_title": "Stand-in"}), dataSource="kv"))
+    upload_worker_modules(ACCOUNT_ID, API_TOKEN, WORKER_NAME, modules, bindings=[kv_binding(namespace_id)],
+                          api_base=api_base)
+    script = standin.scripts.get(WORKER_NAME, {})
+    main_module = script.get("modules", {}).get(script.get("metadata", {}).get("main_module"), b"").decode('utf-8')
+    results.append(("binding", script.get("metadata", {}).get("bindings") == [kv_binding(namespace_id)]
+                    and f"env.{KV_BINDING}" in main_module, f"{KV_BINDING} -> {namespace_id}"))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check kv_publish.py against a local Workers KV stand-in")
+    parser.parse_args(argv)
+
+    standin = KVStandIn().start()
+    try:
+        results = run_checks(standin)
+    finally:
+        standin.stop()
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24} {detail}")
+    return 0 if all(ok for _, ok, _ in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
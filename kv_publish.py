@@ -0,0 +1,175 @@
+"""Publish a blog dataset snapshot to Cloudflare Workers KV
+
+kv_check.py exercises the bulk writes, namespace creation and the Worker's KV
+binding against a local stand-in of the API.
+"""
+import hashlib
+import json
+from datetime import datetime
+
+from cloudflare_api import CF_API_BASE, cf_request
+from listing_shards import LISTING_KEY_PREFIX, build_shards
+
+# Name of the KV binding the generated Worker reads from
+KV_BINDING = "BLOG_KV"
+
+# Cloudflare bulk write limits: 10,000 pairs and 100 MB per request
+KV_BULK_MAX_PAIRS = 10000
+KV_BULK_MAX_BYTES = 95 * 1024 * 1024
+
+POST_KEY_PREFIX = "api/post/"
+# Sitemaps and feeds (see feeds.py), keyed by file name
+FEED_KEY_PREFIX = "feed/"
+
+
+def _json(data):
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def build_kv_entries(dataset, spreadsheet_id='', sheet_name='', posts_per_page=6, blog_title='Blog'):
+    """Map a dataset to KV keys whose values are the ready-to-serve API bodies
+
+    Every listing page is its own api/list/... key (see listing_shards.py).
+    """
+    entries = {
+        "api/posts": _json({"success": True, "posts": dataset["published"], "total": len(dataset["published"])}),
+        "api/categories": _json({"success": True, "categories": dataset["categories"]}),
+        "api/tags": _json({"success": True, "tags": dataset["tags"]}),
+        "api/stats": _json({"success": True, "stats": dataset["stats"]}),
+    }
+    for slug, post in dataset["by_slug"].items():
+        entries[POST_KEY_PREFIX + slug] = _json({"success": True, "post": post})
+    entries.update(build_shards(dataset["posts"], posts_per_page, blog_title))
+    for name, body in (dataset.get("feeds") or {}).items():
+        entries[FEED_KEY_PREFIX + name] = body
+
+    version = hashlib.sha256(''.join(entries[k] for k in sorted(entries)).encode('utf-8')).hexdigest()[:16]
+    entries["meta"] = _json({
+        "version": version,
+        "generatedAt": dataset.get("generated_at") or datetime.now().isoformat(),
+        "spreadsheetId": spreadsheet_id,
+        "sheetName": sheet_name,
+        "postCount": len(dataset["posts"])
+    })
+    return entries
+
+
+def chunk_entries(entries, max_pairs=KV_BULK_MAX_PAIRS, max_bytes=KV_BULK_MAX_BYTES):
+    """Split key/value pairs into batches that fit the bulk API limits"""
+    batch = []
+    batch_bytes = 0
+    for key, value in entries.items():
+        size = len(key.encode('utf-8')) + len(value.encode('utf-8'))
+        if batch and (len(batch) >= max_pairs or batch_bytes + size > max_bytes):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append({"key": key, "value": value})
+        batch_bytes += size
+    if batch:
+        yield batch
+
+
+def ensure_kv_namespace(account_id, api_token, title, api_base=CF_API_BASE):
+    """Return the id of the namespace with this title, creating it when missing"""
+    page = 1
+    while True:
+        data = cf_request('GET', f"/accounts/{account_id}/storage/kv/namespaces", api_token,
+                          api_base=api_base, params={"page": page, "per_page": 100})
+        for namespace in data.get('result') or []:
+            if namespace.get('title') == title:
+                return namespace['id']
+        info = data.get('result_info') or {}
+        if page >= info.get('total_pages', 1):
+            break
+        page += 1
+
+    data = cf_request('POST', f"/accounts/{account_id}/storage/kv/namespaces", api_token,
+                      api_base=api_base, json={"title": title})
+    return data['result']['id']
+
+
+def list_kv_keys(account_id, api_token, namespace_id, prefix='', api_base=CF_API_BASE):
+    """List every key under a prefix, following the pagination cursor"""
+    keys = []
+    cursor = None
+    while True:
+        params = {"prefix": prefix, "limit": 1000}
+        if cursor:
+            params["cursor"] = cursor
+        data = cf_request('GET', f"/accounts/{account_id}/storage/kv/namespaces/{namespace_id}/keys",
+                          api_token, api_base=api_base, params=params)
+        keys.extend(item['name'] for item in data.get('result') or [])
+        cursor = (data.get('result_info') or {}).get('cursor')
+        if not cursor:
+            return keys
+
+
+def bulk_write(account_id, api_token, namespace_id, entries, api_base=CF_API_BASE, progress=None):
+    """Write key/value pairs in chunked bulk requests, returns the number of batches"""
+    path = f"/accounts/{account_id}/storage/kv/namespaces/{namespace_id}/bulk"
+    batches = 0
+    written = 0
+    for batch in chunk_entries(entries):
+        cf_request('PUT', path, api_token, api_base=api_base, json=batch)
+        batches += 1
+        written += len(batch)
+        if progress:
+            progress(written, len(entries))
+    return batches
+
+
+def bulk_delete(account_id, api_token, namespace_id, keys, api_base=CF_API_BASE):
+    """Delete keys in chunks of the bulk API limit"""
+    path = f"/accounts/{account_id}/storage/kv/namespaces/{namespace_id}/bulk/delete"
+    keys = list(keys)
+    for start in range(0, len(keys), KV_BULK_MAX_PAIRS):
+        cf_request('POST', path, api_token, api_base=api_base, json=keys[start:start + KV_BULK_MAX_PAIRS])
+    return len(keys)
+
+
+def kv_binding(namespace_id):
+    """Worker binding for the snapshot namespace"""
+    return {"type": "kv_namespace", "name": KV_BINDING, "namespace_id": namespace_id}
+
+
+def diff_entries(old_entries, new_entries):
+    """Keys whose value changed and keys that disappeared between two snapshots"""
+    changed = {key: value for key, value in new_entries.items() if old_entries.get(key) != value}
+    deleted = [key for key in old_entries if key not in new_entries]
+    return changed, deleted
+
+
+def publish_entries(account_id, api_token, namespace_id, entries, deleted_keys=(), api_base=CF_API_BASE, progress=None):
+    """Write changed keys with `meta` last, then delete keys that no longer exist"""
+    entries = dict(entries)
+    meta = entries.pop("meta", None)
+
+    batches = bulk_write(account_id, api_token, namespace_id, entries, api_base=api_base, progress=progress) if entries else 0
+    if meta is not None:
+        batches += bulk_write(account_id, api_token, namespace_id, {"meta": meta}, api_base=api_base)
+    deleted = bulk_delete(account_id, api_token, namespace_id, deleted_keys, api_base=api_base) if deleted_keys else 0
+
+    return {
+        "namespace_id": namespace_id,
+        "keys_written": len(entries) + (meta is not None),
+        "batches": batches,
+        "keys_deleted": deleted
+    }
+
+
+def publish_snapshot(dataset, account_id, api_token, namespace_id, spreadsheet_id='', sheet_name='',
+                     api_base=CF_API_BASE, progress=None, posts_per_page=6, blog_title='Blog'):
+    """Write a full dataset snapshot to KV and drop posts that no longer exist
+
+    `meta` is written last so readers never see a version whose keys are missing.
+    """
+    entries = build_kv_entries(dataset, spreadsheet_id, sheet_name, posts_per_page, blog_title)
+
+    existing = [key for prefix in (POST_KEY_PREFIX, FEED_KEY_PREFIX, LISTING_KEY_PREFIX)
+                for key in list_kv_keys(account_id, api_token, namespace_id, prefix=prefix, api_base=api_base)]
+    stale = [key for key in existing if key not in entries]
+
+    summary = publish_entries(account_id, api_token, namespace_id, entries, stale, api_base=api_base, progress=progress)
+    summary["version"] = json.loads(entries["meta"])["version"]
+    return summary
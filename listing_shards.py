@@ -0,0 +1,122 @@
+"""Listing shards: every page of every post listing, computed once per dataset
+
+A listing is the home page, a category, a tag or a monthly archive, newest
+post first, cut into pages of `posts_per_page`. Each page is one shard, so a
+listing request is a single lookup wherever the blog is served:
+
+* the static build renders each shard to HTML and writes its JSON beside the
+  snapshot files (api/list/<path>.json),
+* the KV snapshot and the self-hosted server hold each shard under its key,
+* the Worker answers /api/list/<path>.json and the HTML listing routes
+  (/page/N/, /category/..., /tag/..., /archive/YYYY/MM/) from the shard.
+
+Shards carry card summaries only; the full post stays under api/post/<slug>.
+"""
+import calendar
+import json
+import re
+
+from blog_data import is_published, split_tags
+from site_render import category_base, listing_url, tag_base
+
+LISTING_KEY_PREFIX = "api/list/"
+SUMMARY_FIELDS = ("id", "slug", "title", "excerpt", "category", "tags", "date", "author", "reading_time", "image")
+EXCERPT_LENGTH = 150
+
+_MONTH = re.compile(r'^(\d{4})-(\d{2})')
+
+
+def archive_base(date):
+    """/archive/YYYY/MM/ for a YYYY-MM-DD date, or None when the date has no month"""
+    match = _MONTH.match(str(date or ''))
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        return None
+    return f"/archive/{match.group(1)}/{match.group(2)}/"
+
+
+def archive_heading(base):
+    year, month = base.strip('/').split('/')[1:3]
+    return f"{calendar.month_name[int(month)]} {year}"
+
+
+def listing_kind(base):
+    """home, category, tag or archive"""
+    return "home" if base == "/" else base.strip('/').split('/')[0]
+
+
+def listing_groups(statuses, dates, categories, tags, blog_title="Blog"):
+    """{listing base: (heading, row numbers newest first)} for the given columns
+
+    Works on columns so the static build can plan from the mmap dataset without
+    materializing posts; lists of post dicts go through post_columns().
+    """
+    published = [row for row in range(len(statuses)) if is_published({"status": statuses[row]})]
+    # Newest first; sort() is stable, so posts of one day keep their sheet order
+    published.sort(key=lambda row: dates[row] or '', reverse=True)
+
+    groups = {"/": (blog_title, [])}
+    for row in published:
+        groups["/"][1].append(row)
+        category = categories[row] or 'Uncategorized'
+        groups.setdefault(category_base(category), (category, []))[1].append(row)
+        for tag in split_tags(tags[row]):
+            groups.setdefault(tag_base(tag), (f"#{tag}", []))[1].append(row)
+    archives = {}
+    for row in published:
+        base = archive_base(dates[row])
+        if base:
+            archives.setdefault(base, (archive_heading(base), []))[1].append(row)
+    # Archives newest month first, after the other listings
+    for base in sorted(archives, reverse=True):
+        groups[base] = archives[base]
+    return groups
+
+
+def post_columns(posts):
+    """The columns listing_groups() reads, from a list of post dicts"""
+    return ([post.get('status') for post in posts], [post.get('date') for post in posts],
+            [post.get('category') for post in posts], [post.get('tags') for post in posts])
+
+
+def paginate(groups, posts_per_page):
+    """(heading, base, page, total_pages, rows) for every page of every listing"""
+    pages = []
+    for base, (heading, rows) in groups.items():
+        total_pages = max(1, -(-len(rows) // posts_per_page))
+        for page in range(1, total_pages + 1):
+            start = (page - 1) * posts_per_page
+            pages.append((heading, base, page, total_pages, rows[start:start + posts_per_page]))
+    return pages
+
+
+def shard_key(url):
+    """Snapshot key of the listing page at `url`: api/list/index, api/list/category/news/page/2, ..."""
+    return LISTING_KEY_PREFIX + (url.strip('/') or 'index')
+
+
+def post_summary(post):
+    """The fields a listing card shows"""
+    summary = {field: post[field] for field in SUMMARY_FIELDS if post.get(field)}
+    if not summary.get('excerpt'):
+        summary['excerpt'] = (post.get('content') or '')[:EXCERPT_LENGTH] + '...'
+    return summary
+
+
+def shard_body(heading, base, page, total_pages, posts):
+    """JSON body of one listing page"""
+    return json.dumps({
+        "success": True,
+        "kind": listing_kind(base),
+        "heading": heading,
+        "base": base,
+        "page": page,
+        "totalPages": total_pages,
+        "posts": [post_summary(post) for post in posts]
+    }, ensure_ascii=False, separators=(',', ':'))
+
+
+def build_shards(posts, posts_per_page=6, blog_title="Blog"):
+    """{snapshot key: JSON body} of every listing page of a list of posts"""
+    groups = listing_groups(*post_columns(posts), blog_title=blog_title)
+    return {shard_key(listing_url(base, page)): shard_body(heading, base, page, total_pages, [posts[row] for row in rows])
+            for heading, base, page, total_pages, rows in paginate(groups, int(posts_per_page or 6))}
@@ -0,0 +1,473 @@
+"""Load test for the blog routes with a local stand-in for the Google export
+
+Usage:
+    python loadtest.py --serve python                        # start blog_api_server.py against the stand-in
+    python loadtest.py --serve worker                        # generate the Worker and run it under Node
+    python loadtest.py --serve worker --worker-script w.js   # run a saved Worker main module instead
+    python loadtest.py --target http://127.0.0.1:8080        # an already running server
+    python loadtest.py --serve python --posts 5000 --concurrency 64 --duration 30
+
+The stand-in serves the sample sheet (or --posts synthetic rows of the same
+shape) on the export URLs and counts every download, so the report shows how
+many upstream fetches the traffic caused. Each run writes one JSON report
+under loadtest-reports/ with the same keys, so runs can be diffed.
+"""
+import argparse
+import asyncio
+import csv
+import hashlib
+import io
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from blog_data import parse_posts_csv
+from generators import WORKER_MAIN_MODULE, generate_cloudflare_worker_modules
+
+SAMPLE_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Spreadsheet", "sample-blog-data.csv")
+REPORT_DIR = "loadtest-reports"
+STANDIN_SPREADSHEET_ID = "loadtest"
+
+# Share of requests per route kind
+DEFAULT_MIX = {"home": 10, "list": 30, "post": 50, "stats": 10}
+
+
+def synthetic_csv(source_csv, posts):
+    """Repeat the sample rows with fresh ids and slugs until there are `posts` rows"""
+    rows = list(csv.reader(io.StringIO(source_csv.lstrip('\ufeff'))))
+    header, samples = rows[0], rows[1:]
+    id_col, slug_col, title_col = header.index('id'), header.index('slug'), header.index('title')
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(header)
+    for number in range(1, posts + 1):
+        row = list(samples[(number - 1) % len(samples)])
+        row[id_col] = str(number)
+        row[title_col] = f"{row[title_col]} {number}"
+        row[slug_col] = f"{row[slug_col]}-{number}"
+        writer.writerow(row)
+    return out.getvalue()
+
+
+class GoogleStandIn:
+    """Local HTTP server answering the CSV export URLs; counts downloads"""
+
+    def __init__(self, csv_text, latency=0.0, fail_every=0):
+        self.csv_body = csv_text.encode('utf-8')
+        self.etag = '"%s"' % hashlib.md5(self.csv_body).hexdigest()
+        self.latency = latency
+        self.fail_every = fail_every
+        self.fetches = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = urlsplit(self.path).path
+                if '/d/' not in path or not ('/export' in path or '/gviz/' in path):
+                    self._reply(404, b"")
+                    return
+                with standin.lock:
+                    standin.fetches += 1
+                    count = standin.fetches
+                if standin.latency:
+                    time.sleep(standin.latency)
+                if standin.fail_every and count % standin.fail_every == 0:
+                    self._reply(503, b"")
+                    return
+                if self.headers.get('If-None-Match') == standin.etag:
+                    with standin.lock:
+                        standin.not_modified += 1
+                    self._reply(304, b"")
+                    return
+                self._reply(200, standin.csv_body)
+
+            def _reply(self, status, body):
+                self.send_response(status)
+                if status in (200, 304):
+                    self.send_header('ETag', standin.etag)
+                self.send_header('Content-Type', 'text/csv; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        return Handler
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def origin(self):
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    @property
+    def sheets_base(self):
+        """Value for GOOGLE_SHEETS_BASE"""
+        return f"{self.origin}/spreadsheets"
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+# Runs a generated Worker under Node's HTTP server: the main module is linked
+# with node:vm (text modules next to it become default-export strings, data
+# modules - fonts and .gz/.br variants - ArrayBuffers), and an
+# older service-worker script still works through addEventListener. fetch() to
+# docs.google.com is sent to the stand-in and the Cache API is an in-memory map.
+WORKER_RUNNER = r"""
+const http = require('http'), fs = require('fs'), path = require('path'), vm = require('vm')
+const [script, port, upstream] = process.argv.slice(2)
+const realFetch = fetch
+const store = new Map()
+let handler
+const ctx = {
+    addEventListener: (type, fn) => { handler = fn },
+    Response, Request, URL, Headers, TextDecoder, TextEncoder, ReadableStream, AbortController,
+    setTimeout, clearTimeout, console,
+    caches: { default: {
+        match: async key => store.has(key) ? new Response(store.get(key)) : undefined,
+        put: async (key, response) => { store.set(key, await response.text()) }
+    } },
+    fetch: (input, init) => {
+        const url = new URL(typeof input === 'string' ? input : input.url)
+        if (url.hostname === 'docs.google.com') return realFetch(upstream + url.pathname + url.search, init)
+        return realFetch(input, init)
+    }
+}
+vm.createContext(ctx)
+
+function linkModule(specifier) {
+    const file = path.join(path.dirname(script), specifier)
+    let value
+    if (/\.(gz|br|woff2?|ttf)$/.test(specifier)) {
+        const data = fs.readFileSync(file)
+        value = data.buffer.slice(data.byteOffset, data.byteOffset + data.byteLength)
+    } else {
+        value = fs.readFileSync(file, 'utf8')
+    }
+    return new vm.SyntheticModule(['default'], function () { this.setExport('default', value) }, { context: ctx })
+}
+
+async function load() {
+    const main = new vm.SourceTextModule(fs.readFileSync(script, 'utf8'), { context: ctx, identifier: script })
+    await main.link(linkModule)
+    await main.evaluate()
+    const worker = main.namespace.default
+    if (worker && worker.fetch) {
+        handler = event => event.respondWith(worker.fetch(event.request, {}, { waitUntil: () => {} }))
+    }
+}
+
+load().then(() => http.createServer(async (req, res) => {
+    let pending
+    handler({ request: new Request('http://localhost' + req.url, { method: req.method, headers: req.headers }),
+              respondWith: r => { pending = r }, waitUntil: () => {} })
+    const response = await pending
+    const body = Buffer.from(await response.arrayBuffer())
+    const headers = Object.fromEntries(response.headers)
+    headers['content-length'] = body.length
+    res.writeHead(response.status, headers)
+    res.end(body)
+}).listen(Number(port), '127.0.0.1', () => console.log('ready')))
+"""
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1) as s:
+                s.sendall(b"GET /health HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n")
+                if s.recv(12).startswith(b"HTTP/1.1 200"):
+                    return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not become ready")
+
+
+def start_python_server(standin, workdir, refresh_interval=60, workers=1):
+    """Launch blog_api_server.py reading from the stand-in; returns (process, base_url)"""
+    port = _free_port()
+    config_path = os.path.join(workdir, "config.json")
+    with open(config_path, 'w') as f:
+        json.dump({"spreadsheet_id": STANDIN_SPREADSHEET_ID, "sheet_name": "", "blog_title": "Load Test"}, f)
+    env = dict(os.environ, GOOGLE_SHEETS_BASE=standin.sheets_base)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "blog_api_server.py"),
+         "--config", config_path, "--dataset", os.path.join(workdir, "dataset.blogds"),
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+         "--refresh-interval", str(refresh_interval)],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    _wait_ready(port)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def start_worker_runner(standin, workdir, worker_script=None):
+    """Run a Worker main module (with its text and data modules beside it) under Node, generating
+    one for the stand-in sheet if none is given; returns (process, base_url)"""
+    port = _free_port()
+    if not worker_script:
+        modules = generate_cloudflare_worker_modules({"spreadsheetId": STANDIN_SPREADSHEET_ID, "blogTitle": "Load Test"})
+        for name, (source, _) in modules.items():
+            with open(os.path.join(workdir, name), 'wb') as f:
+                f.write(source if isinstance(source, bytes) else source.encode('utf-8'))
+        worker_script = os.path.join(workdir, WORKER_MAIN_MODULE)
+    runner = os.path.join(workdir, "worker-runner.js")
+    with open(runner, 'w') as f:
+        f.write(WORKER_RUNNER)
+    process = subprocess.Popen(["node", "--experimental-vm-modules", runner, os.path.abspath(worker_script), str(port),
+                                standin.origin], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    _wait_ready(port)
+    return process, f"http://127.0.0.1:{port}"
+
+
+def build_plan(slugs, mix, seed):
+    """Endless, reproducible sequence of (route, path) following the mix"""
+    rng = random.Random(seed)
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    paths = {"home": "/", "list": "/api/posts", "stats": "/api/stats"}
+    while True:
+        kind = rng.choices(kinds, weights)[0]
+        if kind == "post":
+            yield kind, f"/post/{rng.choice(slugs)}"
+        else:
+            yield kind, paths[kind]
+
+
+async def _read_response(reader):
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head[9:12])
+    headers = {}
+    for line in head.split(b"\r\n")[1:]:
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    if headers.get(b"transfer-encoding", b"").lower() == b"chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    else:
+        await reader.readexactly(int(headers.get(b"content-length", b"0")))
+    return status, headers.get(b"connection", b"").lower() == b"close"
+
+
+async def _client(host, port, plan, deadline, results, accept_encoding):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        kind, path = next(plan)
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: {accept_encoding}\r\n\r\n".encode())
+            status, close = await _read_response(reader)
+            results.append((kind, status, time.perf_counter() - started))
+            if close:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            results.append((kind, 0, time.perf_counter() - started))
+            if writer is not None:
+                writer.close()
+            writer = None
+    if writer is not None:
+        writer.close()
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _latency_summary(latencies):
+    values = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    return {
+        "p50": ms(percentile(values, 0.50)),
+        "p95": ms(percentile(values, 0.95)),
+        "p99": ms(percentile(values, 0.99)),
+        "max": ms(values[-1]) if values else 0.0,
+        "mean": ms(sum(values) / len(values)) if values else 0.0
+    }
+
+
+def run_load(base_url, slugs, concurrency=32, duration=10, mix=None, seed=1, warmup=1, accept_encoding="gzip"):
+    """Drive the routes with `concurrency` keep-alive connections; returns raw results and elapsed time"""
+    url = urlsplit(base_url)
+    host, port = url.hostname, url.port or 80
+    plan = build_plan(slugs, mix or DEFAULT_MIX, seed)
+
+    async def main():
+        if warmup:
+            await asyncio.gather(*(_client(host, port, plan, time.perf_counter() + warmup, [], accept_encoding)
+                                   for _ in range(concurrency)))
+        results = []
+        started = time.perf_counter()
+        await asyncio.gather(*(_client(host, port, plan, started + duration, results, accept_encoding)
+                               for _ in range(concurrency)))
+        return results, time.perf_counter() - started
+
+    return asyncio.run(main())
+
+
+def summarize(results, elapsed):
+    """Throughput, latency percentiles and error rate overall and per route"""
+    by_route = {}
+    status_codes = {}
+    for kind, status, latency in results:
+        by_route.setdefault(kind, []).append((status, latency))
+        status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+
+    def errors(entries):
+        return sum(1 for status, _ in entries if status == 0 or status >= 400)
+
+    total = len(results)
+    return {
+        "requests": total,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "error_rate": round(errors([(s, l) for _, s, l in results]) / total, 5) if total else 0.0,
+        "latency_ms": _latency_summary([latency for _, _, latency in results]),
+        "status_codes": status_codes,
+        "by_route": {
+            kind: {
+                "requests": len(entries),
+                "error_rate": round(errors(entries) / len(entries), 5),
+                "latency_ms": _latency_summary([latency for _, latency in entries])
+            }
+            for kind, entries in sorted(by_route.items())
+        }
+    }
+
+
+def write_report(report, path=None):
+    if path is None:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        path = os.path.join(REPORT_DIR, f"{report['run_id']}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2)
+    return path
+
+
+def _parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        kind, _, weight = part.partition('=')
+        if kind.strip() not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"unknown route kind: {kind}")
+        mix[kind.strip()] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the blog routes")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--target', help="Base URL of a running server")
+    target.add_argument('--serve', choices=("python", "worker"), help="Start a server against the local stand-in")
+    parser.add_argument('--worker-script', help="Worker script for --serve worker (default: generate one)")
+    parser.add_argument('--csv', default=SAMPLE_CSV, help="Sheet contents served by the stand-in")
+    parser.add_argument('--posts', type=int, help="Synthesize this many rows from the CSV's rows")
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10, help="Measured seconds (after warmup)")
+    parser.add_argument('--warmup', type=float, default=1)
+    parser.add_argument('--mix', type=_parse_mix, default=DEFAULT_MIX, help="e.g. home=10,list=30,post=50,stats=10")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1, help="Server processes for --serve python")
+    parser.add_argument('--refresh-interval', type=int, default=60, help="Sheet poll interval for --serve python")
+    parser.add_argument('--upstream-latency', type=float, default=0.0, help="Seconds the stand-in waits per download")
+    parser.add_argument('--upstream-fail-every', type=int, default=0, help="Make every Nth download fail with 503")
+    parser.add_argument('--report', help="Report path (default: loadtest-reports/<run id>.json)")
+    args = parser.parse_args(argv)
+
+    with open(args.csv, encoding='utf-8') as f:
+        csv_text = f.read()
+    if args.posts:
+        csv_text = synthetic_csv(csv_text, args.posts)
+    slugs = [post['slug'] for post in parse_posts_csv(csv_text) if post.get('slug')]
+
+    standin = None
+    process = None
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if args.serve:
+                standin = GoogleStandIn(csv_text, args.upstream_latency, args.upstream_fail_every).start()
+                if args.serve == "python":
+                    process, base_url = start_python_server(standin, workdir, args.refresh_interval, args.workers)
+                else:
+                    process, base_url = start_worker_runner(standin, workdir, args.worker_script)
+            else:
+                base_url = args.target.rstrip('/')
+
+            fetches_before = standin.fetches if standin else None
+            started_at = datetime.now()
+            results, elapsed = run_load(base_url, slugs, args.concurrency, args.duration, args.mix, args.seed, args.warmup)
+            summary = summarize(results, elapsed)
+        finally:
+            if process is not None:
+                process.terminate()
+                process.wait()
+            if standin is not None:
+                standin.stop()
+
+    report = {
+        "run_id": started_at.strftime("%Y%m%d-%H%M%S") + f"-{args.serve or 'target'}",
+        "started_at": started_at.isoformat(),
+        "target": {"serve": args.serve, "url": args.target, "worker_script": args.worker_script,
+                   "workers": args.workers if args.serve == "python" else None},
+        "settings": {"concurrency": args.concurrency, "duration": args.duration, "warmup": args.warmup,
+                     "mix": args.mix, "seed": args.seed, "posts": len(slugs),
+                     "upstream_latency": args.upstream_latency, "upstream_fail_every": args.upstream_fail_every},
+        "results": summary,
+        "upstream": {
+            "fetches": standin.fetches if standin else None,
+            "fetches_during_run": standin.fetches - fetches_before if standin else None,
+            "not_modified": standin.not_modified if standin else None
+        }
+    }
+    path = write_report(report, args.report)
+
+    latency = summary["latency_ms"]
+    print(f"{summary['requests']} requests in {summary['seconds']}s: {summary['throughput_rps']} req/s, "
+          f"p50 {latency['p50']}ms p95 {latency['p95']}ms p99 {latency['p99']}ms, "
+          f"errors {summary['error_rate']:.2%}, upstream fetches {report['upstream']['fetches']}")
+    print(f"Report: {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,219 @@
+"""Exercise cache_purge.py against a local stand-in of Cloudflare's purge_cache endpoint
+
+PurgeStandIn answers POST /zones/<zone>/purge_cache the way the API does and
+records every request; it can be told to answer the next requests with 429
+or 5xx first. The checks:
+
+1. URL lists longer than PURGE_BATCH are split into batches that cover them once,
+2. a 429 and a 503 are retried through cf_request's backoff until they succeed,
+3. affected_paths() maps an added, updated and deleted post, a category change
+   and a tag change to exactly the expected URLs,
+4. purge_changes() sends those URLs under the site address, and past
+   MAX_TARGETED_URLS a single purge_everything.
+
+Exits with status 1 when a check fails, so it can gate CI.
+
+Usage:
+    python purge_check.py
+"""
+import argparse
+import json
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from cache_purge import MAX_TARGETED_URLS, PURGE_BATCH, affected_paths, purge_changes, purge_urls
+
+ZONE_ID = "zone-standin"
+API_TOKEN = "token-standin"
+SITE_URL = "https://blog.example.com"
+FEED_PATHS = {"/sitemap.xml", "/rss.xml", "/atom.xml"}
+
+_PURGE_PATH = re.compile(r'^/client/v4/zones/([^/]+)/purge_cache$')
+
+
+class PurgeStandIn:
+    """Local HTTP server answering purge_cache; records (zone, body) of every accepted request"""
+
+    def __init__(self):
+        self.requests = []
+        self.failures = []
+        self.attempts = 0
+        self.lock = threading.Lock()
+        self.httpd = None
+
+    def fail_next(self, *statuses):
+        """Answer the next requests with these statuses before accepting again"""
+        with self.lock:
+            self.failures.extend(statuses)
+
+    def _handler(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                match = _PURGE_PATH.match(self.path)
+                if not match:
+                    self._reply(404, {"success": False, "errors": [{"code": 7003, "message": "No route"}]})
+                    return
+                if self.headers.get('Authorization') != f"Bearer {API_TOKEN}":
+                    self._reply(403, {"success": False, "errors": [{"code": 10000, "message": "Authentication error"}]})
+                    return
+                with standin.lock:
+                    standin.attempts += 1
+                    status = standin.failures.pop(0) if standin.failures else None
+                if status:
+                    self._reply(status, {"success": False, "errors": [{"code": status, "message": "stand-in failure"}]},
+                                {"Retry-After": "0"})
+                    return
+                data = json.loads(body)
+                if len(data.get("files", [])) > PURGE_BATCH:
+                    self._reply(400, {"success": False, "errors": [{"code": 1015, "message": "Too many files"}]})
+                    return
+                with standin.lock:
+                    standin.requests.append((match.group(1), data))
+                self._reply(200, {"success": True, "errors": [], "messages": [], "result": {"id": match.group(1)}})
+
+            def _reply(self, status, data, headers=None):
+                payload = json.dumps(data).encode('utf-8')
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+        return Handler
+
+    def start(self):
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    @property
+    def api_base(self):
+        """Value for cache_purge's api_base"""
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}/client/v4"
+
+    def purged_files(self):
+        return [url for _, data in self.requests for url in data.get("files", [])]
+
+    def reset(self):
+        with self.lock:
+            self.requests, self.failures, self.attempts = [], [], 0
+
+    def stop(self):
+        if self.httpd:
+            self.httpd.shutdown()
+            self.httpd.server_close()
+
+
+def _post(slug, category, tags, date, title=None):
+    return {"id": slug, "slug": slug, "title": title or slug.upper(), "content": "...", "category": category,
+            "tags": tags, "date": date, "status": "published"}
+
+
+BASE_POSTS = [
+    _post("a", "News", "x", "2024-01-05"),
+    _post("b", "News", "y", "2024-01-04"),
+    _post("c", "Tech", "", "2024-02-01"),
+]
+
+
+def _shard(path):
+    return f"/api/list/{path.strip('/') or 'index'}.json"
+
+
+def _pages(*paths):
+    return {path for page in paths for path in (page, _shard(page))}
+
+
+def _post_paths(slug):
+    return {f"/post/{slug}", f"/post/{slug}/", f"/api/post/{slug}"}
+
+
+def path_cases():
+    """(name, new posts, expected paths) of each change to BASE_POSTS"""
+    always = {"/api/posts"} | FEED_PATHS
+    updated = [_post("a", "News", "x", "2024-01-05", title="A, edited")] + BASE_POSTS[1:]
+    added = BASE_POSTS + [_post("d", "Tech", "x", "2024-02-02")]
+    deleted = [BASE_POSTS[0], BASE_POSTS[2]]
+    moved = BASE_POSTS[:2] + [_post("c", "News", "", "2024-02-01")]
+    retagged = [_post("a", "News", "y", "2024-01-05")] + BASE_POSTS[1:]
+    return [
+        ("update", updated, always | _post_paths("a") | _pages("/", "/category/news/", "/tag/x/", "/archive/2024/01/")),
+        ("add", added, always | _post_paths("d") | {"/api/categories", "/api/tags", "/api/stats"}
+         | _pages("/", "/category/tech/", "/tag/x/", "/archive/2024/02/")),
+        ("delete", deleted, always | _post_paths("b") | {"/api/categories", "/api/tags", "/api/stats"}
+         | _pages("/", "/category/news/", "/tag/y/", "/archive/2024/01/")),
+        ("category change", moved, always | _post_paths("c") | {"/api/categories", "/api/stats"}
+         | _pages("/", "/category/news/", "/category/tech/", "/archive/2024/02/")),
+        ("tag change", retagged, always | _post_paths("a") | {"/api/tags", "/api/stats"}
+         | _pages("/", "/category/news/", "/tag/x/", "/tag/y/", "/archive/2024/01/")),
+        ("no change", [dict(post) for post in BASE_POSTS], set()),
+    ]
+
+
+def run_checks(standin):
+    """[(check name, ok, detail)]"""
+    results = []
+
+    urls = [f"{SITE_URL}/post/{number}/" for number in range(2 * PURGE_BATCH + 5)]
+    made = purge_urls(ZONE_ID, API_TOKEN, urls, api_base=standin.api_base)
+    sizes = [len(data["files"]) for _, data in standin.requests]
+    results.append(("batches", made == 3 and sizes == [PURGE_BATCH, PURGE_BATCH, 5] and standin.purged_files() == urls,
+                    f"{made} requests of {sizes}"))
+
+    for status in (429, 503):
+        standin.reset()
+        standin.fail_next(status)
+        made = purge_urls(ZONE_ID, API_TOKEN, urls[:3], api_base=standin.api_base)
+        results.append((f"retry after {status}", made == 1 and standin.attempts == 2 and standin.purged_files() == urls[:3],
+                        f"{standin.attempts} attempts, {len(standin.requests)} accepted"))
+
+    for name, new_posts, expected in path_cases():
+        paths = set(affected_paths(BASE_POSTS, new_posts))
+        detail = f"missing {sorted(expected - paths)}, unexpected {sorted(paths - expected)}"
+        results.append((f"paths: {name}", paths == expected, "ok" if paths == expected else detail))
+
+    standin.reset()
+    name, new_posts, expected = path_cases()[0]
+    summary = purge_changes(ZONE_ID, API_TOKEN, SITE_URL + "/", BASE_POSTS, new_posts, api_base=standin.api_base)
+    sent = set(standin.purged_files())
+    results.append(("purge_changes", sent == {SITE_URL + path for path in expected}
+                    and summary == {"purged_urls": len(expected), "requests": len(standin.requests)},
+                    json.dumps(summary)))
+
+    standin.reset()
+    many = [_post(f"p{number}", "News", "", "2024-03-01") for number in range(MAX_TARGETED_URLS // 3 + 1)]
+    summary = purge_changes(ZONE_ID, API_TOKEN, SITE_URL, [], many, api_base=standin.api_base)
+    results.append(("purge_everything", [data for _, data in standin.requests] == [{"purge_everything": True}]
+                    and summary["purged_urls"] == "everything", json.dumps(summary)))
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check cache_purge.py against a local purge_cache stand-in")
+    parser.parse_args(argv)
+
+    standin = PurgeStandIn().start()
+    try:
+        results = run_checks(standin)
+    finally:
+        standin.stop()
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name:<24} {detail}")
+    return 0 if all(ok for _, ok, _ in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
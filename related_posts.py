@@ -0,0 +1,342 @@
+"""Related posts, computed once at ingestion
+
+Every post gets `related`: up to TOP_K other published posts as
+[{"slug", "title", "score"}], ranked by
+
+    TAG_WEIGHT * Jaccard(tags) + TEXT_WEIGHT * cosine(TF-IDF of title + content)
+
+Posts are sparse term vectors and the corpus is an inverted index of numpy
+arrays, so scoring a post only touches the posts sharing a term or a tag with it.
+
+The vectors, the IDF table and the graph are kept in a small SQLite file next
+to the dataset. When only a few rows changed, only those rows are re-tokenized
+and only the posts whose lists can change are re-ranked; the IDF table stays
+frozen until enough of the sheet changed to warrant a full rebuild.
+
+Usage:
+    python related_posts.py .cache/datasets/<sheet>.blogds     # print the graph
+"""
+import argparse
+import hashlib
+import heapq
+import json
+import math
+import os
+import re
+import sqlite3
+import sys
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from blog_data import is_published, split_tags
+from content_render import plain_text
+
+# Bump when scoring changes, so stored graphs are rebuilt
+RELATED_VERSION = "1"
+TOP_K = 5
+TAG_WEIGHT = 0.4
+TEXT_WEIGHT = 0.6
+MIN_SCORE = 0.05
+TITLE_WEIGHT = 3
+MAX_TERMS = 48
+# Terms in more than this share of posts say nothing about relatedness
+MAX_DF_RATIO = 0.5
+# Rebuild everything (and refresh the IDF table) once this share of posts changed
+REBUILD_RATIO = 0.2
+
+STOPWORDS = {
+    "adalah", "akan", "anda", "atau", "bagi", "bisa", "dalam", "dan", "dapat", "dari", "dengan", "ini", "itu",
+    "juga", "kami", "kita", "lebih", "oleh", "pada", "para", "sebagai", "secara", "sudah", "tanpa", "untuk",
+    "yang", "and", "are", "but", "can", "for", "from", "has", "have", "how", "into", "not", "that", "the",
+    "this", "was", "were", "what", "when", "which", "will", "with", "you", "your"
+}
+_WORD = re.compile(r'[^\W\d_]{3,}')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS posts (
+    slug TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    published INTEGER NOT NULL,
+    tags TEXT NOT NULL,
+    terms TEXT NOT NULL,
+    vector TEXT NOT NULL,
+    related TEXT NOT NULL
+);
+"""
+
+
+def related_state_path(dataset_file):
+    """Graph state kept next to a dataset file"""
+    return f"{os.path.splitext(dataset_file)[0]}.related.sqlite"
+
+
+def tokenize(text):
+    return [word for word in _WORD.findall((text or '').lower()) if word not in STOPWORDS]
+
+
+def post_terms(post):
+    """Term counts of a post, title words weighted TITLE_WEIGHT times"""
+    body = plain_text(post['content_html']) if post.get('content_html') else post.get('content')
+    terms = Counter(tokenize(body))
+    for word in tokenize(post.get('title')):
+        terms[word] += TITLE_WEIGHT
+    return dict(terms)
+
+
+def post_hash(post):
+    key = "\0".join(str(post.get(field) or '') for field in ('title', 'content', 'tags', 'status'))
+    return hashlib.sha256(f"{RELATED_VERSION}\0{key}".encode('utf-8')).hexdigest()
+
+
+def idf_table(term_sets):
+    """Smoothed IDF of every term, plus the IDF a term unseen so far gets"""
+    df = Counter()
+    for terms in term_sets:
+        df.update(terms.keys())
+    total = len(term_sets)
+    idf = {term: math.log((1 + total) / (1 + count)) + 1 for term, count in df.items()}
+    return idf, math.log((1 + total) / 2) + 1
+
+
+def tfidf_vector(terms, idf, unseen_idf):
+    """Sublinear TF-IDF, cut to the MAX_TERMS heaviest terms and L2-normalized"""
+    weights = {term: (1 + math.log(count)) * idf.get(term, unseen_idf) for term, count in terms.items()}
+    if len(weights) > MAX_TERMS:
+        weights = dict(heapq.nlargest(MAX_TERMS, weights.items(), key=lambda item: item[1]))
+    norm = math.sqrt(sum(weight * weight for weight in weights.values())) or 1.0
+    return {term: weight / norm for term, weight in weights.items()}
+
+
+class _Entry:
+    __slots__ = ("slug", "hash", "published", "tags", "terms", "vector", "related")
+
+    def __init__(self, slug, hash, published, tags, terms, vector=None, related=None):
+        self.slug = slug
+        self.hash = hash
+        self.published = published
+        self.tags = tags
+        self.terms = terms
+        self.vector = vector or {}
+        self.related = related or []
+
+
+class _Index:
+    """Sparse inverted index of the published posts
+
+    Each term maps to (rows, weights) arrays and each tag to rows, so scoring a
+    post against the whole corpus is a handful of vectorized scatter-adds.
+    """
+
+    def __init__(self, entries):
+        self.slugs = [entry.slug for entry in entries.values() if entry.published]
+        self.rows = {slug: row for row, slug in enumerate(self.slugs)}
+        term_postings = defaultdict(lambda: ([], []))
+        tag_postings = defaultdict(list)
+        for row, slug in enumerate(self.slugs):
+            entry = entries[slug]
+            for term, weight in entry.vector.items():
+                rows, weights = term_postings[term]
+                rows.append(row)
+                weights.append(weight)
+            for tag in entry.tags:
+                tag_postings[tag].append(row)
+        max_df = max(2, int(len(self.slugs) * MAX_DF_RATIO))
+        self.term_postings = {term: (np.array(rows, dtype=np.int64), np.array(weights))
+                              for term, (rows, weights) in term_postings.items() if len(rows) <= max_df}
+        self.tag_postings = {tag: np.array(rows, dtype=np.int64) for tag, rows in tag_postings.items()}
+        self.tag_counts = np.array([len(entries[slug].tags) for slug in self.slugs], dtype=np.float64)
+
+    def _score_array(self, entry):
+        text = np.zeros(len(self.slugs))
+        for term, weight in entry.vector.items():
+            if term in self.term_postings:
+                rows, weights = self.term_postings[term]
+                text[rows] += weight * weights
+        shared = np.zeros(len(self.slugs))
+        for tag in entry.tags:
+            if tag in self.tag_postings:
+                shared[self.tag_postings[tag]] += 1
+        union = np.maximum(len(entry.tags) + self.tag_counts - shared, 1)
+        score = np.round(TAG_WEIGHT * shared / union + TEXT_WEIGHT * text, 4)
+        if entry.slug in self.rows:
+            score[self.rows[entry.slug]] = 0
+        return score
+
+    def scores(self, entry):
+        """{slug: score} of every published post scoring at least MIN_SCORE against `entry`"""
+        score = self._score_array(entry)
+        return {self.slugs[row]: float(score[row]) for row in np.flatnonzero(score >= MIN_SCORE)}
+
+    def top(self, entry, k):
+        score = self._score_array(entry)
+        rows = np.flatnonzero(score >= MIN_SCORE)
+        if len(rows) > k:
+            # Keep everything tied with the k-th best, _top breaks the ties
+            kth = np.partition(score[rows], len(rows) - k)[len(rows) - k]
+            rows = rows[score[rows] >= kth]
+        return _top(((self.slugs[row], float(score[row])) for row in rows), k)
+
+
+def _top(scored, k):
+    """[[slug, score]] of the k best, ties broken by slug so the graph is stable"""
+    return [[slug, score] for slug, score in heapq.nsmallest(k, scored, key=lambda item: (-item[1], item[0]))]
+
+
+class RelatedGraph:
+    """The stored state of one dataset's graph"""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.entries = {}
+        self.idf = {}
+        self.unseen_idf = 1.0
+        if path and os.path.exists(path):
+            self._load()
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        db = sqlite3.connect(self.path, timeout=30)
+        db.executescript(SCHEMA)
+        return db
+
+    def _load(self):
+        db = self._connect()
+        try:
+            meta = dict(db.execute("SELECT key, value FROM meta"))
+            if meta.get("version") != RELATED_VERSION:
+                return
+            self.idf = json.loads(meta.get("idf", "{}"))
+            self.unseen_idf = float(meta.get("unseen_idf", 1.0))
+            for slug, hash, published, tags, terms, vector, related in db.execute("SELECT * FROM posts"):
+                self.entries[slug] = _Entry(slug, hash, bool(published), json.loads(tags), json.loads(terms),
+                                            json.loads(vector), json.loads(related))
+        finally:
+            db.close()
+
+    def save(self, slugs=None, removed=()):
+        """Write the IDF table and the given entries (all by default)"""
+        if not self.path:
+            return
+        db = self._connect()
+        try:
+            with db:
+                if slugs is None:
+                    db.execute("DELETE FROM posts")
+                    slugs = self.entries.keys()
+                db.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                               [("version", RELATED_VERSION), ("idf", json.dumps(self.idf, ensure_ascii=False)),
+                                ("unseen_idf", str(self.unseen_idf))])
+                db.executemany("DELETE FROM posts WHERE slug = ?", [(slug,) for slug in removed])
+                db.executemany(
+                    "INSERT OR REPLACE INTO posts VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(entry.slug, entry.hash, int(entry.published), json.dumps(entry.tags, ensure_ascii=False),
+                      json.dumps(entry.terms, ensure_ascii=False), json.dumps(entry.vector, ensure_ascii=False),
+                      json.dumps(entry.related, ensure_ascii=False))
+                     for entry in (self.entries[slug] for slug in slugs)]
+                )
+        finally:
+            db.close()
+
+    def update(self, posts, k=TOP_K):
+        """Bring the graph in line with `posts`; returns {"mode", "changed", "removed", "reranked"}"""
+        current = {}
+        for post in posts:
+            slug = post.get('slug')
+            if slug and slug not in current:
+                current[slug] = post
+        changed = [slug for slug, post in current.items()
+                   if slug not in self.entries or self.entries[slug].hash != post_hash(post)]
+        removed = [slug for slug in self.entries if slug not in current]
+
+        for slug in changed:
+            post = current[slug]
+            self.entries[slug] = _Entry(slug, post_hash(post), is_published(post),
+                                        sorted({tag.lower() for tag in split_tags(post.get('tags'))}), post_terms(post))
+        for slug in removed:
+            del self.entries[slug]
+
+        if not self.idf or len(changed) + len(removed) > REBUILD_RATIO * max(1, len(self.entries)):
+            self._rebuild(k)
+            return {"mode": "full", "changed": len(changed), "removed": len(removed), "reranked": len(self.entries)}
+
+        touched = set(changed) | set(removed)
+        for slug in changed:
+            entry = self.entries[slug]
+            entry.vector = tfidf_vector(entry.terms, self.idf, self.unseen_idf)
+        index = _Index(self.entries)
+
+        # Changed posts and posts that listed a changed or removed post are ranked from scratch
+        rerank = set(changed) | {entry.slug for entry in self.entries.values()
+                                 if any(slug in touched for slug, _ in entry.related)}
+        for slug in rerank:
+            self.entries[slug].related = index.top(self.entries[slug], k)
+        # Everyone else only has to make room for a changed post that now beats their last entry
+        grown = set()
+        for slug in changed:
+            if not self.entries[slug].published:
+                continue
+            for other, score in index.scores(self.entries[slug]).items():
+                entry = self.entries[other]
+                if other in rerank:
+                    continue
+                if len(entry.related) < k or score > entry.related[-1][1]:
+                    scored = dict(entry.related)
+                    scored[slug] = score
+                    entry.related = _top(scored.items(), k)
+                    grown.add(other)
+        self.save(rerank | grown, removed)
+        return {"mode": "incremental", "changed": len(changed), "removed": len(removed),
+                "reranked": len(rerank | grown)}
+
+    def _rebuild(self, k):
+        self.idf, self.unseen_idf = idf_table([entry.terms for entry in self.entries.values()])
+        for entry in self.entries.values():
+            entry.vector = tfidf_vector(entry.terms, self.idf, self.unseen_idf)
+        index = _Index(self.entries)
+        for entry in self.entries.values():
+            entry.related = index.top(entry, k)
+        self.save()
+
+
+def add_related_posts(posts, state_path=None, k=TOP_K, stats=None):
+    """Posts with `related` filled in from the (incrementally updated) graph
+
+    Without `state_path` the graph is computed in memory from scratch. Pass a
+    dict as `stats` to see how much work the update did.
+    """
+    posts = list(posts)
+    graph = RelatedGraph(state_path)
+    summary = graph.update(posts, k)
+    if stats is not None:
+        stats.update(summary)
+
+    titles = {}
+    for post in posts:
+        titles.setdefault(post.get('slug'), post.get('title') or '')
+    linked = []
+    for post in posts:
+        entry = graph.entries.get(post.get('slug'))
+        related = [{"slug": slug, "title": titles.get(slug, ''), "score": score}
+                   for slug, score in (entry.related if entry else [])]
+        linked.append(dict(post, related=related))
+    return linked
+
+
+def main(argv=None):
+    from dataset_store import PostDataset
+
+    parser = argparse.ArgumentParser(description="Show the related-posts graph of a dataset")
+    parser.add_argument('dataset', help="Dataset file written by an ingest")
+    args = parser.parse_args(argv)
+
+    with PostDataset(args.dataset) as dataset:
+        for post in dataset:
+            titles = ', '.join(f"{item['slug']} ({item['score']})" for item in post.get('related') or [])
+            print(f"{post.get('slug')}\t{titles}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,208 @@
+"""Failure handling shared by everything that talks to Google: breaker, backoff, last known good
+
+A dependency that keeps failing trips its circuit breaker; while the breaker is
+open calls fail immediately instead of waiting on timeouts, and callers serve
+the last successfully fetched copy kept on disk. Token buckets keep callers
+under an API's request quota; an adaptive limiter finds the concurrency an API
+tolerates when its quota isn't known up front.
+"""
+import hashlib
+import os
+import random
+import threading
+import time
+
+LKG_DIR = os.path.join(".cache", "last_good")
+
+
+class TransientError(RuntimeError):
+    """A failure worth retrying: timeouts, connection errors, 429 and 5xx answers"""
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the dependency while its breaker is open"""
+
+
+class CircuitBreaker:
+    """Closed -> open after `failure_threshold` transient failures in a row; after
+    `reset_timeout` seconds one trial call is let through (half-open) and its
+    result closes or re-opens the breaker."""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def retry_after(self):
+        """Seconds until the next trial call is allowed"""
+        if self.opened_at is None:
+            return 0
+        return max(0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def _acquire(self):
+        with self.lock:
+            state = self.state
+            if state == "closed":
+                return False
+            if state == "half_open" and not self.trial_running:
+                self.trial_running = True
+                return True
+        raise CircuitOpenError(f"{self.name} circuit is open, retry in {self.retry_after():.0f}s")
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker; only TransientError counts as a failure"""
+        trial = self._acquire()
+        try:
+            result = fn(*args, **kwargs)
+        except TransientError:
+            self.record_failure()
+            raise
+        except Exception:
+            # Not the dependency's fault (bad sheet id, private sheet): don't trip
+            if trial:
+                with self.lock:
+                    self.trial_running = False
+            raise
+        self.record_success()
+        return result
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name, failure_threshold=5, reset_timeout=60):
+    """Process-wide breaker for a named dependency"""
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, failure_threshold, reset_timeout)
+        return _breakers[name]
+
+
+def backoff_delay(attempt, base_delay=0.5, max_delay=10):
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)"""
+    return random.uniform(0, min(max_delay, base_delay * 2 ** attempt))
+
+
+def retry_call(fn, attempts=3, base_delay=0.5, max_delay=10, retry_on=(TransientError,)):
+    """Call fn, retrying `retry_on` errors with exponential backoff"""
+    for attempt in range(attempts):
+        try:
+            return fn()
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+class TokenBucket:
+    """`rate` requests per second on average, bursts of up to `capacity`; shared by threads"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveLimiter:
+    """Requests in flight capped at a limit that adapts to throttling (AIMD); shared by threads
+
+    The limit grows by one for every `limit` successful calls, up to
+    `max_limit`. A throttled call halves it and pauses everyone for the
+    server's Retry-After.
+    """
+
+    def __init__(self, max_limit, initial=None, min_limit=1):
+        self.max_limit = max(min_limit, max_limit)
+        self.min_limit = min_limit
+        self.limit = float(min(self.max_limit, initial or self.max_limit))
+        self.in_flight = 0
+        self.resume_at = 0.0
+        self.throttled_count = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """Wait for a free slot and any throttling pause to pass"""
+        with self.condition:
+            while True:
+                wait = self.resume_at - time.monotonic()
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+                self.condition.wait(wait if wait > 0 else None)
+
+    def release(self, throttled=False, retry_after=None):
+        """Free the slot; `throttled` when the server answered 429 (or similar)"""
+        with self.condition:
+            self.in_flight -= 1
+            if throttled:
+                self.throttled_count += 1
+                self.limit = max(self.min_limit, self.limit / 2)
+                if retry_after:
+                    self.resume_at = max(self.resume_at, time.monotonic() + retry_after)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self.condition.notify_all()
+
+
+def _last_good_path(key, lkg_dir):
+    return os.path.join(lkg_dir, hashlib.sha256(key.encode('utf-8')).hexdigest()[:32])
+
+
+def save_last_good(key, text, lkg_dir=LKG_DIR):
+    """Persist the latest good copy of a resource"""
+    os.makedirs(lkg_dir, exist_ok=True)
+    path = _last_good_path(key, lkg_dir)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def load_last_good(key, lkg_dir=LKG_DIR):
+    """(text, saved_at timestamp) of the last good copy, or (None, None)"""
+    path = _last_good_path(key, lkg_dir)
+    if not os.path.exists(path):
+        return None, None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read(), os.path.getmtime(path)
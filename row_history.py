@@ -0,0 +1,78 @@
+"""When each row of a sheet last changed
+
+The sheet itself rarely says when a post was edited, so every ingest compares
+each row with the previous one and stamps it with `lastmod`: the time the row
+was last seen to change. A row seen for the first time takes its own
+`updated_at`-style column or its `date`, so the first ingest of an old blog
+doesn't claim every post was modified today.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+from sheets_api import CHANGE_COLUMNS
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rows (
+    slug TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    lastmod TEXT NOT NULL
+)
+"""
+
+
+def history_path(dataset_file):
+    """History kept next to a dataset file"""
+    return f"{os.path.splitext(dataset_file)[0]}.history.sqlite"
+
+
+def parse_timestamp(value):
+    """UTC datetime of an ISO date or date-time cell, or None"""
+    try:
+        parsed = datetime.fromisoformat(str(value or '').strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed.replace(tzinfo=parsed.tzinfo or timezone.utc).astimezone(timezone.utc)
+
+
+def row_hash(post):
+    return hashlib.sha256(json.dumps(post, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')).hexdigest()
+
+
+def _initial_lastmod(post, now):
+    for column in CHANGE_COLUMNS + ('date',):
+        parsed = parse_timestamp(post.get(column))
+        if parsed:
+            return min(parsed, now)
+    return now
+
+
+def stamp_lastmod(posts, path, now=None):
+    """Posts with `lastmod` (ISO 8601, UTC) from the history at `path`, which is updated"""
+    now = now or datetime.now(timezone.utc)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    db = sqlite3.connect(path, timeout=30)
+    try:
+        db.execute(SCHEMA)
+        known = {slug: (digest, lastmod) for slug, digest, lastmod in db.execute("SELECT slug, hash, lastmod FROM rows")}
+        stamped = []
+        changed = []
+        for post in posts:
+            slug = post.get('slug') or str(post.get('id') or '')
+            digest = row_hash(post)
+            if slug in known and known[slug][0] == digest:
+                lastmod = known[slug][1]
+            else:
+                lastmod = (now if slug in known else _initial_lastmod(post, now)).isoformat(timespec='seconds')
+                changed.append((slug, digest, now.isoformat(timespec='seconds'), lastmod))
+                known[slug] = (digest, lastmod)
+            stamped.append(dict(post, lastmod=lastmod))
+        with db:
+            db.executemany("INSERT INTO rows (slug, hash, first_seen, lastmod) VALUES (?, ?, ?, ?) "
+                           "ON CONFLICT(slug) DO UPDATE SET hash = excluded.hash, lastmod = excluded.lastmod", changed)
+    finally:
+        db.close()
+    return stamped
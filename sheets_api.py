@@ -0,0 +1,263 @@
+"""Incremental sheet ingestion through the Google Sheets API v4
+
+An alternative to the CSV export for large sheets. The export always sends
+every row; this backend remembers what it saw last time and asks only for
+
+* nothing at all when the Drive file version has not moved,
+* the header row, the key column (A) and the change column of each tab,
+* the rows appended after the last known row, and
+* the rows whose key or change marker differs from the stored copy.
+
+Everything for every tab goes out in one `values:batchGet` request (two when
+rows changed). A tab without a change column (`updated_at`, `last_modified`,
+...) cannot report edits, so it is read in full whenever the file changed.
+
+Both API base URLs can be pointed at a local stand-in through SHEETS_API_BASE
+and DRIVE_API_BASE; google_check.py runs the sync against one.
+"""
+import json
+import os
+import threading
+
+import requests
+
+from blog_data import rows_to_posts
+from resilience import TransientError, get_breaker, retry_call
+
+SHEETS_API_BASE = os.environ.get("SHEETS_API_BASE", "https://sheets.googleapis.com/v4")
+DRIVE_API_BASE = os.environ.get("DRIVE_API_BASE", "https://www.googleapis.com/drive/v3")
+SHEETS_API_STATE_DIR = os.path.join(".cache", "sheets_api")
+
+# Columns whose value changes whenever a row is edited, first match wins
+CHANGE_COLUMNS = ("updated_at", "last_modified", "modified", "timestamp")
+
+SHEETS_API_BREAKER = get_breaker("google-sheets-api", failure_threshold=3, reset_timeout=60)
+
+
+def column_letter(number):
+    """1 -> A, 27 -> AA"""
+    letters = ''
+    while number:
+        number, remainder = divmod(number - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def quote_tab(tab):
+    """Tab name as an A1 range prefix"""
+    return "'" + tab.replace("'", "''") + "'"
+
+
+def change_column_index(headers):
+    """Index of the row-change marker column, or None"""
+    lowered = [h.strip().lower() for h in headers]
+    for name in CHANGE_COLUMNS:
+        if name in lowered:
+            return lowered.index(name)
+    return None
+
+
+def row_ranges(rows):
+    """Coalesce sorted 0-based data row numbers into (first, last) runs"""
+    runs = []
+    for row in rows:
+        if runs and row == runs[-1][1] + 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return runs
+
+
+def _column(values):
+    return [row[0] if row else '' for row in values]
+
+
+def _tab_copy(values):
+    """Stored copy of a tab read in full"""
+    headers = values[0] if values else []
+    rows = values[1:]
+    marker = change_column_index(headers)
+    return {
+        "headers": headers,
+        "rows": rows,
+        "keys": _column(rows),
+        "markers": [row[marker] if marker is not None and marker < len(row) else '' for row in rows]
+    }
+
+
+class SheetsAPISource:
+    """Keeps a local copy of one spreadsheet's tabs and refreshes it incrementally
+
+    The copy (headers, rows, row keys and markers per tab, plus the Drive file
+    version) is persisted under `state_dir` so every run starts from the last one.
+    """
+
+    def __init__(self, spreadsheet_id, api_key, state_dir=SHEETS_API_STATE_DIR, sheets_base=SHEETS_API_BASE,
+                 drive_base=DRIVE_API_BASE, timeout=30, session=None):
+        self.spreadsheet_id = spreadsheet_id
+        self.api_key = api_key
+        self.state_dir = state_dir
+        self.sheets_base = sheets_base.rstrip('/')
+        self.drive_base = drive_base.rstrip('/')
+        self.timeout = timeout
+        self.http = session or requests.Session()
+        self.state = self._load_state()
+        self.requests_made = 0
+        self.lock = threading.Lock()
+
+    @property
+    def state_path(self):
+        return os.path.join(self.state_dir, f"{self.spreadsheet_id}.json")
+
+    def _load_state(self):
+        if os.path.exists(self.state_path):
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        return {"revision": None, "tabs": {}}
+
+    def _save_state(self):
+        os.makedirs(self.state_dir, exist_ok=True)
+        tmp = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, ensure_ascii=False)
+        os.replace(tmp, self.state_path)
+
+    def _get(self, url, params):
+        def attempt():
+            self.requests_made += 1
+            try:
+                response = self.http.get(url, params=params, timeout=self.timeout)
+            except requests.RequestException as e:
+                raise TransientError(f"{url}: {e}")
+            if response.status_code == 429 or response.status_code >= 500:
+                raise TransientError(f"{url}: HTTP {response.status_code}")
+            if response.status_code != 200:
+                raise RuntimeError(f"Sheets API error {response.status_code}: {response.text[:200]}")
+            return response.json()
+        return SHEETS_API_BREAKER.call(retry_call, attempt)
+
+    def revision(self):
+        """Drive file version, bumped by every edit; None when Drive is not reachable with this key"""
+        try:
+            data = self._get(f"{self.drive_base}/files/{self.spreadsheet_id}",
+                             {"fields": "version", "key": self.api_key, "supportsAllDrives": "true"})
+        except RuntimeError:
+            return None
+        return data.get("version")
+
+    def batch_get(self, ranges):
+        """Values of several A1 ranges in one request, in request order"""
+        if not ranges:
+            return []
+        data = self._get(f"{self.sheets_base}/spreadsheets/{self.spreadsheet_id}/values:batchGet", {
+            "ranges": ranges,
+            "majorDimension": "ROWS",
+            "valueRenderOption": "FORMATTED_VALUE",
+            "fields": "valueRanges(values)",
+            "key": self.api_key
+        })
+        return [value_range.get("values", []) for value_range in data.get("valueRanges", [])]
+
+    def _first_pass(self, tabs):
+        """Ranges for the first request: whole tabs, or header/key/marker columns plus the tail"""
+        ranges = []
+        plans = {}
+        for tab in tabs:
+            known = self.state["tabs"].get(tab)
+            marker = change_column_index(known["headers"]) if known else None
+            q = quote_tab(tab)
+            if marker is None:
+                plans[tab] = {"full": len(ranges)}
+                ranges.append(q)
+                continue
+            last = column_letter(len(known["headers"]))
+            mark = column_letter(marker + 1)
+            plans[tab] = {"header": len(ranges), "keys": len(ranges) + 1, "markers": len(ranges) + 2,
+                          "tail": len(ranges) + 3, "marker": marker}
+            ranges.extend([f"{q}!1:1", f"{q}!A2:A", f"{q}!{mark}2:{mark}",
+                           f"{q}!A{len(known['rows']) + 2}:{last}"])
+        return ranges, plans
+
+    def sync(self, tabs):
+        """Refresh the local copy of `tabs`; returns {tab: changed?}"""
+        with self.lock:
+            return self._sync(list(tabs))
+
+    def _sync(self, tabs):
+        revision = self.revision()
+        if revision is not None and revision == self.state.get("revision") \
+                and all(tab in self.state["tabs"] for tab in tabs):
+            return {tab: False for tab in tabs}
+
+        ranges, plans = self._first_pass(tabs)
+        results = self.batch_get(ranges)
+
+        changed = {}
+        refetch = []
+        for tab in tabs:
+            plan = plans[tab]
+            if "full" in plan:
+                new = _tab_copy(results[plan["full"]])
+                changed[tab] = new != self.state["tabs"].get(tab)
+                self.state["tabs"][tab] = new
+                continue
+
+            known = self.state["tabs"][tab]
+            header = results[plan["header"]][0] if results[plan["header"]] else []
+            if header != known["headers"]:
+                # Columns moved: the stored copy no longer lines up, read the tab again
+                self.state["tabs"].pop(tab)
+                refetch.append(tab)
+                continue
+
+            keys = _column(results[plan["keys"]])
+            markers = _column(results[plan["markers"]])
+            tail = results[plan["tail"]]
+            old_count = len(known["rows"])
+            count = max(len(keys), len(markers), old_count + len(tail) if tail else 0)
+
+            rows = known["rows"][:min(count, old_count)] + tail[:max(0, count - old_count)]
+            keys += [''] * (count - len(keys))
+            markers += [''] * (count - len(markers))
+            stale = [row for row in range(min(count, old_count))
+                     if keys[row] != known["keys"][row] or markers[row] != known["markers"][row]]
+            plan["stale"] = stale
+            self.state["tabs"][tab] = {"headers": header, "rows": rows, "keys": keys, "markers": markers}
+            changed[tab] = bool(stale) or count != old_count
+
+        # Second request: edited rows of every tab, plus tabs that need a full read
+        second = []
+        for tab in tabs:
+            if tab in refetch:
+                second.append((tab, None, quote_tab(tab)))
+                continue
+            last = column_letter(len(self.state["tabs"][tab]["headers"]))
+            for first, end in row_ranges(plans[tab].get("stale", [])):
+                second.append((tab, (first, end), f"{quote_tab(tab)}!A{first + 2}:{last}{end + 2}"))
+        if second:
+            for (tab, span, _), values in zip(second, self.batch_get([r for _, _, r in second])):
+                if span is None:
+                    self.state["tabs"][tab] = _tab_copy(values)
+                    changed[tab] = True
+                    continue
+                first, end = span
+                values += [[]] * (end - first + 1 - len(values))
+                self.state["tabs"][tab]["rows"][first:end + 1] = values
+
+        self.state["revision"] = revision
+        self._save_state()
+        return changed
+
+    def posts(self, tab):
+        """Posts of a synced tab, shaped exactly like parse_posts_csv output"""
+        known = self.state["tabs"].get(tab)
+        if not known:
+            return []
+        return rows_to_posts([known["headers"]] + known["rows"])
+
+
+def fetch_sheet_posts(spreadsheet_id, api_key, sheet_name, state_dir=SHEETS_API_STATE_DIR):
+    """One-shot incremental fetch of a single tab through the Sheets API"""
+    source = SheetsAPISource(spreadsheet_id, api_key, state_dir=state_dir)
+    source.sync([sheet_name])
+    return source.posts(sheet_name)
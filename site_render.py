@@ -0,0 +1,253 @@
+"""Server-side HTML rendering of blog pages for static builds
+
+Page templates are compiled once per process with the site-wide values already
+substituted; rendering a page only fills in the per-page fields. The <head>
+styles and closing scripts come from asset_pipeline: inlined critical CSS and
+self-hosted files when the build produced them, the CDN links otherwise.
+"""
+import html
+from datetime import datetime
+from string import Template
+from urllib.parse import quote
+
+from asset_pipeline import cdn_assets, template_sources
+from blog_data import slugify, split_tags
+from content_render import toc_html
+
+COLOR_SCHEMES = {
+    "Blue": {"primary": "#2563eb", "secondary": "#1d4ed8"},
+    "Green": {"primary": "#059669", "secondary": "#047857"},
+    "Purple": {"primary": "#7c3aed", "secondary": "#6d28d9"},
+    "Red": {"primary": "#dc2626", "secondary": "#b91c1c"},
+    "Orange": {"primary": "#ea580c", "secondary": "#c2410c"}
+}
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html lang="id">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>$title</title>
+    <meta name="description" content="$description">
+    <meta name="keywords" content="$keywords">
+    $styles
+    <style>
+        body { font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }
+        .navbar { background: linear-gradient(135deg, $primary 0%, $secondary 100%); }
+        .hero { background: linear-gradient(135deg, $primary 0%, $secondary 100%); color: white; padding: 4rem 0; }
+        .card { border: none; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); transition: transform 0.3s; }
+        .card:hover { transform: translateY(-5px); }
+        .btn-primary { background: $primary; border-color: $primary; }
+        .btn-primary:hover { background: $secondary; border-color: $secondary; }
+        .post-content { line-height: 1.8; font-size: 1.1rem; }
+    </style>
+</head>
+<body>
+    <nav class="navbar navbar-expand-lg navbar-dark">
+        <div class="container">
+            <a class="navbar-brand" href="/"><i class="fas fa-blog me-2"></i>$site_title</a>
+            <div class="navbar-nav ms-auto">
+                <a class="nav-link" href="/">Home</a>
+            </div>
+        </div>
+    </nav>
+
+    <div class="hero text-center">
+        <div class="container">
+            <h1 class="display-4">$heading</h1>
+            <p class="lead">$subheading</p>
+        </div>
+    </div>
+
+    <div class="container mt-5">
+$main
+    </div>
+
+    <footer class="bg-dark text-white mt-5 py-4">
+        <div class="container text-center">
+            <p>&copy; $year $site_title. Powered by Google Sheets.</p>
+        </div>
+    </footer>
+
+    $scripts
+</body>
+</html>
+"""
+
+POST_MAIN = """        <div class="row">
+            <div class="col-lg-8 mx-auto">
+                $image
+                <div class="post-content">
+                    $content
+                </div>
+
+                <div class="mt-4">
+                    <h6>Tags:</h6>
+                    $tags
+                </div>
+$related
+
+                <div class="mt-4">
+                    <a href="/" class="btn btn-outline-primary">
+                        <i class="fas fa-arrow-left me-2"></i>Back to Blog
+                    </a>
+                </div>
+            </div>
+        </div>"""
+
+CARD = """            <div class="col-md-6 col-lg-4 mb-4">
+                <div class="card h-100">
+                    $image
+                    <div class="card-body">
+                        <h5 class="card-title"><a href="$url" class="text-decoration-none">$title</a></h5>
+                        <p class="card-text">$excerpt</p>
+                        <div class="d-flex justify-content-between align-items-center">
+                            <small class="text-muted">$category • $date</small>
+                            <a href="$url" class="btn btn-primary btn-sm">Read More</a>
+                        </div>
+                    </div>
+                </div>
+            </div>"""
+
+
+def escape(value):
+    return html.escape(str(value or ''), quote=True)
+
+
+def post_url(post):
+    return f"/post/{quote(str(post.get('slug') or post.get('id') or ''), safe='')}/"
+
+
+def listing_url(base, page):
+    """URL of page N of a listing; page 1 lives at the listing root"""
+    return base if page == 1 else f"{base}page/{page}/"
+
+
+def category_base(category):
+    return f"/category/{slugify(category or 'Uncategorized')}/"
+
+
+def tag_base(tag):
+    return f"/tag/{slugify(tag)}/"
+
+
+def picture_html(image, alt, sizes, css_class="img-fluid rounded", lazy=True):
+    """Responsive <picture> from the srcset data produced by the image pipeline"""
+    if not image:
+        return ''
+    sources = ''.join(
+        f'<source type="{escape(source["type"])}" srcset="{escape(source["srcset"])}" sizes="{escape(sizes)}">'
+        for source in image.get("sources", [])
+    )
+    loading = ' loading="lazy"' if lazy else ''
+    return (f'<picture>{sources}<img src="{escape(image["src"])}" width="{image["width"]}" '
+            f'height="{image["height"]}" alt="{escape(alt)}" class="{css_class}"{loading} decoding="async"></picture>')
+
+
+def compile_templates(config, assets=None):
+    """Substitute the site-wide values once and keep per-page templates
+
+    `assets` is asset_pipeline.build_page_assets() of the template sources;
+    without it the pages link the CDN copies.
+    """
+    colors = COLOR_SCHEMES.get(config.get('color_scheme'), COLOR_SCHEMES['Blue'])
+    assets = assets or cdn_assets(template_sources("site_render.py", "content_render.py"))
+    page = Template(PAGE_TEMPLATE).safe_substitute(
+        # The page is a Template again, so a literal $ in the CSS has to stay one
+        styles=assets["styles"].replace('$', '$$').replace('\n', '\n    '),
+        scripts=assets["scripts"].replace('$', '$$'),
+        site_title=escape(config.get('blog_title', 'Blog')),
+        primary=colors['primary'],
+        secondary=colors['secondary'],
+        year=datetime.now().year
+    )
+    return {
+        "page": Template(page),
+        "post": Template(POST_MAIN),
+        "card": Template(CARD),
+        "blog_title": config.get('blog_title', 'Blog'),
+        "blog_description": config.get('blog_description', ''),
+        "blog_keywords": config.get('blog_keywords', ''),
+    }
+
+
+def related_html(related):
+    """Related posts block from the graph computed at ingestion"""
+    if not related:
+        return ''
+    items = ''.join(f'<li><a href="{escape(post_url(item))}">{escape(item.get("title"))}</a></li>' for item in related)
+    return f'                <div class="mt-4 related-posts"><h6>Related posts:</h6><ul>{items}</ul></div>'
+
+
+def render_post(templates, post):
+    """Full HTML page of one post"""
+    # content_html is rendered and sanitized at ingestion; older datasets only have the text
+    content = post.get('content_html') or escape(post.get('content')).replace('\n', '<br>')
+    reading = f" • {post['reading_time']} min read" if post.get('reading_time') else ''
+    tags = ''.join(f'<a href="{tag_base(tag)}" class="badge bg-primary me-1 text-decoration-none">{escape(tag)}</a>'
+                   for tag in split_tags(post.get('tags')))
+    image = post.get('image')
+    main = templates["post"].substitute(
+        image=f'<div class="mb-4">{picture_html(image, post.get("title"), "(min-width: 992px) 856px, 100vw", lazy=False)}</div>' if image else '',
+        content=toc_html(post.get('toc') or []) + content,
+        tags=tags,
+        related=related_html(post.get('related'))
+    )
+    return templates["page"].substitute(
+        title=f"{escape(post.get('title'))} - {escape(templates['blog_title'])}",
+        description=escape(post.get('meta_description') or (post.get('content') or '')[:160]),
+        keywords=escape(post.get('tags')),
+        heading=escape(post.get('title')),
+        subheading=f"{escape(post.get('category') or 'Uncategorized')} • {escape(post.get('date'))} • {escape(post.get('author') or 'Admin')}{reading}",
+        main=main
+    )
+
+
+def _pagination(base, page, total_pages, window=2):
+    """Pager with first/last and a window around the current page"""
+    if total_pages <= 1:
+        return ''
+    numbers = sorted({1, total_pages} | set(range(max(1, page - window), min(total_pages, page + window) + 1)))
+    items = []
+    if page > 1:
+        items.append(f'<li class="page-item"><a class="page-link" href="{listing_url(base, page - 1)}" rel="prev">&laquo;</a></li>')
+    previous = 0
+    for number in numbers:
+        if number - previous > 1:
+            items.append('<li class="page-item disabled"><span class="page-link">&hellip;</span></li>')
+        active = ' active' if number == page else ''
+        items.append(f'<li class="page-item{active}"><a class="page-link" href="{listing_url(base, number)}">{number}</a></li>')
+        previous = number
+    if page < total_pages:
+        items.append(f'<li class="page-item"><a class="page-link" href="{listing_url(base, page + 1)}" rel="next">&raquo;</a></li>')
+    return f'        <nav class="mt-4"><ul class="pagination justify-content-center">{"".join(items)}</ul></nav>'
+
+
+def render_listing(templates, heading, posts, base, page, total_pages):
+    """One page of a post listing (home, category or tag)"""
+    cards = []
+    for post in posts:
+        excerpt = post.get('excerpt') or (post.get('content') or '')[:150] + '...'
+        cards.append(templates["card"].substitute(
+            image=picture_html(post.get('image'), post.get('title'), "(min-width: 992px) 400px, (min-width: 768px) 50vw, 100vw", "card-img-top"),
+            url=escape(post_url(post)),
+            title=escape(post.get('title')),
+            excerpt=escape(excerpt),
+            category=escape(post.get('category') or 'Uncategorized'),
+            date=escape(post.get('date'))
+        ))
+    if not cards:
+        cards.append('            <div class="col-12 text-center"><p>No posts found.</p></div>')
+
+    main = '        <div class="row">\n' + '\n'.join(cards) + '\n        </div>\n' + _pagination(base, page, total_pages)
+    title = templates['blog_title'] if base == '/' else f"{heading} - {templates['blog_title']}"
+    if page > 1:
+        title = f"{title} - Page {page}"
+    return templates["page"].substitute(
+        title=escape(title),
+        description=escape(templates['blog_description']),
+        keywords=escape(templates['blog_keywords']),
+        heading=escape(heading),
+        subheading=escape(templates['blog_description'] if base == '/' else f"Page {page} of {total_pages}"),
+        main=main
+    )
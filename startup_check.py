@@ -0,0 +1,135 @@
+"""Measure the Streamlit app's cold start and per-view render time against a budget
+
+Runs in a fresh interpreter so nothing is imported yet, and in a scratch
+directory so the app's auto-saved config doesn't touch app_config.json:
+
+1. imports the app's top-level dependencies (streamlit and the blog modules),
+2. renders the first page with streamlit.testing's AppTest,
+3. switches to every view once and times each rerun,
+4. fails when the app imports a DEFERRED_IMPORTS module at the top level
+   instead of in the handler that needs it.
+
+Exits with status 1 when a measurement is over its budget, so it can gate CI.
+
+Usage:
+    python startup_check.py
+    python startup_check.py --import-budget 1500 --render-budget 1000 --view-budget 500
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_FILE = os.path.join(APP_DIR, "streamlit_app.py")
+
+# Budgets in milliseconds
+IMPORT_BUDGET = 1500
+RENDER_BUDGET = 1000
+VIEW_BUDGET = 500
+
+# Only some handlers need these, so the app imports them there
+DEFERRED_IMPORTS = ("requests", "random")
+
+
+def app_imports(app_file=APP_FILE):
+    """Top-level module names imported by the app, in order"""
+    with open(app_file, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    names = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            names.append(node.module)
+    return list(dict.fromkeys(names))
+
+
+def measure(app_file=APP_FILE, timeout=60):
+    """Timings in ms, taken in this (fresh) process: imports, first render, each view"""
+    import importlib
+
+    sys.path.insert(0, os.path.dirname(app_file))
+    started = time.perf_counter()
+    for name in app_imports(app_file):
+        importlib.import_module(name)
+    imports_ms = (time.perf_counter() - started) * 1000
+
+    from streamlit.testing.v1 import AppTest
+
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        app = AppTest.from_file(app_file, default_timeout=timeout)
+        started = time.perf_counter()
+        app.run()
+        render_ms = (time.perf_counter() - started) * 1000
+        errors = [str(e.value) for e in app.exception]
+
+        views = {}
+        for view in app.radio[0].options if app.radio else []:
+            started = time.perf_counter()
+            app.radio[0].set_value(view).run()
+            views[view] = round((time.perf_counter() - started) * 1000, 1)
+            errors.extend(f"{view}: {e.value}" for e in app.exception)
+
+    return {"imports_ms": round(imports_ms, 1), "render_ms": round(render_ms, 1), "views_ms": views,
+            "errors": errors, "eager_imports": [name for name in app_imports(app_file) if name in DEFERRED_IMPORTS]}
+
+
+def check(result, import_budget=IMPORT_BUDGET, render_budget=RENDER_BUDGET, view_budget=VIEW_BUDGET):
+    """Human-readable problems with a measurement, empty when within budget"""
+    problems = list(result["errors"])
+    for name in result.get("eager_imports", []):
+        problems.append(f"{name} is imported at the top of the app; import it where it is used")
+    if result["imports_ms"] > import_budget:
+        problems.append(f"imports took {result['imports_ms']}ms (budget {import_budget}ms)")
+    if result["render_ms"] > render_budget:
+        problems.append(f"first render took {result['render_ms']}ms (budget {render_budget}ms)")
+    for view, ms in result["views_ms"].items():
+        if ms > view_budget:
+            problems.append(f"{view} took {ms}ms (budget {view_budget}ms)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check the Streamlit app's startup time against a budget")
+    parser.add_argument('--app', default=APP_FILE, help="Streamlit script to measure")
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET, help="Import budget in ms")
+    parser.add_argument('--render-budget', type=float, default=RENDER_BUDGET, help="First render budget in ms")
+    parser.add_argument('--view-budget', type=float, default=VIEW_BUDGET, help="Budget per view switch in ms")
+    parser.add_argument('--json', action='store_true', help="Print the raw measurement as JSON")
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(os.path.abspath(args.app))))
+        return 0
+
+    # Measure in a fresh interpreter, so already-imported modules don't hide the cost
+    process = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', '--app', args.app],
+                             capture_output=True, text=True)
+    if process.returncode != 0:
+        print(process.stderr, file=sys.stderr)
+        return 1
+    result = json.loads(process.stdout.strip().splitlines()[-1])
+
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+    else:
+        print(f"{'imports':<24}{result['imports_ms']:8.1f} ms")
+        print(f"{'first render':<24}{result['render_ms']:8.1f} ms")
+        for view, ms in result['views_ms'].items():
+            print(f"{view:<24}{ms:8.1f} ms")
+
+    problems = check(result, args.import_budget, args.render_budget, args.view_budget)
+    for problem in problems:
+        print(f"FAIL: {problem}", file=sys.stderr)
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
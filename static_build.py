@@ -0,0 +1,182 @@
+"""Static site build that renders every page of a dataset across a process pool
+
+Usage:
+    python static_build.py --blog main --out dist/site --workers 8    # a blog of the app's workspace.db
+    python static_build.py --config app_config.json --dataset blog.blogds --out dist/site
+    python static_build.py --vendor-dir vendor --out dist/site    # Bootstrap and Font Awesome from disk
+
+Workers map the dataset file and compile the templates once in their pool
+initializer, so tasks only carry row numbers and each task writes its pages
+in one batch. Every listing page (home, category, tag and monthly archive)
+is also written as its JSON shard, api/list/<path>.json (see listing_shards.py).
+The pages inline their critical CSS and load the rest from assets/ (see
+asset_pipeline.py), written once before rendering.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from urllib.parse import unquote
+
+from asset_pipeline import build_page_assets, template_sources, write_assets
+from dataset_store import PostDataset
+from feeds import build_feeds
+from listing_shards import listing_groups, paginate, shard_body, shard_key
+from site_render import compile_templates, listing_url, post_url, render_listing, render_post
+from workspace import add_blog_arguments, resolve_blog, site_config
+
+POSTS_PER_TASK = 200
+LISTING_PAGES_PER_TASK = 50
+
+# Per-process state set up by the pool initializer
+_dataset = None
+_templates = None
+_out_dir = None
+
+
+def _init_worker(dataset_file, config, out_dir, assets=None):
+    global _dataset, _templates, _out_dir
+    _dataset = PostDataset(dataset_file)
+    _templates = compile_templates(config, assets)
+    _out_dir = out_dir
+
+
+def _output_path(out_dir, url):
+    """index.html of a page URL under out_dir; refuses URLs that resolve outside it"""
+    path = os.path.join(out_dir, *[unquote(part) for part in url.split('/') if part], 'index.html')
+    root = os.path.realpath(out_dir)
+    if os.path.commonpath([root, os.path.realpath(path)]) != root:
+        raise ValueError(f"{url} resolves outside {out_dir}")
+    return path
+
+
+def _shard_path(out_dir, key):
+    return os.path.join(out_dir, *key.split('/')) + '.json'
+
+
+def _write_pages(pages):
+    """Write a task's rendered pages in one batch; returns bytes written"""
+    written = 0
+    for path, page in pages:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = page.encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(data)
+        written += len(data)
+    return written
+
+
+def render_posts_task(rows):
+    """Render and write the post pages of a chunk of rows"""
+    pages = []
+    for row in rows:
+        post = _dataset.row(row)
+        pages.append((_output_path(_out_dir, post_url(post)), render_post(_templates, post)))
+    return len(pages), _write_pages(pages)
+
+
+def render_listings_task(listings):
+    """Render and write listing pages given as (heading, base, page, total_pages, rows), with their shards"""
+    files = []
+    for heading, base, page, total_pages, rows in listings:
+        posts = [_dataset.row(row) for row in rows]
+        url = listing_url(base, page)
+        files.append((_output_path(_out_dir, url), render_listing(_templates, heading, posts, base, page, total_pages)))
+        files.append((_shard_path(_out_dir, shard_key(url)), shard_body(heading, base, page, total_pages, posts)))
+    return len(listings), _write_pages(files)
+
+
+def plan_build(dataset, blog_title, posts_per_page):
+    """Split the build into small picklable tasks of row numbers"""
+    groups = listing_groups(dataset.column('status'), dataset.column('date'), dataset.column('category'),
+                            dataset.column('tags'), blog_title)
+    published = groups["/"][1]
+    listings = paginate(groups, posts_per_page)
+
+    post_tasks = [published[i:i + POSTS_PER_TASK] for i in range(0, len(published), POSTS_PER_TASK)]
+    listing_tasks = [listings[i:i + LISTING_PAGES_PER_TASK] for i in range(0, len(listings), LISTING_PAGES_PER_TASK)]
+    return post_tasks, listing_tasks
+
+
+def _pool_context():
+    # Never fork a threaded parent such as the Streamlit server
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def build_static_site(dataset_file, out_dir, config, workers=None, progress=None, vendor_dir=None):
+    """Render the home, post, category, tag and archive pages of a dataset into out_dir, plus shards, sitemaps and feeds"""
+    started = time.perf_counter()
+    workers = workers or os.cpu_count() or 1
+    posts_per_page = int(config.get('posts_per_page') or 6)
+
+    with PostDataset(dataset_file) as dataset:
+        post_tasks, listing_tasks = plan_build(dataset, config.get('blog_title', 'Blog'), posts_per_page)
+    tasks = [(render_posts_task, rows) for rows in post_tasks] + [(render_listings_task, pages) for pages in listing_tasks]
+
+    assets = build_page_assets(template_sources("site_render.py", "content_render.py"), vendor_dir=vendor_dir)
+    asset_files = write_assets(assets, os.path.join(out_dir, "assets"))
+    # Workers only need the HTML; the file bytes stay here
+    page_assets = {"styles": assets["styles"], "scripts": assets["scripts"]}
+
+    pages = 0
+    written = 0
+    if workers == 1:
+        _init_worker(dataset_file, config, out_dir, page_assets)
+        for done, (func, arg) in enumerate(tasks, start=1):
+            count, size = func(arg)
+            pages += count
+            written += size
+            if progress:
+                progress(done, len(tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                 initializer=_init_worker, initargs=(dataset_file, config, out_dir, page_assets)) as pool:
+            futures = [pool.submit(func, arg) for func, arg in tasks]
+            for done, future in enumerate(as_completed(futures), start=1):
+                count, size = future.result()
+                pages += count
+                written += size
+                if progress:
+                    progress(done, len(tasks))
+
+    # Sitemaps and feeds need absolute URLs, so only with a site_url
+    feeds = []
+    if config.get('site_url'):
+        with PostDataset(dataset_file) as dataset:
+            feeds = build_feeds(dataset, out_dir, config)["files"]
+
+    return {
+        "pages": pages,
+        "bytes": written,
+        "tasks": len(tasks),
+        "workers": workers,
+        "feeds": feeds,
+        "assets": asset_files,
+        "critical_css_bytes": assets["critical_bytes"],
+        "seconds": round(time.perf_counter() - started, 3)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the blog as static HTML pages")
+    add_blog_arguments(parser)
+    parser.add_argument('--out', default=os.path.join("dist", "site"))
+    parser.add_argument('--workers', type=int, default=None, help="Render processes (default: CPU count)")
+    parser.add_argument('--vendor-dir', help="Local copies of Bootstrap and Font Awesome, for offline builds")
+    args = parser.parse_args(argv)
+
+    try:
+        _, profile, dataset_file = resolve_blog(args)
+    except ValueError as e:
+        parser.error(str(e))
+
+    summary = build_static_site(dataset_file, args.out, site_config(profile), workers=args.workers, vendor_dir=args.vendor_dir)
+    print(json.dumps(summary, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
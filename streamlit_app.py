@@ -1,9 +1,21 @@
 import streamlit as st
-import requests
 import json
 import os
 from datetime import datetime
 import re
+import uuid
+from asset_pipeline import assets_zip
+from blog_data import fetch_sheet_csv_with_status
+from cloudflare_api import CloudflareError, upload_worker_modules
+from content_render import render_posts
+from dataset_store import PostDataset, write_dataset
+from generators import (calculate_stats, generate_cloudflare_worker_modules, generate_deployment_guide,
+                        generate_html_template, get_demo_data, html_template_assets)
+from jobs import JobManager
+from related_posts import add_related_posts
+from resilience import CircuitOpenError
+from workspace import (Workspace, blog_dataset_path, build_blog, check_blog, deploy_blog, fetch_blog, generate_blog,
+                       index_blog, run_all)
 
 # Page configuration
 st.set_page_config(
@@ -13,8 +25,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Configuration file path
+# Single-blog configuration file, imported as the first blog of a new workspace
 CONFIG_FILE = "app_config.json"
+SECRET_KEYS = ("sheets_api_key", "cf_api_token", "gsc_client_secret", "gsc_refresh_token", "ai_api_key", "webhook_secret")
 
 # Load saved configuration
 def load_config():
@@ -26,16 +39,71 @@ def load_config():
             return {}
     return {}
 
-# Save configuration
-def save_config(config):
+# Blog profiles, one row per blog in the workspace database
+@st.cache_resource
+def get_workspace():
+    workspace = Workspace()
+    if not workspace.ids():
+        workspace.save(load_config().get("kv_worker_name") or "default", load_config())
+    return workspace
+
+workspace = get_workspace()
+
+# Save configuration of one blog
+def save_config(blog_id, config):
     try:
-        with open(CONFIG_FILE, 'w') as f:
-            json.dump(config, f, indent=2)
+        workspace.save(blog_id, config)
     except Exception as e:
         st.error(f"Error saving configuration: {e}")
 
-# Load existing configuration
-config = load_config()
+def add_blog():
+    new_blog_id = st.session_state.new_blog_id.strip()
+    if new_blog_id and workspace.get(new_blog_id) is None:
+        workspace.save(new_blog_id, {})
+        st.session_state.blog_id = new_blog_id
+    st.session_state.new_blog_id = ""
+
+# Memory-mapped dataset, reopened only when ingestion rewrote the file
+@st.cache_resource(max_entries=4)
+def open_post_dataset(path, mtime):
+    return PostDataset(path)
+
+def get_post_dataset(path):
+    if not os.path.exists(path):
+        return None
+    return open_post_dataset(path, os.path.getmtime(path))
+
+# Background jobs, shared by every session; each session remembers its own job per action
+@st.cache_resource
+def get_job_manager():
+    return JobManager(max_workers=4)
+
+job_manager = get_job_manager()
+session_id = st.session_state.setdefault("session_id", uuid.uuid4().hex[:8])
+
+def start_job(slot, kind, label, fn, *args, **kwargs):
+    job = job_manager.submit(kind, label, fn, *args, owner=session_id, **kwargs)
+    st.session_state[f"job_{slot}"] = job.id
+    return job
+
+@st.fragment(run_every=1)
+def poll_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"⏳ {job.label}: {job.message or job.status} ({job.seconds}s)")
+
+def finished_job(slot):
+    """This session's job for `slot`: shows its progress while it runs, returns it once finished"""
+    job_id = st.session_state.get(f"job_{slot}")
+    job = job_manager.get(job_id) if job_id else None
+    if job is None:
+        return None
+    if not job.finished:
+        poll_job(job_id)
+        return None
+    return job
+
 
 # Custom CSS
 st.markdown("""
@@ -88,12 +156,27 @@ st.markdown("<p style='text-align: center; color: #64748b;'>Generate HTML blog t
 # Sidebar configuration
 st.sidebar.header("⚙️ Configuration")
 
+# Pick the blog to work on; only its profile is loaded
+blog_ids = workspace.ids()
+if st.session_state.get("blog_id") not in blog_ids:
+    st.session_state.blog_id = blog_ids[0]
+blog_id = st.sidebar.selectbox("🗂️ Blog", blog_ids, key="blog_id")
+with st.sidebar.expander("➕ Add Blog"):
+    st.text_input("Blog ID", key="new_blog_id", help="Short unique name, e.g. the snapshot worker name")
+    st.button("Add Blog", on_click=add_blog)
+
+# Load existing configuration
+config = workspace.get(blog_id) or {}
+dataset_file = blog_dataset_path(blog_id, config)
+
 # Google Sheets Configuration (Direct Connection - No API Key Required)
 with st.sidebar.expander("📊 Google Sheets Settings", expanded=True):
     st.info("🔥 Direct connection - No API key required!")
     spreadsheet_id = st.text_input("Spreadsheet ID", value=config.get("spreadsheet_id", "14K69q8SMd3pCAROB1YQMDrmuw8y6QphxAslF_y-3NrM"), help="The ID of your Google Sheets")
     sheet_name = st.text_input("Sheet Name", value=config.get("sheet_name", "WEBSITE"), help="Name of the sheet to read from")
     st.markdown("**Note:** Spreadsheet must be set to public/editor access")
+    sheets_api_key = st.text_input("Sheets API Key (optional)", type="password", value=config.get("sheets_api_key", ""), help="With a Google Sheets API v4 key, ingestion only downloads new and changed rows")
+    webhook_secret = st.text_input("Webhook Secret (optional)", type="password", value=config.get("webhook_secret", ""), help="Shared with WEBHOOK_SECRET in Apps Script; the sync daemon then applies signed row changes as they happen")
 
 # Cloudflare Workers AI Configuration
 with st.sidebar.expander("☁️ Cloudflare Workers AI Settings"):
@@ -124,15 +207,43 @@ with st.sidebar.expander("☁️ Cloudflare Workers AI Settings"):
     worker_name_prefix = st.text_input("Worker Name Prefix", value=config.get("worker_name_prefix", "blog"), help="Prefix for worker name")
     auto_generate_name = st.checkbox("Auto-generate available name", value=config.get("auto_generate_name", True), help="Automatically generate available worker name")
     
+    # Workers KV snapshot options
+    kv_worker_name = st.text_input("Snapshot Worker Name", value=config.get("kv_worker_name", f"{worker_name_prefix}-kv"), help="Worker that serves the snapshot published to Workers KV")
+    kv_namespace_id = st.text_input("KV Namespace ID", value=config.get("kv_namespace_id", ""), help="Leave empty to create/reuse a namespace named after the worker")
+    cf_zone_id = st.text_input("Zone ID (optional)", value=config.get("cf_zone_id", ""), help="Zone serving the Site URL; the sync daemon then purges only the cached URLs a row change affects (token needs Cache Purge)")
+    
     # Show save status for Cloudflare settings
     if cf_api_token and cf_account_id:
         st.success("✅ Cloudflare settings saved")
     elif cf_api_token or cf_account_id:
         st.warning("⚠️ Cloudflare settings incomplete")
 
+# Blog Configuration
+with st.sidebar.expander("📝 Blog Settings", expanded=True):
+    blog_title = st.text_input("Blog Title", value=config.get("blog_title", "Blog Sederhana"), help="Title of your blog")
+    blog_description = st.text_area("Blog Description", value=config.get("blog_description", "Platform blog yang terhubung dengan Google Sheets"), help="Description of your blog")
+    blog_keywords = st.text_input("Keywords", value=config.get("blog_keywords", "blog, artikel, google sheets"), help="SEO keywords")
+    posts_per_page = st.number_input("Posts per Page", min_value=1, max_value=20, value=config.get("posts_per_page", 6))
+    site_url = st.text_input("Site URL", value=config.get("site_url", ""), help="Public address of the blog, used for sitemap.xml, rss.xml and atom.xml")
+    image_base_url = st.text_input("Image Base URL", value=config.get("image_base_url", "/images"), help="Where the processed featured images are served from")
+
+# Search Console / Indexing API credentials
+with st.sidebar.expander("🔎 Search Indexing Settings"):
+    gsc_client_id = st.text_input("OAuth Client ID", value=config.get("gsc_client_id", ""))
+    gsc_client_secret = st.text_input("OAuth Client Secret", value=config.get("gsc_client_secret", ""), type="password")
+    gsc_refresh_token = st.text_input("Refresh Token", value=config.get("gsc_refresh_token", ""), type="password", help="Of a Google account that owns the site in Search Console; AI generation also needs the spreadsheets scope to write back")
+    indexing_status_sheet = st.text_input("Status Sheet", value=config.get("indexing_status_sheet", ""), help="Tab to write the submission status table to, e.g. WEBSITE; leave empty to skip")
+
+# Chat completion API used to fill in empty articles and meta descriptions
+with st.sidebar.expander("🤖 AI Generation Settings"):
+    ai_api_key = st.text_input("AI API Key", value=config.get("ai_api_key", ""), type="password", help="Key of an OpenAI-compatible chat completion API")
+    ai_api_base = st.text_input("AI API Base URL", value=config.get("ai_api_base", ""), help="Leave empty for https://api.openai.com/v1")
+    ai_model = st.text_input("AI Model", value=config.get("ai_model", "gpt-3.5-turbo"))
+    ai_concurrency = st.number_input("Requests in Flight", min_value=1, max_value=32, value=config.get("ai_concurrency", 4), help="Upper bound; lowered automatically while the API rate limits")
+
 # Auto-save indicator dengan detail
-if os.path.exists(CONFIG_FILE):
-    st.sidebar.success("🔄 Auto-save aktif - Semua pengaturan tersimpan otomatis")
+if config:
+    st.sidebar.success(f"🔄 Auto-save aktif - Semua pengaturan `{blog_id}` tersimpan otomatis")
     
     # Show detailed save status
     with st.sidebar.expander("💾 Status Penyimpanan", expanded=False):
@@ -156,25 +267,33 @@ if os.path.exists(CONFIG_FILE):
 else:
     st.sidebar.info("📝 Pengaturan akan tersimpan otomatis")
 
-# Blog Configuration
-with st.sidebar.expander("📝 Blog Settings", expanded=True):
-    blog_title = st.text_input("Blog Title", value=config.get("blog_title", "Blog Sederhana"), help="Title of your blog")
-    blog_description = st.text_area("Blog Description", value=config.get("blog_description", "Platform blog yang terhubung dengan Google Sheets"), help="Description of your blog")
-    blog_keywords = st.text_input("Keywords", value=config.get("blog_keywords", "blog, artikel, google sheets"), help="SEO keywords")
-    posts_per_page = st.number_input("Posts per Page", min_value=1, max_value=20, value=config.get("posts_per_page", 6))
-
 # Auto-save configuration when values change
 current_config = {
     "spreadsheet_id": spreadsheet_id,
     "sheet_name": sheet_name,
+    "sheets_api_key": sheets_api_key,
+    "webhook_secret": webhook_secret,
     "cf_api_token": cf_api_token,
     "cf_account_id": cf_account_id,
     "worker_name_prefix": worker_name_prefix,
     "auto_generate_name": auto_generate_name,
+    "kv_worker_name": kv_worker_name,
+    "kv_namespace_id": kv_namespace_id,
+    "cf_zone_id": cf_zone_id,
     "blog_title": blog_title,
     "blog_description": blog_description,
     "blog_keywords": blog_keywords,
-    "posts_per_page": posts_per_page
+    "posts_per_page": posts_per_page,
+    "image_base_url": image_base_url,
+    "site_url": site_url,
+    "gsc_client_id": gsc_client_id,
+    "gsc_client_secret": gsc_client_secret,
+    "gsc_refresh_token": gsc_refresh_token,
+    "indexing_status_sheet": indexing_status_sheet,
+    "ai_api_key": ai_api_key,
+    "ai_api_base": ai_api_base,
+    "ai_model": ai_model,
+    "ai_concurrency": ai_concurrency
 }
 
 # Save configuration if changed
@@ -194,17 +313,208 @@ if current_config != config:
             elif key in ["blog_title", "blog_description", "blog_keywords"]:
                 changed_keys.append(f"Blog {key.replace('_', ' ').title()}")
     
-    save_config(current_config)
+    save_config(blog_id, current_config)
     config = current_config
+    dataset_file = blog_dataset_path(blog_id, config)
     
     # Show notification if something important was saved
     if changed_keys:
         st.sidebar.success(f"💾 Tersimpan: {', '.join(changed_keys)}")
 
-# Main content area
-tab1, tab2, tab3, tab4 = st.tabs(["🏠 Dashboard", "📝 Template Generator", "🚀 Deploy", "📊 Preview"])
+# Jobs from every operator of this app
+with st.sidebar.expander("⏳ Background Jobs"):
+    recent_jobs = job_manager.list()[:10]
+    if not recent_jobs:
+        st.write("No jobs yet")
+    for job in recent_jobs:
+        mine = " (you)" if job.owner == session_id else ""
+        st.write(f"**{job.label}**{mine} - {job.status}, {job.seconds}s")
+    if st.button("🔄 Refresh Jobs"):
+        st.rerun()
+
+# Background job functions: plain arguments in, result dict out, no Streamlit calls.
+# Modules only a job needs are imported inside it, so they don't slow down the first page load.
+def blog_lock(blog_id):
+    return f"blog:{blog_id}"
 
-with tab1:
+def test_sheets_job(spreadsheet_id, sheet_name, progress):
+    csv_data, stale_since = fetch_sheet_csv_with_status(spreadsheet_id, sheet_name)
+    lines = csv_data.split('\n')
+    return {"rows": len(lines), "first_rows": lines[:5], "stale_since": stale_since}
+
+def test_cloudflare_job(cf_api_token, cf_account_id, progress):
+    import requests
+
+    headers = {
+        'Authorization': f'Bearer {cf_api_token}',
+        'Content-Type': 'application/json'
+    }
+
+    # First verify the token is valid
+    verify_url = "https://api.cloudflare.com/client/v4/user/tokens/verify"
+    verify_response = requests.get(verify_url, headers=headers, timeout=30)
+    result = {"verify_status": verify_response.status_code, "verify": verify_response.json()}
+    if verify_response.status_code != 200 or not result["verify"].get('success'):
+        return result
+
+    # Try to list workers (this requires Workers:Edit permission)
+    progress(1, 2, "Listing workers...")
+    workers_url = f"https://api.cloudflare.com/client/v4/accounts/{cf_account_id}/workers/scripts"
+    workers_response = requests.get(workers_url, headers=headers, timeout=30)
+    result["workers_status"] = workers_response.status_code
+    result["workers"] = workers_response.json()
+    return result
+
+def list_workers_job(cf_api_token, cf_account_id, progress):
+    import requests
+
+    headers = {
+        'Authorization': f'Bearer {cf_api_token}',
+        'Content-Type': 'application/json'
+    }
+    list_url = f"https://api.cloudflare.com/client/v4/accounts/{cf_account_id}/workers/scripts"
+    response = requests.get(list_url, headers=headers, timeout=30)
+    return {"status": response.status_code, "data": response.json()}
+
+def ingest_job(blog_id, profile, progress):
+    return fetch_blog(blog_id, profile)
+
+def static_build_job(blog_id, profile, output_dir, workers, progress):
+    progress(0, 1, "Ingesting spreadsheet...")
+    fetch_blog(blog_id, profile)
+    return build_blog(blog_id, profile, output_dir, workers=workers,
+                      progress=lambda done, total: progress(done, total, f"Rendered {done}/{total} batches"))
+
+def featured_images_job(blog_id, profile, output_dir, base_url, progress):
+    from image_pipeline import ImagePipeline, attach_images, image_manifest_path
+    
+    progress(0, 1, "Ingesting spreadsheet...")
+    path = fetch_blog(blog_id, profile)["dataset"]
+    with PostDataset(path) as post_dataset:
+        posts = list(post_dataset)
+    pipeline = ImagePipeline(output_dir, base_url=base_url)
+    manifest, summary = pipeline.run(
+        [post.get('featured_image') for post in posts], image_manifest_path(path),
+        progress=lambda done, total: progress(done, total, f"Processed {done}/{total} images")
+    )
+    # Later ingests attach the manifest themselves; this one already happened
+    write_dataset(path, attach_images(posts, manifest))
+    summary["formats"] = list(pipeline.formats)
+    return summary
+
+def deploy_job(cf_api_token, cf_account_id, worker_name, worker_config, progress):
+    progress(0, 1, f"Uploading {worker_name}...")
+    modules = generate_cloudflare_worker_modules(worker_config)
+    # Bindings go up with the modules, so the Worker never runs without them
+    bindings = [
+        {"type": "plain_text", "name": "SPREADSHEET_ID", "text": worker_config.get("spreadsheetId", "")},
+        {"type": "plain_text", "name": "SHEET_NAME", "text": worker_config.get("sheetName", "")}
+    ]
+    try:
+        data = upload_worker_modules(cf_account_id, cf_api_token, worker_name, modules, bindings=bindings)
+        status = 200
+    except CloudflareError as e:
+        status, data = e.status_code, {"success": False, "errors": e.errors or [{"message": str(e)}]}
+    return {"worker_name": worker_name, "status": status, "data": data}
+
+def kv_publish_job(blog_id, profile, progress):
+    progress(0, 1, "Ingesting spreadsheet...")
+    fetch_blog(blog_id, profile)
+    return deploy_blog(blog_id, profile,
+                       progress=lambda done, total: progress(done, total, f"Wrote {done}/{total} keys"))
+
+def indexing_job(blog_id, profile, dry_run, progress):
+    progress(0, 1, "Ingesting spreadsheet...")
+    fetch_blog(blog_id, profile)
+    return index_blog(blog_id, profile, progress=progress, dry_run=dry_run)
+
+def generate_job(blog_id, profile, task, dry_run, progress):
+    progress(0, 1, "Ingesting spreadsheet...")
+    fetch_blog(blog_id, profile)
+    summary = generate_blog(blog_id, profile, progress=progress, task=task, dry_run=dry_run)
+    if summary["written"]:
+        # Pick up what was just written to the sheet
+        progress(1, 1, "Ingesting spreadsheet...")
+        fetch_blog(blog_id, profile)
+    return summary
+
+def quality_job(blog_id, profile, refresh, write_back, progress):
+    if refresh or not os.path.exists(blog_dataset_path(blog_id, profile)):
+        progress(0, 1, "Ingesting spreadsheet...")
+        fetch_blog(blog_id, profile)
+    progress(1, 1, "Checking data quality...")
+    return check_blog(blog_id, profile, write_back=write_back)
+
+def bulk_job(operation, concurrency, progress):
+    return run_all(workspace, operation, concurrency=concurrency, progress=progress)
+
+# Preview posts and statistics; "Refresh Preview" reruns just this fragment, not the page
+@st.cache_data(max_entries=8)
+def dataset_stats(path, mtime):
+    with PostDataset(path) as post_dataset:
+        return post_dataset.stats()
+
+@st.fragment
+def preview_panel(dataset_file, sheet_name):
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        st.markdown("### 🖥️ Blog Preview")
+        
+        # Preview the ingested dataset when there is one, demo data otherwise
+        post_dataset = get_post_dataset(dataset_file)
+        if post_dataset is not None:
+            st.caption(f"{len(post_dataset)} posts from the last ingest of `{sheet_name}`")
+            preview_posts = [post_dataset.row(i) for i in range(min(3, len(post_dataset)))]
+        else:
+            st.caption("Demo data - ingest the sheet to preview real posts")
+            preview_posts = add_related_posts(render_posts(get_demo_data()))[:3]
+        
+        # Display preview
+        st.markdown("#### Sample Blog Posts")
+        for post in preview_posts:
+            with st.container():
+                st.markdown(f"**{post.get('title', '')}**")
+                reading = f" • {post['reading_time']} min read" if post.get('reading_time') else ''
+                st.markdown(f"*{post.get('category', '')} • {post.get('date', '')} • {post.get('author', '')}{reading}*")
+                st.markdown(post.get('excerpt') or f"{post.get('content', '')[:200]}...")
+                if post.get('content_html'):
+                    with st.expander("Rendered content"):
+                        # Sanitized by content_render at ingestion
+                        st.markdown(post['content_html'], unsafe_allow_html=True)
+                st.markdown(f"**Tags:** {post.get('tags', '')}")
+                if post.get('related'):
+                    st.markdown("**Related:** " + ", ".join(item['title'] for item in post['related']))
+                st.markdown("---")
+    
+    with col2:
+        st.markdown("### 📊 Statistics")
+        
+        # Display statistics
+        if post_dataset is not None:
+            stats = dataset_stats(dataset_file, os.path.getmtime(dataset_file))
+            stats = {
+                'total_posts': stats['totalPosts'],
+                'categories': stats['totalCategories'],
+                'tags': stats['totalTags']
+            }
+        else:
+            stats = calculate_stats(preview_posts)
+        st.metric("Total Posts", stats['total_posts'])
+        st.metric("Categories", stats['categories'])
+        st.metric("Tags", stats['tags'])
+        
+        # Any click inside the fragment reruns only the fragment
+        st.button("🔄 Refresh Preview")
+
+# Main content area: only the selected view runs, st.tabs would execute all four on every rerun
+VIEWS = ["🏠 Dashboard", "📝 Template Generator", "🚀 Deploy", "📊 Preview"]
+if st.query_params.get("view") not in VIEWS:
+    st.query_params["view"] = VIEWS[0]
+view = st.radio("View", VIEWS, index=VIEWS.index(st.query_params["view"]), horizontal=True, label_visibility="collapsed")
+st.query_params["view"] = view
+
+if view == "🏠 Dashboard":
     st.header("📊 Dashboard")
     
     col1, col2 = st.columns(2)
@@ -215,44 +525,26 @@ with tab1:
             if not spreadsheet_id:
                 st.error("Please provide Spreadsheet ID")
             else:
-                try:
-                    # Try direct connection (no API key needed)
-                    st.info("Testing direct connection...")
-                    
-                    # Try multiple URL formats
-                    urls = [
-                        f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv&gid=0",
-                        f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv",
-                        f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/gviz/tq?tqx=out:csv"
-                    ]
-                    
-                    success = False
-                    for url in urls:
-                        try:
-                            csv_response = requests.get(url)
-                            if csv_response.status_code == 200 and not csv_response.text.startswith('<!DOCTYPE'):
-                                csv_data = csv_response.text
-                                lines = csv_data.split('\n')
-                                
-                                st.success(f"✅ Direct connection successful! Found {len(lines)} rows")
-                                
-                                if lines:
-                                    st.markdown("**First 5 rows:**")
-                                    for i, line in enumerate(lines[:5]):
-                                        st.write(f"Row {i+1}: {line}")
-                                success = True
-                                break
-                        except Exception as e:
-                            continue
-                    
-                    if not success:
-                        st.error("❌ Direct connection failed - make sure spreadsheet is public/editor access")
-                        
-                        # Remove API key fallback - not needed anymore
-                        st.info("Make sure your Google Sheets is set to public or editor access")
-                            
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
+                # Direct connection (no API key needed), through the shared Google breaker
+                start_job("test_sheets", "test_sheets", "Testing Google Sheets connection",
+                          test_sheets_job, spreadsheet_id, sheet_name)
+        
+        job = finished_job("test_sheets")
+        if job and isinstance(job.error, CircuitOpenError):
+            st.error(f"❌ Google Sheets is failing and no previous copy is available: {str(job.error)}")
+        elif job and job.error:
+            st.error(f"❌ Direct connection failed - make sure spreadsheet is public/editor access: {str(job.error)}")
+        elif job:
+            if job.result['stale_since']:
+                st.warning(f"⚠️ Google Sheets is not responding - showing the last good copy from "
+                           f"{datetime.fromtimestamp(job.result['stale_since']).strftime('%Y-%m-%d %H:%M')}")
+            else:
+                st.success(f"✅ Direct connection successful! Found {job.result['rows']} rows")
+            
+            if job.result['first_rows']:
+                st.markdown("**First 5 rows:**")
+                for i, line in enumerate(job.result['first_rows']):
+                    st.write(f"Row {i+1}: {line}")
     
     with col2:
         st.markdown("### ☁️ Cloudflare Workers AI Status")
@@ -260,75 +552,160 @@ with tab1:
             if not cf_api_token or not cf_account_id:
                 st.error("Please provide Cloudflare Workers AI API Token and Account ID")
             else:
-                try:
-                    # Test connection to Cloudflare token first
-                    headers = {
-                        'Authorization': f'Bearer {cf_api_token}',
-                        'Content-Type': 'application/json'
-                    }
-                    
-                    # First verify the token is valid
-                    verify_url = "https://api.cloudflare.com/client/v4/user/tokens/verify"
-                    verify_response = requests.get(verify_url, headers=headers)
+                start_job("test_cloudflare", "test_cloudflare", "Testing Cloudflare connection",
+                          test_cloudflare_job, cf_api_token, cf_account_id)
+        
+        job = finished_job("test_cloudflare")
+        if job and job.error:
+            st.error(f"❌ Error: {str(job.error)}")
+            st.markdown("""
+            **Common Issues:**
+            - Check internet connection
+            - Verify API token format
+            - Ensure account ID is correct (32-character hex string)
+            """)
+        elif job:
+            result = job.result
+            if result['verify_status'] != 200:
+                st.error(f"❌ Token verification failed: {result['verify_status']}")
+                st.json(result['verify'])
+            elif not result['verify'].get('success'):
+                st.error("❌ Invalid API token")
+            else:
+                st.success("✅ API Token is valid and active")
+                
+                if result['workers_status'] == 200:
+                    workers = result['workers'].get('result', [])
+                    st.success(f"✅ Connected to Cloudflare Workers! Found {len(workers)} workers")
                     
-                    if verify_response.status_code == 200:
-                        verify_data = verify_response.json()
-                        if verify_data.get('success'):
-                            st.success("✅ API Token is valid and active")
-                            
-                            # Try to list workers (this requires Workers:Edit permission)
-                            workers_url = f"https://api.cloudflare.com/client/v4/accounts/{cf_account_id}/workers/scripts"
-                            workers_response = requests.get(workers_url, headers=headers)
-                            
-                            if workers_response.status_code == 200:
-                                workers_data = workers_response.json()
-                                workers = workers_data.get('result', [])
-                                st.success(f"✅ Connected to Cloudflare Workers! Found {len(workers)} workers")
-                                
-                                if workers:
-                                    st.markdown("**Existing Workers:**")
-                                    for worker in workers[:5]:
-                                        st.write(f"- {worker.get('id', 'Unknown')}")
-                                else:
-                                    st.info("No existing workers found - ready to deploy new ones!")
-                            else:
-                                st.warning(f"⚠️ Token valid but lacks Workers permission (Error {workers_response.status_code})")
-                                
-                                # Show detailed error and fix instructions
-                                if workers_response.status_code == 403:
-                                    st.error("**Permission Error:** Token needs Workers:Edit permission")
-                                    st.markdown("""
-                                    **✅ Create a new token with these EXACT settings:**
-                                    
-                                    **Permissions (Account level):**
-                                    - `Cloudflare Workers:Edit` (NOT "Workers AI"!)
-                                    - `Account:Read`
-                                    
-                                    **Account Resources:**
-                                    - Include: `All accounts` 
-                                    
-                                    **🚨 Common mistake:** "Workers AI" ≠ "Cloudflare Workers"
-                                    
-                                    [Create Token Now →](https://dash.cloudflare.com/profile/api-tokens)
-                                    """)
-                                else:
-                                    st.json(workers_response.json())
-                        else:
-                            st.error("❌ Invalid API token")
+                    if workers:
+                        st.markdown("**Existing Workers:**")
+                        for worker in workers[:5]:
+                            st.write(f"- {worker.get('id', 'Unknown')}")
                     else:
-                        st.error(f"❌ Token verification failed: {verify_response.status_code}")
-                        st.json(verify_response.json())
+                        st.info("No existing workers found - ready to deploy new ones!")
+                else:
+                    st.warning(f"⚠️ Token valid but lacks Workers permission (Error {result['workers_status']})")
+                    
+                    # Show detailed error and fix instructions
+                    if result['workers_status'] == 403:
+                        st.error("**Permission Error:** Token needs Workers:Edit permission")
+                        st.markdown("""
+                        **✅ Create a new token with these EXACT settings:**
+                        
+                        **Permissions (Account level):**
+                        - `Cloudflare Workers:Edit` (NOT "Workers AI"!)
+                        - `Account:Read`
+                        
+                        **Account Resources:**
+                        - Include: `All accounts` 
+                        
+                        **🚨 Common mistake:** "Workers AI" ≠ "Cloudflare Workers"
                         
-                except Exception as e:
-                    st.error(f"❌ Error: {str(e)}")
-                    st.markdown("""
-                    **Common Issues:**
-                    - Check internet connection
-                    - Verify API token format
-                    - Ensure account ID is correct (32-character hex string)
-                    """)
+                        [Create Token Now →](https://dash.cloudflare.com/profile/api-tokens)
+                        """)
+                    else:
+                        st.json(result['workers'])
+    
+    st.markdown("### 🤖 AI Content Generation")
+    st.caption("Fill in empty articles or meta descriptions with the AI API and write them back to the sheet; "
+               "responses are cached, so rerunning never pays twice for the same prompt")
+    ai_col1, ai_col2 = st.columns(2)
+    with ai_col1:
+        ai_task = st.radio("Generate", ["article", "meta"], horizontal=True,
+                           format_func=lambda task: "Articles" if task == "article" else "Meta descriptions")
+    with ai_col2:
+        ai_dry_run = st.checkbox("Dry run (only list the rows)", value=True)
+    if st.button("🤖 Generate Content"):
+        if not (spreadsheet_id and sheet_name):
+            st.error("Please provide Spreadsheet ID and Sheet Name")
+        elif not (gsc_refresh_token and gsc_client_id and gsc_client_secret):
+            st.error("Please provide the Google OAuth client and refresh token (Search Indexing Settings) to read and write the sheet")
+        elif not ai_dry_run and not ai_api_key:
+            st.error("Please provide the AI API key")
+        else:
+            start_job("ai_generate", "ai_generate", f"Generating {ai_task} for {blog_id}", generate_job,
+                      blog_id, current_config, ai_task, ai_dry_run,
+                      key=("ai_generate", blog_id, ai_task, ai_dry_run), locks=(blog_lock(blog_id),))
+    
+    job = finished_job("ai_generate")
+    if job and job.error:
+        st.error(f"❌ Generation failed: {str(job.error)}")
+    elif job:
+        summary = job.result
+        if "would_generate" in summary:
+            st.info(f"{summary['pending']} rows would be generated, {summary['cached']} of them from the cache")
+            if summary['would_generate']:
+                st.code("\n".join(summary['would_generate']), language="text")
+        else:
+            st.success(f"✅ Wrote {summary['written']} rows ({summary['generated']} generated, {summary['cached']} cached), "
+                       f"{summary['failed']} failed" + (f", rate limited {summary['throttled']} times" if summary['throttled'] else ""))
+            for error in summary.get('errors', []):
+                st.warning(error)
+    
+    st.markdown("### 🔍 Data Quality")
+    st.caption("Blank required fields, duplicate slugs and IDs, malformed dates, bad featured image URLs and "
+               "over-long meta descriptions, checked over the last ingest")
+    dq_col1, dq_col2 = st.columns(2)
+    with dq_col1:
+        dq_refresh = st.checkbox("Ingest the sheet first", value=False)
+    with dq_col2:
+        dq_write_back = st.checkbox("Color flagged cells in the sheet", value=False)
+    if st.button("🔍 Check Data Quality"):
+        if not (spreadsheet_id and sheet_name):
+            st.error("Please provide Spreadsheet ID and Sheet Name")
+        elif dq_write_back and not (gsc_refresh_token and gsc_client_id and gsc_client_secret):
+            st.error("Please provide the Google OAuth client and refresh token (Search Indexing Settings) to write to the sheet")
+        else:
+            start_job("data_quality", "data_quality", f"Checking data quality of {blog_id}", quality_job,
+                      blog_id, current_config, dq_refresh, dq_write_back,
+                      key=("data_quality", blog_id, dq_refresh, dq_write_back), locks=(blog_lock(blog_id),))
+    
+    job = finished_job("data_quality")
+    if job and job.error:
+        st.error(f"❌ Data quality check failed: {str(job.error)}")
+    elif job:
+        report = job.result
+        flagged = sum(issue['count'] for issue in report['issues'])
+        message = f"{report['rows']} rows checked in {report['elapsed_ms']} ms"
+        if flagged:
+            st.warning(f"⚠️ {flagged} issues found; {message}")
+        else:
+            st.success(f"✅ No issues found; {message}")
+        st.markdown("| Check | Rows | Examples |\n|---|---|---|\n" + "\n".join(
+            f"| {issue['label']} | {issue['count']} | {'; '.join(issue['examples']).replace('|', '/')} |"
+            for issue in report['issues']
+        ))
+        if "highlighted" in report:
+            st.info(f"Colored {report['highlighted']} cells in the sheet")
+    
+    st.markdown("### 🗂️ All Blogs")
+    # A markdown table: st.dataframe would pull pandas into the first render
+    st.markdown("| Blog | Spreadsheet | Sheet | Snapshot Worker |\n|---|---|---|---|\n" + "\n".join(
+        f"| {other_id} | {profile.get('spreadsheet_id', '')} | {profile.get('sheet_name', '')} | "
+        f"{profile.get('kv_worker_name', '')} |"
+        for other_id, profile in workspace.blogs()
+    ))
+    
+    bulk_col1, bulk_col2, bulk_col3, bulk_col4 = st.columns(4)
+    with bulk_col1:
+        bulk_concurrency = st.number_input("Blogs at once", min_value=1, max_value=32, value=4)
+    for column, operation, icon in ((bulk_col2, "fetch", "📥"), (bulk_col3, "build", "🏗️"), (bulk_col4, "deploy", "🚀")):
+        with column:
+            if st.button(f"{icon} {operation.title()} All"):
+                start_job("bulk", "bulk", f"{operation.title()} all ({len(blog_ids)} blogs)", bulk_job, operation, int(bulk_concurrency),
+                          key=("bulk", operation), locks=[blog_lock(other_id) for other_id in blog_ids])
+    
+    job = finished_job("bulk")
+    if job and job.error:
+        st.error(f"❌ Bulk operation failed: {str(job.error)}")
+    elif job:
+        failed = {other_id: outcome["error"] for other_id, outcome in job.result.items() if not outcome["ok"]}
+        st.success(f"✅ {job.label}: {len(job.result) - len(failed)} succeeded in {job.seconds}s")
+        for other_id, error in failed.items():
+            st.error(f"❌ {other_id}: {error}")
 
-with tab2:
+elif view == "📝 Template Generator":
     st.header("🎨 Template Generator")
     
     col1, col2 = st.columns([2, 1])
@@ -377,6 +754,72 @@ with tab2:
                 file_name=f"{template_type.lower().replace(' ', '_')}_template.html",
                 mime="text/html"
             )
+            # The template links its stylesheet, fonts and scripts under /assets/
+            template_assets = html_template_assets()
+            if template_assets["files"]:
+                st.download_button(
+                    label="📥 Download Assets (.zip)",
+                    data=assets_zip(template_assets),
+                    file_name="assets.zip",
+                    mime="application/zip"
+                )
+                st.caption(f"Unzip next to the template so /assets/ is served from the site root. "
+                           f"Critical CSS inlined: {template_assets['critical_bytes']:,} bytes")
+            else:
+                st.caption("Vendor files unavailable; the template links Bootstrap and Font Awesome from their CDNs")
+    
+        # Static site build
+        st.markdown("#### 🏗️ Static Site Build")
+        st.caption("Render every post, category and tag page of the ingested sheet to HTML files")
+        build_col1, build_col2 = st.columns(2)
+        with build_col1:
+            static_output_dir = st.text_input("Static Output Directory", value=os.path.join("dist", blog_id))
+        with build_col2:
+            build_workers = st.number_input("Render Processes", min_value=1, max_value=64, value=os.cpu_count() or 1)
+        if st.button("🏗️ Build Static Site"):
+            if not spreadsheet_id:
+                st.error("Please provide Spreadsheet ID")
+            else:
+                start_job("static_build", "static_build", f"Building static site of {blog_id}", static_build_job,
+                          blog_id, dict(current_config, color_scheme=color_scheme), static_output_dir, int(build_workers),
+                          key=("static_build", blog_id, os.path.abspath(static_output_dir)),
+                          locks=(blog_lock(blog_id), f"dir:{os.path.abspath(static_output_dir)}"))
+        
+        job = finished_job("static_build")
+        if job and job.error:
+            st.error(f"❌ Error building static site: {str(job.error)}")
+        elif job:
+            summary = job.result
+            st.success(f"✅ Rendered {summary['pages']} pages in {summary['seconds']}s with {summary['workers']} processes")
+            st.info(f"Output: `{static_output_dir}`")
+            if summary.get('feeds'):
+                st.caption("Feeds: " + ", ".join(f"`{name}`" for name in summary['feeds']))
+            else:
+                st.caption("Set the Site URL in Blog Settings to also write sitemap.xml, rss.xml and atom.xml")
+        
+        # Featured image pipeline
+        st.markdown("#### 🖼️ Featured Images")
+        st.caption("Download `featured_image` URLs and build responsive WebP/AVIF variants for the templates")
+        image_output_dir = st.text_input("Image Output Directory", value="dist/images")
+        if st.button("🖼️ Process Featured Images"):
+            if not spreadsheet_id:
+                st.error("Please provide Spreadsheet ID")
+            else:
+                start_job("featured_images", "featured_images", f"Processing featured images of {blog_id}",
+                          featured_images_job, blog_id, current_config, image_output_dir, image_base_url,
+                          key=("featured_images", blog_id, os.path.abspath(image_output_dir)),
+                          locks=(blog_lock(blog_id), f"dir:{os.path.abspath(image_output_dir)}"))
+        
+        job = finished_job("featured_images")
+        if job and job.error:
+            st.error(f"❌ Error processing images: {str(job.error)}")
+        elif job:
+            summary = job.result
+            st.success(f"✅ {summary['processed']} images processed, {summary['reused']} unchanged ({', '.join(summary['formats'])})")
+            if summary['failed']:
+                st.warning(f"⚠️ {summary['failed']} images failed")
+                st.json(summary['errors'])
+            st.info(f"Upload `{image_output_dir}` so it is served at `{image_base_url}`; files are content-addressed and safe to cache forever")
     
     with col2:
         st.markdown("### 📋 Template Preview")
@@ -394,7 +837,7 @@ with tab2:
         </div>
         """, unsafe_allow_html=True)
 
-with tab3:
+elif view == "🚀 Deploy":
     st.header("🚀 Deployment")
     
     col1, col2 = st.columns(2)
@@ -435,841 +878,199 @@ with tab3:
             elif not spreadsheet_id:
                 st.error("Please provide Spreadsheet ID")
             else:
-                try:
-                    with st.spinner("Deploying to Cloudflare Workers..."):
-                        # Import cloudflare manager (simulated)
-                        from datetime import datetime
-                        import random
-                        
-                        # Generate worker name
-                        if auto_generate_name:
-                            adjectives = ['amazing', 'brilliant', 'clever', 'dynamic', 'elegant', 'fantastic']
-                            nouns = ['blog', 'site', 'portal', 'hub', 'space', 'platform']
-                            adjective = random.choice(adjectives)
-                            noun = random.choice(nouns)
-                            random_num = random.randint(100, 999)
-                            worker_name = f"{worker_name_prefix}-{adjective}-{noun}-{random_num}"
-                        else:
-                            worker_name = custom_worker_name or f"{worker_name_prefix}-{random.randint(1000, 9999)}"
-                        
-                        # Generate worker script
-                        worker_config = {
-                            "spreadsheetId": spreadsheet_id,
-                            "sheetName": sheet_name,
-                            "blogTitle": blog_title,
-                            "blogDescription": blog_description,
-                            "blogKeywords": blog_keywords
-                        }
-                        
-                        # Deploy to Cloudflare Workers
-                        headers = {
-                            'Authorization': f'Bearer {cf_api_token}',
-                            'Content-Type': 'application/javascript'
-                        }
-                        
-                        # Generate the worker script
-                        worker_script = generate_cloudflare_worker_script(worker_config)
-                        
-                        # Deploy API call
-                        deploy_url = f"https://api.cloudflare.com/client/v4/accounts/{cf_account_id}/workers/scripts/{worker_name}"
-                        response = requests.put(deploy_url, headers=headers, data=worker_script)
-                        
-                        if response.status_code in [200, 201]:
-                            result = response.json()
-                            st.success(f"✅ Successfully deployed to Cloudflare Workers!")
-                            
-                            # Display deployment info
-                            st.info(f"**Worker Name:** {worker_name}")
-                            st.info(f"**URL:** https://{worker_name}.{cf_account_id}.workers.dev")
-                            
-                            # Show deployment details
-                            with st.expander("Deployment Details"):
-                                st.json(result)
-                            
-                            # Set environment variables if needed
-                            if st.button("Set Environment Variables"):
-                                env_vars = {
-                                    'SPREADSHEET_ID': spreadsheet_id,
-                                    'SHEET_NAME': sheet_name
-                                }
-                                
-                                env_url = f"https://api.cloudflare.com/client/v4/accounts/{cf_account_id}/workers/scripts/{worker_name}/settings"
-                                env_response = requests.patch(env_url, headers=headers, json={
-                                    "bindings": [
-                                        {"type": "plain_text", "name": "SPREADSHEET_ID", "text": spreadsheet_id},
-                                        {"type": "plain_text", "name": "SHEET_NAME", "text": sheet_name}
-                                    ]
-                                })
-                                
-                                if env_response.status_code == 200:
-                                    st.success("✅ Environment variables set successfully!")
-                                else:
-                                    st.error("❌ Failed to set environment variables")
-                                    st.json(env_response.json())
-                            
-                        else:
-                            st.error(f"❌ Deployment failed: {response.status_code}")
-                            error_data = response.json()
-                            st.json(error_data)
-                            
-                            # Show error details
-                            if 'errors' in error_data:
-                                for error in error_data['errors']:
-                                    st.error(f"Error: {error.get('message', 'Unknown error')}")
-                        
-                except Exception as e:
-                    st.error(f"❌ Error during deployment: {str(e)}")
-                    st.exception(e)
+                import random
+
+                # Generate worker name
+                if auto_generate_name:
+                    adjectives = ['amazing', 'brilliant', 'clever', 'dynamic', 'elegant', 'fantastic']
+                    nouns = ['blog', 'site', 'portal', 'hub', 'space', 'platform']
+                    adjective = random.choice(adjectives)
+                    noun = random.choice(nouns)
+                    random_num = random.randint(100, 999)
+                    worker_name = f"{worker_name_prefix}-{adjective}-{noun}-{random_num}"
+                else:
+                    worker_name = custom_worker_name or f"{worker_name_prefix}-{random.randint(1000, 9999)}"
+                
+                worker_config = {
+                    "spreadsheetId": spreadsheet_id,
+                    "sheetName": sheet_name,
+                    "blogTitle": blog_title,
+                    "blogDescription": blog_description,
+                    "blogKeywords": blog_keywords,
+                    "postsPerPage": posts_per_page
+                }
+                start_job("deploy", "deploy", f"Deploying {worker_name}", deploy_job,
+                          cf_api_token, cf_account_id, worker_name, worker_config,
+                          key=("deploy", cf_account_id, worker_name), locks=(f"worker:{cf_account_id}/{worker_name}",))
+        
+        job = finished_job("deploy")
+        if job and job.error:
+            st.error(f"❌ Error during deployment: {str(job.error)}")
+            st.code(job.traceback)
+        elif job:
+            worker_name = job.result['worker_name']
+            if job.result['status'] in [200, 201]:
+                st.success(f"✅ Successfully deployed to Cloudflare Workers!")
+                
+                # Display deployment info
+                st.info(f"**Worker Name:** {worker_name}")
+                st.info(f"**URL:** https://{worker_name}.{cf_account_id}.workers.dev")
+                
+                # Show deployment details
+                with st.expander("Deployment Details"):
+                    st.json(job.result['data'])
+                
+                st.caption("SPREADSHEET_ID and SHEET_NAME are bound in the same upload.")
+            else:
+                st.error(f"❌ Deployment failed: {job.result['status']}")
+                error_data = job.result['data']
+                st.json(error_data)
+                
+                # Show error details
+                if 'errors' in error_data:
+                    for error in error_data['errors']:
+                        st.error(f"Error: {error.get('message', 'Unknown error')}")
+        
+        # Publish the sheet as a Workers KV snapshot
+        st.markdown("### 📦 Workers KV Snapshot")
+        st.caption("Ingest the sheet now and serve it from KV, so readers never wait on Google")
+        if st.button("📦 Publish Snapshot to Workers KV"):
+            if not cf_api_token or not cf_account_id:
+                st.error("Please provide Cloudflare Workers AI API Token and Account ID")
+            elif not spreadsheet_id:
+                st.error("Please provide Spreadsheet ID")
+            elif not kv_worker_name:
+                st.error("Please provide Snapshot Worker Name")
+            else:
+                start_job("kv_publish", "kv_publish", f"Publishing {blog_id} to Workers KV", kv_publish_job,
+                          blog_id, current_config,
+                          key=("kv_publish", cf_account_id, kv_worker_name),
+                          locks=(blog_lock(blog_id), f"worker:{cf_account_id}/{kv_worker_name}"))
+        
+        job = finished_job("kv_publish")
+        if job and isinstance(job.error, CloudflareError):
+            st.error(f"❌ Cloudflare API error: {str(job.error)}")
+        elif job and job.error:
+            st.error(f"❌ Error publishing snapshot: {str(job.error)}")
+        elif job:
+            st.success(f"✅ Published {job.result['posts']} posts to Workers KV")
+            st.info(f"**Worker Name:** {kv_worker_name}")
+            st.info(f"**KV Namespace ID:** {job.result['namespace_id']}")
+            with st.expander("Snapshot Details"):
+                st.json(job.result['summary'])
+        
+        with st.expander("🔄 Keep the snapshot in sync"):
+            st.markdown("Run the sync daemon to push only changed rows to KV, a static directory or a cache purge:")
+            st.code(f"python sync_daemon.py --workspace workspace.db --blog {blog_id}   # this blog\n"
+                    "python sync_daemon.py --workspace workspace.db   # every blog of the workspace\n"
+                    "python sync_daemon.py --config sync.json   # many blogs from one process\n"
+                    "python sync_daemon.py --workspace workspace.db --webhook-port 8090 --no-poll   # push-based, no polling",
+                    language="bash")
+            st.caption("With a Webhook Secret, set WEBHOOK_URL (https://<host>:8090/webhook/<blog id>) and WEBHOOK_SECRET "
+                       "in the Apps Script properties and run installWebhookTrigger() once (Script/api-appscript-db.js)")
+        
+        with st.expander("🖥️ Self-hosted server"):
+            st.markdown("Serve the same routes as the Worker from your own machines, behind any load balancer:")
+            st.code(f"python blog_api_server.py --blog {blog_id} --port 8080                # one process, polls the sheet\n"
+                    f"python blog_api_server.py --blog {blog_id} --workers 4 --port 8080    # one process per core",
+                    language="bash")
+        
+        # Search indexing
+        st.markdown("#### 🔎 Search Indexing")
+        st.caption("Submit the URLs of new and updated posts to the Google Indexing API; unchanged URLs are never resubmitted")
+        indexing_dry_run = st.checkbox("Dry run (only list the URLs)", value=True)
+        if st.button("🔎 Submit URLs for Indexing"):
+            if not (spreadsheet_id and site_url):
+                st.error("Please provide Spreadsheet ID and Site URL")
+            elif not indexing_dry_run and not (gsc_client_id and gsc_client_secret and gsc_refresh_token):
+                st.error("Please provide the Search Indexing OAuth client and refresh token")
+            else:
+                start_job("indexing", "indexing", f"Submitting URLs of {blog_id}", indexing_job,
+                          blog_id, current_config, indexing_dry_run,
+                          key=("indexing", blog_id, indexing_dry_run), locks=(blog_lock(blog_id),))
+        
+        job = finished_job("indexing")
+        if job and job.error:
+            st.error(f"❌ Indexing failed: {str(job.error)}")
+        elif job:
+            summary = job.result
+            if "would_submit" in summary:
+                st.info(f"{len(summary['would_submit'])} of {summary['urls']} URLs would be submitted"
+                        + (f", {summary['deferred']} deferred by the daily quota" if summary['deferred'] else ""))
+                if summary['would_submit']:
+                    st.code("\n".join(summary['would_submit']), language="text")
+            else:
+                st.success(f"✅ Submitted {summary['submitted']} URLs, {summary['failed']} failed, "
+                           f"{summary['deferred']} deferred by the daily quota")
+                for error in summary.get('errors', []):
+                    st.warning(error)
         
         # List existing workers
         if st.button("📋 List Existing Workers"):
             if cf_api_token and cf_account_id:
-                try:
-                    headers = {
-                        'Authorization': f'Bearer {cf_api_token}',
-                        'Content-Type': 'application/json'
-                    }
-                    
-                    list_url = f"https://api.cloudflare.com/client/v4/accounts/{cf_account_id}/workers/scripts"
-                    response = requests.get(list_url, headers=headers)
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        workers = data.get('result', [])
-                        
-                        if workers:
-                            st.success(f"Found {len(workers)} workers:")
-                            for worker in workers:
-                                st.write(f"- **{worker.get('id', 'Unknown')}** (Created: {worker.get('created_on', 'Unknown')})")
-                        else:
-                            st.info("No workers found in this account")
-                    else:
-                        st.error(f"Failed to list workers: {response.status_code}")
-                        st.json(response.json())
-                        
-                except Exception as e:
-                    st.error(f"Error listing workers: {str(e)}")
+                start_job("list_workers", "list_workers", "Listing workers", list_workers_job,
+                          cf_api_token, cf_account_id)
             else:
                 st.error("Please provide Cloudflare API Token and Account ID")
+        
+        job = finished_job("list_workers")
+        if job and job.error:
+            st.error(f"Error listing workers: {str(job.error)}")
+        elif job:
+            if job.result['status'] == 200:
+                workers = job.result['data'].get('result', [])
+                
+                if workers:
+                    st.success(f"Found {len(workers)} workers:")
+                    for worker in workers:
+                        st.write(f"- **{worker.get('id', 'Unknown')}** (Created: {worker.get('created_on', 'Unknown')})")
+                else:
+                    st.info("No workers found in this account")
+            else:
+                st.error(f"Failed to list workers: {job.result['status']}")
+                st.json(job.result['data'])
 
 
-with tab4:
+elif view == "📊 Preview":
     st.header("👁️ Preview")
     
+    preview_panel(dataset_file, sheet_name)
+    
     col1, col2 = st.columns([3, 1])
     
     with col1:
-        st.markdown("### 🖥️ Blog Preview")
-        
-        # Load demo data for preview
-        demo_data = get_demo_data()
-        
-        # Display preview
-        st.markdown("#### Sample Blog Posts")
-        for post in demo_data[:3]:
-            with st.container():
-                st.markdown(f"**{post['title']}**")
-                st.markdown(f"*{post['category']} • {post['date']} • {post['author']}*")
-                st.markdown(f"{post['content'][:200]}...")
-                st.markdown(f"**Tags:** {post['tags']}")
-                st.markdown("---")
+        st.markdown("### 📁 Configuration")
+        # Built only on request; secrets stay masked
+        if st.toggle("Show configuration"):
+            st.json({key: ("••••••" if key in SECRET_KEYS and value else value) for key, value in current_config.items()})
     
     with col2:
-        st.markdown("### 📊 Statistics")
-        
-        # Display statistics
-        stats = calculate_stats(demo_data)
-        st.metric("Total Posts", stats['total_posts'])
-        st.metric("Categories", stats['categories'])
-        st.metric("Tags", stats['tags'])
-        
         st.markdown("### 🔄 Actions")
-        if st.button("🔄 Refresh Preview"):
-            st.rerun()
-            
-        st.markdown("### 📁 Configuration")
-        st.json(current_config)
+        if st.button("📥 Ingest Google Sheets"):
+            start_job("ingest", "ingest", f"Ingesting {blog_id}", ingest_job, blog_id, current_config,
+                      key=("ingest", blog_id), locks=(blog_lock(blog_id),))
+        
+        # The preview above reads the new dataset on the rerun that follows the job
+        job = finished_job("ingest")
+        if job and job.error:
+            st.error(f"❌ Error ingesting spreadsheet: {str(job.error)}")
+        elif job:
+            st.success(f"✅ Ingested in {job.seconds}s")
         
         if st.button("💾 Save Config"):
-            save_config(current_config)
+            save_config(blog_id, current_config)
             st.success("Configuration saved!")
             
         if st.button("🗑️ Clear Config"):
-            if os.path.exists(CONFIG_FILE):
-                os.remove(CONFIG_FILE)
-                st.success("Configuration cleared!")
-            else:
-                st.info("No config file found")
-
-def generate_html_template(config):
-    """Generate HTML template based on configuration"""
-    color_schemes = {
-        "Blue": {"primary": "#2563eb", "secondary": "#1d4ed8"},
-        "Green": {"primary": "#059669", "secondary": "#047857"},
-        "Purple": {"primary": "#7c3aed", "secondary": "#6d28d9"},
-        "Red": {"primary": "#dc2626", "secondary": "#b91c1c"},
-        "Orange": {"primary": "#ea580c", "secondary": "#c2410c"}
-    }
-    
-    colors = color_schemes.get(config['color_scheme'], color_schemes['Blue'])
-    
-    # Read the base template
-    try:
-        with open('blog-template.html', 'r', encoding='utf-8') as f:
-            template = f.read()
-    except FileNotFoundError:
-        # Fallback template if file doesn't exist
-        template = """
-        <!DOCTYPE html>
-        <html lang="id">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>{{blog_title}}</title>
-            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-        </head>
-        <body>
-            <nav class="navbar navbar-expand-lg navbar-dark bg-primary">
-                <div class="container">
-                    <a class="navbar-brand" href="#">{{blog_title}}</a>
-                </div>
-            </nav>
-            <div class="container mt-4">
-                <h1>{{blog_title}}</h1>
-                <p>{{blog_description}}</p>
-            </div>
-            <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-        </body>
-        </html>
-        """
-    
-    # Replace template variables
-    template = template.replace('{{site_title}}', config['blog_title'])
-    template = template.replace('{{site_description}}', config['blog_description'])
-    template = template.replace('{{site_keywords}}', config['blog_keywords'])
-    template = template.replace('{{current_year}}', str(datetime.now().year))
-    
-    # Replace color scheme
-    template = template.replace('--primary-color: #2563eb', f'--primary-color: {colors["primary"]}')
-    template = template.replace('#1d4ed8', colors["secondary"])
-    
-    return template
-
-def generate_deployment_guide():
-    """Generate deployment guide"""
-    return """
-    ## 🚀 Deployment Guide
-    
-    ### Prerequisites
-    - Web server (Apache/Nginx)
-    - Domain name
-    - SSL certificate
-    
-    ### Steps
-    1. **Upload Files**
-       - Upload HTML template to your web server
-       - Ensure proper file permissions
-    
-    2. **Configure Environment**
-       - Set up environment variables
-       - Configure Google Sheets API
-       - Set up Cloudflare if using
-    
-    3. **Test Deployment**
-       - Check all links work
-       - Test Google Sheets connection
-       - Verify responsive design
-    
-    4. **Go Live**
-       - Point domain to your server
-       - Enable SSL
-       - Monitor for errors
-    
-    ### Environment Variables
-    ```bash
-    GOOGLE_SHEETS_API_KEY=your_api_key_here
-    SPREADSHEET_ID=your_spreadsheet_id
-    SHEET_NAME=WEBSITE
-    ```
-    
-    ### Troubleshooting
-    - Check API key permissions
-    - Verify spreadsheet sharing settings
-    - Test network connectivity
-    """
-
-def generate_cloudflare_worker_script(config):
-    """Generate Cloudflare Workers script with direct Google Sheets connection"""
-    spreadsheet_id = config.get('spreadsheetId', '')
-    sheet_name = config.get('sheetName', 'Sheet1')
-    blog_title = config.get('blogTitle', 'Blog')
-    blog_description = config.get('blogDescription', 'Blog powered by Google Sheets')
-    blog_keywords = config.get('blogKeywords', 'blog, google sheets')
-    
-    return f"""// Auto-generated Cloudflare Worker Script
-// Generated on: {datetime.now().isoformat()}
-// Spreadsheet ID: {spreadsheet_id}
-
-addEventListener('fetch', event => {{
-    event.respondWith(handleRequest(event.request))
-}})
-
-async function handleRequest(request) {{
-    const url = new URL(request.url)
-    
-    // CORS headers
-    const corsHeaders = {{
-        'Access-Control-Allow-Origin': '*',
-        'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
-        'Access-Control-Allow-Headers': 'Content-Type, Authorization',
-    }}
-    
-    // Handle CORS preflight
-    if (request.method === 'OPTIONS') {{
-        return new Response(null, {{ headers: corsHeaders }})
-    }}
-    
-    try {{
-        let response
-        
-        // Route handling
-        switch (url.pathname) {{
-            case '/':
-                response = await serveBlogHome()
-                break
-            case '/api/posts':
-                response = await getPosts()
-                break
-            case '/api/categories':
-                response = await getCategories()
-                break
-            case '/api/tags':
-                response = await getTags()
-                break
-            case '/api/stats':
-                response = await getStats()
-                break
-            case '/health':
-                response = new Response(JSON.stringify({{ 
-                    status: 'healthy', 
-                    timestamp: new Date().toISOString(),
-                    spreadsheetId: SPREADSHEET_ID 
-                }}), {{
-                    headers: {{ 'Content-Type': 'application/json' }}
-                }})
-                break
-            default:
-                if (url.pathname.startsWith('/post/')) {{
-                    response = await getPost(url.pathname.split('/')[2])
-                }} else if (url.pathname.startsWith('/api/post/')) {{
-                    response = await getPostAPI(url.pathname.split('/')[3])
-                }} else {{
-                    response = new Response('Not Found', {{ status: 404 }})
-                }}
-                break
-        }}
-        
-        // Add CORS headers to response
-        Object.entries(corsHeaders).forEach(([key, value]) => {{
-            response.headers.set(key, value)
-        }})
+            save_config(blog_id, {})
+            st.success("Configuration cleared!")
         
-        return response
-    }} catch (error) {{
-        console.error('Error handling request:', error)
-        return new Response(JSON.stringify({{ 
-            success: false, 
-            error: error.message 
-        }}), {{ 
-            status: 500,
-            headers: {{ 
-                'Content-Type': 'application/json',
-                ...corsHeaders 
-            }}
-        }})
-    }}
-}}
-
-// Configuration
-const SPREADSHEET_ID = '{spreadsheet_id}'
-const SHEET_NAME = '{sheet_name}'
-const BLOG_CONFIG = {{
-    site_title: '{blog_title}',
-    site_description: '{blog_description}',
-    site_keywords: '{blog_keywords}',
-    current_year: new Date().getFullYear()
-}}
-
-// Direct Google Sheets data fetching (no API key required)
-async function getGoogleSheetsData() {{
-    try {{
-        const csvUrl = `https://docs.google.com/spreadsheets/d/${{SPREADSHEET_ID}}/export?format=csv&gid=0`
-        const response = await fetch(csvUrl)
-        
-        if (!response.ok) {{
-            throw new Error(`HTTP error! status: ${{response.status}}`)
-        }}
-        
-        const csvText = await response.text()
-        return csvToJson(csvText)
-    }} catch (error) {{
-        console.error('Error fetching Google Sheets data:', error)
-        return getDemoData()
-    }}
-}}
-
-// Convert CSV to JSON
-function csvToJson(csvText) {{
-    const lines = csvText.split('\\n')
-    const headers = lines[0].split(',').map(header => header.trim().replace(/"/g, ''))
-    const data = []
-
-    for (let i = 1; i < lines.length; i++) {{
-        const values = parseCSVLine(lines[i])
-        if (values.length === headers.length) {{
-            const obj = {{}}
-            headers.forEach((header, index) => {{
-                obj[header.toLowerCase()] = values[index] || ''
-            }})
-            
-            // Ensure required fields
-            if (!obj.id) obj.id = i
-            if (!obj.slug && obj.title) {{
-                obj.slug = obj.title.toLowerCase()
-                    .replace(/[^a-z0-9\\s-]/g, '')
-                    .replace(/\\s+/g, '-')
-                    .trim()
-            }}
-            
-            data.push(obj)
-        }}
-    }}
-
-    return data
-}}
-
-// Parse CSV line with proper comma handling
-function parseCSVLine(line) {{
-    const values = []
-    let current = ''
-    let inQuotes = false
-    
-    for (let i = 0; i < line.length; i++) {{
-        const char = line[i]
-        
-        if (char === '"') {{
-            inQuotes = !inQuotes
-        }} else if (char === ',' && !inQuotes) {{
-            values.push(current.trim().replace(/"/g, ''))
-            current = ''
-        }} else {{
-            current += char
-        }}
-    }}
-    
-    values.push(current.trim().replace(/"/g, ''))
-    return values
-}}
-
-// Demo data fallback
-function getDemoData() {{
-    return [
-        {{
-            id: 1,
-            title: 'Welcome to Your Blog',
-            slug: 'welcome-to-your-blog',
-            content: 'This is your first blog post powered by Google Sheets and Cloudflare Workers. Edit your Google Sheets to add more content!',
-            category: 'Welcome',
-            tags: 'blog, welcome, cloudflare, google sheets',
-            author: 'Admin',
-            date: new Date().toISOString().split('T')[0],
-            status: 'published'
-        }}
-    ]
-}}
-
-// Serve blog home page
-async function serveBlogHome() {{
-    const html = `
-    <!DOCTYPE html>
-    <html lang="id">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>${{BLOG_CONFIG.site_title}}</title>
-        <meta name="description" content="${{BLOG_CONFIG.site_description}}">
-        <meta name="keywords" content="${{BLOG_CONFIG.site_keywords}}">
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }}
-            .navbar {{ background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); }}
-            .hero {{ background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); color: white; padding: 4rem 0; }}
-            .card {{ border: none; border-radius: 12px; box-shadow: 0 4px 6px rgba(0,0,0,0.1); transition: transform 0.3s; }}
-            .card:hover {{ transform: translateY(-5px); }}
-            .btn-primary {{ background: #2563eb; border-color: #2563eb; }}
-            .btn-primary:hover {{ background: #1d4ed8; border-color: #1d4ed8; }}
-            .loading {{ text-align: center; padding: 2rem; }}
-        </style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="/"><i class="fas fa-blog me-2"></i>${{BLOG_CONFIG.site_title}}</a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="/">Home</a>
-                    <a class="nav-link" href="/api/posts">API</a>
-                    <a class="nav-link" href="/health">Health</a>
-                </div>
-            </div>
-        </nav>
-        
-        <div class="hero text-center">
-            <div class="container">
-                <h1 class="display-4">${{BLOG_CONFIG.site_title}}</h1>
-                <p class="lead">${{BLOG_CONFIG.site_description}}</p>
-                <p><small>Powered by Google Sheets & Cloudflare Workers</small></p>
-            </div>
-        </div>
-        
-        <div class="container mt-5">
-            <div class="row">
-                <div class="col-lg-8">
-                    <div id="posts" class="row">
-                        <div class="col-12 loading">
-                            <i class="fas fa-spinner fa-spin fa-2x"></i>
-                            <p>Loading posts...</p>
-                        </div>
-                    </div>
-                </div>
-                <div class="col-lg-4">
-                    <div class="card">
-                        <div class="card-body">
-                            <h5><i class="fas fa-info-circle me-2"></i>About This Blog</h5>
-                            <p>${{BLOG_CONFIG.site_description}}</p>
-                            <p><small><strong>Data Source:</strong> Google Sheets</small></p>
-                            <p><small><strong>Spreadsheet ID:</strong> ${{SPREADSHEET_ID}}</small></p>
-                            <p><small><strong>Last Updated:</strong> <span id="lastUpdated">Loading...</span></small></p>
-                        </div>
-                    </div>
-                    
-                    <div class="card mt-3">
-                        <div class="card-body">
-                            <h5><i class="fas fa-chart-bar me-2"></i>Statistics</h5>
-                            <div id="stats">
-                                <p><i class="fas fa-spinner fa-spin"></i> Loading stats...</p>
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <footer class="bg-dark text-white mt-5 py-4">
-            <div class="container text-center">
-                <p>&copy; ${{BLOG_CONFIG.current_year}} ${{BLOG_CONFIG.site_title}}. Powered by Cloudflare Workers & Google Sheets.</p>
-                <p><small>Generated by Blog Template System</small></p>
-            </div>
-        </footer>
-        
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-        <script>
-            // Update last updated time
-            document.getElementById('lastUpdated').textContent = new Date().toLocaleString('id-ID');
-            
-            // Load posts
-            async function loadPosts() {{
-                try {{
-                    const response = await fetch('/api/posts')
-                    const data = await response.json()
-                    
-                    if (data.success) {{
-                        const posts = data.posts || []
-                        const postsContainer = document.getElementById('posts')
-                        
-                        if (posts.length === 0) {{
-                            postsContainer.innerHTML = '<div class="col-12 text-center"><p>No posts found. Add content to your Google Sheets!</p></div>'
-                            return
-                        }}
-                        
-                        postsContainer.innerHTML = posts.map(post => `
-                            <div class="col-md-6 mb-4">
-                                <div class="card">
-                                    <div class="card-body">
-                                        <h5 class="card-title">${{post.title}}</h5>
-                                        <p class="card-text">${{(post.content || '').substring(0, 150)}}...</p>
-                                        <div class="d-flex justify-content-between align-items-center">
-                                            <small class="text-muted">${{post.category || 'Uncategorized'}} • ${{post.date}}</small>
-                                            <a href="/post/${{post.slug}}" class="btn btn-primary btn-sm">Read More</a>
-                                        </div>
-                                    </div>
-                                </div>
-                            </div>
-                        `).join('')
-                    }} else {{
-                        document.getElementById('posts').innerHTML = '<div class="col-12 text-center"><p>Error loading posts</p></div>'
-                    }}
-                }} catch (error) {{
-                    console.error('Error loading posts:', error)
-                    document.getElementById('posts').innerHTML = '<div class="col-12 text-center"><p>Failed to load posts</p></div>'
-                }}
-            }}
-            
-            // Load statistics
-            async function loadStats() {{
-                try {{
-                    const response = await fetch('/api/stats')
-                    const data = await response.json()
-                    
-                    if (data.success) {{
-                        const stats = data.stats
-                        document.getElementById('stats').innerHTML = `
-                            <p><i class="fas fa-file-alt me-2"></i>Posts: ${{stats.totalPosts}}</p>
-                            <p><i class="fas fa-folder me-2"></i>Categories: ${{stats.totalCategories}}</p>
-                            <p><i class="fas fa-tags me-2"></i>Tags: ${{stats.totalTags}}</p>
-                        `
-                    }}
-                }} catch (error) {{
-                    console.error('Error loading stats:', error)
-                    document.getElementById('stats').innerHTML = '<p>Error loading statistics</p>'
-                }}
-            }}
-            
-            // Initialize
-            loadPosts()
-            loadStats()
-        </script>
-    </body>
-    </html>
-    `
-    
-    return new Response(html, {{
-        headers: {{ 'Content-Type': 'text/html' }}
-    }})
-}}
-
-// API endpoints
-async function getPosts() {{
-    const posts = await getGoogleSheetsData()
-    const publishedPosts = posts.filter(post => post.status === 'published' || !post.status)
-    
-    return new Response(JSON.stringify({{
-        success: true,
-        posts: publishedPosts,
-        total: publishedPosts.length
-    }}), {{
-        headers: {{ 'Content-Type': 'application/json' }}
-    }})
-}}
-
-async function getCategories() {{
-    const posts = await getGoogleSheetsData()
-    const categories = {{}}
-    
-    posts.forEach(post => {{
-        const category = post.category || 'Uncategorized'
-        categories[category] = (categories[category] || 0) + 1
-    }})
-    
-    return new Response(JSON.stringify({{
-        success: true,
-        categories: categories
-    }}), {{
-        headers: {{ 'Content-Type': 'application/json' }}
-    }})
-}}
-
-async function getTags() {{
-    const posts = await getGoogleSheetsData()
-    const tags = {{}}
-    
-    posts.forEach(post => {{
-        const postTags = post.tags ? post.tags.split(',').map(tag => tag.trim()) : []
-        postTags.forEach(tag => {{
-            if (tag) tags[tag] = (tags[tag] || 0) + 1
-        }})
-    }})
-    
-    return new Response(JSON.stringify({{
-        success: true,
-        tags: tags
-    }}), {{
-        headers: {{ 'Content-Type': 'application/json' }}
-    }})
-}}
-
-async function getStats() {{
-    const posts = await getGoogleSheetsData()
-    const categories = new Set(posts.map(post => post.category || 'Uncategorized'))
-    const tags = new Set()
-    
-    posts.forEach(post => {{
-        const postTags = post.tags ? post.tags.split(',').map(tag => tag.trim()) : []
-        postTags.forEach(tag => {{
-            if (tag) tags.add(tag)
-        }})
-    }})
-    
-    return new Response(JSON.stringify({{
-        success: true,
-        stats: {{
-            totalPosts: posts.length,
-            totalCategories: categories.size,
-            totalTags: tags.size,
-            publishedPosts: posts.filter(p => p.status === 'published' || !p.status).length
-        }}
-    }}), {{
-        headers: {{ 'Content-Type': 'application/json' }}
-    }})
-}}
-
-async function getPost(slug) {{
-    const posts = await getGoogleSheetsData()
-    const post = posts.find(p => p.slug === slug)
-    
-    if (!post) {{
-        return new Response('Post not found', {{ status: 404 }})
-    }}
-    
-    const html = `
-    <!DOCTYPE html>
-    <html lang="id">
-    <head>
-        <meta charset="UTF-8">
-        <meta name="viewport" content="width=device-width, initial-scale=1.0">
-        <title>${{post.title}} - ${{BLOG_CONFIG.site_title}}</title>
-        <meta name="description" content="${{(post.content || '').substring(0, 160)}}">
-        <meta name="keywords" content="${{post.tags}}">
-        <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
-        <link href="https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css" rel="stylesheet">
-        <style>
-            body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; }}
-            .navbar {{ background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); }}
-            .hero {{ background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); color: white; padding: 4rem 0; }}
-            .post-content {{ line-height: 1.8; font-size: 1.1rem; }}
-        </style>
-    </head>
-    <body>
-        <nav class="navbar navbar-expand-lg navbar-dark">
-            <div class="container">
-                <a class="navbar-brand" href="/"><i class="fas fa-blog me-2"></i>${{BLOG_CONFIG.site_title}}</a>
-                <div class="navbar-nav ms-auto">
-                    <a class="nav-link" href="/">Home</a>
-                </div>
-            </div>
-        </nav>
-        
-        <div class="hero text-center">
-            <div class="container">
-                <h1 class="display-4">${{post.title}}</h1>
-                <p class="lead">${{post.category || 'Uncategorized'}} • ${{post.date}} • ${{post.author || 'Admin'}}</p>
-            </div>
-        </div>
-        
-        <div class="container mt-5">
-            <div class="row">
-                <div class="col-lg-8 mx-auto">
-                    <div class="post-content">
-                        ${{(post.content || '').replace(/\\n/g, '<br>')}}
-                    </div>
-                    
-                    <div class="mt-4">
-                        <h6>Tags:</h6>
-                        ${{(post.tags || '').split(',').map(tag => `<span class="badge bg-primary me-1">${{tag.trim()}}</span>`).join('')}}
-                    </div>
-                    
-                    <div class="mt-4">
-                        <a href="/" class="btn btn-outline-primary">
-                            <i class="fas fa-arrow-left me-2"></i>Back to Blog
-                        </a>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <footer class="bg-dark text-white mt-5 py-4">
-            <div class="container text-center">
-                <p>&copy; ${{BLOG_CONFIG.current_year}} ${{BLOG_CONFIG.site_title}}. Powered by Cloudflare Workers.</p>
-            </div>
-        </footer>
-        
-        <script src="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/js/bootstrap.bundle.min.js"></script>
-    </body>
-    </html>
-    `
-    
-    return new Response(html, {{
-        headers: {{ 'Content-Type': 'text/html' }}
-    }})
-}}
-
-async function getPostAPI(slug) {{
-    const posts = await getGoogleSheetsData()
-    const post = posts.find(p => p.slug === slug)
-    
-    if (!post) {{
-        return new Response(JSON.stringify({{
-            success: false,
-            message: 'Post not found'
-        }}), {{
-            status: 404,
-            headers: {{ 'Content-Type': 'application/json' }}
-        }})
-    }}
-    
-    return new Response(JSON.stringify({{
-        success: true,
-        post: post
-    }}), {{
-        headers: {{ 'Content-Type': 'application/json' }}
-    }})
-}}"""
-
-def get_demo_data():
-    """Get demo data for preview"""
-    return [
-        {
-            "id": 1,
-            "title": "Cara Membuat Blog dengan Google Sheets",
-            "content": "Panduan lengkap untuk membuat blog sederhana yang terhubung dengan Google Sheets sebagai database.",
-            "category": "Tutorial",
-            "tags": "blog, google sheets, tutorial",
-            "author": "Admin",
-            "date": "2025-01-18"
-        },
-        {
-            "id": 2,
-            "title": "Optimasi SEO untuk Blog",
-            "content": "Tips dan trik untuk mengoptimalkan SEO blog Anda agar lebih mudah ditemukan di mesin pencari.",
-            "category": "SEO",
-            "tags": "seo, optimasi, blog",
-            "author": "Admin",
-            "date": "2025-01-17"
-        },
-        {
-            "id": 3,
-            "title": "Deploy ke Cloudflare Workers",
-            "content": "Panduan step-by-step untuk deploy blog Anda ke Cloudflare Workers secara gratis.",
-            "category": "Deployment",
-            "tags": "cloudflare, workers, deploy",
-            "author": "Admin",
-            "date": "2025-01-16"
-        }
-    ]
-
-def calculate_stats(data):
-    """Calculate statistics from data"""
-    categories = set(post['category'] for post in data)
-    tags = set()
-    for post in data:
-        post_tags = post['tags'].split(',')
-        tags.update(tag.strip() for tag in post_tags)
-    
-    return {
-        'total_posts': len(data),
-        'categories': len(categories),
-        'tags': len(tags)
-    }
+        if st.button("❌ Remove Blog"):
+            if len(blog_ids) == 1:
+                st.info("The workspace needs at least one blog")
+            else:
+                workspace.remove(blog_id)
+                st.rerun()
 
 # Footer
 st.markdown("---")
@@ -0,0 +1,488 @@
+"""Background sync daemon that pushes sheet changes to deployed targets
+
+Usage:
+    python sync_daemon.py                       # the blog in app_config.json
+    python sync_daemon.py --config sync.json    # many blogs from one process
+    python sync_daemon.py --workspace workspace.db --static-dir dist   # every blog of the app's workspace
+    python sync_daemon.py --once                # single poll of every blog
+    python sync_daemon.py --webhook-port 8090   # also apply signed row-change webhooks (see webhook_receiver)
+    python sync_daemon.py --webhook-port 8090 --no-poll   # webhooks only, no polling
+
+sync.json:
+    {
+      "max_concurrency": 4,
+      "blogs": [
+        {
+          "id": "main",
+          "spreadsheet_id": "...",
+          "sheet_name": "WEBSITE",
+          "sheets_api_key": "...",                  # optional, fetch only changed rows
+          "interval": 60,
+          "webhook_secret": "...",                  # optional, accept signed webhooks at /webhook/main
+          "poll": true,                             # false: only webhooks change the blog
+          "site": {"site_url": "https://...", "blog_title": "..."},   # optional, publish sitemaps and feeds
+          "targets": [
+            {"type": "kv", "account_id": "...", "api_token": "...", "namespace_id": "..."},
+            {"type": "static", "path": "dist/main"},
+            {"type": "purge", "zone_id": "...", "api_token": "..."}   # purges the changed URLs under site.site_url
+          ]
+        }
+      ]
+    }
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import signal
+import tempfile
+import threading
+
+from blog_data import build_dataset, delta_is_empty, diff_posts, fetch_sheet_csv_if_changed, is_safe_slug, parse_posts_csv
+from cache_purge import DEFAULT_FEEDS, purge_changes, purge_everything
+from cloudflare_api import CF_API_BASE
+from dataset_store import dataset_path, prepare_posts, write_dataset
+from feeds import feed_bodies
+from kv_publish import FEED_KEY_PREFIX, build_kv_entries, diff_entries, publish_entries, publish_snapshot
+from sheets_api import SHEETS_API_STATE_DIR, SheetsAPISource
+from webhook_receiver import ResyncNeeded, apply_event as apply_row_event, start_server
+from workspace import Workspace, blog_dataset_path, cache_dir, site_config
+
+logger = logging.getLogger("sync_daemon")
+
+DEFAULT_INTERVAL = 60
+DEFAULT_JITTER = 0.2
+MAX_BACKOFF = 900
+
+
+def listing_settings(blog):
+    """(posts_per_page, blog_title) the blog's listing shards are built with"""
+    return int(blog.site.get('posts_per_page') or 6), blog.site.get('blog_title') or 'Blog'
+
+
+class KVTarget:
+    """Pushes changed snapshot keys to a Workers KV namespace"""
+
+    def __init__(self, account_id, api_token, namespace_id, api_base=CF_API_BASE):
+        self.account_id = account_id
+        self.api_token = api_token
+        self.namespace_id = namespace_id
+        self.api_base = api_base
+        self.entries = None
+
+    @property
+    def name(self):
+        return f"kv:{self.namespace_id}"
+
+    def push(self, blog, dataset, delta):
+        posts_per_page, blog_title = listing_settings(blog)
+        entries = build_kv_entries(dataset, blog.spreadsheet_id, blog.sheet_name, posts_per_page, blog_title)
+        if self.entries is None:
+            # First push since start: we don't know what KV holds, so publish everything
+            summary = publish_snapshot(dataset, self.account_id, self.api_token, self.namespace_id,
+                                       blog.spreadsheet_id, blog.sheet_name, api_base=self.api_base,
+                                       posts_per_page=posts_per_page, blog_title=blog_title)
+        else:
+            changed, deleted = diff_entries(self.entries, entries)
+            summary = publish_entries(self.account_id, self.api_token, self.namespace_id, changed, deleted,
+                                      api_base=self.api_base)
+        self.entries = entries
+        return summary
+
+
+class StaticDirTarget:
+    """Mirrors the snapshot keys as JSON files in an output directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = None
+
+    @property
+    def name(self):
+        return f"static:{self.path}"
+
+    def _file(self, key):
+        parts = key.split('/')
+        if not all(is_safe_slug(part) for part in parts):
+            raise ValueError(f"Unsafe snapshot key: {key!r}")
+        # Sitemaps and feeds keep their own extension
+        path = os.path.join(self.path, *parts) + ('' if key.startswith(FEED_KEY_PREFIX) else '.json')
+        root = os.path.realpath(self.path)
+        if os.path.commonpath([root, os.path.realpath(path)]) != root:
+            raise ValueError(f"Snapshot key {key!r} resolves outside {self.path}")
+        return path
+
+    def push(self, blog, dataset, delta):
+        posts_per_page, blog_title = listing_settings(blog)
+        entries = build_kv_entries(dataset, blog.spreadsheet_id, blog.sheet_name, posts_per_page, blog_title)
+        if self.entries is None:
+            self.entries = self._read_existing()
+        changed, deleted = diff_entries(self.entries, entries)
+
+        for key, value in changed.items():
+            path = self._file(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write then rename so readers never see a half-written file
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(value)
+            os.replace(tmp, path)
+        for key in deleted:
+            if os.path.exists(self._file(key)):
+                os.remove(self._file(key))
+
+        self.entries = entries
+        return {"files_written": len(changed), "files_deleted": len(deleted)}
+
+    def _read_existing(self):
+        entries = {}
+        for root, _, files in os.walk(self.path):
+            for filename in files:
+                path = os.path.join(root, filename)
+                key = os.path.relpath(path, self.path).replace(os.sep, '/')
+                if not key.startswith(FEED_KEY_PREFIX):
+                    if not filename.endswith('.json'):
+                        continue
+                    key = key[:-len('.json')]
+                with open(path, encoding='utf-8') as f:
+                    entries[key] = f.read()
+        return entries
+
+
+class CachePurgeTarget:
+    """Purges the cached URLs that rows changes made stale (see cache_purge)"""
+
+    def __init__(self, zone_id, api_token, api_base=CF_API_BASE, site_url=None):
+        self.zone_id = zone_id
+        self.api_token = api_token
+        self.api_base = api_base
+        self.site_url = site_url
+        self.posts = None
+
+    @property
+    def name(self):
+        return f"purge:{self.zone_id}"
+
+    def push(self, blog, dataset, delta):
+        site_url = self.site_url or blog.site.get('site_url')
+        if self.posts is None or not site_url:
+            # First push since start: we don't know what the edge holds; without a site URL there are no URLs
+            if delta_is_empty(delta):
+                summary = {"purged_urls": 0, "requests": 0}
+            else:
+                purge_everything(self.zone_id, self.api_token, self.api_base)
+                summary = {"purged_urls": "everything", "requests": 1}
+        else:
+            summary = purge_changes(self.zone_id, self.api_token, site_url, self.posts, dataset["posts"],
+                                    listing_settings(blog)[0],
+                                    sorted(dataset.get("feeds") or DEFAULT_FEEDS), self.api_base)
+        self.posts = dataset["posts"]
+        return summary
+
+
+def build_target(spec):
+    """Create a sync target from its config entry"""
+    kind = spec.get('type')
+    if kind == 'kv':
+        return KVTarget(spec['account_id'], spec['api_token'], spec['namespace_id'], spec.get('api_base', CF_API_BASE))
+    if kind == 'static':
+        return StaticDirTarget(spec['path'])
+    if kind == 'purge':
+        return CachePurgeTarget(spec['zone_id'], spec['api_token'], spec.get('api_base', CF_API_BASE), spec.get('site_url'))
+    raise ValueError(f"Unknown sync target type: {kind}")
+
+
+class BlogSync:
+    """Sync state of one blog: validators, last rows and backoff"""
+
+    def __init__(self, blog_id, spreadsheet_id, sheet_name, targets, interval=DEFAULT_INTERVAL,
+                 jitter=DEFAULT_JITTER, max_backoff=MAX_BACKOFF, dataset_file=None, api_key=None,
+                 api_state_dir=SHEETS_API_STATE_DIR, site=None, webhook_secret=None, poll=True):
+        self.blog_id = blog_id
+        self.spreadsheet_id = spreadsheet_id
+        self.sheet_name = sheet_name
+        self.dataset_file = dataset_file or dataset_path(spreadsheet_id, sheet_name)
+        self.targets = targets
+        self.interval = interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.validators = {}
+        # With a Sheets API key only new and changed rows are downloaded
+        self.api_key = api_key
+        self.api_state_dir = api_state_dir
+        # Site settings for sitemaps and feeds, which need a site_url
+        self.site = site or {}
+        # Signed webhooks apply single rows; without polling they are the only source of changes
+        self.webhook_secret = webhook_secret
+        self.poll = poll
+        self.source = None
+        # Rows as read from the sheet, and the same posts with their derived columns
+        self.rows = None
+        self.posts = None
+        # Polls and webhooks of one blog never run at the same time
+        self.lock = threading.Lock()
+        self.failures = 0
+        # Targets whose last push failed, with the delta they still owe
+        self.pending = {}
+
+    def fetch_posts(self, force=False):
+        """Current posts, or None when the sheet did not change since the last poll (unless `force`)"""
+        if self.api_key:
+            if self.source is None:
+                self.source = SheetsAPISource(self.spreadsheet_id, self.api_key, state_dir=self.api_state_dir)
+            tab = self.sheet_name or "Sheet1"
+            changed = self.source.sync([tab])[tab]
+            return self.source.posts(tab) if changed or force or self.posts is None else None
+
+        csv_text, self.validators = fetch_sheet_csv_if_changed(self.spreadsheet_id, self.sheet_name,
+                                                               {} if force else self.validators)
+        return None if csv_text is None else parse_posts_csv(csv_text)
+
+    def poll_once(self):
+        """Fetch the sheet if it changed and push the row delta to every target"""
+        with self.lock:
+            return self._publish(self.fetch_posts())
+
+    def push_pending(self):
+        """Retry the targets whose last push failed, without reading the sheet"""
+        with self.lock:
+            return self._publish(None)
+
+    def apply_event(self, event):
+        """Apply one webhook row change and push it like a poll would; returns the row delta"""
+        with self.lock:
+            try:
+                if self.rows is None:
+                    # First event since start: read the sheet once, then apply the event on top
+                    self.rows = self.fetch_posts(force=True)
+                fresh = apply_row_event(self.rows, event)
+            except ResyncNeeded as e:
+                logger.info("[%s] webhook %s: reading the whole sheet (%s)", self.blog_id, event.get('action'), e)
+                fresh = self.fetch_posts(force=True)
+            return self._publish(fresh) or {"added": [], "updated": [], "removed": []}
+
+    def _publish(self, fresh):
+        """Push the delta between the last posts and `fresh` rows (None: unchanged) to the targets"""
+        if fresh is None and not self.pending:
+            return None
+
+        if fresh is not None:
+            self.rows = fresh
+            posts = prepare_posts(fresh, self.dataset_file)
+            # Keep the mapped dataset other processes read in step with the sheet
+            write_dataset(self.dataset_file, posts)
+        else:
+            posts = self.posts
+        delta = diff_posts(self.posts, posts)
+        if delta_is_empty(delta) and self.posts is not None:
+            targets = [target for target in self.targets if target.name in self.pending]
+        else:
+            targets = self.targets
+        if not targets:
+            return delta
+
+        dataset = build_dataset(posts)
+        if self.site.get('site_url'):
+            dataset["feeds"] = feed_bodies(posts, self.site)
+        errors = []
+        for target in targets:
+            owed = _merge_deltas(self.pending.pop(target.name, None), delta)
+            try:
+                summary = target.push(self, dataset, owed)
+                logger.info("[%s] %s: %s", self.blog_id, target.name, summary)
+            except Exception as e:
+                self.pending[target.name] = owed
+                errors.append(f"{target.name}: {e}")
+
+        self.posts = posts
+        logger.info("[%s] +%d ~%d -%d rows", self.blog_id,
+                    len(delta["added"]), len(delta["updated"]), len(delta["removed"]))
+        if errors:
+            raise RuntimeError("; ".join(errors))
+        return delta
+
+    def next_delay(self):
+        """Poll interval with jitter, or exponential backoff after failures"""
+        if self.failures:
+            delay = min(self.max_backoff, self.interval * 2 ** self.failures)
+            return random.uniform(delay / 2, delay)
+        return self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    async def run(self, semaphore, stop):
+        # Spread the first polls so many blogs don't hit Google at the same instant
+        await _sleep_or_stop(stop, random.uniform(0, self.interval * self.jitter))
+        while not stop.is_set():
+            async with semaphore:
+                try:
+                    if self.poll or self.posts is None:
+                        await asyncio.to_thread(self.poll_once)
+                    else:
+                        await asyncio.to_thread(self.push_pending)
+                    self.failures = 0
+                except Exception as e:
+                    self.failures += 1
+                    logger.warning("[%s] sync failed (%d in a row): %s", self.blog_id, self.failures, e)
+            await _sleep_or_stop(stop, self.next_delay())
+
+
+def _merge_deltas(first, second):
+    if not first:
+        return second
+    return {key: first[key] + second[key] for key in ("added", "updated", "removed")}
+
+
+async def _sleep_or_stop(stop, delay):
+    try:
+        await asyncio.wait_for(stop.wait(), timeout=delay)
+    except asyncio.TimeoutError:
+        pass
+
+
+def load_blogs(config):
+    """Build BlogSync objects from the daemon config"""
+    blogs = []
+    for blog in config.get('blogs', []):
+        blogs.append(BlogSync(
+            blog.get('id') or blog['spreadsheet_id'],
+            blog['spreadsheet_id'],
+            blog.get('sheet_name'),
+            [build_target(spec) for spec in blog.get('targets', [])],
+            interval=blog.get('interval', config.get('interval', DEFAULT_INTERVAL)),
+            jitter=blog.get('jitter', config.get('jitter', DEFAULT_JITTER)),
+            dataset_file=blog.get('dataset_path'),
+            api_key=blog.get('sheets_api_key'),
+            api_state_dir=blog.get('sheets_api_state_dir', SHEETS_API_STATE_DIR),
+            site=blog.get('site'),
+            webhook_secret=blog.get('webhook_secret'),
+            poll=blog.get('poll', config.get('poll', True))
+        ))
+    return blogs
+
+
+def _app_targets(app_config, static_dir=None):
+    """Sync targets implied by one blog's app settings"""
+    targets = []
+    if app_config.get('cf_api_token') and app_config.get('cf_account_id') and app_config.get('kv_namespace_id'):
+        targets.append({"type": "kv", "account_id": app_config['cf_account_id'],
+                        "api_token": app_config['cf_api_token'], "namespace_id": app_config['kv_namespace_id']})
+    if static_dir:
+        targets.append({"type": "static", "path": static_dir})
+    if app_config.get('cf_api_token') and app_config.get('cf_zone_id'):
+        targets.append({"type": "purge", "zone_id": app_config['cf_zone_id'], "api_token": app_config['cf_api_token']})
+    return targets
+
+
+def config_from_app_config(path, static_dir=None):
+    """Single-blog daemon config derived from the Streamlit app settings"""
+    with open(path, 'r') as f:
+        app_config = json.load(f)
+
+    return {"blogs": [{
+        "id": app_config.get('kv_worker_name') or app_config.get('spreadsheet_id'),
+        "spreadsheet_id": app_config.get('spreadsheet_id'),
+        "sheet_name": app_config.get('sheet_name'),
+        "sheets_api_key": app_config.get('sheets_api_key') or None,
+        "site": site_config(app_config),
+        "webhook_secret": app_config.get('webhook_secret') or None,
+        "targets": _app_targets(app_config, static_dir)
+    }]}
+
+
+def config_from_workspace(path, static_dir=None, blog_ids=None):
+    """Daemon config with every blog of the app's workspace, each on its own dataset and caches"""
+    blogs = []
+    for blog_id, profile in Workspace(path).blogs(blog_ids):
+        if not profile.get('spreadsheet_id'):
+            continue
+        blogs.append({
+            "id": blog_id,
+            "spreadsheet_id": profile['spreadsheet_id'],
+            "sheet_name": profile.get('sheet_name'),
+            "sheets_api_key": profile.get('sheets_api_key') or None,
+            "dataset_path": blog_dataset_path(blog_id, profile),
+            "sheets_api_state_dir": os.path.join(cache_dir(blog_id, profile), "sheets_api"),
+            "site": site_config(profile),
+            "webhook_secret": profile.get('webhook_secret') or None,
+            "targets": _app_targets(profile, static_dir and os.path.join(static_dir, blog_id))
+        })
+    return {"blogs": blogs}
+
+
+async def run_daemon(blogs, max_concurrency=4, webhook_address=None):
+    """Run every blog's poll loop on one event loop until SIGINT/SIGTERM
+
+    With `webhook_address` (host, port) signed row-change webhooks are
+    received alongside.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    webhooks = start_server(blogs, *webhook_address) if webhook_address else None
+    semaphore = asyncio.Semaphore(max_concurrency)
+    try:
+        await asyncio.gather(*(blog.run(semaphore, stop) for blog in blogs))
+    finally:
+        if webhooks:
+            webhooks.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Push Google Sheets changes to deployed blog targets")
+    parser.add_argument('--config', help="Daemon config with one or more blogs")
+    parser.add_argument('--workspace', help="Sync every blog of this workspace database")
+    parser.add_argument('--blog', action='append', help="With --workspace, only this blog (repeatable)")
+    parser.add_argument('--app-config', default="app_config.json", help="Streamlit app config used when --config is absent")
+    parser.add_argument('--static-dir', help="Also mirror the snapshot into this directory (per blog with --workspace)")
+    parser.add_argument('--once', action='store_true', help="Poll every blog once and exit")
+    parser.add_argument('--webhook-port', type=int, help="Receive signed row-change webhooks on this port")
+    parser.add_argument('--webhook-host', default="0.0.0.0")
+    parser.add_argument('--no-poll', action='store_true', help="With --webhook-port, only webhooks change the blogs")
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args(argv)
+    if args.no_poll and not args.webhook_port:
+        parser.error("--no-poll needs --webhook-port")
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+
+    if args.config:
+        with open(args.config, 'r') as f:
+            config = json.load(f)
+    elif args.workspace:
+        config = config_from_workspace(args.workspace, args.static_dir, args.blog)
+    else:
+        config = config_from_app_config(args.app_config, args.static_dir)
+
+    if args.no_poll:
+        config['poll'] = False
+
+    blogs = load_blogs(config)
+    if not any(blog.targets for blog in blogs):
+        parser.error("no sync targets configured")
+    if args.webhook_port and not any(blog.webhook_secret for blog in blogs):
+        parser.error("--webhook-port needs a webhook_secret on at least one blog")
+
+    if args.once:
+        failed = 0
+        for blog in blogs:
+            try:
+                blog.poll_once()
+            except Exception as e:
+                failed += 1
+                logger.error("[%s] sync failed: %s", blog.blog_id, e)
+        return 1 if failed else 0
+
+    webhook_address = (args.webhook_host, args.webhook_port) if args.webhook_port else None
+    asyncio.run(run_daemon(blogs, config.get('max_concurrency', 4), webhook_address))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
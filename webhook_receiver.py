@@ -0,0 +1,217 @@
+"""Signed row-change webhooks, applied to the sync daemon's blogs as deltas
+
+Script/api-appscript-db.js (and its installable edit trigger) POSTs one event
+per changed row to /webhook/<blog id>:
+
+    {"event_id": "...", "action": "insert" | "update" | "delete" | "resync",
+     "sheet_name": "WEBSITE", "row_index": 12, "row": {"title": "...", ...}}
+
+signed with the blog's `webhook_secret`:
+
+    X-Webhook-Timestamp: <unix seconds>
+    X-Webhook-Signature: sha256=<hex HMAC-SHA256 of "<timestamp>.<body>">
+
+The row replaces (or removes) its post in the blog's last known rows, which
+then go through the same path as a poll: derived columns, the dataset file the
+self-hosted servers watch, and every sync target. Nothing is downloaded from
+Google except for a `resync` event, the first event after start, a cleared
+row and a delete in a sheet without an id column (the row numbers that serve
+as ids shift).
+
+Run through the daemon:
+    python sync_daemon.py --webhook-port 8090              # webhooks plus polling as a safety net
+    python sync_daemon.py --webhook-port 8090 --no-poll    # webhooks only
+"""
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from blog_data import rows_to_posts
+
+logger = logging.getLogger("webhook_receiver")
+
+SIGNATURE_HEADER = "X-Webhook-Signature"
+TIMESTAMP_HEADER = "X-Webhook-Timestamp"
+MAX_CLOCK_SKEW = 300
+MAX_BODY_BYTES = 1024 * 1024
+SEEN_EVENTS = 1000
+ACTIONS = ("insert", "update", "delete", "resync")
+
+
+class WebhookError(ValueError):
+    """A request that is refused, with the HTTP status to refuse it with"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class ResyncNeeded(Exception):
+    """The event can't be applied as a delta; the sheet has to be read again"""
+
+
+def sign(secret, timestamp, body):
+    """Signature header value for a request body"""
+    digest = hmac.new(secret.encode('utf-8'), f"{timestamp}.".encode('ascii') + body, hashlib.sha256).hexdigest()
+    return f"sha256={digest}"
+
+
+def verify_signature(secret, timestamp, signature, body, now=None):
+    """Raise WebhookError unless the body was signed with `secret` within MAX_CLOCK_SKEW"""
+    if not secret:
+        raise WebhookError(403, "Webhooks are not enabled for this blog")
+    try:
+        skew = abs((now or time.time()) - int(timestamp))
+    except (TypeError, ValueError):
+        raise WebhookError(401, "Missing or invalid timestamp")
+    if skew > MAX_CLOCK_SKEW:
+        raise WebhookError(401, "Timestamp outside the allowed window")
+    if not hmac.compare_digest(sign(secret, timestamp, body), signature or ''):
+        raise WebhookError(401, "Invalid signature")
+
+
+def _has_id(row):
+    return any(str(key).strip().lower() == 'id' and str(value or '').strip() for key, value in row.items())
+
+
+def event_post(event):
+    """The event's row as a post, with id and slug filled in the way ingestion does"""
+    row = event.get('row') or {}
+    if not isinstance(row, dict):
+        raise WebhookError(400, "'row' must be an object of column name to value")
+    headers = list(row)
+    values = ['' if value is None else str(value) for value in row.values()]
+    posts = rows_to_posts([headers, values])
+    post = posts[0] if posts else {}
+    if not _has_id(row):
+        post.pop('id', None)
+        if event.get('row_index'):
+            # Without an id cell ingestion numbers the data rows from 1
+            try:
+                post['id'] = str(int(event['row_index']) - 1)
+            except (TypeError, ValueError):
+                raise WebhookError(400, "'row_index' must be the sheet row number")
+    return post
+
+
+def apply_event(rows, event):
+    """New list of raw rows with the event applied; raises ResyncNeeded when it can't be"""
+    action = event.get('action')
+    if action == 'resync':
+        raise ResyncNeeded("resync requested")
+    post = event_post(event)
+    row = event.get('row') or {}
+    if action == 'delete' and not _has_id(row):
+        raise ResyncNeeded("delete in a sheet without ids")
+    if action != 'delete' and not any(str(value or '').strip() for value in row.values()):
+        # A cleared row: its id cell went with it
+        raise ResyncNeeded("row cleared")
+    if not post.get('id'):
+        raise WebhookError(400, "The row needs an id cell or row_index")
+
+    rows = list(rows)
+    position = next((i for i, existing in enumerate(rows) if str(existing.get('id')) == post['id']), None)
+    if action == 'delete':
+        if position is not None:
+            del rows[position]
+    elif position is None:
+        rows.append(post)
+    else:
+        rows[position] = dict(rows[position], **post)
+    return rows
+
+
+class WebhookReceiver:
+    """Routes verified events to the BlogSync of their blog"""
+
+    def __init__(self, blogs):
+        self.blogs = {blog.blog_id: blog for blog in blogs}
+        self.seen = OrderedDict()
+        self.lock = threading.Lock()
+
+    def _seen(self, blog_id, event_id):
+        """True for an event id already applied (senders retry)"""
+        with self.lock:
+            return bool(event_id) and (blog_id, event_id) in self.seen
+
+    def _remember(self, blog_id, event_id):
+        if not event_id:
+            return
+        with self.lock:
+            self.seen[(blog_id, event_id)] = True
+            while len(self.seen) > SEEN_EVENTS:
+                self.seen.popitem(last=False)
+
+    def handle(self, path, headers, body):
+        """(status, response dict) for a POST"""
+        parts = path.split('?')[0].strip('/').split('/')
+        if len(parts) != 2 or parts[0] != 'webhook':
+            raise WebhookError(404, "Not found")
+        blog = self.blogs.get(parts[1])
+        if blog is None:
+            raise WebhookError(404, f"Unknown blog: {parts[1]}")
+        verify_signature(blog.webhook_secret, headers.get(TIMESTAMP_HEADER), headers.get(SIGNATURE_HEADER), body)
+        try:
+            event = json.loads(body)
+        except ValueError:
+            raise WebhookError(400, "Body is not JSON")
+        if not isinstance(event, dict) or event.get('action') not in ACTIONS:
+            raise WebhookError(400, f"'action' must be one of: {', '.join(ACTIONS)}")
+        if event.get('sheet_name') and blog.sheet_name and event['sheet_name'] != blog.sheet_name:
+            return 200, {"status": "ignored", "message": f"Not the blog's sheet ({blog.sheet_name})"}
+        if self._seen(blog.blog_id, event.get('event_id')):
+            return 200, {"status": "duplicate"}
+
+        delta = blog.apply_event(event)
+        self._remember(blog.blog_id, event.get('event_id'))
+        return 200, {"status": "applied", "added": len(delta["added"]), "updated": len(delta["updated"]),
+                     "removed": len(delta["removed"])}
+
+
+def _handler(receiver):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, fmt, *args):
+            logger.debug("%s " + fmt, self.address_string(), *args)
+
+        def _send(self, status, data):
+            body = json.dumps(data).encode('utf-8')
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                return self._send(200, {"status": "healthy", "blogs": sorted(receiver.blogs)})
+            self._send(404, {"status": "error", "message": "Not found"})
+
+        def do_POST(self):
+            try:
+                length = int(self.headers.get('Content-Length') or 0)
+                if length > MAX_BODY_BYTES:
+                    raise WebhookError(413, "Body too large")
+                status, data = receiver.handle(self.path, self.headers, self.rfile.read(length))
+            except WebhookError as e:
+                status, data = e.status, {"status": "error", "message": str(e)}
+            except Exception as e:
+                # Dataset and targets may be partly updated; failed targets are retried by the daemon
+                logger.warning("webhook failed: %s", e)
+                status, data = 502, {"status": "error", "message": str(e)}
+            self._send(status, data)
+
+    return Handler
+
+
+def start_server(blogs, host, port):
+    """Serve webhooks from a background thread; returns the server (call shutdown() to stop)"""
+    server = ThreadingHTTPServer((host, port), _handler(WebhookReceiver(blogs)))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="webhook-receiver", daemon=True).start()
+    logger.info("receiving webhooks on http://%s:%d/webhook/<blog id>", host, server.server_address[1])
+    return server
@@ -0,0 +1,334 @@
+"""Workspace of many blog profiles in one SQLite file
+
+Each blog is a row keyed by its id holding the same settings app_config.json
+has for one blog (spreadsheet, sheet, worker names, Cloudflare credentials,
+titles). A blog's dataset, Sheets API state and default build output live
+under its own cache namespace, so blogs never share or overwrite files.
+
+Usage:
+    python workspace.py list
+    python workspace.py import app_config.json --id main      # add/replace a blog from an app config
+    python workspace.py remove main
+    python workspace.py fetch-all --concurrency 4            # ingest every blog's sheet
+    python workspace.py build-all --out dist                 # static site per blog, dist/<id>/
+    python workspace.py deploy-all                           # KV snapshot + Worker per blog
+    python workspace.py index-all                            # submit new/updated URLs to the Indexing API
+    python workspace.py generate-all --task meta             # fill empty meta descriptions with the AI API
+    python workspace.py check-all --write-back               # data-quality scan, flagged cells colored in the sheet
+    python workspace.py fetch-all --blog main --blog docs    # only some blogs
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dataset_store import PostDataset, dataset_path, ingest_sheet
+
+WORKSPACE_DB = "workspace.db"
+WORKSPACE_CACHE_DIR = os.path.join(".cache", "blogs")
+DEFAULT_CONCURRENCY = 4
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS blogs (
+    id TEXT PRIMARY KEY,
+    profile TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+
+
+def cache_dir(blog_id, profile):
+    """Directory holding everything cached for one blog"""
+    return os.path.join(WORKSPACE_CACHE_DIR, profile.get('cache_namespace') or blog_id)
+
+
+def blog_dataset_path(blog_id, profile):
+    """The blog's own dataset file"""
+    return dataset_path(profile.get('spreadsheet_id', ''), profile.get('sheet_name'),
+                        base_dir=os.path.join(cache_dir(blog_id, profile), "datasets"))
+
+
+def site_config(profile):
+    """Static build settings of a blog"""
+    return {
+        "blog_title": profile.get('blog_title', 'Blog'),
+        "blog_description": profile.get('blog_description', ''),
+        "blog_keywords": profile.get('blog_keywords', ''),
+        "color_scheme": profile.get('color_scheme', 'Blue'),
+        "posts_per_page": profile.get('posts_per_page', 6),
+        "site_url": profile.get('site_url', '')
+    }
+
+
+def worker_config(profile):
+    """generate_cloudflare_worker_modules settings of a blog"""
+    return {
+        "spreadsheetId": profile.get('spreadsheet_id', ''),
+        "sheetName": profile.get('sheet_name', ''),
+        "blogTitle": profile.get('blog_title', 'Blog'),
+        "blogDescription": profile.get('blog_description', ''),
+        "blogKeywords": profile.get('blog_keywords', ''),
+        "postsPerPage": int(profile.get('posts_per_page') or 6)
+    }
+
+
+def add_blog_arguments(parser):
+    """--workspace/--blog options of a single-blog CLI, plus --config/--dataset for a legacy app_config.json"""
+    parser.add_argument('--workspace', default=WORKSPACE_DB, help="Workspace database of the Streamlit app")
+    parser.add_argument('--blog', help="Blog id in the workspace (needed when it holds more than one blog)")
+    parser.add_argument('--config', help="Legacy app_config.json to read instead of the workspace")
+    parser.add_argument('--dataset', help="Dataset file (defaults to the blog's last ingest)")
+
+
+def resolve_blog(args):
+    """(blog id, profile, dataset file) named by add_blog_arguments() options
+
+    The blog id is None for a legacy --config. Raises ValueError with a
+    message for the user when the blog can't be found.
+    """
+    if args.config:
+        with open(args.config, 'r') as f:
+            profile = json.load(f)
+        return None, profile, args.dataset or dataset_path(profile.get('spreadsheet_id'), profile.get('sheet_name'))
+    if not os.path.exists(args.workspace):
+        raise ValueError(f"No workspace at {args.workspace}; pass --workspace (the app's workspace.db) or --config")
+    workspace = Workspace(args.workspace)
+    blog_id = args.blog
+    if blog_id is None:
+        ids = workspace.ids()
+        if len(ids) != 1:
+            raise ValueError(f"--blog is required; the workspace holds: {', '.join(ids) or 'no blogs'}")
+        blog_id = ids[0]
+    profile = workspace.get(blog_id)
+    if profile is None:
+        raise ValueError(f"Unknown blog: {blog_id} (the workspace holds: {', '.join(workspace.ids())})")
+    return blog_id, profile, args.dataset or blog_dataset_path(blog_id, profile)
+
+
+class Workspace:
+    """Blog profiles stored in SQLite; every call opens its own short connection,
+    so threads and Streamlit sessions can share one Workspace"""
+
+    def __init__(self, path=WORKSPACE_DB):
+        self.path = path
+        with self._connect() as db:
+            db.execute(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def _query(self, sql, params=()):
+        db = self._connect()
+        try:
+            return db.execute(sql, params).fetchall()
+        finally:
+            db.close()
+
+    def ids(self):
+        return [row[0] for row in self._query("SELECT id FROM blogs ORDER BY id")]
+
+    def get(self, blog_id):
+        """One blog's profile, or None"""
+        rows = self._query("SELECT profile FROM blogs WHERE id = ?", (blog_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def blogs(self, blog_ids=None):
+        """[(id, profile)] of every blog, or of `blog_ids`"""
+        rows = self._query("SELECT id, profile FROM blogs ORDER BY id")
+        return [(blog_id, json.loads(profile)) for blog_id, profile in rows
+                if blog_ids is None or blog_id in blog_ids]
+
+    def save(self, blog_id, profile):
+        """Create or replace a blog's profile"""
+        db = self._connect()
+        try:
+            with db:
+                db.execute("INSERT INTO blogs (id, profile, updated_at) VALUES (?, ?, ?) "
+                           "ON CONFLICT(id) DO UPDATE SET profile = excluded.profile, updated_at = excluded.updated_at",
+                           (blog_id, json.dumps(profile, ensure_ascii=False), time.time()))
+        finally:
+            db.close()
+
+    def remove(self, blog_id):
+        db = self._connect()
+        try:
+            with db:
+                db.execute("DELETE FROM blogs WHERE id = ?", (blog_id,))
+        finally:
+            db.close()
+
+    def import_app_config(self, path, blog_id=None):
+        """Add the single blog of an app_config.json; returns its id"""
+        with open(path, 'r') as f:
+            profile = json.load(f)
+        blog_id = blog_id or profile.get('kv_worker_name') or profile.get('spreadsheet_id') or "default"
+        self.save(blog_id, profile)
+        return blog_id
+
+
+def fetch_blog(blog_id, profile, progress=None):
+    """Ingest the blog's sheet into its own dataset"""
+    path = ingest_sheet(profile['spreadsheet_id'], profile.get('sheet_name'), path=blog_dataset_path(blog_id, profile),
+                        api_key=profile.get('sheets_api_key') or None,
+                        state_dir=os.path.join(cache_dir(blog_id, profile), "sheets_api"))
+    with PostDataset(path) as dataset:
+        return {"posts": len(dataset), "dataset": path}
+
+
+def build_blog(blog_id, profile, output_dir=None, workers=1, progress=None):
+    """Render the blog's last ingested dataset to a static site"""
+    from static_build import build_static_site
+
+    output_dir = output_dir or os.path.join(cache_dir(blog_id, profile), "site")
+    summary = build_static_site(blog_dataset_path(blog_id, profile), output_dir, site_config(profile),
+                                workers=workers, progress=progress)
+    return dict(summary, output_dir=output_dir)
+
+
+def deploy_blog(blog_id, profile, progress=None):
+    """Publish the blog's last ingested dataset to Workers KV and upload its KV-backed Worker"""
+    from blog_data import build_dataset
+    from cloudflare_api import upload_worker_modules
+    from feeds import feed_bodies
+    from generators import generate_cloudflare_worker_modules
+    from kv_publish import ensure_kv_namespace, kv_binding, publish_snapshot
+
+    account_id = profile.get('cf_account_id')
+    api_token = profile.get('cf_api_token')
+    worker_name = profile.get('kv_worker_name')
+    if not (account_id and api_token and worker_name):
+        raise ValueError("Cloudflare account ID, API token and snapshot worker name are required")
+
+    with PostDataset(blog_dataset_path(blog_id, profile)) as post_dataset:
+        posts = list(post_dataset)
+    dataset = build_dataset(posts)
+    if profile.get('site_url'):
+        dataset["feeds"] = feed_bodies(posts, site_config(profile))
+    namespace_id = profile.get('kv_namespace_id') or ensure_kv_namespace(account_id, api_token, f"{worker_name}-content")
+    summary = publish_snapshot(dataset, account_id, api_token, namespace_id,
+                               spreadsheet_id=profile.get('spreadsheet_id', ''),
+                               sheet_name=profile.get('sheet_name', ''), progress=progress,
+                               posts_per_page=int(profile.get('posts_per_page') or 6),
+                               blog_title=profile.get('blog_title', 'Blog'))
+
+    modules = generate_cloudflare_worker_modules(dict(worker_config(profile), dataSource="kv"))
+    upload_worker_modules(account_id, api_token, worker_name, modules, bindings=[kv_binding(namespace_id)])
+    return {"posts": dataset['stats']['totalPosts'], "worker_name": worker_name, "namespace_id": namespace_id,
+            "summary": summary}
+
+
+def index_blog(blog_id, profile, progress=None, dry_run=False):
+    """Submit the blog's new and updated post URLs to the Indexing API, with its own ledger"""
+    from indexing import index_posts
+
+    with PostDataset(blog_dataset_path(blog_id, profile)) as dataset:
+        return index_posts(dataset, profile, os.path.join(cache_dir(blog_id, profile), "indexing.sqlite"),
+                           dry_run=dry_run, progress=progress)
+
+
+def generate_blog(blog_id, profile, progress=None, task="article", dry_run=False):
+    """Generate the blog's empty articles or meta descriptions and write them to its sheet"""
+    from ai_generate import generate_posts
+
+    with PostDataset(blog_dataset_path(blog_id, profile)) as dataset:
+        return generate_posts(dataset, profile, task, dry_run=dry_run, progress=progress)
+
+
+def check_blog(blog_id, profile, progress=None, write_back=False):
+    """Scan the blog's dataset for data-quality issues, optionally coloring them in its sheet"""
+    from data_quality import check_dataset
+
+    with PostDataset(blog_dataset_path(blog_id, profile)) as dataset:
+        return check_dataset(dataset, profile, write_back)
+
+
+OPERATIONS = {
+    "fetch": fetch_blog,
+    "build": build_blog,
+    "deploy": deploy_blog,
+    "index": index_blog,
+    "generate": generate_blog,
+    "check": check_blog
+}
+
+
+def run_all(workspace, operation, blog_ids=None, concurrency=DEFAULT_CONCURRENCY, progress=None, **kwargs):
+    """Run an operation on many blogs, at most `concurrency` at a time
+
+    Returns {blog_id: {"ok": True, "result": ...} or {"ok": False, "error": "..."}};
+    one blog failing doesn't stop the others.
+    """
+    func = OPERATIONS[operation] if isinstance(operation, str) else operation
+    blogs = workspace.blogs(blog_ids)
+    results = {}
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(func, blog_id, profile, **kwargs): blog_id for blog_id, profile in blogs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            blog_id = futures[future]
+            try:
+                results[blog_id] = {"ok": True, "result": future.result()}
+            except Exception as e:
+                results[blog_id] = {"ok": False, "error": str(e)}
+            if progress:
+                progress(done, len(futures), f"{blog_id} done ({done}/{len(futures)})")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage and bulk-operate the blogs of a workspace")
+    parser.add_argument('--db', default=WORKSPACE_DB, help="Workspace database")
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('list', help="List blogs")
+    imported = sub.add_parser('import', help="Add a blog from an app_config.json")
+    imported.add_argument('app_config')
+    imported.add_argument('--id', help="Blog id (default: snapshot worker name or spreadsheet id)")
+    removed = sub.add_parser('remove', help="Remove a blog")
+    removed.add_argument('blog_id')
+    for command in ('fetch-all', 'build-all', 'deploy-all', 'index-all', 'generate-all', 'check-all'):
+        bulk = sub.add_parser(command)
+        bulk.add_argument('--blog', action='append', help="Only this blog (repeatable)")
+        bulk.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help="Blogs processed at once")
+        if command == 'build-all':
+            bulk.add_argument('--out', help="Write each site to <out>/<blog id> (default: the blog's cache)")
+        if command == 'generate-all':
+            bulk.add_argument('--task', choices=('article', 'meta'), default='article', help="Column to fill in")
+        if command == 'check-all':
+            bulk.add_argument('--write-back', action='store_true', help="Color the flagged cells in each sheet")
+    args = parser.parse_args(argv)
+
+    workspace = Workspace(args.db)
+    if args.command == 'list':
+        for blog_id, profile in workspace.blogs():
+            print(f"{blog_id}\t{profile.get('spreadsheet_id', '')}\t{profile.get('sheet_name', '')}\t"
+                  f"{profile.get('kv_worker_name', '')}")
+        return 0
+    if args.command == 'import':
+        print(f"Imported {workspace.import_app_config(args.app_config, args.id)}")
+        return 0
+    if args.command == 'remove':
+        workspace.remove(args.blog_id)
+        return 0
+
+    operation = args.command[:-len('-all')]
+    if operation == 'build' and args.out:
+        # Every blog gets its own directory under --out
+        results = run_all(workspace, lambda blog_id, profile: build_blog(blog_id, profile, os.path.join(args.out, blog_id)),
+                          args.blog, args.concurrency)
+    elif operation == 'generate':
+        results = run_all(workspace, operation, args.blog, args.concurrency, task=args.task)
+    elif operation == 'check':
+        results = run_all(workspace, operation, args.blog, args.concurrency, write_back=args.write_back)
+    else:
+        results = run_all(workspace, operation, args.blog, args.concurrency)
+    for blog_id, outcome in sorted(results.items()):
+        print(f"{blog_id}: {'ok' if outcome['ok'] else 'FAILED ' + outcome['error']}")
+    return 0 if all(outcome['ok'] for outcome in results.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())